@@ -30,12 +30,13 @@ import os
 import logging
 import streamlit as st
 from pathlib import Path
-from groq import Groq
+from llm_client import get_groq_client
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 from time_utils import get_formatted_utc_time
 from pdf_utils import generate_pdf_report
+from response_timing import format_response_factor_evidence, stamp_message
 from feedback_template import FeedbackFormatter, FeedbackValidator
 from scoring_utils import validate_student_name
 from persona_texts import (
@@ -93,9 +94,8 @@ if not student_name:
     st.warning("Please enter your name for the feedback report.")
     st.stop()
 
-# --- Set API key and initialize client ---
-os.environ["GROQ_API_KEY"] = api_key
-client = Groq()
+# --- Get the shared client for this API key (reused across reruns) ---
+client = get_groq_client(api_key)
 
 # --- Initialize session state ---
 from chat_utils import initialize_session_state
@@ -192,12 +192,13 @@ if st.session_state.selected_persona is None:
     if st.button("Start Conversation"):
         st.session_state.selected_persona = selected
         st.session_state.chat_history = []
+        st.session_state.conversation_summary = None
         st.session_state.conversation_state = "active"
         st.session_state.turn_count = 0
-        st.session_state.chat_history.append({
+        st.session_state.chat_history.append(stamp_message({
             "role": "assistant",
             "content": f"Hello! I'm {selected}, nice to meet you today."
-        })
+        }))
         st.rerun()
     
     # Stop here if persona not selected yet
@@ -258,9 +259,10 @@ if st.button(feedback_button_label, disabled=not feedback_enabled):
     retrieved_info = retrieve_knowledge("motivational interviewing feedback rubric")
     rag_context = "\n".join(retrieved_info)
 
-    # Use standardized evaluation prompt
+    # Use standardized evaluation prompt, with the measured response times the PDF score uses
     review_prompt = FeedbackFormatter.format_evaluation_prompt(
-        "dental hygiene", transcript, rag_context
+        "dental hygiene", transcript, rag_context,
+        format_response_factor_evidence(st.session_state.chat_history)
     )
 
     try:
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Chunking Micro-Benchmark
+
+Compares the legacy split_text() with the sentence-aware chunk_text() on the
+bot rubric corpora: time per call (best of --repeat), chunk counts and sizes,
+and the share of chunks that end on a sentence boundary. --scale repeats each
+corpus to show how both implementations grow with input and chunk size.
+
+Usage:
+    python3 benchmarks/chunking.py
+    python3 benchmarks/chunking.py --scale 10 --chunk-size 400
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.chunking import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, chunk_text, split_text
+from rag.knowledge_base import load_rubric_texts
+from rag.warmup import BOT_RUBRIC_DIRS, REPO_ROOT
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark rubric chunking')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'chunk_text size (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP,
+                        help=f'chunk_text overlap (default: {DEFAULT_OVERLAP})')
+    parser.add_argument('--legacy-length', type=int, default=200,
+                        help='split_text max_length (default: 200)')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='Repeat each corpus this many times (default: 1)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Timing runs; the fastest is reported (default: 5)')
+    return parser.parse_args()
+
+
+def describe(chunks):
+    """Summarize chunk statistics."""
+    lengths = [len(chunk) for chunk in chunks] or [0]
+    sentence_ends = sum(1 for chunk in chunks if chunk.rstrip().endswith(('.', '!', '?', ':')))
+    return {
+        'count': len(chunks),
+        'mean': statistics.mean(lengths),
+        'max': max(lengths),
+        'sentence_pct': 100.0 * sentence_ends / max(1, len(chunks)),
+    }
+
+
+def best_time_ms(func, repeat):
+    """Best wall time of one call, in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+
+    header = f"{'corpus':<16} {'impl':<12} {'ms':>8} {'chunks':>7} {'mean':>6} {'max':>5} {'sent%':>6}"
+    print(header)
+    print('-' * len(header))
+
+    for rubric_dir in BOT_RUBRIC_DIRS:
+        rubric_texts = load_rubric_texts(REPO_ROOT / rubric_dir)
+        text = "\n\n".join(text for _, text in rubric_texts)
+        text = "\n\n".join([text] * args.scale)
+
+        runs = [
+            ('split_text', lambda: split_text(text, args.legacy_length)),
+            ('chunk_text', lambda: chunk_text(text, args.chunk_size, args.overlap)),
+        ]
+        for label, func in runs:
+            elapsed = best_time_ms(func, args.repeat)
+            stats = describe(func())
+            print(
+                f"{rubric_dir:<16} {label:<12} {elapsed:>8.2f} {stats['count']:>7} "
+                f"{stats['mean']:>6.0f} {stats['max']:>5} {stats['sentence_pct']:>5.0f}%"
+            )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+End-Control Decision Benchmark
+
+Replays chat transcripts turn by turn through should_continue_v4 and
+reports the per-turn decision time with the compiled signal matcher
+(end_control_middleware.scan_message) and incremental MI coverage
+(MICoverageTracker), and with the previous detectors, which lower-cased
+the text in every detector, ran re.search over each pattern list and
+rescanned the whole history for MI coverage every turn. Both runs must
+reach the same decisions.
+
+Transcripts are JSONL, one session per line: {"id": ..., "messages":
+[{"role": "user" | "assistant", "content": ...}, ...]}. Each student
+message and the patient reply after it form one turn; other assistant
+messages (greeting, confirmation prompts) are added to the history as in
+the app.
+
+Usage:
+    python3 benchmarks/end_control.py
+    python3 benchmarks/end_control.py --transcripts sessions.jsonl --repeat 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import end_control_middleware as ecm
+from config_loader import get_config_loader
+
+DEFAULT_TRANSCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'transcripts.jsonl')
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark end-control decisions')
+    parser.add_argument('--transcripts', default=DEFAULT_TRANSCRIPTS,
+                        help='JSONL transcripts (default: benchmarks/data/transcripts.jsonl)')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Replays of the whole corpus per implementation (default: 10)')
+    return parser.parse_args()
+
+
+def load_transcripts(path):
+    """Load one session per non-empty line."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _matches(patterns, text):
+    text_lower = text.lower().strip()
+    return any(re.search(pattern, text_lower) for pattern in patterns)
+
+
+def legacy_detectors():
+    """The detectors before the compiled matcher, for patch.multiple."""
+
+    def check_mi_coverage(chat_history):
+        coverage = {component: False for component in ecm.MI_COVERAGE_PATTERNS}
+        for message in chat_history:
+            if message.get('role') == 'assistant':
+                for component, patterns in ecm.MI_COVERAGE_PATTERNS.items():
+                    if not coverage[component] and _matches(patterns, message.get('content', '')):
+                        coverage[component] = True
+        return coverage
+
+    def detect_patient_satisfaction(chat_history):
+        recent = [m for m in chat_history[-6:] if m.get('role') == 'assistant']
+        return sum(1 for m in recent if _matches(ecm.PATIENT_SATISFACTION_PATTERNS, m.get('content', ''))) >= 2
+
+    def detect_student_confirmation(user_message):
+        return _matches(ecm.STUDENT_CONFIRMATION_PATTERNS, user_message)
+
+    class FullScanCoverage:
+        def __init__(self, chat_history):
+            self.covered = check_mi_coverage(chat_history)
+
+        def missing(self):
+            return [component for component, present in self.covered.items() if not present]
+
+    return {
+        'detect_user_end_intent': lambda text: bool(text) and _matches(ecm.USER_END_INTENT_PATTERNS, text),
+        'detect_bot_end_ack': lambda text: bool(text) and _matches(ecm.BOT_END_ACK_PATTERNS, text),
+        'detect_doctor_closure_signal': lambda text: _matches(ecm.DOCTOR_CLOSURE_PATTERNS, text),
+        'detect_patient_end_confirmation': lambda text: _matches(ecm.PATIENT_END_CONFIRMATION_PATTERNS, text),
+        'detect_student_confirmation': detect_student_confirmation,
+        'detect_patient_satisfaction': detect_patient_satisfaction,
+        'check_mi_coverage': check_mi_coverage,
+        'get_mi_coverage_tracker': lambda context: FullScanCoverage(context.get('chat_history', [])),
+    }
+
+
+def replay(session):
+    """Run should_continue_v4 for each turn; return (turn times in seconds, decision states)."""
+    context = {'chat_history': [], 'turn_count': 0, 'end_control_state': 'ACTIVE'}
+    history = context['chat_history']
+    messages = session['messages']
+    times, states = [], []
+
+    for index, message in enumerate(messages):
+        history.append(message)
+        # A turn is complete once the patient has replied to a student message
+        # (same pairing as end_control_replay.replay_transcript)
+        if message['role'] != 'assistant' or index == 0 or messages[index - 1]['role'] != 'user':
+            continue
+        context['turn_count'] += 1
+
+        start = time.perf_counter()
+        decision = ecm.should_continue_v4(context, message['content'], messages[index - 1]['content'])
+        times.append(time.perf_counter() - start)
+
+        context['end_control_state'] = decision['state']
+        states.append(decision['state'])
+        if not decision['continue']:
+            break
+    return times, states
+
+
+def run(sessions, repeat):
+    """Replay the corpus `repeat` times; return all turn times and the decisions of one replay."""
+    times = []
+    for _ in range(repeat):
+        ecm._scan_cached.cache_clear()
+        states = []
+        for session in sessions:
+            session_times, session_states = replay(session)
+            times.extend(session_times)
+            states.append(session_states)
+    return times, states
+
+
+def describe(times):
+    """Per-turn timing statistics in microseconds."""
+    ordered = sorted(times)
+    return {
+        'mean': statistics.mean(ordered) * 1e6,
+        'p50': statistics.median(ordered) * 1e6,
+        'p95': ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1e6,
+        'max': ordered[-1] * 1e6,
+    }
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    sessions = load_transcripts(args.transcripts)
+    logging.disable(logging.CRITICAL)
+    get_config_loader()  # Load the config before timing
+
+    with patch.multiple(ecm, **legacy_detectors()):
+        legacy_times, legacy_states = run(sessions, args.repeat)
+    compiled_times, compiled_states = run(sessions, args.repeat)
+
+    turns = len(compiled_times) // args.repeat
+    print(f"{len(sessions)} sessions, {turns} turns, {args.repeat} replays")
+    header = f"{'impl':<10} {'mean us':>9} {'p50 us':>9} {'p95 us':>9} {'max us':>9}"
+    print(header)
+    print('-' * len(header))
+    for label, times in (('legacy', legacy_times), ('compiled', compiled_times)):
+        stats = describe(times)
+        print(f"{label:<10} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['max']:>9.1f}")
+    print(f"speed-up: {statistics.mean(legacy_times) / statistics.mean(compiled_times):.1f}x (mean)")
+
+    if legacy_states != compiled_states:
+        print("Decisions differ between implementations")
+        return 1
+    print("Decisions identical")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
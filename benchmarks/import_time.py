@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Import-Time Benchmark
+
+Measures the cost of importing the app's shared modules in a fresh
+interpreter (python -X importtime), so regressions in portal startup show up
+before a lab session does. Each module is imported in its own subprocess and
+the best of --repeat runs is reported, along with the heaviest transitive
+imports and whether faiss/torch/sentence_transformers were pulled in.
+
+Usage:
+    python3 benchmarks/import_time.py
+    python3 benchmarks/import_time.py --modules chat_utils rag --top 15
+    python3 benchmarks/import_time.py --budget-ms 1500   # exit 1 if any module exceeds it
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules on the portal/developer login path, plus the heavy deps for reference
+DEFAULT_MODULES = [
+    'config_loader',
+    'logger_config',
+    'utils.access_control',
+    'end_control_middleware',
+    'feedback_template',
+    'pdf_utils',
+    'rag',
+    'chat_utils',
+    'faiss',
+    'torch',
+    'sentence_transformers',
+]
+
+HEAVY_MODULES = ('faiss', 'torch', 'sentence_transformers')
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Report per-module import cost')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES,
+                        help='Modules to import (default: shared app modules and heavy deps)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per module; the fastest is reported (default: 3)')
+    parser.add_argument('--top', type=int, default=5,
+                        help='Heaviest transitive imports to list per module (default: 5)')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Fail if any non-heavy module takes longer than this')
+    return parser.parse_args()
+
+
+def measure_import(module: str, statement: Optional[str] = None) -> Tuple[float, Dict[str, float]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module name to import
+        statement: Code to run instead of "import <module>" (optional)
+
+    Returns:
+        Tuple of (total cumulative ms, dict of imported module -> cumulative ms)
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement or f'import {module}'],
+        cwd=REPO_ROOT,
+        env={**os.environ, 'PYTHONPATH': str(REPO_ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error'
+        raise RuntimeError(last_line)
+
+    cumulative: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        cumulative[name] = max(cumulative.get(name, 0.0), int(parts[1]) / 1000.0)
+
+    return cumulative.get(module, 0.0), cumulative
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+
+    # Interpreter startup imports (site, .pth hooks) are not attributable to any module
+    _, startup = measure_import('', statement='pass')
+
+    print(f"{'module':<28} {'import ms':>10}  heavy deps pulled in")
+    print('-' * 70)
+
+    over_budget: List[str] = []
+    failed = 0
+    for module in args.modules:
+        try:
+            runs = [measure_import(module) for _ in range(max(1, args.repeat))]
+        except RuntimeError as e:
+            print(f"{module:<28} {'FAILED':>10}  {e}")
+            failed += 1
+            continue
+
+        total_ms, cumulative = min(runs, key=lambda run: run[0])
+        heavy = [name for name in HEAVY_MODULES if name in cumulative and name != module]
+        print(f"{module:<28} {total_ms:>10.1f}  {', '.join(heavy) or '-'}")
+
+        if args.top:
+            children = sorted(
+                (
+                    (name, ms) for name, ms in cumulative.items()
+                    if name != module and '.' not in name and name not in startup
+                ),
+                key=lambda item: item[1], reverse=True
+            )[:args.top]
+            for name, ms in children:
+                print(f"    {name:<24} {ms:>10.1f}")
+
+        if args.budget_ms is not None and module not in HEAVY_MODULES and total_ms > args.budget_ms:
+            over_budget.append(f"{module} ({total_ms:.0f} ms)")
+
+    if over_budget:
+        print(f"\nOver {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        return 1
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
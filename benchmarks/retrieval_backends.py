@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Retrieval Backend Comparison
+
+Builds the embedding (MiniLM + FAISS) and BM25 knowledge bases for every bot
+rubric corpus, runs the feedback query, the per-category rubric queries and a
+few typical MI queries against both, and reports how closely BM25 matches the
+embedding results (top-k overlap) alongside build and query times.
+
+The embedding backend needs torch, faiss and the all-MiniLM-L6-v2 model; use
+this before switching a deployment to "retrieval": {"backend": "bm25"}.
+
+Usage:
+    python3 benchmarks/retrieval_backends.py
+    python3 benchmarks/retrieval_backends.py --top-k 3 --rubrics hpv_rubrics --verbose
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.backends import BM25Backend, EmbeddingBackend
+from rag.knowledge_base import KnowledgeBase, load_rubric_texts
+from rag.retrieval_cache import CATEGORY_QUERIES, FEEDBACK_QUERY
+from rag.warmup import BOT_RUBRIC_DIRS, REPO_ROOT
+
+# Typical ad-hoc queries alongside the fixed feedback/category queries
+EXTRA_QUERIES = [
+    "open-ended questions and reflective listening",
+    "rolling with resistance without arguing",
+    "eliciting change talk about the patient's own reasons",
+    "summarizing the conversation and agreeing on next steps",
+    "asking permission before sharing information",
+]
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Compare embedding and BM25 retrieval')
+    parser.add_argument('--rubrics', nargs='+', default=BOT_RUBRIC_DIRS,
+                        help='Rubric directories relative to the repository root')
+    parser.add_argument('--top-k', type=int, default=2,
+                        help='Chunks retrieved per query (default: 2)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the overlap of every query')
+    return parser.parse_args()
+
+
+def build(name, rubric_texts, backend):
+    """Build a knowledge base; returns (knowledge_base, build_ms)."""
+    start = time.perf_counter()
+    knowledge_base = KnowledgeBase.build(name, rubric_texts, backend=backend)
+    return knowledge_base, (time.perf_counter() - start) * 1000
+
+
+def search(knowledge_base, queries, top_k):
+    """Search the backend directly (bypassing the cache); returns (results, query_ms)."""
+    start = time.perf_counter()
+    results = knowledge_base.backend.search(queries, top_k)
+    return results, (time.perf_counter() - start) * 1000
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    queries = [FEEDBACK_QUERY, *CATEGORY_QUERIES.values(), *EXTRA_QUERIES]
+
+    header = (f"{'corpus':<16} {'chunks':>6} {'emb build':>10} {'bm25 build':>11} "
+              f"{'emb query':>10} {'bm25 query':>11} {'overlap':>8} {'top1':>6}")
+    print(header)
+    print('-' * len(header))
+
+    overlaps = []
+    for rubric_dir in args.rubrics:
+        rubric_texts = load_rubric_texts(REPO_ROOT / rubric_dir)
+        try:
+            embedding_kb, embedding_build_ms = build(rubric_dir, rubric_texts, EmbeddingBackend())
+        except Exception as e:
+            print(f"❌ Could not build the embedding index (torch/faiss/model unavailable?): {e}")
+            return 1
+        bm25_kb, bm25_build_ms = build(rubric_dir, rubric_texts, BM25Backend())
+
+        embedding_results, embedding_query_ms = search(embedding_kb, queries, args.top_k)
+        bm25_results, bm25_query_ms = search(bm25_kb, queries, args.top_k)
+
+        corpus_overlaps = []
+        top1_matches = 0
+        for query, expected, actual in zip(queries, embedding_results, bm25_results):
+            overlap = len(set(expected) & set(actual)) / max(1, len(expected))
+            corpus_overlaps.append(overlap)
+            top1_matches += bool(expected and actual and expected[0] == actual[0])
+            if args.verbose:
+                print(f"    {overlap:>4.0%}  {query[:70]}")
+        overlaps.extend(corpus_overlaps)
+
+        print(
+            f"{rubric_dir:<16} {len(embedding_kb.chunks):>6} {embedding_build_ms:>8.0f}ms "
+            f"{bm25_build_ms:>9.1f}ms {embedding_query_ms:>8.1f}ms {bm25_query_ms:>9.2f}ms "
+            f"{statistics.mean(corpus_overlaps):>8.0%} {top1_matches / len(queries):>6.0%}"
+        )
+
+    print(f"\nMean top-{args.top_k} overlap with embedding retrieval: {statistics.mean(overlaps):.0%} "
+          f"over {len(overlaps)} queries")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Rubric Index Build Script
+
+This script encodes the rubric corpora once and writes prebuilt indexes
+(chunks plus the backend index, e.g. embeddings and FAISS index, stamped
+with per-file hashes and the backend model name) so bot pages can memory-map them at startup instead of
+encoding the rubrics in every worker process.
+
+Indexes that already match the current rubric content and model are skipped.
+
+Usage:
+    python3 build_rubric_index.py
+    python3 build_rubric_index.py --rubrics hpv_rubrics ohi_rubrics
+    python3 build_rubric_index.py --backend bm25
+    python3 build_rubric_index.py --index-dir /var/cache/rag_index --force
+"""
+
+import argparse
+import sys
+import logging
+from pathlib import Path
+
+from rag.backends import BACKENDS, create_backend, get_backend_name
+from rag.chunking import get_chunk_settings
+from rag.knowledge_base import (
+    KnowledgeBase,
+    KnowledgeBaseError,
+    compute_corpus_hash,
+    load_rubric_texts,
+)
+from rag.index_store import get_artifact_dir, is_artifact_current, read_manifest
+from rag.warmup import BOT_RUBRIC_DIRS, REPO_ROOT
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Build prebuilt rubric indexes for the MI chatbot pages'
+    )
+    parser.add_argument(
+        '--rubrics',
+        nargs='+',
+        default=BOT_RUBRIC_DIRS,
+        help='Rubric directories to index (default: all bot rubric directories)'
+    )
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default=None,
+        help='Output directory for prebuilt indexes (default: RAG_INDEX_DIR or rag_index/)'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=sorted(BACKENDS),
+        default=None,
+        help='Retrieval backend to build (default: configured backend)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild indexes even if they are already current'
+    )
+    return parser.parse_args()
+
+
+def build_index(rubrics_dir: Path, backend_name: str, index_dir=None, force: bool = False) -> str:
+    """
+    Build the prebuilt index for one rubric directory.
+
+    Args:
+        rubrics_dir: Directory containing rubric .txt files
+        backend_name: Retrieval backend name
+        index_dir: Output index directory (optional)
+        force: Rebuild even if the existing index is current
+
+    Returns:
+        'built' or 'current'
+    """
+    rubric_texts = load_rubric_texts(rubrics_dir)
+    corpus_hash = compute_corpus_hash(rubric_texts)
+
+    backend = create_backend(backend_name)
+    chunk_size, chunk_overlap = get_chunk_settings()
+    manifest = read_manifest(rubrics_dir.name, index_dir, backend_name)
+    if not force and is_artifact_current(manifest, corpus_hash, backend.model_name, chunk_size, chunk_overlap):
+        logger.info(f"✓ {rubrics_dir.name}: up to date ({manifest.get('chunk_count')} chunks)")
+        return 'current'
+
+    knowledge_base = KnowledgeBase.build(
+        rubrics_dir.name, rubric_texts, corpus_hash, backend, (chunk_size, chunk_overlap)
+    )
+    artifact_dir = knowledge_base.save(index_dir)
+    logger.info(f"✓ {rubrics_dir.name}: built {len(knowledge_base.chunks)} chunks -> {artifact_dir}")
+    return 'built'
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    backend_name = args.backend or get_backend_name()
+
+    built = current = failed = 0
+    for rubric_name in args.rubrics:
+        rubrics_dir = Path(rubric_name)
+        if not rubrics_dir.is_absolute():
+            rubrics_dir = REPO_ROOT / rubrics_dir
+
+        try:
+            if build_index(rubrics_dir, backend_name, args.index_dir, args.force) == 'built':
+                built += 1
+            else:
+                current += 1
+        except (KnowledgeBaseError, OSError) as e:
+            logger.error(f"✗ {rubrics_dir.name}: {e}")
+            failed += 1
+
+    # Summary
+    logger.info("=" * 70)
+    logger.info(f"Index directory: {get_artifact_dir('', args.index_dir, backend_name)}")
+    logger.info(f"Built: {built}, up to date: {current}, failed: {failed}")
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
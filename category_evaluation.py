@@ -0,0 +1,266 @@
+"""
+Parallel Per-Category Evaluation for MI Feedback
+
+The standard evaluation prompt asks the model to grade all six rubric
+categories in one long completion, so feedback takes as long as generating
+every category in turn. In per-category mode (feedback_jobs.evaluation_mode
+= "per_category") the evaluation fans out one smaller prompt per
+MIRubric.CATEGORIES entry, each with its own category RAG context, to a
+process-wide thread pool. The answers are merged back, in rubric order, into
+the "**Category (N pts): Status - feedback**" format that
+EvaluationService.parse_llm_feedback and MIScorer read, so feedback arrives
+in about the time of the slowest category.
+
+A category whose call fails or whose answer has no assessment line is
+retried (category_attempts in total). If a category still fails, evaluate()
+raises CategoryEvaluationError naming it, and the feedback job falls back to
+the single evaluation prompt (see chat_utils._generate_category_feedback).
+
+Each category call goes through the rate limiter at evaluation priority,
+limited to feedback_jobs.category_max_tokens completion tokens (which is
+also what the limiter reserves for it), and is recorded in llm_metrics like
+any other evaluation call. The prompts repeat the transcript, so
+per-category mode spends more prompt tokens per evaluation; on a key with a
+low tokens-per-minute limit it can be slower.
+
+Usage:
+    if get_evaluation_mode() == EVALUATION_MODE_PER_CATEGORY:
+        prompts = FeedbackFormatter.format_category_evaluation_prompts(
+            "HPV vaccine", transcript, knowledge_base.category_contexts())
+        feedback = evaluate_categories(client, system_prompt, prompts, model)
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from llm_metrics import PURPOSE_EVALUATION, extract_usage, track_llm_call
+from rate_limiter import PRIORITY_EVALUATION, rate_limited_completion
+from rubric.mi_rubric import MIRubric
+from services.evaluation_service import EvaluationService
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EVALUATION_MODE_SINGLE = 'single'
+EVALUATION_MODE_PER_CATEGORY = 'per_category'
+
+# Enough for a few concurrent evaluations of all six categories
+DEFAULT_CATEGORY_MAX_WORKERS = 12
+
+# One category block (assessment, feedback, a quote) fits well within this;
+# without max_tokens the rate limiter reserves DEFAULT_COMPLETION_TOKENS per call
+DEFAULT_CATEGORY_MAX_TOKENS = 400
+
+# Calls per category (the first plus retries) before the evaluation fails
+DEFAULT_CATEGORY_ATTEMPTS = 2
+
+
+class CategoryEvaluationError(Exception):
+    """Raised when one or more categories could not be evaluated."""
+
+    def __init__(self, failures: Dict[str, Exception]):
+        """
+        Initialize the error.
+
+        Args:
+            failures: Dict mapping each failed category to its last error
+        """
+        self.failures = failures
+        super().__init__(
+            "Evaluation failed for " + ', '.join(f"{category} ({error})" for category, error in failures.items())
+        )
+
+    @property
+    def categories(self) -> List[str]:
+        """Names of the failed categories."""
+        return list(self.failures)
+
+
+def get_evaluation_mode() -> str:
+    """Get feedback_jobs.evaluation_mode ("single" or "per_category"), read on every call."""
+    from config_loader import get_config_loader
+    return get_config_loader().get_feedback_jobs_config().get('evaluation_mode', EVALUATION_MODE_SINGLE)
+
+
+def evaluate_category(client: Any, model: str, system_prompt: str, prompt: str,
+                      max_tokens: int = DEFAULT_CATEGORY_MAX_TOKENS) -> str:
+    """
+    Run the evaluation completion for one category.
+
+    Args:
+        client: Groq API client
+        model: Evaluation model
+        system_prompt: Persona system prompt
+        prompt: Category prompt (see FeedbackFormatter.format_category_evaluation_prompt)
+        max_tokens: Completion token limit (also what the rate limiter reserves)
+
+    Returns:
+        str: The model's answer
+    """
+    with track_llm_call(PURPOSE_EVALUATION, model) as call:
+        response = rate_limited_completion(
+            client,
+            PRIORITY_EVALUATION,
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens
+        )
+        call.set_usage(extract_usage(response))
+    return response.choices[0].message.content
+
+
+def extract_category_block(category: str, response: Optional[str]) -> str:
+    """
+    Get a category's block from the model's answer, starting at its assessment line.
+
+    Args:
+        category: Rubric category name
+        response: The model's answer for that category
+
+    Returns:
+        str: The answer from the category line on (anything before it dropped)
+
+    Raises:
+        ValueError: If the answer has no assessment for the category
+    """
+    lines = (response or '').strip().split('\n')
+    start = next(
+        (index for index, line in enumerate(lines)
+         if category in EvaluationService.parse_llm_feedback(line)),
+        None
+    )
+    if start is None:
+        raise ValueError(f"Evaluation response for {category} has no assessment")
+    return '\n'.join(lines[start:]).strip()
+
+
+def merge_category_feedback(responses: Dict[str, str]) -> str:
+    """
+    Merge per-category answers into the standard evaluation feedback format.
+
+    Categories are ordered as in MIRubric.CATEGORIES. Anything the model
+    wrote before its category line is dropped.
+
+    Args:
+        responses: Dict mapping category name to the model's answer
+
+    Returns:
+        str: Feedback text parseable by EvaluationService.parse_llm_feedback
+
+    Raises:
+        ValueError: If a category is missing or its answer has no assessment
+    """
+    blocks = []
+    for category in MIRubric.CATEGORIES:
+        if category not in responses:
+            raise ValueError(f"No evaluation response for {category}")
+        blocks.append(extract_category_block(category, responses[category]))
+    return '\n\n'.join(blocks)
+
+
+class CategoryEvaluator:
+    """Fans category prompts out to a bounded, process-wide thread pool."""
+
+    def __init__(self, max_workers: int = DEFAULT_CATEGORY_MAX_WORKERS,
+                 max_tokens: int = DEFAULT_CATEGORY_MAX_TOKENS,
+                 attempts: int = DEFAULT_CATEGORY_ATTEMPTS):
+        """
+        Initialize the evaluator.
+
+        Args:
+            max_workers: Maximum concurrent category completions (all sessions)
+            max_tokens: Completion token limit of each category call
+            attempts: Calls per category before it counts as failed (at least 1)
+        """
+        self.max_workers = max_workers
+        self.max_tokens = max_tokens
+        self.attempts = max(1, attempts)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='category-eval')
+
+    def _evaluate_one(self, client: Any, model: str, system_prompt: str, category: str, prompt: str) -> str:
+        """Evaluate one category, retrying a failed call or an answer without an assessment."""
+        for attempt in range(1, self.attempts + 1):
+            try:
+                response = evaluate_category(client, model, system_prompt, prompt, self.max_tokens)
+                extract_category_block(category, response)
+                return response
+            except Exception as e:
+                logger.warning(f"Evaluation of {category} failed (attempt {attempt}/{self.attempts}): {e}")
+                if attempt == self.attempts:
+                    raise
+
+    def evaluate(self, client: Any, system_prompt: str, category_prompts: Dict[str, str], model: str) -> str:
+        """
+        Evaluate all categories in parallel and merge the answers.
+
+        Args:
+            client: Groq API client
+            system_prompt: Persona system prompt
+            category_prompts: Dict mapping category name to its prompt
+            model: Evaluation model
+
+        Returns:
+            str: Merged feedback (see merge_category_feedback)
+
+        Raises:
+            CategoryEvaluationError: If a category still failed after its retries
+        """
+        start = time.perf_counter()
+        futures = {
+            category: self._executor.submit(
+                self._evaluate_one, client, model, system_prompt, category, prompt
+            )
+            for category, prompt in category_prompts.items()
+        }
+        wait(futures.values())
+        failures = {
+            category: future.exception()
+            for category, future in futures.items()
+            if future.exception() is not None
+        }
+        if failures:
+            raise CategoryEvaluationError(failures)
+
+        feedback = merge_category_feedback({category: future.result() for category, future in futures.items()})
+        logger.info(
+            f"Evaluated {len(futures)} categories in parallel in {time.perf_counter() - start:.1f}s"
+        )
+        return feedback
+
+
+# Process-wide evaluator shared by all pages and sessions
+_category_evaluator: Optional[CategoryEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_category_evaluator() -> CategoryEvaluator:
+    """Get the process-wide category evaluator (configured from config.json)."""
+    global _category_evaluator
+
+    if _category_evaluator is None:
+        with _evaluator_lock:
+            if _category_evaluator is None:
+                try:
+                    from config_loader import get_config_loader
+                    settings = get_config_loader().get_feedback_jobs_config()
+                except Exception as e:
+                    logger.warning(f"Could not read feedback job config, using defaults: {e}")
+                    settings = {}
+                _category_evaluator = CategoryEvaluator(
+                    max_workers=int(settings.get('category_max_workers', DEFAULT_CATEGORY_MAX_WORKERS)),
+                    max_tokens=int(settings.get('category_max_tokens', DEFAULT_CATEGORY_MAX_TOKENS)),
+                    attempts=int(settings.get('category_attempts', DEFAULT_CATEGORY_ATTEMPTS))
+                )
+
+    return _category_evaluator
+
+
+def evaluate_categories(client: Any, system_prompt: str, category_prompts: Dict[str, str], model: str) -> str:
+    """Evaluate all categories on the process-wide evaluator (see CategoryEvaluator.evaluate)."""
+    return get_category_evaluator().evaluate(client, system_prompt, category_prompts, model)
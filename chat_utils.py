@@ -14,22 +14,32 @@ All functions maintain consistent behavior across both OHI and HPV assessment bo
 
 import streamlit as st
 import logging
+import time
+import uuid
 from groq import Groq
 from time_utils import get_formatted_utc_time
 from feedback_template import FeedbackFormatter
 from scoring_utils import validate_student_name
 from pdf_utils import generate_pdf_report
-from end_control_middleware import (
-    should_continue_v4,  # Use v4 with semantic-based ending
-    prevent_ambiguous_ending,
-    log_conversation_trace,
-    MIN_TURN_THRESHOLD,
-    END_TOKEN,
-)
+from conversation_window import estimate_tokens, window_chat_history
+from response_timing import format_response_factor_evidence, stamp_message
 
 # Configure logging for chat utilities
 logger = logging.getLogger(__name__)
 
+# Patient turn generation settings
+PATIENT_MODEL = "llama-3.1-8b-instant"
+PATIENT_MAX_TOKENS = 150  # Limit response length to enforce conciseness
+PATIENT_TEMPERATURE = 0.7
+STREAMING_CURSOR = "▌"
+
+# Model used for end-of-session evaluations
+FEEDBACK_MODEL = "llama-3.1-8b-instant"
+FEEDBACK_MAX_TOKENS = 1500  # Six category blocks; also what the rate limiter reserves
+
+# Fallback reply used when the bot breaks the patient role
+GENERIC_PATIENT_RESPONSE = "I appreciate you taking the time to talk with me. Is there anything else you'd like to discuss?"
+
 
 def detect_conversation_ending(chat_history, turn_count):
     """
@@ -82,6 +92,274 @@ def validate_response_role(response_content):
     return True, response_content
 
 
+def is_auth_error(error):
+    """Check whether an API exception is an authentication (invalid key) error."""
+    error_msg = str(error).lower()
+    return "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg
+
+
+def show_auth_error():
+    """Show the invalid API key message."""
+    st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
+    st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
+
+
+def is_rate_limit_error(error):
+    """Check whether an API exception means the key stayed rate limited after retries."""
+    from rate_limiter import RateLimitTimeout, get_status_code
+    return isinstance(error, RateLimitTimeout) or get_status_code(error) == 429
+
+
+def show_rate_limit_error():
+    """Show the busy-service message for a rate-limited API key."""
+    st.warning("⏳ The AI service is busy right now (rate limit reached for this API key).")
+    st.info("💡 Please wait a minute and send your message again.")
+
+
+def stream_chat_completion(client, messages, placeholder=None, guard=None, purpose='turn'):
+    """
+    Request a patient reply with streaming and render tokens as they arrive.
+    
+    If a StreamingGuard is given, each chunk is checked as it arrives and the
+    stream is closed as soon as a guardrail violation is certain, so the
+    caller can start the corrective request without waiting for the rest of
+    a reply that will be discarded anyway.
+    
+    Args:
+        client: Groq API client
+        messages: Chat messages to send
+        placeholder: Streamlit placeholder (st.empty()) updated with the partial reply
+        guard: persona_guard.StreamingGuard checking the reply mid-stream (optional)
+        purpose: Call purpose recorded in llm_metrics ('turn' or 'correction')
+        
+    Returns:
+        tuple: (response_text, timing) - timing has ttft_ms, total_ms, chunks
+               and aborted (the violation that stopped the stream, or None)
+    """
+    from llm_metrics import OUTCOME_ABORTED, extract_usage, track_llm_call
+    from rate_limiter import PRIORITY_TURN, rate_limited_completion
+    
+    with track_llm_call(purpose, PATIENT_MODEL, stream=True) as call:
+        start = time.perf_counter()
+        stream = rate_limited_completion(
+            client,
+            PRIORITY_TURN,
+            model=PATIENT_MODEL,
+            messages=messages,
+            max_tokens=PATIENT_MAX_TOKENS,
+            temperature=PATIENT_TEMPERATURE,
+            stream=True
+        )
+        
+        buffer = ""
+        ttft_ms = None
+        chunks = 0
+        aborted = None
+        for chunk in stream:
+            # Usage arrives on the final chunk
+            call.set_usage(extract_usage(chunk))
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            buffer += delta
+            chunks += 1
+            if guard is not None:
+                aborted = guard.feed(delta)
+                if aborted:
+                    break
+            if placeholder is not None:
+                placeholder.markdown(buffer + STREAMING_CURSOR)
+        
+        timing = {
+            'ttft_ms': ttft_ms,
+            'total_ms': (time.perf_counter() - start) * 1000,
+            'chunks': chunks,
+            'aborted': aborted,
+        }
+        call.ttft_ms = ttft_ms
+        
+        if aborted:
+            # Stop generation server-side. The partial text already rendered
+            # stays visible until the corrected reply replaces it
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+            call.outcome = OUTCOME_ABORTED
+            record_early_abort(aborted, timing)
+        else:
+            logger.info(
+                f"Streamed patient reply: TTFT {ttft_ms or 0:.0f}ms, "
+                f"total {timing['total_ms']:.0f}ms, {chunks} chunks"
+            )
+    return buffer, timing
+
+
+def record_early_abort(reason, timing):
+    """
+    Record an upper bound on the tokens and time saved by aborting a streamed reply.
+    
+    The savings are upper bounds: a reply that breaks the guardrails is
+    assumed to run on to the max_tokens limit at the token rate observed so
+    far (each streamed chunk counts as one token), though it may have ended
+    sooner.
+    
+    Args:
+        reason: Guardrail violation ('persona_drift' or 'too_long')
+        timing: Timing dict from stream_chat_completion
+    """
+    from persona_guard import record_stream_abort
+    
+    tokens_received = timing['chunks']
+    tokens_saved = max(0, PATIENT_MAX_TOKENS - tokens_received)
+    streaming_ms = timing['total_ms'] - (timing['ttft_ms'] or timing['total_ms'])
+    ms_per_token = streaming_ms / max(1, tokens_received - 1)
+    record_stream_abort(reason, tokens_received, tokens_saved, tokens_saved * ms_per_token)
+
+
+def request_chat_completion(client, messages, placeholder=None, stream=True, purpose='turn'):
+    """
+    Request a patient reply, streamed into the placeholder or as one completion.
+    
+    Args:
+        client: Groq API client
+        messages: Chat messages to send
+        placeholder: Streamlit placeholder for streamed tokens (optional)
+        stream: Whether to stream the reply
+        purpose: Call purpose recorded in llm_metrics ('turn' or 'correction')
+        
+    Returns:
+        str: The complete reply text
+    """
+    if stream:
+        response_text, _ = stream_chat_completion(client, messages, placeholder, purpose=purpose)
+        return response_text
+    
+    from llm_metrics import extract_usage, track_llm_call
+    from rate_limiter import PRIORITY_TURN, rate_limited_completion
+    
+    with track_llm_call(purpose, PATIENT_MODEL) as call:
+        response = rate_limited_completion(
+            client,
+            PRIORITY_TURN,
+            model=PATIENT_MODEL,
+            messages=messages,
+            max_tokens=PATIENT_MAX_TOKENS,
+            temperature=PATIENT_TEMPERATURE
+        )
+        call.set_usage(extract_usage(response))
+    return response.choices[0].message.content
+
+
+def generate_patient_response(client, messages, domain_name=None, placeholder=None, stream=True):
+    """
+    Generate the patient's reply for one turn, applying the response guardrails.
+    
+    When streaming, tokens are rendered into the placeholder as they arrive and
+    the persona-drift and sentence-limit guardrails are checked incrementally.
+    The moment a violation is certain the stream is aborted and the corrective
+    request starts (streamed into the same placeholder), instead of waiting
+    for the full bad reply. Without streaming the same checks run on the
+    complete reply. The role check always runs on the final text, and the
+    placeholder finally shows the committed text. The caller appends the
+    returned text to chat_history exactly once.
+    
+    Args:
+        client: Groq API client
+        messages: Chat messages for this turn (persona, instructions, history)
+        domain_name: Name of the domain for response guardrails (optional)
+        placeholder: Streamlit placeholder inside st.chat_message("assistant")
+        stream: Whether to stream tokens into the placeholder
+        
+    Returns:
+        str: Final assistant response, or None if the API key was rejected
+    """
+    from persona_guard import StreamingGuard, check_response_guardrails
+    
+    try:
+        needs_correction, correction_message = False, None
+        if stream:
+            guard = StreamingGuard(domain_name) if domain_name else None
+            assistant_response, _ = stream_chat_completion(client, messages, placeholder, guard)
+            if guard is not None and guard.finish():
+                needs_correction, correction_message = True, guard.correction_message()
+        else:
+            assistant_response = request_chat_completion(client, messages, stream=False)
+            # Check response guardrails if domain metadata is provided
+            if domain_name:
+                needs_correction, correction_message = check_response_guardrails(
+                    assistant_response, domain_name
+                )
+        
+        if needs_correction:
+            logger.warning("Response guardrail triggered, re-generating response")
+            # Re-generate response with correction message
+            correction_messages = messages + [
+                {"role": "assistant", "content": assistant_response},
+                correction_message
+            ]
+            assistant_response = request_chat_completion(
+                client, correction_messages, placeholder, stream, purpose='correction'
+            )
+            logger.info("Corrected response generated")
+    except Exception as e:
+        # Handle authentication errors gracefully
+        if is_auth_error(e):
+            if placeholder is not None:
+                placeholder.empty()
+            show_auth_error()
+            return None
+        if is_rate_limit_error(e):
+            if placeholder is not None:
+                placeholder.empty()
+            show_rate_limit_error()
+            return None
+        # Re-raise other unexpected errors
+        raise
+    
+    # Validate role consistency (legacy check, now supplemented by persona_guard)
+    is_valid_role, cleaned_response = validate_response_role(assistant_response)
+    
+    if not is_valid_role:
+        # If bot breaks role, provide a generic patient response instead
+        assistant_response = GENERIC_PATIENT_RESPONSE
+        logger.warning("Bot broke role - forcing generic response")
+    
+    if placeholder is not None:
+        placeholder.markdown(assistant_response)
+    
+    return assistant_response
+
+
+def get_windowed_history(settings=None):
+    """
+    Get the chat history to send with this turn's prompt.
+    
+    Keeps the most recent messages verbatim within the token budget and folds
+    older ones into the rolling summary cached in st.session_state, so the
+    prompt stays roughly constant-size in long sessions.
+    
+    Args:
+        settings: conversation_window settings (see ConfigLoader.get_conversation_window_config)
+        
+    Returns:
+        list: Messages (optional summary system message + recent chat messages)
+    """
+    history_messages, st.session_state.conversation_summary = window_chat_history(
+        st.session_state.chat_history,
+        st.session_state.get('conversation_summary'),
+        settings
+    )
+    logger.debug(
+        f"Prompt history: {len(history_messages)} of {len(st.session_state.chat_history)} messages, "
+        f"~{sum(estimate_tokens(m['content']) for m in history_messages)} tokens"
+    )
+    return history_messages
+
+
 def initialize_session_state():
     """Initialize common session state variables."""
     if "selected_persona" not in st.session_state:
@@ -104,6 +382,12 @@ def initialize_session_state():
         st.session_state.user_end_intent = False
     if "bot_end_ack" not in st.session_state:
         st.session_state.bot_end_ack = False
+    # Running MI coverage (end_control_middleware.MICoverageTracker)
+    if "mi_coverage" not in st.session_state:
+        st.session_state.mi_coverage = None
+    # Rolling summary of turns outside the prompt window
+    if "conversation_summary" not in st.session_state:
+        st.session_state.conversation_summary = None
 
 
 
@@ -134,12 +418,13 @@ def display_persona_selection(personas_dict, app_title):
         if st.button("Start Conversation"):
             st.session_state.selected_persona = selected
             st.session_state.chat_history = []
+            st.session_state.conversation_summary = None
             st.session_state.conversation_state = "active"
             st.session_state.turn_count = 0
-            st.session_state.chat_history.append({
+            st.session_state.chat_history.append(stamp_message({
                 "role": "assistant",
                 "content": f"Hello! I'm {selected}, nice to meet you today."
-            })
+            }))
             st.rerun()
 
 
@@ -151,62 +436,55 @@ def display_chat_history():
                 st.markdown(message["content"])
 
 
-def generate_and_display_feedback(personas_dict, session_type, student_name, retrieve_knowledge_func, client, bot_name="MI Assessment System"):
+def generate_and_display_feedback(personas_dict, session_type, student_name, knowledge_base, client, bot_name="MI Assessment System"):
     """Generate and display feedback with PDF download capability.
     
+    The evaluation runs as a background feedback job (see submit_feedback_job),
+    which reuses a cached evaluation of the same transcript; until it
+    finishes, a progress message is shown instead of the feedback.
+    
     Args:
         personas_dict: Dictionary of persona definitions
         session_type: Type of session (e.g., "dental hygiene", "hpv")
         student_name: Name of the student
-        retrieve_knowledge_func: Function to retrieve knowledge from RAG
+        knowledge_base: Rubric KnowledgeBase of the bot (see rag.get_knowledge_base)
         client: Groq client for LLM calls
         bot_name: Name of the bot/system for the evaluator field (default: "MI Assessment System")
     """
-    # Get current UTC timestamp and use bot name as evaluator
-    current_timestamp = get_formatted_utc_time()
-    evaluator = bot_name
+    from category_evaluation import EVALUATION_MODE_PER_CATEGORY, get_evaluation_mode
     
     transcript = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in st.session_state.chat_history])
 
-    # Retrieve relevant rubric content
-    retrieved_info = retrieve_knowledge_func("motivational interviewing feedback rubric")
-    rag_context = "\n".join(retrieved_info)
+    # Precomputed general feedback chunks plus one section per rubric category
+    rag_context = knowledge_base.feedback_context()
 
-    # Use standardized evaluation prompt
+    # Use standardized evaluation prompt, with the measured response times the PDF score uses
+    response_times = format_response_factor_evidence(st.session_state.chat_history)
     review_prompt = FeedbackFormatter.format_evaluation_prompt(
-        session_type.lower(), transcript, rag_context
+        session_type.lower(), transcript, rag_context, response_times
     )
-
-    try:
-        feedback_response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": personas_dict[st.session_state.selected_persona]},
-                {"role": "user", "content": review_prompt}
-            ]
+    
+    # One prompt per rubric category, only built when feedback_jobs.evaluation_mode is "per_category"
+    category_prompts = None
+    if get_evaluation_mode() == EVALUATION_MODE_PER_CATEGORY:
+        category_prompts = FeedbackFormatter.format_category_evaluation_prompts(
+            session_type.lower(), transcript, knowledge_base.category_contexts(), response_times
         )
-        feedback = feedback_response.choices[0].message.content
-    except Exception as e:
-        # Handle authentication errors gracefully
-        error_msg = str(e).lower()
-        if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-            st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-            st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
-            return
-        else:
-            # Re-raise other unexpected errors
-            raise
-    
-    # Store feedback in session state to prevent disappearing
-    st.session_state.feedback = {
-        'content': feedback,
-        'timestamp': current_timestamp,
-        'evaluator': evaluator
-    }
+
+    # Reuse a cached evaluation or generate in the background; use bot name as evaluator
+    submit_feedback_job(
+        client, personas_dict[st.session_state.selected_persona], review_prompt, bot_name, session_type,
+        category_prompts
+    )
+    poll_feedback_job()
+    
+    if st.session_state.get('feedback') is None:
+        return
     
     # Display feedback using standardized formatting
+    feedback_data = st.session_state.feedback
     display_format = FeedbackFormatter.format_feedback_for_display(
-        feedback, current_timestamp, evaluator
+        feedback_data['content'], feedback_data['timestamp'], feedback_data['evaluator']
     )
     
     st.markdown(display_format['header'])
@@ -216,6 +494,441 @@ def generate_and_display_feedback(personas_dict, session_type, student_name, ret
     st.markdown(display_format['content'])
 
 
+def _generate_feedback(client, messages, cache_key=None, cache_metadata=None):
+    """Run the evaluation completion (called on a feedback worker thread) and cache the result."""
+    from evaluation_cache import get_evaluation_cache
+    from llm_metrics import PURPOSE_EVALUATION, extract_usage, track_llm_call
+    from rate_limiter import PRIORITY_EVALUATION, rate_limited_completion
+    
+    with track_llm_call(PURPOSE_EVALUATION, FEEDBACK_MODEL) as call:
+        # Evaluations queue behind in-conversation turns on a busy key
+        feedback_response = rate_limited_completion(
+            client,
+            PRIORITY_EVALUATION,
+            model=FEEDBACK_MODEL,
+            messages=messages,
+            max_tokens=FEEDBACK_MAX_TOKENS
+        )
+        call.set_usage(extract_usage(feedback_response))
+    feedback = feedback_response.choices[0].message.content
+    
+    cache = get_evaluation_cache()
+    if cache is not None and cache_key:
+        cache.put(cache_key, feedback, **(cache_metadata or {}))
+    return feedback
+
+
+def _generate_category_feedback(client, system_prompt, category_prompts, messages, cache_key=None,
+                                 cache_metadata=None, fallback_cache_key=None, fallback_cache_metadata=None):
+    """
+    Run the per-category evaluation completions in parallel (called on a feedback worker thread) and cache the merged result.
+    
+    If a category still fails after its retries, the failed categories are
+    logged and the evaluation falls back to the single-prompt messages
+    (cached under the single-prompt key).
+    """
+    from category_evaluation import CategoryEvaluationError, evaluate_categories
+    from evaluation_cache import get_evaluation_cache
+    
+    try:
+        feedback = evaluate_categories(client, system_prompt, category_prompts, FEEDBACK_MODEL)
+    except CategoryEvaluationError as e:
+        logger.warning(f"Per-category evaluation failed for {', '.join(e.categories)}; using the single prompt: {e}")
+        return _generate_feedback(client, messages, fallback_cache_key, fallback_cache_metadata)
+    
+    cache = get_evaluation_cache()
+    if cache is not None and cache_key:
+        cache.put(cache_key, feedback, **(cache_metadata or {}))
+    return feedback
+
+
+def get_evaluation_cache_key(session_type, prompt_version=None):
+    """
+    Get the evaluation cache key for the current conversation (and its measured response times).
+    
+    Args:
+        session_type: Bot/session type (e.g. "HPV")
+        prompt_version: Evaluation prompt version (default: FeedbackFormatter.EVALUATION_PROMPT_VERSION)
+        
+    Returns:
+        tuple: (cache_key, cache_metadata) for evaluation_cache
+    """
+    from evaluation_cache import compute_evaluation_key
+    
+    persona = st.session_state.selected_persona or ''
+    prompt_version = prompt_version or FeedbackFormatter.EVALUATION_PROMPT_VERSION
+    cache_key = compute_evaluation_key(
+        session_type, persona, st.session_state.chat_history, prompt_version, FEEDBACK_MODEL,
+        format_response_factor_evidence(st.session_state.chat_history)
+    )
+    cache_metadata = {
+        'session_type': session_type,
+        'persona': persona,
+        'prompt_version': prompt_version,
+        'model': FEEDBACK_MODEL,
+    }
+    return cache_key, cache_metadata
+
+
+def submit_feedback_job(client, system_prompt, review_prompt, evaluator, session_type, category_prompts=None):
+    """
+    Start feedback generation in the background for this session.
+    
+    An evaluation already cached for this transcript (same session type,
+    persona, prompt version and model) is used directly, without an LLM call.
+    Otherwise the evaluation completion runs on the process-wide feedback
+    worker pool. With feedback_jobs.evaluation_mode "per_category" and
+    category_prompts given, the job instead evaluates each rubric category
+    in parallel and merges the answers (see category_evaluation.py), falling
+    back to review_prompt if a category fails. Clicking again (or any rerun) while the job is in flight, or
+    after it has finished, attaches to the same job instead of calling the
+    LLM again. Call poll_feedback_job() afterwards to show progress and
+    collect the result.
+    
+    Args:
+        client: Groq API client
+        system_prompt: Persona system prompt
+        review_prompt: Evaluation prompt (see FeedbackFormatter.format_evaluation_prompt)
+        evaluator: Evaluator name stored with the feedback
+        session_type: Bot/session type for the evaluation cache key (e.g. "HPV")
+        category_prompts: Per-category prompts (see FeedbackFormatter.format_category_evaluation_prompts)
+        
+    Returns:
+        FeedbackJob: The new or existing job, or None if the feedback was cached
+    """
+    from category_evaluation import EVALUATION_MODE_PER_CATEGORY, get_evaluation_mode
+    from evaluation_cache import get_evaluation_cache
+    from feedback_jobs import compute_transcript_key, get_feedback_job_manager
+    
+    per_category = get_evaluation_mode() == EVALUATION_MODE_PER_CATEGORY and bool(category_prompts)
+    prompt_version = FeedbackFormatter.CATEGORY_PROMPT_VERSION if per_category else None
+    cache_key, cache_metadata = get_evaluation_cache_key(session_type, prompt_version)
+    cache = get_evaluation_cache()
+    cached_feedback = cache.get(cache_key) if cache is not None else None
+    if cached_feedback is not None:
+        logger.info(f"Using cached evaluation {cache_key[:8]} for {session_type}")
+        st.session_state.feedback_job_key = None
+        st.session_state.feedback = {
+            'content': cached_feedback,
+            'timestamp': get_formatted_utc_time(),
+            'evaluator': evaluator
+        }
+        return None
+    
+    if 'feedback_session_id' not in st.session_state:
+        st.session_state.feedback_session_id = uuid.uuid4().hex
+    
+    transcript_key = compute_transcript_key(system_prompt, review_prompt)
+    st.session_state.feedback_job_key = transcript_key
+    metadata = {'timestamp': get_formatted_utc_time(), 'evaluator': evaluator}
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": review_prompt}
+    ]
+    
+    if per_category:
+        fallback_cache_key, fallback_cache_metadata = get_evaluation_cache_key(session_type)
+        return get_feedback_job_manager().submit(
+            st.session_state.feedback_session_id,
+            transcript_key,
+            _generate_category_feedback,
+            client,
+            system_prompt,
+            category_prompts,
+            messages,
+            cache_key,
+            cache_metadata,
+            fallback_cache_key,
+            fallback_cache_metadata,
+            metadata=metadata
+        )
+    
+    return get_feedback_job_manager().submit(
+        st.session_state.feedback_session_id,
+        transcript_key,
+        _generate_feedback,
+        client,
+        messages,
+        cache_key,
+        cache_metadata,
+        metadata=metadata
+    )
+
+
+def poll_feedback_job(poll_interval=None):
+    """
+    Show the progress of this session's feedback job and collect its result.
+    
+    While the job is queued or running, shows a progress message that is
+    refreshed every poll_interval seconds (see _show_job_progress; the
+    script thread never waits for the LLM call). Once done, stores the
+    feedback in st.session_state.feedback. A failed job is removed so the
+    button can be clicked again.
+    
+    Args:
+        poll_interval: Seconds between polls (default: feedback_jobs.poll_interval_seconds)
+    """
+    from feedback_jobs import STATUS_DONE, get_feedback_job_manager
+    
+    session_id = st.session_state.get('feedback_session_id')
+    if st.session_state.get('feedback') is not None or session_id is None:
+        return
+    
+    manager = get_feedback_job_manager()
+    job = manager.get(session_id)
+    if job is None or job.transcript_key != st.session_state.get('feedback_job_key'):
+        return
+    
+    if job.is_active:
+        _show_job_progress(session_id, job.transcript_key, _show_feedback_progress, poll_interval)
+    elif job.status == STATUS_DONE:
+        # Store feedback in session state to prevent disappearing
+        st.session_state.feedback = {
+            'content': job.result,
+            'timestamp': job.metadata['timestamp'],
+            'evaluator': job.metadata['evaluator']
+        }
+    else:
+        manager.discard(session_id)
+        st.session_state.feedback_job_key = None
+        if is_auth_error(job.error):
+            st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
+            st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and restart the conversation.")
+        elif is_rate_limit_error(job.error):
+            st.warning("⏳ The AI service is busy right now (rate limit reached for this API key).")
+            st.info("Please wait a minute and click 'Finish Session & Get Feedback' again.")
+        else:
+            st.error(f"❌ Feedback generation failed: {job.error}")
+            st.info("Please click 'Finish Session & Get Feedback' to try again.")
+
+
+def _show_feedback_progress(job):
+    """Progress message for a feedback job."""
+    st.info(f"⏳ Generating your feedback... ({job.elapsed_seconds:.0f}s). This usually takes under a minute.")
+
+
+def _show_job_progress(session_id, transcript_key, render, poll_interval=None, manager=None):
+    """
+    Show the progress of an active job and rerun the page once it has finished.
+    
+    The progress is drawn in a fragment that Streamlit reruns by itself every
+    poll_interval seconds, so the script run ends right away instead of
+    sleeping between polls. When the job is no longer active the whole page
+    reruns to collect its result.
+    
+    Args:
+        session_id: Job table key of the job
+        transcript_key: Key of the job being shown (a replaced job also ends the polling)
+        render: Callable drawing the progress of the job
+        poll_interval: Seconds between polls (default: feedback_jobs.poll_interval_seconds)
+        manager: Job manager running the job (default: get_feedback_job_manager())
+    """
+    from feedback_jobs import get_feedback_job_manager
+    
+    manager = manager or get_feedback_job_manager()
+    if poll_interval is None:
+        from config_loader import get_config_loader
+        poll_interval = get_config_loader().get_feedback_jobs_config().get('poll_interval_seconds', 1.0)
+    
+    def progress():
+        job = manager.get(session_id)
+        if job is None or job.transcript_key != transcript_key or not job.is_active:
+            st.rerun()
+        render(job)
+    
+    st.fragment(progress, run_every=float(poll_interval))()
+
+
+def _build_report(student_name, formatted_feedback, chat_history, session_type, email_session_type,
+                  download_filename, box_email, email_settings, progress):
+    """Build the PDF report and back it up to Box (called on a report worker thread)."""
+    import pdf_utils
+    from email_utils import RobustEmailSender
+    
+    pdf_buffer = pdf_utils.generate_pdf_report(
+        student_name=student_name,
+        raw_feedback=formatted_feedback,
+        chat_history=chat_history,
+        session_type=session_type
+    )
+    pdf_bytes = pdf_buffer.getvalue()
+    
+    backup = None
+    if box_email:
+        def update_progress(attempt, max_attempts, status):
+            progress.update(attempt=attempt, max_attempts=max_attempts, status=status)
+        
+        backup = RobustEmailSender(email_settings).send_with_guaranteed_delivery(
+            pdf_buffer=pdf_buffer,
+            filename=download_filename,
+            recipient=box_email,
+            student_name=student_name,
+            session_type=email_session_type,
+            progress_callback=update_progress
+        )
+    return {'pdf': pdf_bytes, 'backup': backup}
+
+
+def _show_report_progress(job):
+    """Progress of a report job: PDF generation, then the email backup attempts."""
+    progress = job.metadata.get('progress') or {}
+    if progress.get('max_attempts'):
+        st.progress(progress['attempt'] / progress['max_attempts'])
+        st.text(f"Attempt {progress['attempt']}/{progress['max_attempts']}: {progress['status']}")
+    else:
+        st.text(f"Preparing your PDF report... ({job.elapsed_seconds:.0f}s)")
+
+
+def handle_report_backup(student_name, session_type, bot_name, email_session_type, box_email, app_name):
+    """
+    Build the PDF report for the session feedback, back it up to Box and offer the download.
+    
+    PDF generation and the email backup (with its retries) run as a job on
+    the report worker pool (separate from feedback generation), keyed by the formatted feedback, student name
+    and Box address, so reruns attach to the same job and the report is only
+    rebuilt when one of them changes. The backup progress is polled like a
+    feedback job (see _show_job_progress). The download button appears once
+    the backup succeeded, was queued, skipped or is not configured; a failed
+    backup can be retried or skipped. A failed report job is not submitted
+    again until the user clicks Retry, so reruns do not rebuild and resend it.
+    
+    Args:
+        student_name: Student name entered on the page
+        session_type: Session type shown in the PDF (e.g. "HPV Vaccine")
+        bot_name: Bot name for the download filename (e.g. "HPV")
+        email_session_type: Session type in the backup email subject (e.g. "HPV Vaccine")
+        box_email: Box address for the backup (None: download only)
+        app_name: App name for the download button label (e.g. "HPV")
+    """
+    from config_loader import get_config_loader
+    from feedback_jobs import STATUS_DONE, compute_transcript_key, get_report_job_manager
+    
+    if st.session_state.get('feedback') is None:
+        return
+    feedback_data = st.session_state.feedback
+    
+    # Format feedback for PDF using standardized template
+    formatted_feedback = FeedbackFormatter.format_feedback_for_pdf(
+        feedback_data['content'], feedback_data['timestamp'], feedback_data['evaluator']
+    )
+    
+    # Show only PDF download section
+    st.markdown("### 📄 Download Feedback Report")
+    st.info("Your feedback has been generated! Click below to download the PDF report.")
+    
+    try:
+        validated_name = validate_student_name(student_name)
+    except ValueError as e:
+        st.error(f"Error generating PDF: {e}")
+        st.info("Please check your student name and try again.")
+        return
+    
+    # Generate standardized filename
+    download_filename = FeedbackFormatter.create_download_filename(
+        student_name, bot_name, st.session_state.selected_persona
+    )
+    
+    # New feedback, student name or Box address: build and back up the report again
+    report_key = compute_transcript_key(formatted_feedback, validated_name, download_filename, box_email or '')
+    if st.session_state.get('report_key') != report_key:
+        st.session_state.report_key = report_key
+        st.session_state.report_attempt = 0
+        st.session_state.report_pdf = None
+        st.session_state.email_backup_status = 'pending'
+        st.session_state.email_backup_result = None
+        st.session_state.report_error = None
+    
+    if 'feedback_session_id' not in st.session_state:
+        st.session_state.feedback_session_id = uuid.uuid4().hex
+    report_session_id = f"{st.session_state.feedback_session_id}:report"
+    
+    # Email backup section
+    if st.session_state.email_backup_status == 'pending':
+        if box_email:
+            st.markdown("### 📧 Backing Up Report to Box")
+        
+        manager = get_report_job_manager()
+        job_key = compute_transcript_key(report_key, str(st.session_state.report_attempt))
+        progress = {}
+        job = manager.submit(
+            report_session_id,
+            job_key,
+            _build_report,
+            validated_name,
+            formatted_feedback,
+            list(st.session_state.chat_history),
+            session_type,
+            email_session_type,
+            download_filename,
+            box_email,
+            get_config_loader().get_config(),
+            progress,
+            metadata={'progress': progress}
+        )
+        if job.is_active:
+            _show_job_progress(report_session_id, job_key, _show_report_progress, manager=manager)
+            return
+        
+        manager.discard(report_session_id)
+        if job.status != STATUS_DONE:
+            # Build the report again only when the user asks for it
+            st.session_state.email_backup_status = 'report_failed'
+            st.session_state.report_error = job.error
+        else:
+            st.session_state.report_pdf = job.result['pdf']
+            result = job.result['backup']
+            st.session_state.email_backup_result = result
+            
+            if result is None:
+                st.session_state.email_backup_status = 'no_email'
+                st.warning("⚠️ Box email not configured. Report will be available for download only.")
+            elif result['success']:
+                st.session_state.email_backup_status = 'success'
+                st.success(f"✅ Report backed up to Box successfully! (Attempt {result['attempts']})")
+            elif result.get('queued'):
+                st.session_state.email_backup_status = 'queued'
+                st.warning("⚠️ Email queued for later delivery. Will retry automatically.")
+            else:
+                st.session_state.email_backup_status = 'failed'
+    
+    # Handle failed report generation
+    if st.session_state.email_backup_status == 'report_failed':
+        st.error(f"Unexpected error: {st.session_state.report_error}")
+        st.info("There was an issue generating the PDF. Please try again.")
+        if st.button("🔄 Retry Report"):
+            st.session_state.report_attempt += 1
+            st.session_state.email_backup_status = 'pending'
+            st.session_state.report_error = None
+            st.rerun()
+        return
+    
+    # Handle failed status
+    if st.session_state.email_backup_status == 'failed':
+        st.error("❌ Email backup failed after multiple attempts.")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔄 Retry Backup"):
+                st.session_state.report_attempt += 1
+                st.session_state.email_backup_status = 'pending'
+                st.session_state.email_backup_result = None
+                st.rerun()
+        with col2:
+            if st.button("⚠️ Skip & Download Only"):
+                st.session_state.email_backup_status = 'skipped'
+                st.rerun()
+    
+    # Show download button only after backup is resolved
+    if st.session_state.email_backup_status in ['success', 'queued', 'skipped', 'no_email']:
+        st.markdown("### 📄 Download Report")
+        st.download_button(
+            label=f"📥 Download {app_name} MI Performance Report (PDF)",
+            data=st.session_state.report_pdf,
+            file_name=download_filename,
+            mime="application/pdf",
+            help="Download your complete feedback report as a PDF"
+        )
+
+
 def display_existing_feedback():
     """Display existing feedback if it exists (prevents disappearing after PDF download)."""
     if st.session_state.feedback is not None:
@@ -288,227 +1001,17 @@ def handle_pdf_generation(student_name, session_type, app_name):
 def handle_chat_input(personas_dict, client, domain_name=None, domain_keywords=None):
     """Handle user chat input and AI response with persona guard integration.
     
+    Runs the turn pipeline (see turn_pipeline.py) with typed input.
+    
     Args:
         personas_dict: Dictionary of persona definitions
         client: Groq API client
         domain_name: Name of the domain (e.g., "HPV vaccination", "oral hygiene")
         domain_keywords: List of domain-relevant keywords for off-topic detection
     """
-    if st.session_state.selected_persona is not None:
-        # Check conversation state
-        if st.session_state.conversation_state == "ended":
-            st.info("💬 This conversation has ended. Please click 'Finish Session & Get Feedback' to receive your evaluation, or start a new conversation.")
-            return
-            
-        user_prompt = st.chat_input("Your response...")
-
-        if user_prompt:
-            # Block feedback requests during conversation
-            feedback_request_phrases = [
-                'feedback',
-                'evaluate',
-                'how did i do',
-                'rate my performance',
-                'score',
-                'assessment',
-            ]
-            
-            if any(phrase in user_prompt.lower() for phrase in feedback_request_phrases):
-                st.warning("⏸️ Feedback will be provided after the conversation ends. Please continue the conversation naturally.")
-                return
-            
-            # Apply persona guardrails if domain metadata is provided
-            guard_message = None
-            if domain_name and domain_keywords:
-                from persona_guard import apply_guardrails
-                needs_intervention, guard_message = apply_guardrails(
-                    user_prompt, domain_name, domain_keywords
-                )
-                
-                if needs_intervention:
-                    logger.warning(f"Guardrail intervention triggered for user message: '{user_prompt[:50]}'")
-            
-            # Prevent premature ending from ambiguous phrases
-            if prevent_ambiguous_ending(user_prompt):
-                logger.info(f"Ambiguous phrase detected from user: '{user_prompt}' - continuing conversation")
-            
-            st.session_state.chat_history.append({"role": "user", "content": user_prompt})
-            st.chat_message("user").markdown(user_prompt)
-            
-            # Increment turn count
-            st.session_state.turn_count += 1
-
-            # Enhanced turn instruction with conciseness, role consistency, and end token
-            turn_instruction = {
-                "role": "system",
-                "content": f"""Follow the MI chain-of-thought steps: identify routine, ask open question, reflect, elicit change talk, summarize & plan.
-
-CRITICAL INSTRUCTIONS:
-- Keep your responses CONCISE (2-3 sentences maximum)
-- Stay in character as the PATIENT throughout the entire conversation
-- DO NOT provide feedback, evaluation, or scores during the conversation
-- DO NOT switch to evaluator role until explicitly asked at the end
-- Respond naturally as the patient would, showing emotions and reactions
-- When you are ready to naturally end the conversation after a full MI session, include the end token: {END_TOKEN}
-- Only use the end token when the conversation has covered all MI components and feels complete"""
-            }
-            
-            # Build messages array with guard message if intervention needed
-            messages = [
-                {"role": "system", "content": personas_dict[st.session_state.selected_persona]},
-                turn_instruction,
-            ]
-            
-            # Add guard message before chat history if intervention needed
-            if guard_message:
-                messages.append(guard_message)
-            
-            messages.extend(st.session_state.chat_history)
-            
-            try:
-                response = client.chat.completions.create(
-                    model="llama-3.1-8b-instant",
-                    messages=messages,
-                    max_tokens=150,  # Limit response length to enforce conciseness
-                    temperature=0.7
-                )
-                assistant_response = response.choices[0].message.content
-            except Exception as e:
-                # Handle authentication errors gracefully
-                error_msg = str(e).lower()
-                if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-                    st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-                    st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
-                    return
-                else:
-                    # Re-raise other unexpected errors
-                    raise
-            
-            # Check response guardrails if domain metadata is provided
-            if domain_name:
-                from persona_guard import check_response_guardrails
-                needs_correction, correction_message = check_response_guardrails(
-                    assistant_response, domain_name
-                )
-                
-                if needs_correction:
-                    logger.warning(f"Response guardrail triggered, re-generating response")
-                    # Re-generate response with correction message
-                    correction_messages = messages + [
-                        {"role": "assistant", "content": assistant_response},
-                        correction_message
-                    ]
-                    
-                    try:
-                        correction_response = client.chat.completions.create(
-                            model="llama-3.1-8b-instant",
-                            messages=correction_messages,
-                            max_tokens=150,
-                            temperature=0.7
-                        )
-                        assistant_response = correction_response.choices[0].message.content
-                        logger.info(f"Corrected response generated")
-                    except Exception as e:
-                        # Handle authentication errors gracefully
-                        error_msg = str(e).lower()
-                        if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-                            st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-                            st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
-                            return
-                        else:
-                            # Re-raise other unexpected errors
-                            raise
-            
-            # Validate role consistency (legacy check, now supplemented by persona_guard)
-            is_valid_role, cleaned_response = validate_response_role(assistant_response)
-            
-            if not is_valid_role:
-                # If bot breaks role, provide a generic patient response instead
-                assistant_response = "I appreciate you taking the time to talk with me. Is there anything else you'd like to discuss?"
-                logger.warning("Bot broke role - forcing generic response")
-            
-            st.session_state.chat_history.append({"role": "assistant", "content": assistant_response})
-            with st.chat_message("assistant"):
-                st.markdown(assistant_response)
-            
-            # Use end-control middleware v4 for semantic-based ending
-            from end_control_middleware import should_continue_v4, log_termination_metrics
-            from config_loader import ConfigLoader
-            
-            config = ConfigLoader()
-            flags = config.get_feature_flags()
-            
-            # Build conversation context with all required fields
-            conversation_context = {
-                'chat_history': st.session_state.chat_history,
-                'turn_count': st.session_state.turn_count,
-                'end_control_state': st.session_state.get('end_control_state', 'ACTIVE'),
-                'confirmation_flag': st.session_state.get('confirmation_flag', False),
-                'termination_trigger': st.session_state.get('termination_trigger', 'unknown'),
-                'user_end_intent': st.session_state.get('user_end_intent', False),
-                'bot_end_ack': st.session_state.get('bot_end_ack', False)
-            }
-            
-            # Use v4 with semantic-based ending
-            if flags.get('require_end_confirmation', True):
-                decision = should_continue_v4(
-                    conversation_context,
-                    assistant_response,
-                    user_prompt
-                )
-                
-                # Log metrics for monitoring
-                log_termination_metrics(decision.get('metrics', {}))
-                
-                # Update session state with new conversation state and flags
-                st.session_state.end_control_state = decision['state']
-                st.session_state.confirmation_flag = conversation_context.get('confirmation_flag', False)
-                st.session_state.user_end_intent = conversation_context.get('user_end_intent', False)
-                st.session_state.bot_end_ack = conversation_context.get('bot_end_ack', False)
-                
-                # Handle confirmation prompt if needed
-                if decision.get('requires_confirmation') and decision.get('confirmation_prompt'):
-                    # Add confirmation prompt as system message (patient voice)
-                    confirmation_msg = decision['confirmation_prompt']
-                    st.session_state.chat_history.append({"role": "assistant", "content": confirmation_msg})
-                    with st.chat_message("assistant"):
-                        st.markdown(confirmation_msg)
-                    logger.info(f"Showing confirmation prompt: {confirmation_msg}")
-                
-                # Only end if decision says so
-                if not decision['continue']:
-                    st.session_state.conversation_state = "ended"
-                    st.info("💬 The conversation has concluded with mutual confirmation. Click 'Finish Session & Get Feedback' to receive your evaluation.")
-                    logger.info(f"Conversation ended: {decision['reason']}")
-                elif decision['state'] == 'PARKED':
-                    st.warning("💬 Session paused. Reconnect to continue the conversation.")
-                    logger.info(f"Session parked: {decision['reason']}")
-            else:
-                # Fallback: Use semantic-based v4 even if confirmation flag is disabled
-                # This ensures consistent behavior
-                decision = should_continue_v4(
-                    conversation_context,
-                    assistant_response,
-                    user_prompt
-                )
-                
-                # Log the decision for diagnostics
-                log_conversation_trace(conversation_context, decision, {
-                    'last_user_message': user_prompt,
-                    'last_assistant_message': assistant_response,
-                })
-                
-                # Update session state
-                st.session_state.end_control_state = decision['state']
-                st.session_state.confirmation_flag = conversation_context.get('confirmation_flag', False)
-                st.session_state.user_end_intent = conversation_context.get('user_end_intent', False)
-                st.session_state.bot_end_ack = conversation_context.get('bot_end_ack', False)
-                
-                # Only end if decision says not to continue
-                if not decision['continue']:
-                    st.session_state.conversation_state = "ended"
-                    st.info("💬 The conversation has concluded. Click 'Finish Session & Get Feedback' to receive your evaluation.")
-                    logger.info(f"Conversation ended: {decision['reason']}")
+    from turn_pipeline import TextTurnAdapter, TurnPipeline
+    
+    TurnPipeline(personas_dict, client, domain_name, domain_keywords).run(TextTurnAdapter())
 
 
 def handle_new_conversation_button():
@@ -526,6 +1029,9 @@ def handle_new_conversation_button():
         # Reset mutual intent flags
         st.session_state.user_end_intent = False
         st.session_state.bot_end_ack = False
+        st.session_state.mi_coverage = None
+        st.session_state.conversation_summary = None
+        st.session_state.feedback_job_key = None
         st.rerun()
 
 
@@ -556,10 +1062,9 @@ def handle_chat_input_with_voice(personas_dict, client, domain_name=None, domain
     """
     Voice-aware wrapper for handle_chat_input.
     
-    If voice mode is enabled in session state, this function:
-    1. Uses STT for input (instead of st.chat_input)
-    2. Uses TTS for bot responses
-    3. Otherwise, delegates to standard handle_chat_input
+    If voice mode is enabled in session state, runs the turn pipeline with
+    STT input and TTS playback of the bot responses; otherwise delegates to
+    the standard handle_chat_input.
     
     Args:
         personas_dict: Dictionary of persona definitions
@@ -573,248 +1078,12 @@ def handle_chat_input_with_voice(personas_dict, client, domain_name=None, domain
         # Standard text-only mode
         return handle_chat_input(personas_dict, client, domain_name, domain_keywords)
     
-    # Voice mode is enabled
-    # Import speech components
+    from turn_pipeline import TurnPipeline, VoiceTurnAdapter
+    
     try:
-        from speech_text import render_stt_input, render_tts_playback
-        import streamlit.components.v1 as components
-        from speech_text.tts_handler import TTSHandler
-        from speech_text.stt_handler import STTHandler
+        adapter = VoiceTurnAdapter()
     except ImportError:
         st.error("Speech module not available. Falling back to text mode.")
         return handle_chat_input(personas_dict, client, domain_name, domain_keywords)
     
-    # Check conversation state
-    if st.session_state.selected_persona is None:
-        return
-        
-    if st.session_state.conversation_state == "ended":
-        st.info("💬 This conversation has ended. Please click 'Finish Session & Get Feedback' to receive your evaluation, or start a new conversation.")
-        return
-    
-    # Use STT for input
-    st.markdown("### 🎤 Your Turn")
-    st.markdown("Click **Start Recording**, speak your response, then click **Stop Recording**.")
-    
-    stt_handler = STTHandler()
-    
-    # Create unique key for this turn - ensure turn_count is initialized
-    turn_count = st.session_state.get('turn_count', 0)
-    turn_key = f"voice_input_turn_{turn_count}"
-    
-    # Initialize transcript state
-    if f"{turn_key}_transcript" not in st.session_state:
-        st.session_state[f"{turn_key}_transcript"] = ""
-    if f"{turn_key}_confirmed" not in st.session_state:
-        st.session_state[f"{turn_key}_confirmed"] = False
-    
-    # Render STT interface
-    stt_html = stt_handler.generate_browser_stt_html(session_key=turn_key)
-    components.html(stt_html, height=250)
-    
-    # Manual input area for transcript (user can also type)
-    user_prompt = st.text_area(
-        "Your transcript (edit if needed):",
-        value=st.session_state.get(f"{turn_key}_transcript", ""),
-        key=f"{turn_key}_text_area",
-        help="You can edit the transcribed text or type directly here."
-    )
-    
-    # Update transcript in session state
-    if user_prompt:
-        st.session_state[f"{turn_key}_transcript"] = user_prompt
-    
-    # Confirm button
-    if st.button("✅ Send Response", key=f"{turn_key}_send", type="primary"):
-        if not user_prompt or not user_prompt.strip():
-            st.warning("Please provide a response before sending.")
-            return
-        
-        # Mark as confirmed
-        st.session_state[f"{turn_key}_confirmed"] = True
-        
-        # Process the input using the same logic as handle_chat_input
-        # Block feedback requests during conversation
-        feedback_request_phrases = [
-            'feedback', 'evaluate', 'how did i do', 'rate my performance',
-            'score', 'assessment',
-        ]
-        
-        if any(phrase in user_prompt.lower() for phrase in feedback_request_phrases):
-            st.warning("⏸️ Feedback will be provided after the conversation ends. Please continue the conversation naturally.")
-            return
-        
-        # Apply persona guardrails if domain metadata is provided
-        guard_message = None
-        if domain_name and domain_keywords:
-            from persona_guard import apply_guardrails
-            needs_intervention, guard_message = apply_guardrails(
-                user_prompt, domain_name, domain_keywords
-            )
-            
-            if needs_intervention:
-                logger.warning(f"Guardrail intervention triggered for user message: '{user_prompt[:50]}'")
-        
-        # Prevent premature ending from ambiguous phrases
-        if prevent_ambiguous_ending(user_prompt):
-            logger.info(f"Ambiguous phrase detected from user: '{user_prompt}' - continuing conversation")
-        
-        st.session_state.chat_history.append({"role": "user", "content": user_prompt})
-        st.chat_message("user").markdown(user_prompt)
-        
-        # Increment turn count
-        st.session_state.turn_count += 1
-        
-        # Enhanced turn instruction
-        turn_instruction = {
-            "role": "system",
-            "content": f"""Follow the MI chain-of-thought steps: identify routine, ask open question, reflect, elicit change talk, summarize & plan.
-
-CRITICAL INSTRUCTIONS:
-- Keep your responses CONCISE (2-3 sentences maximum)
-- Stay in character as the PATIENT throughout the entire conversation
-- DO NOT provide feedback, evaluation, or scores during the conversation
-- DO NOT switch to evaluator role until explicitly asked at the end
-- Respond naturally as the patient would, showing emotions and reactions
-- When you are ready to naturally end the conversation after a full MI session, include the end token: {END_TOKEN}
-- Only use the end token when the conversation has covered all MI components and feels complete"""
-        }
-        
-        # Build messages array
-        messages = [
-            {"role": "system", "content": personas_dict[st.session_state.selected_persona]},
-            turn_instruction,
-        ]
-        
-        if guard_message:
-            messages.append(guard_message)
-        
-        messages.extend(st.session_state.chat_history)
-        
-        try:
-            response = client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=messages,
-                max_tokens=150,
-                temperature=0.7
-            )
-            assistant_response = response.choices[0].message.content
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-                st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-                st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
-                return
-            else:
-                raise
-        
-        # Check response guardrails
-        if domain_name:
-            from persona_guard import check_response_guardrails
-            needs_correction, correction_message = check_response_guardrails(
-                assistant_response, domain_name
-            )
-            
-            if needs_correction:
-                logger.warning(f"Response guardrail triggered, re-generating response")
-                correction_messages = messages + [
-                    {"role": "assistant", "content": assistant_response},
-                    correction_message
-                ]
-                
-                try:
-                    correction_response = client.chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=correction_messages,
-                        max_tokens=150,
-                        temperature=0.7
-                    )
-                    assistant_response = correction_response.choices[0].message.content
-                    logger.info(f"Corrected response generated")
-                except Exception as e:
-                    error_msg = str(e).lower()
-                    if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-                        st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-                        st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and reload the page.")
-                        return
-                    else:
-                        raise
-        
-        # Validate role consistency
-        is_valid_role, cleaned_response = validate_response_role(assistant_response)
-        
-        if not is_valid_role:
-            assistant_response = "I appreciate you taking the time to talk with me. Is there anything else you'd like to discuss?"
-            logger.warning("Bot broke role - forcing generic response")
-        
-        st.session_state.chat_history.append({"role": "assistant", "content": assistant_response})
-        
-        # Show bot response with TTS
-        with st.chat_message("assistant"):
-            st.markdown(assistant_response)
-            
-            # Add TTS playback
-            tts_handler = TTSHandler()
-            tts_html = tts_handler.generate_browser_tts_html(assistant_response, auto_play=True)
-            components.html(tts_html, height=0)
-            
-            # Add repeat button
-            if st.button("🔊 Repeat", key=f"repeat_turn_{st.session_state.turn_count}"):
-                tts_html = tts_handler.generate_browser_tts_html(assistant_response, auto_play=True)
-                components.html(tts_html, height=0)
-        
-        # End control middleware logic (same as standard flow)
-        from end_control_middleware import should_continue_v4, log_termination_metrics
-        from config_loader import ConfigLoader
-        
-        config = ConfigLoader()
-        flags = config.get_feature_flags()
-        
-        conversation_context = {
-            'chat_history': st.session_state.chat_history,
-            'turn_count': st.session_state.turn_count,
-            'end_control_state': st.session_state.get('end_control_state', 'ACTIVE'),
-            'confirmation_flag': st.session_state.get('confirmation_flag', False),
-            'termination_trigger': st.session_state.get('termination_trigger', 'unknown'),
-            'user_end_intent': st.session_state.get('user_end_intent', False),
-            'bot_end_ack': st.session_state.get('bot_end_ack', False)
-        }
-        
-        if flags.get('require_end_confirmation', True):
-            decision = should_continue_v4(
-                conversation_context,
-                assistant_response,
-                user_prompt
-            )
-            
-            log_termination_metrics(decision.get('metrics', {}))
-            
-            st.session_state.end_control_state = decision['state']
-            st.session_state.confirmation_flag = conversation_context.get('confirmation_flag', False)
-            st.session_state.user_end_intent = conversation_context.get('user_end_intent', False)
-            st.session_state.bot_end_ack = conversation_context.get('bot_end_ack', False)
-            
-            if decision.get('requires_confirmation') and decision.get('confirmation_prompt'):
-                confirmation_msg = decision['confirmation_prompt']
-                st.session_state.chat_history.append({"role": "assistant", "content": confirmation_msg})
-                with st.chat_message("assistant"):
-                    st.markdown(confirmation_msg)
-                    # TTS for confirmation too
-                    tts_html = tts_handler.generate_browser_tts_html(confirmation_msg, auto_play=True)
-                    components.html(tts_html, height=0)
-                logger.info(f"Showing confirmation prompt: {confirmation_msg}")
-            
-            if not decision['continue']:
-                st.session_state.conversation_state = "ended"
-                st.info("💬 The conversation has concluded with mutual confirmation. Click 'Finish Session & Get Feedback' to receive your evaluation.")
-                logger.info(f"Conversation ended: {decision['reason']}")
-            elif decision['state'] == 'PARKED':
-                st.warning("💬 Session paused. Reconnect to continue the conversation.")
-                logger.info(f"Session parked: {decision['reason']}")
-        
-        # Clear transcript for next turn
-        st.session_state[f"{turn_key}_transcript"] = ""
-        st.session_state[f"{turn_key}_confirmed"] = False
-        
-        # Rerun to show updated chat
-        st.rerun()
+    TurnPipeline(personas_dict, client, domain_name, domain_keywords).run(adapter)
@@ -3,48 +3,149 @@ Configuration Loader for MI Chatbots
 
 This module handles loading configuration from environment variables and config files.
 Environment variables take precedence over config file values for security.
+
+Application code reads the process-wide loader from get_config_loader(), which
+stats config.json (or MI_CONFIG_PATH) and .env at most once per
+CONFIG_CHECK_INTERVAL_SECONDS and loads them again only when a file's mtime
+changes, so flags can be flipped without a restart and a turn does not
+re-parse the files. Variables already set in the environment when .env is
+first loaded are never replaced; a changed .env only updates the variables
+that an earlier .env load set.
 """
 
 import os
 import json
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import AbstractSet, Dict, Any, List, Optional, TypedDict
 
 # Try to import python-dotenv for .env file support
 try:
-    from dotenv import load_dotenv
+    from dotenv import dotenv_values
     DOTENV_AVAILABLE = True
 except ImportError:
     DOTENV_AVAILABLE = False
     logging.warning("python-dotenv not installed. .env file support disabled.")
 
 
+ENV_FILE_PATH = os.path.join(os.path.dirname(__file__), '.env')
+
+# How often get_config_loader() checks the config files for changes
+CONFIG_CHECK_INTERVAL_SECONDS = 2.0
+
+
+class FeatureFlags(TypedDict):
+    """feature_flags section (see ConfigLoader.get_feature_flags)."""
+    require_end_confirmation: bool
+    pdf_score_binding_fix: bool
+    feedback_data_validation: bool
+    idle_grace_period_seconds: int
+    enable_termination_metrics: bool
+    background_rag_warm_up: bool
+    streaming_responses: bool
+
+
+class EmailSettings(TypedDict, total=False):
+    """email_config section (see ConfigLoader.get_email_config)."""
+    smtp_server: str
+    smtp_port: int
+    smtp_use_ssl: bool
+    smtp_username: str
+    smtp_app_password: str
+    connection_timeout: int
+    retry_attempts: int
+    retry_delay: int
+    max_retries: int
+    retry_delays: List[int]
+    queue_enabled: bool
+    queue_retry_on_startup: bool
+    ohi_box_email: str
+    hpv_box_email: str
+    tobacco_box_email: str
+    perio_box_email: str
+
+
+def resolve_config_path() -> str:
+    """Path of the config file: MI_CONFIG_PATH, else config.json next to this module."""
+    return os.environ.get('MI_CONFIG_PATH') or os.path.join(os.path.dirname(__file__), 'config.json')
+
+
+def _file_mtime(path: str) -> Optional[int]:
+    """Modification time of a file in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 class ConfigLoader:
     """Load and manage configuration from environment variables and config files."""
     
-    def __init__(self, config_path: Optional[str] = None, load_dotenv_file: bool = True):
+    def __init__(self, config_path: Optional[str] = None, load_dotenv_file: bool = True,
+                 dotenv_keys: AbstractSet[str] = frozenset()):
         """
         Initialize configuration loader.
         
         Args:
-            config_path: Path to config.json file (default: ./config.json)
+            config_path: Path to config.json file (default: MI_CONFIG_PATH, else ./config.json)
             load_dotenv_file: Whether to load .env file if it exists (default: True)
+            dotenv_keys: Variables an earlier .env load set, which this load may
+                update (default: none; see get_config_loader)
         """
-        self.config_path = config_path or os.path.join(os.path.dirname(__file__), 'config.json')
+        self.config_path = config_path or resolve_config_path()
         self.config = {}
         self.logger = self._setup_logger()
         
         # Load .env file if available and requested
-        if load_dotenv_file and DOTENV_AVAILABLE:
-            env_path = os.path.join(os.path.dirname(__file__), '.env')
-            if os.path.exists(env_path):
-                load_dotenv(env_path)
+        self.env_mtime = None
+        self.dotenv_keys = frozenset(dotenv_keys)
+        self.watches_env = load_dotenv_file and DOTENV_AVAILABLE
+        if self.watches_env:
+            self.env_mtime = _file_mtime(ENV_FILE_PATH)
+            if self.env_mtime is not None:
+                self._load_dotenv()
                 self.logger.info("Loaded environment variables from .env file")
         
         # Load config.json
+        self.config_mtime = _file_mtime(self.config_path)
         self._load_config_file()
     
+    def has_changed(self) -> bool:
+        """
+        Check whether the files this loader read have changed since.
+        
+        Returns:
+            True if MI_CONFIG_PATH now points elsewhere, or config.json or
+            .env was modified, created or deleted
+        """
+        if self.config_path != resolve_config_path():
+            return True
+        if _file_mtime(self.config_path) != self.config_mtime:
+            return True
+        return self.env_changed()
+    
+    def _load_dotenv(self) -> None:
+        """
+        Set the .env variables, leaving ones set outside .env untouched.
+        
+        A variable is set when it is missing from the environment or an
+        earlier .env load set it; self.dotenv_keys records those variables.
+        """
+        owned = set(self.dotenv_keys)
+        for key, value in dotenv_values(ENV_FILE_PATH).items():
+            if value is None:
+                continue
+            if key in owned or key not in os.environ:
+                os.environ[key] = value
+                owned.add(key)
+        self.dotenv_keys = frozenset(owned)
+    
+    def env_changed(self) -> bool:
+        """Check whether .env was modified, created or deleted since this loader read it."""
+        return self.watches_env and _file_mtime(ENV_FILE_PATH) != self.env_mtime
+    
     def _setup_logger(self) -> logging.Logger:
         """Set up logger for config loader."""
         logger = logging.getLogger('config_loader')
@@ -133,24 +234,38 @@ class ConfigLoader:
         """
         Get the full configuration dictionary.
         
+        The dictionary of the shared loader is used by every session; treat
+        it as read-only.
+        
         Returns:
             Configuration dictionary
         """
         return self.config
     
-    def get_feature_flags(self) -> Dict[str, Any]:
+    def get_email_config(self) -> EmailSettings:
+        """
+        Get the email_config section (Box addresses, SMTP and retry settings).
+        
+        Returns:
+            Copy of the email_config section (empty if not configured)
+        """
+        return dict(self.config.get('email_config', {}))
+    
+    def get_feature_flags(self) -> FeatureFlags:
         """
         Get feature flags configuration.
         
         Returns:
             Dictionary with feature flags (with safe defaults if not configured)
         """
-        defaults = {
+        defaults: FeatureFlags = {
             'require_end_confirmation': True,
             'pdf_score_binding_fix': True,
             'feedback_data_validation': True,
             'idle_grace_period_seconds': 300,
-            'enable_termination_metrics': True
+            'enable_termination_metrics': True,
+            'background_rag_warm_up': True,
+            'streaming_responses': True
         }
         
         # Check environment variables for feature flags first
@@ -170,6 +285,182 @@ class ConfigLoader:
         
         return defaults
     
+    def get_retrieval_config(self) -> Dict[str, Any]:
+        """
+        Get retrieval (RAG) configuration.
+        
+        Returns:
+            Dictionary with retrieval settings (with safe defaults if not configured)
+        """
+        retrieval = {
+            'backend': 'embedding',
+            'chunk_size': 240,
+            'chunk_overlap': 40
+        }
+        
+        # Override with config file values if present
+        if 'retrieval' in self.config:
+            retrieval.update(self.config['retrieval'])
+        
+        # Environment variable takes precedence (e.g. per-replica override)
+        if os.environ.get('RAG_BACKEND'):
+            retrieval['backend'] = os.environ.get('RAG_BACKEND').lower()
+        
+        return retrieval
+    
+    def get_llm_config(self) -> Dict[str, Any]:
+        """
+        Get LLM client configuration.
+        
+        Returns:
+            Dictionary with LLM client settings (with safe defaults if not configured)
+        """
+        llm = {
+            'client_cache_size': 64,
+            'max_connections': 20,
+            'max_keepalive_connections': 10,
+            'keepalive_expiry_seconds': 60,
+            'sdk_max_retries': 0
+        }
+        
+        # Override with config file values if present
+        if 'llm' in self.config:
+            llm.update(self.config['llm'])
+        
+        return llm
+    
+    def get_conversation_window_config(self) -> Dict[str, Any]:
+        """
+        Get per-turn prompt windowing configuration.
+        
+        Returns:
+            Dictionary with conversation window settings (with safe defaults if not configured)
+        """
+        window = {
+            'history_token_budget': 1200,
+            'min_recent_messages': 6,
+            'summary_token_budget': 250
+        }
+        
+        # Override with config file values if present
+        if 'conversation_window' in self.config:
+            window.update(self.config['conversation_window'])
+        
+        return window
+    
+    def get_feedback_jobs_config(self) -> Dict[str, Any]:
+        """
+        Get background feedback generation configuration.
+        
+        Returns:
+            Dictionary with feedback job settings (with safe defaults if not configured)
+        """
+        jobs = {
+            'max_workers': 4,
+            'report_max_workers': 4,
+            'job_ttl_seconds': 3600,
+            'poll_interval_seconds': 1.0,
+            'evaluation_mode': 'single',
+            'category_max_workers': 12,
+            'category_max_tokens': 400,
+            'category_attempts': 2
+        }
+        
+        # Override with config file values if present
+        if 'feedback_jobs' in self.config:
+            jobs.update(self.config['feedback_jobs'])
+        
+        return jobs
+    
+    def get_evaluation_cache_config(self) -> Dict[str, Any]:
+        """
+        Get evaluation result cache configuration.
+        
+        Returns:
+            Dictionary with evaluation cache settings (with safe defaults if not configured)
+        """
+        cache = {
+            'enabled': True,
+            'path': 'eval_cache/evaluations.sqlite3',
+            'max_size_mb': 50
+        }
+        
+        # Override with config file values if present
+        if 'evaluation_cache' in self.config:
+            cache.update(self.config['evaluation_cache'])
+        
+        return cache
+    
+    def get_rate_limit_config(self) -> Dict[str, Any]:
+        """
+        Get client-side Groq rate limit configuration.
+        
+        Returns:
+            Dictionary with per-key rate limit and retry settings (with safe defaults if not configured)
+        """
+        limits = {
+            'enabled': False,
+            'max_keys': 256,
+            'requests_per_minute': 30,
+            'tokens_per_minute': 6000,
+            'max_retries': 4,
+            'backoff_base_seconds': 1.0,
+            'backoff_max_seconds': 30.0,
+            'queue_timeout_seconds': 60.0
+        }
+        
+        # Override with config file values if present
+        if 'rate_limits' in self.config:
+            limits.update(self.config['rate_limits'])
+        
+        return limits
+    
+    def get_llm_metrics_config(self) -> Dict[str, Any]:
+        """
+        Get per-call LLM instrumentation configuration.
+        
+        Returns:
+            Dictionary with LLM metrics settings (with safe defaults if not configured)
+        """
+        metrics = {
+            'ring_buffer_size': 1000,
+            'metrics_file': None
+        }
+        
+        # Override with config file values if present
+        if 'llm_metrics' in self.config:
+            metrics.update(self.config['llm_metrics'])
+        
+        return metrics
+    
+    def get_response_timing_config(self) -> Dict[str, Any]:
+        """
+        Get measured response timing configuration.
+        
+        The RESPONSE_FACTOR_THRESHOLD environment variable, if set, takes
+        precedence over response_factor_threshold_seconds.
+        
+        Returns:
+            Dictionary with Response Factor timing settings (with safe defaults if not configured)
+        """
+        timing = {
+            'score_response_factor': True,
+            'response_factor_threshold_seconds': 60.0
+        }
+        
+        # Override with config file values if present
+        if 'response_timing' in self.config:
+            timing.update(self.config['response_timing'])
+        
+        env_threshold = os.environ.get('RESPONSE_FACTOR_THRESHOLD')
+        if env_threshold:
+            try:
+                timing['response_factor_threshold_seconds'] = float(env_threshold)
+            except ValueError:
+                self.logger.warning(f"Ignoring invalid RESPONSE_FACTOR_THRESHOLD: {env_threshold!r}")
+        
+        return timing
+    
     def validate_required_env_vars(self, required_vars: list) -> Dict[str, bool]:
         """
         Validate that required environment variables are set.
@@ -199,6 +490,40 @@ class ConfigLoader:
         return [var for var, is_set in validation.items() if not is_set]
 
 
+# Process-wide loader shared by all pages, sessions and worker threads
+_config_loader: Optional[ConfigLoader] = None
+_checked_at = 0.0
+_config_lock = threading.Lock()
+
+
+def get_config_loader() -> ConfigLoader:
+    """
+    Get the process-wide configuration, reloading it when its files change.
+    
+    The files are checked at most once per CONFIG_CHECK_INTERVAL_SECONDS
+    (MI_CONFIG_PATH is checked on every call). A change loads a new
+    ConfigLoader in place of the shared one; a loader is never modified
+    after loading, so a caller can keep the one it got for a whole request.
+    
+    Returns:
+        ConfigLoader: The current shared loader
+    """
+    global _config_loader, _checked_at
+    
+    loader = _config_loader
+    if (loader is not None and loader.config_path == resolve_config_path()
+            and time.monotonic() - _checked_at < CONFIG_CHECK_INTERVAL_SECONDS):
+        return loader
+    
+    with _config_lock:
+        if _config_loader is None:
+            _config_loader = ConfigLoader()
+        elif _config_loader.has_changed():
+            _config_loader = ConfigLoader(dotenv_keys=_config_loader.dotenv_keys)
+        _checked_at = time.monotonic()
+        return _config_loader
+
+
 def load_config(config_path: Optional[str] = None) -> ConfigLoader:
     """
     Convenience function to load configuration.
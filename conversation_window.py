@@ -0,0 +1,197 @@
+"""
+Token-Budgeted Conversation Window for MI Chatbots
+
+Each patient turn used to send the whole chat history to the model, so the
+prompt (and latency) grew with every turn. window_chat_history() keeps the
+most recent messages verbatim within a token budget and folds everything
+older into a compact rolling summary, so the prompt stays roughly constant
+in size however long the session runs.
+
+The summary is extractive (the leading sentence of each folded message), so
+building it needs no extra LLM call. It is updated incrementally: the state
+records how many messages have already been folded, and each turn only the
+messages that newly fell out of the window are added. Callers keep the
+state in st.session_state between turns.
+
+Only the prompt is windowed; end-control and evaluation still see the full
+chat_history.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Defaults for the "conversation_window" section of config.json
+DEFAULT_HISTORY_TOKEN_BUDGET = 1200
+DEFAULT_MIN_RECENT_MESSAGES = 6
+DEFAULT_SUMMARY_TOKEN_BUDGET = 250
+
+# Approximate characters per token for English chat text
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+# Longest excerpt kept per folded message
+SUMMARY_EXCERPT_CHARS = 160
+
+SUMMARY_HEADER = (
+    "Summary of the earlier part of this conversation "
+    "(older messages are not repeated below):"
+)
+ROLE_LABELS = {'user': 'Student', 'assistant': 'Patient'}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text (about 4 characters per token).
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """Estimate the tokens a chat message adds to the prompt."""
+    return estimate_tokens(message.get('content', '')) + MESSAGE_TOKEN_OVERHEAD
+
+
+def new_summary_state() -> Dict[str, Any]:
+    """
+    Create an empty rolling-summary state.
+
+    Returns:
+        dict: folded (messages already summarized), lines (summary lines),
+              omitted (lines dropped to respect the summary budget)
+    """
+    return {'folded': 0, 'lines': [], 'omitted': 0}
+
+
+def summarize_message(message: Dict[str, str]) -> str:
+    """
+    Condense one message to a summary line (its leading sentence).
+
+    Args:
+        message: Chat message with role and content
+
+    Returns:
+        str: Line such as "Student: How often do you floss?"
+    """
+    content = ' '.join(message.get('content', '').split())
+    excerpt = _SENTENCE_END.split(content, maxsplit=1)[0]
+    if len(excerpt) > SUMMARY_EXCERPT_CHARS:
+        excerpt = excerpt[:SUMMARY_EXCERPT_CHARS].rsplit(' ', 1)[0] + '...'
+    elif len(excerpt) < len(content):
+        excerpt += ' ...'
+    label = ROLE_LABELS.get(message.get('role'), message.get('role', 'Unknown').title())
+    return f"{label}: {excerpt}"
+
+
+def find_window_start(chat_history: List[Dict[str, str]], token_budget: int,
+                      min_recent_messages: int) -> int:
+    """
+    Find the index of the first message kept verbatim.
+
+    Messages are taken newest first while they fit the token budget; the
+    last min_recent_messages are always kept. The window never starts on a
+    patient message, so it opens with the student's turn.
+
+    Args:
+        chat_history: Full list of chat messages
+        token_budget: Token budget for verbatim messages
+        min_recent_messages: Messages always kept regardless of budget
+
+    Returns:
+        int: Index into chat_history where the verbatim window starts
+    """
+    start = len(chat_history)
+    used = 0
+    while start > 0:
+        cost = estimate_message_tokens(chat_history[start - 1])
+        kept = len(chat_history) - start
+        if kept >= min_recent_messages and used + cost > token_budget:
+            break
+        used += cost
+        start -= 1
+
+    while 0 < start < len(chat_history) and chat_history[start].get('role') == 'assistant':
+        start += 1
+    return start
+
+
+def _trim_summary(state: Dict[str, Any], token_budget: int) -> None:
+    """Drop the oldest summary lines until the summary fits its budget."""
+    lines = state['lines']
+    total = sum(estimate_tokens(line) for line in lines)
+    while lines and total > token_budget:
+        total -= estimate_tokens(lines.pop(0))
+        state['omitted'] += 1
+
+
+def render_summary(state: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """
+    Render the rolling summary as a system message.
+
+    Returns:
+        dict: System message, or None if nothing has been folded yet
+    """
+    if not state['lines'] and not state['omitted']:
+        return None
+    lines = [SUMMARY_HEADER]
+    if state['omitted']:
+        lines.append(f"- ({state['omitted']} earliest messages omitted)")
+    lines.extend(f"- {line}" for line in state['lines'])
+    return {"role": "system", "content": "\n".join(lines)}
+
+
+def window_chat_history(
+    chat_history: List[Dict[str, str]],
+    summary_state: Optional[Dict[str, Any]] = None,
+    settings: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """
+    Build the history part of the prompt: rolling summary + recent messages.
+
+    Args:
+        chat_history: Full list of chat messages (not modified)
+        summary_state: State from the previous turn (None starts a new one)
+        settings: conversation_window settings (history_token_budget,
+                  min_recent_messages, summary_token_budget)
+
+    Returns:
+        Tuple of (messages, summary_state):
+            - messages: Optional summary system message followed by the
+              verbatim recent messages
+            - summary_state: Updated state to store for the next turn
+    """
+    settings = settings or {}
+    token_budget = int(settings.get('history_token_budget', DEFAULT_HISTORY_TOKEN_BUDGET))
+    min_recent = int(settings.get('min_recent_messages', DEFAULT_MIN_RECENT_MESSAGES))
+    summary_budget = int(settings.get('summary_token_budget', DEFAULT_SUMMARY_TOKEN_BUDGET))
+
+    state = summary_state if summary_state is not None else new_summary_state()
+    if state['folded'] > len(chat_history):
+        # History was reset (new conversation) - start the summary over
+        state = new_summary_state()
+
+    # Never un-fold: messages already in the summary stay out of the window
+    start = max(find_window_start(chat_history, token_budget, min_recent), state['folded'])
+    if start > state['folded']:
+        state['lines'].extend(summarize_message(m) for m in chat_history[state['folded']:start])
+        _trim_summary(state, summary_budget)
+        logger.debug(f"Folded {start - state['folded']} messages into the conversation summary")
+        state['folded'] = start
+
+    # Only role and content go to the API (messages also carry timestamps)
+    messages = [{'role': m['role'], 'content': m['content']} for m in chat_history[start:]]
+    summary_message = render_summary(state)
+    if summary_message:
+        messages.insert(0, summary_message)
+    return messages, state
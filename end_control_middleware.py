@@ -15,6 +15,16 @@ Path 2: Semantic-Based (traditional, with requirements)
 
 The middleware provides detailed tracing for diagnosing future incidents.
 
+Signal detection: every pattern list below is compiled into one alternation
+with a named group per pattern (SignalMatcher). scan_message() lower-cases a
+message once and returns all of its signals in one pass; results are cached
+per message text.
+
+MI coverage is accumulated in the conversation context (MICoverageTracker
+under 'mi_coverage', kept in session state between turns): each turn only
+the messages added since the previous turn are scanned, and per-component
+hit counts and first-hit turns are kept for trace logging.
+
 Conversation States:
 - ACTIVE: Normal conversation in progress
 - PENDING_END_CONFIRMATION: Awaiting student confirmation
@@ -26,10 +36,13 @@ Conversation States:
 import os
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 from enum import Enum
 
+from termination_metrics import TerminationMetrics
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -179,6 +192,91 @@ PATIENT_END_CONFIRMATION_PATTERNS = [
     r'\b(i\s+think\s+we\'re\s+done|i\s+think\s+that\'s\s+it)\b',
 ]
 
+# Signal name -> pattern list; MI coverage signals use the component names
+SIGNAL_PATTERNS = {
+    'user_end_intent': USER_END_INTENT_PATTERNS,
+    'bot_end_ack': BOT_END_ACK_PATTERNS,
+    'student_confirmation': STUDENT_CONFIRMATION_PATTERNS,
+    'doctor_closure': DOCTOR_CLOSURE_PATTERNS,
+    'patient_satisfaction': PATIENT_SATISFACTION_PATTERNS,
+    'patient_end_confirmation': PATIENT_END_CONFIRMATION_PATTERNS,
+    **MI_COVERAGE_PATTERNS,
+}
+
+# Messages whose scan results are kept (see scan_message)
+SIGNAL_CACHE_SIZE = 4096
+
+
+class SignalMatcher:
+    """
+    Precompiled matcher for named pattern lists.
+    
+    Each list becomes one regex alternation in which pattern i is the named
+    group "p<i>", so a single search per list tells whether any pattern
+    matches and which one did. Lists are searched separately because their
+    patterns overlap (e.g. "bye" is both a user end intent and a bot
+    acknowledgment) and one combined regex would report only one of them.
+    """
+    
+    def __init__(self, signal_patterns: Dict[str, List[str]]):
+        """
+        Compile the pattern lists.
+        
+        Args:
+            signal_patterns: Dict mapping signal name to its regex patterns (lower-case text)
+        """
+        self.signal_patterns = {name: list(patterns) for name, patterns in signal_patterns.items()}
+        self._regexes = {name: self._compile(patterns) for name, patterns in self.signal_patterns.items()}
+    
+    @staticmethod
+    def _compile(patterns: List[str]) -> re.Pattern:
+        # A shared leading \b is factored out of the alternation so the regex
+        # engine skips non-word-boundary positions before trying the patterns
+        prefix = r'\b' if patterns and all(pattern.startswith(r'\b') for pattern in patterns) else ''
+        alternatives = '|'.join(
+            f"(?P<p{index}>{pattern[len(prefix):]})" for index, pattern in enumerate(patterns)
+        )
+        return re.compile(f"{prefix}(?:{alternatives})")
+    
+    def scan(self, text: str) -> Dict[str, str]:
+        """
+        Find every signal in a message.
+        
+        Args:
+            text: Message text (lower-cased here)
+            
+        Returns:
+            Dict mapping each matched signal name to the pattern that matched
+        """
+        text_lower = (text or '').lower().strip()
+        signals = {}
+        for name, regex in self._regexes.items():
+            match = regex.search(text_lower)
+            if match:
+                signals[name] = self.signal_patterns[name][int(match.lastgroup[1:])]
+        return signals
+
+
+_signal_matcher = SignalMatcher(SIGNAL_PATTERNS)
+
+
+@lru_cache(maxsize=SIGNAL_CACHE_SIZE)
+def _scan_cached(text: str) -> Tuple[Tuple[str, str], ...]:
+    return tuple(_signal_matcher.scan(text).items())
+
+
+def scan_message(text: str) -> Dict[str, str]:
+    """
+    Get all end-control signals of a message (cached per message text).
+    
+    Args:
+        text: Message text
+        
+    Returns:
+        Dict mapping each matched signal name (see SIGNAL_PATTERNS) to the pattern that matched
+    """
+    return dict(_scan_cached(text or ''))
+
 
 def detect_user_end_intent(user_message: str) -> bool:
     """
@@ -195,12 +293,9 @@ def detect_user_end_intent(user_message: str) -> bool:
     if not user_message:
         return False
     
-    message_lower = user_message.lower().strip()
-    
-    for pattern in USER_END_INTENT_PATTERNS:
-        if re.search(pattern, message_lower):
-            logger.info(f"User end intent detected: '{user_message[:50]}...'")
-            return True
+    if 'user_end_intent' in scan_message(user_message):
+        logger.info(f"User end intent detected: '{user_message[:50]}...'")
+        return True
     
     return False
 
@@ -220,12 +315,9 @@ def detect_bot_end_ack(bot_message: str) -> bool:
     if not bot_message:
         return False
     
-    message_lower = bot_message.lower().strip()
-    
-    for pattern in BOT_END_ACK_PATTERNS:
-        if re.search(pattern, message_lower):
-            logger.info(f"Bot end acknowledgment detected: '{bot_message[:50]}...'")
-            return True
+    if 'bot_end_ack' in scan_message(bot_message):
+        logger.info(f"Bot end acknowledgment detected: '{bot_message[:50]}...'")
+        return True
     
     return False
 
@@ -324,11 +416,8 @@ def detect_patient_satisfaction(chat_history: List[Dict]) -> bool:
     recent_messages = [msg for msg in chat_history[-6:] if msg.get('role') == 'assistant']
     
     for message in recent_messages:
-        content = message.get('content', '').lower()
-        for pattern in PATIENT_SATISFACTION_PATTERNS:
-            if re.search(pattern, content):
-                satisfaction_count += 1
-                break  # Count each message only once
+        if 'patient_satisfaction' in scan_message(message.get('content', '')):
+            satisfaction_count += 1  # Count each message only once
     
     # Need at least 2 satisfaction signals
     satisfied = satisfaction_count >= 2
@@ -347,12 +436,9 @@ def detect_doctor_closure_signal(user_message: str) -> bool:
     Returns:
         bool: True if doctor closure signal detected
     """
-    message_lower = user_message.lower().strip()
-    
-    for pattern in DOCTOR_CLOSURE_PATTERNS:
-        if re.search(pattern, message_lower):
-            logger.debug(f"Doctor closure signal detected: '{user_message[:50]}...'")
-            return True
+    if 'doctor_closure' in scan_message(user_message):
+        logger.debug(f"Doctor closure signal detected: '{user_message[:50]}...'")
+        return True
     
     return False
 
@@ -367,12 +453,9 @@ def detect_patient_end_confirmation(assistant_message: str) -> bool:
     Returns:
         bool: True if patient confirms readiness to end
     """
-    message_lower = assistant_message.lower().strip()
-    
-    for pattern in PATIENT_END_CONFIRMATION_PATTERNS:
-        if re.search(pattern, message_lower):
-            logger.debug(f"Patient end confirmation detected: '{assistant_message[:50]}...'")
-            return True
+    if 'patient_end_confirmation' in scan_message(assistant_message):
+        logger.debug(f"Patient end confirmation detected: '{assistant_message[:50]}...'")
+        return True
     
     return False
 
@@ -435,8 +518,7 @@ def can_suggest_ending(conversation_state: Dict) -> bool:
         return False
     
     # Check MI coverage (still required)
-    mi_coverage = check_mi_coverage(chat_history)
-    missing_components = [comp for comp, present in mi_coverage.items() if not present]
+    missing_components = get_mi_coverage_tracker(conversation_state).missing()
     
     if missing_components:
         logger.debug(f"Cannot suggest ending: missing MI components {missing_components}")
@@ -444,11 +526,11 @@ def can_suggest_ending(conversation_state: Dict) -> bool:
     
     # NEW: Only suggest ending when doctor has offered closure AND patient seems satisfied
     # Get last user message to check for doctor closure
-    user_messages = [m for m in chat_history if m.get('role') == 'user']
-    if not user_messages:
+    last_user = next((m for m in reversed(chat_history) if m.get('role') == 'user'), None)
+    if last_user is None:
         return False
     
-    last_user_message = user_messages[-1].get('content', '')
+    last_user_message = last_user.get('content', '')
     if not detect_doctor_closure_signal(last_user_message):
         logger.debug("Cannot suggest ending: doctor has not offered closure")
         return False
@@ -476,13 +558,10 @@ def detect_mi_component(text: str, component: str) -> bool:
         logger.warning(f"Unknown MI component requested: {component}")
         return False
     
-    patterns = MI_COVERAGE_PATTERNS[component]
-    text_lower = text.lower()
-    
-    for pattern in patterns:
-        if re.search(pattern, text_lower):
-            logger.debug(f"MI component '{component}' detected with pattern: {pattern}")
-            return True
+    pattern = scan_message(text).get(component)
+    if pattern:
+        logger.debug(f"MI component '{component}' detected with pattern: {pattern}")
+        return True
     
     return False
 
@@ -507,16 +586,100 @@ def check_mi_coverage(chat_history: List[Dict]) -> Dict[str, bool]:
     # Check all assistant messages for MI components
     for message in chat_history:
         if message.get('role') == 'assistant':
-            content = message.get('content', '')
+            signals = scan_message(message.get('content', ''))
             for component in coverage.keys():
-                if not coverage[component]:  # Only check if not already found
-                    if detect_mi_component(content, component):
-                        coverage[component] = True
+                if component in signals:
+                    coverage[component] = True
     
     logger.info(f"MI Coverage check: {coverage}")
     return coverage
 
 
+class MICoverageTracker:
+    """
+    Running MI coverage of one conversation.
+    
+    update() scans only the messages appended since the previous call, so
+    tracking a session costs one scan per message instead of a full
+    history scan per turn. Like check_mi_coverage(), only assistant
+    messages count. A turn is the number of student messages so far.
+    """
+    
+    def __init__(self):
+        """Initialize an empty tracker."""
+        self.hits = {component: 0 for component in MI_COVERAGE_PATTERNS}
+        self.first_turn = {component: None for component in MI_COVERAGE_PATTERNS}
+        self.messages_seen = 0
+        self.turn = 0
+        self._last_message = None
+    
+    def update(self, chat_history: List[Dict]) -> 'MICoverageTracker':
+        """
+        Add the messages appended to chat_history since the last update.
+        
+        The tracker starts over if chat_history is not an extension of the
+        history it has seen (e.g. a new conversation).
+        
+        Args:
+            chat_history: List of chat messages with 'role' and 'content'
+            
+        Returns:
+            MICoverageTracker: self
+        """
+        seen = self.messages_seen
+        if seen > len(chat_history) or (seen and chat_history[seen - 1] is not self._last_message):
+            self.__init__()
+        
+        for message in chat_history[self.messages_seen:]:
+            if message.get('role') == 'user':
+                self.turn += 1
+            elif message.get('role') == 'assistant':
+                signals = scan_message(message.get('content', ''))
+                for component in self.hits:
+                    if component in signals:
+                        self.hits[component] += 1
+                        if self.first_turn[component] is None:
+                            self.first_turn[component] = self.turn
+        
+        self.messages_seen = len(chat_history)
+        self._last_message = chat_history[-1] if chat_history else None
+        return self
+    
+    def coverage(self) -> Dict[str, bool]:
+        """Dict mapping component names to boolean (present or not), as check_mi_coverage()."""
+        return {component: hits > 0 for component, hits in self.hits.items()}
+    
+    def missing(self) -> List[str]:
+        """Components not demonstrated yet."""
+        return [component for component, hits in self.hits.items() if not hits]
+    
+    def to_dict(self) -> Dict[str, Dict]:
+        """Per-component hit counts and first-hit turns (for logs)."""
+        return {
+            component: {'hits': self.hits[component], 'first_turn': self.first_turn[component]}
+            for component in self.hits
+        }
+
+
+def get_mi_coverage_tracker(conversation_context: Dict) -> MICoverageTracker:
+    """
+    Get the context's MI coverage tracker, updated with its chat history.
+    
+    The tracker is created on first use and stored under 'mi_coverage' so
+    callers can keep it (e.g. in st.session_state) for the next turn.
+    
+    Args:
+        conversation_context: Dictionary containing chat_history
+        
+    Returns:
+        MICoverageTracker: Tracker covering the whole chat history
+    """
+    tracker = conversation_context.get('mi_coverage')
+    if not isinstance(tracker, MICoverageTracker):
+        tracker = conversation_context['mi_coverage'] = MICoverageTracker()
+    return tracker.update(conversation_context.get('chat_history', []))
+
+
 def detect_student_confirmation(user_message: str) -> bool:
     """
     Detect if student explicitly confirms they want to end the conversation.
@@ -527,16 +690,13 @@ def detect_student_confirmation(user_message: str) -> bool:
     Returns:
         bool: True if explicit confirmation detected
     """
-    message_lower = user_message.lower().strip()
-    
     # Check for explicit confirmation patterns
-    for pattern in STUDENT_CONFIRMATION_PATTERNS:
-        if re.search(pattern, message_lower):
-            logger.info(f"Student confirmation detected: '{user_message}'")
-            return True
+    if 'student_confirmation' in scan_message(user_message):
+        logger.info(f"Student confirmation detected: '{user_message}'")
+        return True
     
     # Check if message is ONLY an ambiguous phrase (should not count as confirmation)
-    if message_lower in AMBIGUOUS_ENDING_PHRASES:
+    if user_message.lower().strip() in AMBIGUOUS_ENDING_PHRASES:
         logger.debug(f"Ambiguous phrase detected, not counting as confirmation: '{user_message}'")
         return False
     
@@ -633,10 +793,10 @@ def should_continue_v3(
             - requires_confirmation: bool (if confirmation prompt should be shown)
             - metrics: dict (for logging/monitoring)
     """
-    from config_loader import ConfigLoader
+    from config_loader import get_config_loader
     
     # Load feature flags
-    config = ConfigLoader()
+    config = get_config_loader()
     flags = config.get_feature_flags()
     require_confirmation = flags.get('require_end_confirmation', True)
     
@@ -856,6 +1016,7 @@ def should_continue_v4(
             - turn_count: Number of student turns
             - end_control_state: Current state (optional, defaults to ACTIVE)
             - confirmation_flag: Whether confirmation was explicitly given
+            - mi_coverage: MICoverageTracker from the previous turn (optional, updated in place)
         last_assistant_text: The most recent assistant (patient) message
         last_user_text: The most recent user (doctor) message (optional)
         
@@ -868,10 +1029,10 @@ def should_continue_v4(
             - requires_confirmation: bool (if confirmation prompt should be shown)
             - metrics: dict (for logging/monitoring)
     """
-    from config_loader import ConfigLoader
+    from config_loader import get_config_loader
     
     # Load feature flags
-    config = ConfigLoader()
+    config = get_config_loader()
     flags = config.get_feature_flags()
     require_confirmation = flags.get('require_end_confirmation', True)
     
@@ -1036,8 +1197,7 @@ def should_continue_v4(
         }
     
     # Check MI coverage (still required)
-    mi_coverage = check_mi_coverage(chat_history)
-    missing_components = [comp for comp, present in mi_coverage.items() if not present]
+    missing_components = get_mi_coverage_tracker(conversation_context).missing()
     
     if missing_components:
         logger.debug(f"MI coverage incomplete: {missing_components}")
@@ -1222,7 +1382,6 @@ def should_continue(
             - reason: str (explanation for the decision)
             - rewrite_text: Optional[str] (alternative text if needed)
     """
-    chat_history = conversation_state.get('chat_history', [])
     turn_count = conversation_state.get('turn_count', 0)
     
     timestamp = datetime.now().isoformat()
@@ -1239,8 +1398,7 @@ def should_continue(
         }
     
     # Condition 2: MI coverage requirements
-    mi_coverage = check_mi_coverage(chat_history)
-    missing_components = [comp for comp, present in mi_coverage.items() if not present]
+    missing_components = get_mi_coverage_tracker(conversation_state).missing()
     
     if missing_components:
         reason = f"MI coverage incomplete. Missing: {', '.join(missing_components)}"
@@ -1302,12 +1460,14 @@ def log_conversation_trace(
     """
     timestamp = datetime.now().isoformat()
     turn_count = conversation_state.get('turn_count', 0)
+    tracker = get_mi_coverage_tracker(conversation_state)
     
     trace = {
         'timestamp': timestamp,
         'turn_count': turn_count,
         'decision': decision,
-        'mi_coverage': check_mi_coverage(conversation_state.get('chat_history', [])),
+        'mi_coverage': tracker.coverage(),
+        'mi_coverage_detail': tracker.to_dict(),
         'min_threshold': MIN_TURN_THRESHOLD,
         'end_token': END_TOKEN,
     }
@@ -1345,14 +1505,8 @@ def prevent_ambiguous_ending(user_message: str) -> bool:
     return False
 
 
-# Metrics tracking for monitoring and alerts
-_termination_metrics = {
-    'sessions_ended_without_confirmation': 0,
-    'sessions_ended_with_confirmation': 0,
-    'sessions_parked': 0,
-    'confirmation_triggers': [],
-    'ambiguous_responses': 0
-}
+# Metrics tracking for monitoring and alerts (bounded and thread-safe, see termination_metrics)
+_termination_metrics = TerminationMetrics()
 
 
 def log_termination_metrics(metrics: Dict) -> None:
@@ -1362,39 +1516,18 @@ def log_termination_metrics(metrics: Dict) -> None:
     Args:
         metrics: Metrics dictionary from should_continue_v3
     """
-    global _termination_metrics
+    counters = _termination_metrics.record(metrics)
     
-    # Track confirmation status
     if metrics.get('alert') == 'ended_without_confirmation':
-        _termination_metrics['sessions_ended_without_confirmation'] += 1
         logger.error(f"ALERT: Session ended without confirmation! Metrics: {metrics}")
-    elif metrics.get('confirmation_result') in ['confirmed_first_ask', 'confirmed_second_ask']:
-        _termination_metrics['sessions_ended_with_confirmation'] += 1
-    
-    # Track parked sessions
-    if metrics.get('state') == ConversationState.PARKED.value:
-        _termination_metrics['sessions_parked'] += 1
-    
-    # Track triggers
-    trigger = metrics.get('termination_trigger')
-    if trigger:
-        _termination_metrics['confirmation_triggers'].append({
-            'trigger': trigger,
-            'timestamp': metrics.get('timestamp'),
-            'result': metrics.get('confirmation_result')
-        })
-    
-    # Track ambiguous responses
-    if metrics.get('confirmation_result') == 'ambiguous_first_response':
-        _termination_metrics['ambiguous_responses'] += 1
     
     # Log comprehensive metrics periodically (every 10th call)
-    if _termination_metrics['sessions_ended_with_confirmation'] % 10 == 0:
-        logger.info(f"Termination metrics summary: {_termination_metrics}")
+    if counters['sessions_ended_with_confirmation'] % 10 == 0:
+        logger.info(f"Termination metrics summary: {counters}")
     
     # Alert if ANY sessions ended without confirmation
-    if _termination_metrics['sessions_ended_without_confirmation'] > 0:
-        logger.error(f"CRITICAL: {_termination_metrics['sessions_ended_without_confirmation']} sessions ended without confirmation!")
+    if counters['sessions_ended_without_confirmation'] > 0:
+        logger.error(f"CRITICAL: {counters['sessions_ended_without_confirmation']} sessions ended without confirmation!")
 
 
 def get_termination_metrics() -> Dict:
@@ -1402,18 +1535,26 @@ def get_termination_metrics() -> Dict:
     Get current termination metrics for dashboards/monitoring.
     
     Returns:
-        Dictionary with current metrics
+        Dictionary with the counters and 'confirmation_triggers', the most
+        recent trigger events (bounded; the total is 'triggers_total')
     """
-    return _termination_metrics.copy()
+    snapshot = _termination_metrics.snapshot()
+    metrics = dict(snapshot['counters'])
+    metrics['triggers_total'] = metrics.pop('confirmation_triggers')
+    metrics['confirmation_triggers'] = snapshot['recent_events']
+    return metrics
+
+
+def get_termination_metrics_snapshot() -> Dict:
+    """Get counters, recent events and per-minute rollups (see TerminationMetrics.snapshot)."""
+    return _termination_metrics.snapshot()
+
+
+def export_termination_metrics(path: str) -> Dict:
+    """Write a termination metrics snapshot to a JSON file (see TerminationMetrics.export)."""
+    return _termination_metrics.export(path)
 
 
 def reset_termination_metrics() -> None:
     """Reset termination metrics (for testing or periodic cleanup)."""
-    global _termination_metrics
-    _termination_metrics = {
-        'sessions_ended_without_confirmation': 0,
-        'sessions_ended_with_confirmation': 0,
-        'sessions_parked': 0,
-        'confirmation_triggers': [],
-        'ambiguous_responses': 0
-    }
+    _termination_metrics.reset()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Offline Replay of Conversations Through the End-Control State Machine
+
+Changes to should_continue_v4 or the end-control pattern lists were only
+checked against hand-written unit tests. This tool replays recorded
+conversations through the state machine, turn by turn, and reports how
+they end:
+- Per-transcript decisions (state, continue, reason for every turn),
+  streamed to a JSONL file
+- Histograms of final states, end reasons and state transitions
+- A diff against the decisions file of a previous (baseline) run, listing
+  the transcripts whose decisions changed and the first turn that differs
+
+Transcripts are JSONL, one conversation per line: {"id": ..., "messages":
+[{"role": "user" | "assistant", "content": ...}, ...]} (benchmarks/data/
+transcripts.jsonl is an example). A student message and the patient reply
+after it form one turn; other assistant messages (greeting, recorded
+confirmation prompts) are added to the history as the app does. A
+conversation stops being replayed once a decision ends it.
+
+Transcripts are read lazily and replayed in batches on a process pool with
+a bounded number of batches in flight, so memory does not grow with the
+input. Streamlit is never imported; each worker loads the configuration
+once (MI_CONFIG_PATH or --config) and does not re-check it.
+
+Usage:
+    python3 end_control_replay.py transcripts.jsonl --output decisions.jsonl
+    python3 end_control_replay.py transcripts.jsonl --baseline decisions.jsonl --json report.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import config_loader
+from end_control_middleware import ConversationState, should_continue_v4
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+NOT_ENDED = 'not ended'
+
+
+def iter_transcripts(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read transcripts one line at a time.
+
+    Args:
+        path: JSONL file, one {"id", "messages"} object per line
+
+    Yields:
+        dict: Transcript with 'id' (default "line-N") and 'messages'
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no messages list
+    """
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                transcript = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON ({e})") from e
+            if not isinstance(transcript.get('messages'), list):
+                raise ValueError(f"{path}:{number}: no 'messages' list")
+            transcript.setdefault('id', f'line-{number}')
+            yield transcript
+
+
+def replay_transcript(transcript: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run should_continue_v4 for every turn of one conversation.
+
+    The conversation context is carried between turns as the turn pipeline
+    keeps it in session state (state, mutual-intent flags, MI coverage).
+
+    Args:
+        transcript: Dict with 'id' and 'messages'
+
+    Returns:
+        dict: id, turns (replayed), decisions (turn, state, continue,
+              requires_confirmation, reason), final_state, end_reason
+              (None if the conversation did not end) and ended_turn
+    """
+    messages = transcript['messages']
+    context: Dict[str, Any] = {
+        'chat_history': [],
+        'turn_count': 0,
+        'end_control_state': ConversationState.ACTIVE.value,
+        'confirmation_flag': False,
+        'user_end_intent': False,
+        'bot_end_ack': False,
+    }
+    history = context['chat_history']
+    decisions = []
+    end_reason = None
+
+    for index, message in enumerate(messages):
+        history.append({'role': message.get('role'), 'content': message.get('content') or ''})
+        # A turn is complete once the patient has replied to a student message
+        if message.get('role') != 'assistant' or index == 0 or messages[index - 1].get('role') != 'user':
+            continue
+        context['turn_count'] += 1
+
+        decision = should_continue_v4(context, history[-1]['content'], history[-2]['content'])
+        context['end_control_state'] = decision['state']
+        decisions.append({
+            'turn': context['turn_count'],
+            'state': decision['state'],
+            'continue': decision['continue'],
+            'requires_confirmation': decision.get('requires_confirmation', False),
+            'reason': decision['reason'],
+        })
+        if not decision['continue']:
+            end_reason = decision['reason']
+            break
+
+    return {
+        'id': transcript['id'],
+        'turns': len(decisions),
+        'decisions': decisions,
+        'final_state': decisions[-1]['state'] if decisions else ConversationState.ACTIVE.value,
+        'end_reason': end_reason,
+        'ended_turn': decisions[-1]['turn'] if end_reason is not None else None,
+    }
+
+
+def replay_batch(transcripts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replay a batch of transcripts (the unit of work sent to a worker)."""
+    return [replay_transcript(transcript) for transcript in transcripts]
+
+
+def init_worker(config_path: Optional[str] = None) -> None:
+    """
+    Prepare a replay process: quiet logging and load the configuration once.
+
+    Args:
+        config_path: config.json to use (default: MI_CONFIG_PATH or the repo's config.json)
+    """
+    logging.disable(logging.INFO)
+    if config_path:
+        os.environ['MI_CONFIG_PATH'] = config_path
+    config_loader.get_config_loader()
+    # The configuration must not change in the middle of a replay
+    config_loader.CONFIG_CHECK_INTERVAL_SECONDS = float('inf')
+
+
+@contextmanager
+def _in_process_settings(config_path: Optional[str]) -> Iterator[None]:
+    # init_worker() for a replay in the calling process, undone afterwards
+    saved_path = os.environ.get('MI_CONFIG_PATH')
+    saved_interval = config_loader.CONFIG_CHECK_INTERVAL_SECONDS
+    saved_disable = logging.root.manager.disable
+    init_worker(config_path)
+    try:
+        yield
+    finally:
+        if saved_path is None:
+            os.environ.pop('MI_CONFIG_PATH', None)
+        else:
+            os.environ['MI_CONFIG_PATH'] = saved_path
+        config_loader.CONFIG_CHECK_INTERVAL_SECONDS = saved_interval
+        logging.disable(saved_disable)
+
+
+def _batches(transcripts: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(transcripts)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def replay_all(transcripts: Iterable[Dict[str, Any]], workers: int = 0,
+               batch_size: int = DEFAULT_BATCH_SIZE,
+               config_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Replay transcripts, in input order.
+
+    Args:
+        transcripts: Iterable of transcripts (consumed lazily)
+        workers: Worker processes (0: replay in this process)
+        batch_size: Transcripts per task sent to a worker
+        config_path: config.json for the replay (see init_worker)
+
+    Yields:
+        dict: replay_transcript() result for each transcript
+    """
+    batches = _batches(transcripts, batch_size)
+    if workers <= 0:
+        with _in_process_settings(config_path):
+            for batch in batches:
+                yield from replay_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config_path,)) as pool:
+        # Keep a few batches per worker queued, not the whole input
+        in_flight: deque = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(replay_batch, batch))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def load_decisions(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load a decisions file written by a previous run, keyed by transcript id."""
+    with open(path, encoding='utf-8') as f:
+        return {result['id']: result for result in map(json.loads, filter(str.strip, f))}
+
+
+def first_difference(baseline: Dict[str, Any], current: Dict[str, Any]) -> Optional[int]:
+    """
+    Find the first turn whose decision differs between two replays of a transcript.
+
+    Returns:
+        int: Turn number, or None if the decisions are identical
+    """
+    def key(decision):
+        return decision['state'], decision['continue'], decision['requires_confirmation'], decision['reason']
+
+    for old, new in itertools.zip_longest(baseline['decisions'], current['decisions']):
+        if old is None or new is None or key(old) != key(new):
+            return (old or new)['turn']
+    return None
+
+
+class ReplayReport:
+    """Aggregates replay results incrementally (histograms only; ids are kept for a baseline diff)."""
+
+    def __init__(self, baseline: Optional[Dict[str, Dict[str, Any]]] = None, max_changes: int = 100):
+        """
+        Initialize an empty report.
+
+        Args:
+            baseline: Decisions of a previous run keyed by id (None: no diff)
+            max_changes: Changed transcripts listed in the report (all are counted)
+        """
+        self.baseline = baseline
+        self.max_changes = max_changes
+        self.transcripts = 0
+        self.turns = 0
+        self.final_states: Counter = Counter()
+        self.end_reasons: Counter = Counter()
+        self.transitions: Counter = Counter()
+        self.ended_turns: Counter = Counter()
+        self.seen_ids = set()
+        self.changed = 0
+        self.changes: List[Dict[str, Any]] = []
+
+    def add(self, result: Dict[str, Any]) -> None:
+        """Count one replay_transcript() result."""
+        self.transcripts += 1
+        self.turns += result['turns']
+        self.final_states[result['final_state']] += 1
+        self.end_reasons[result['end_reason'] or NOT_ENDED] += 1
+        if result['ended_turn'] is not None:
+            self.ended_turns[result['ended_turn']] += 1
+
+        previous = ConversationState.ACTIVE.value
+        for decision in result['decisions']:
+            self.transitions[f"{previous} -> {decision['state']}"] += 1
+            previous = decision['state']
+
+        if self.baseline is not None:
+            self.seen_ids.add(result['id'])
+            base = self.baseline.get(result['id'])
+            turn = first_difference(base, result) if base is not None else None
+            if base is not None and turn is not None:
+                self.changed += 1
+                if len(self.changes) < self.max_changes:
+                    self.changes.append({
+                        'id': result['id'],
+                        'first_different_turn': turn,
+                        'baseline': {'final_state': base['final_state'], 'end_reason': base['end_reason'],
+                                     'ended_turn': base['ended_turn']},
+                        'current': {'final_state': result['final_state'], 'end_reason': result['end_reason'],
+                                    'ended_turn': result['ended_turn']},
+                    })
+
+    def summary(self, elapsed_seconds: float) -> Dict[str, Any]:
+        """
+        Build the report.
+
+        Returns:
+            dict: transcripts, turns, elapsed_seconds, transcripts_per_second,
+                  final_states, end_reasons, transitions (most common first),
+                  ended_turn stats, and diff (None without a baseline)
+        """
+        ended = sorted(self.ended_turns.elements())
+        report = {
+            'transcripts': self.transcripts,
+            'turns': self.turns,
+            'elapsed_seconds': round(elapsed_seconds, 3),
+            'transcripts_per_second': round(self.transcripts / elapsed_seconds, 1) if elapsed_seconds else None,
+            'final_states': dict(self.final_states.most_common()),
+            'end_reasons': dict(self.end_reasons.most_common()),
+            'transitions': dict(self.transitions.most_common()),
+            'ended_turn': {
+                'count': len(ended),
+                'min': ended[0] if ended else None,
+                'median': ended[len(ended) // 2] if ended else None,
+                'max': ended[-1] if ended else None,
+            },
+            'diff': None,
+        }
+        if self.baseline is not None:
+            report['diff'] = {
+                'compared': len(self.seen_ids & self.baseline.keys()),
+                'changed': self.changed,
+                'only_in_baseline': len(self.baseline.keys() - self.seen_ids),
+                'only_in_run': len(self.seen_ids - self.baseline.keys()),
+                'changes': self.changes,
+            }
+        return report
+
+
+def run_replay(transcripts_path: str, output_path: Optional[str] = None, baseline_path: Optional[str] = None,
+               workers: int = 0, batch_size: int = DEFAULT_BATCH_SIZE, config_path: Optional[str] = None,
+               on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Replay a transcripts file and build the report.
+
+    Args:
+        transcripts_path: Transcripts JSONL file
+        output_path: Write per-transcript decisions here as JSONL (usable as a later baseline)
+        baseline_path: Decisions file of a previous run to diff against
+        workers: Worker processes (0: replay in this process)
+        batch_size: Transcripts per task sent to a worker
+        config_path: config.json for the replay
+        on_result: Called with each result as it arrives
+
+    Returns:
+        dict: ReplayReport.summary()
+    """
+    report = ReplayReport(load_decisions(baseline_path) if baseline_path else None)
+    output = open(output_path, 'w', encoding='utf-8') if output_path else None
+    start = time.perf_counter()
+    try:
+        for result in replay_all(iter_transcripts(transcripts_path), workers, batch_size, config_path):
+            report.add(result)
+            if output:
+                output.write(json.dumps(result) + '\n')
+            if on_result:
+                on_result(result)
+    finally:
+        if output:
+            output.close()
+    return report.summary(time.perf_counter() - start)
+
+
+def _histogram_lines(title: str, counts: Dict[str, int], limit: int = 15) -> List[str]:
+    total = sum(counts.values()) or 1
+    lines = [title]
+    for label, count in list(counts.items())[:limit]:
+        lines.append(f"  {count:>7} {100.0 * count / total:>5.1f}%  {label}")
+    if len(counts) > limit:
+        lines.append(f"  ... {len(counts) - limit} more")
+    return lines
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report as plain text."""
+    ended = report['ended_turn']
+    lines = [
+        f"Replayed {report['transcripts']} transcripts, {report['turns']} turns in {report['elapsed_seconds']}s "
+        f"({report['transcripts_per_second']} transcripts/s)",
+        f"Ended: {ended['count']} (turn min {ended['min']}, median {ended['median']}, max {ended['max']})",
+        "",
+    ]
+    lines += _histogram_lines("Final states:", report['final_states'])
+    lines += _histogram_lines("End reasons:", report['end_reasons'])
+    lines += _histogram_lines("State transitions:", report['transitions'])
+
+    diff = report['diff']
+    if diff is not None:
+        lines += [
+            "",
+            f"Baseline diff: {diff['changed']} of {diff['compared']} transcripts changed "
+            f"({diff['only_in_baseline']} only in baseline, {diff['only_in_run']} only in this run)",
+        ]
+        for change in diff['changes'][:10]:
+            base, current = change['baseline'], change['current']
+            lines.append(
+                f"  {change['id']}: from turn {change['first_different_turn']}, "
+                f"{base['final_state']} (turn {base['ended_turn']}) -> {current['final_state']} (turn {current['ended_turn']})"
+            )
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded conversations through the end-control state machine")
+    parser.add_argument('transcripts', help='Transcripts JSONL file')
+    parser.add_argument('--output', help='Write per-transcript decisions to this JSONL file')
+    parser.add_argument('--baseline', help='Decisions JSONL of a previous run to diff against')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: CPU count; 0 replays in this process)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Transcripts per worker task (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--config', help='config.json to replay with (default: MI_CONFIG_PATH or config.json)')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    report = run_replay(args.transcripts, args.output, args.baseline, args.workers, args.batch_size, args.config)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    # Non-zero when decisions changed against the baseline (for CI)
+    return 1 if report['diff'] and report['diff']['changed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
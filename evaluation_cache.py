@@ -0,0 +1,276 @@
+"""
+Content-Addressed Cache of Evaluation Results
+
+An evaluation depends only on the session type, the persona, the transcript,
+the evaluation prompt and the model. Retrying after a PDF error, reloading
+the page or regenerating a report for an unchanged transcript therefore
+does not need another (slow, token-heavy) evaluation completion.
+
+Results are stored in a small SQLite database keyed by a SHA-256 hash of
+    (session_type, persona, normalized transcript, prompt version, model)
+and evicted least-recently-used once the stored feedback exceeds
+max_size_mb. The database location defaults to eval_cache/evaluations.sqlite3
+(override with "evaluation_cache": {"path": ...} or EVAL_CACHE_PATH).
+
+Cache errors are logged and treated as misses; the cache never blocks
+feedback generation.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CACHE_PATH_ENV = 'EVAL_CACHE_PATH'
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_CACHE_PATH = REPO_ROOT / 'eval_cache' / 'evaluations.sqlite3'
+DEFAULT_MAX_SIZE_MB = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    key TEXT PRIMARY KEY,
+    feedback TEXT NOT NULL,
+    session_type TEXT,
+    persona TEXT,
+    prompt_version TEXT,
+    model TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def normalize_transcript(chat_history: List[Dict[str, str]]) -> str:
+    """
+    Normalize a chat history for hashing.
+
+    Roles are lower-cased and runs of whitespace in each message collapse to
+    one space, so formatting-only differences map to the same key.
+
+    Args:
+        chat_history: List of chat messages with role and content
+
+    Returns:
+        str: One "role: content" line per message
+    """
+    return "\n".join(
+        f"{message.get('role', '').strip().lower()}: {' '.join(message.get('content', '').split())}"
+        for message in chat_history
+    )
+
+
+def compute_evaluation_key(session_type: str, persona: str, chat_history: List[Dict[str, str]],
+                           prompt_version: str, model: str, response_times: Optional[str] = None) -> str:
+    """
+    Compute the cache key of an evaluation.
+
+    Args:
+        session_type: Bot/session type (e.g. "HPV")
+        persona: Selected persona name
+        chat_history: Conversation transcript
+        prompt_version: Evaluation prompt version
+        model: Model used for the evaluation
+        response_times: Measured response times given to the prompt (timings are not part of the transcript)
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        [session_type, persona, normalize_transcript(chat_history), prompt_version, model, response_times],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """SQLite-backed LRU cache of evaluation feedback with a size limit."""
+
+    def __init__(self, path: Optional[os.PathLike] = None, max_size_mb: float = DEFAULT_MAX_SIZE_MB):
+        """
+        Initialize evaluation cache.
+
+        Args:
+            path: SQLite database file (created on first use)
+            max_size_mb: Maximum total size of stored feedback before eviction
+        """
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the database and schema if needed."""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=5)
+        if not self._initialized:
+            with connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(_SCHEMA)
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_evaluations_last_access ON evaluations (last_access)"
+                )
+            self._initialized = True
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up cached feedback.
+
+        Args:
+            key: Evaluation key (see compute_evaluation_key)
+
+        Returns:
+            str: Cached feedback, or None on a miss or cache error
+        """
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        row = connection.execute(
+                            "SELECT feedback FROM evaluations WHERE key = ?", (key,)
+                        ).fetchone()
+                        if row is not None:
+                            connection.execute(
+                                "UPDATE evaluations SET last_access = ? WHERE key = ?", (time.time(), key)
+                            )
+                finally:
+                    connection.close()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return row[0]
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Evaluation cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, feedback: str, session_type: str = '', persona: str = '',
+            prompt_version: str = '', model: str = '') -> None:
+        """
+        Store feedback and evict least recently used entries over the size limit.
+
+        Args:
+            key: Evaluation key (see compute_evaluation_key)
+            feedback: Feedback text
+            session_type, persona, prompt_version, model: Stored for inspection
+        """
+        if not feedback:
+            return
+        now = time.time()
+        size = len(feedback.encode('utf-8'))
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        connection.execute(
+                            "INSERT OR REPLACE INTO evaluations "
+                            "(key, feedback, session_type, persona, prompt_version, model, size, created_at, last_access) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (key, feedback, session_type, persona, prompt_version, model, size, now, now)
+                        )
+                        self._evict(connection)
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Evaluation cache store failed: {e}")
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the total size fits."""
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM evaluations").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        for key, size in connection.execute(
+            "SELECT key, size FROM evaluations ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_size_bytes:
+                break
+            connection.execute("DELETE FROM evaluations WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Delete all entries and reset statistics."""
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        connection.execute("DELETE FROM evaluations")
+                finally:
+                    connection.close()
+                self.hits = self.misses = self.evictions = 0
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Evaluation cache clear failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics (entries, stored bytes, hits, misses, evictions)."""
+        entries, size = 0, 0
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    entries, size = connection.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM evaluations"
+                    ).fetchone()
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Evaluation cache stats failed: {e}")
+        return {
+            'entries': entries,
+            'size_bytes': size,
+            'max_size_bytes': self.max_size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# Process-wide cache shared by all pages and sessions
+_evaluation_cache: Optional[EvaluationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_evaluation_cache() -> Optional[EvaluationCache]:
+    """
+    Get the process-wide evaluation cache.
+
+    Returns:
+        EvaluationCache, or None if disabled in config.json
+    """
+    global _evaluation_cache
+
+    if _evaluation_cache is None:
+        with _cache_lock:
+            if _evaluation_cache is None:
+                try:
+                    from config_loader import get_config_loader
+                    settings = get_config_loader().get_evaluation_cache_config()
+                except Exception as e:
+                    logger.warning(f"Could not read evaluation cache config, using defaults: {e}")
+                    settings = {}
+                if not settings.get('enabled', True):
+                    return None
+                path = Path(os.environ.get(CACHE_PATH_ENV) or settings.get('path') or DEFAULT_CACHE_PATH)
+                if not path.is_absolute():
+                    path = REPO_ROOT / path
+                _evaluation_cache = EvaluationCache(
+                    path, float(settings.get('max_size_mb', DEFAULT_MAX_SIZE_MB))
+                )
+
+    return _evaluation_cache
@@ -0,0 +1,247 @@
+"""
+Background Feedback Jobs for MI Chatbots
+
+"Finish Session & Get Feedback" used to run the evaluation completion on the
+Streamlit script thread, and a rerun during the call (another click, a
+widget change) could start the same LLM call again.
+
+Feedback generation now runs as a job on a bounded, process-wide worker
+pool. The PDF report with its Box backup runs on a second pool
+(get_report_job_manager), so email retries during an SMTP outage cannot
+hold up feedback. Jobs live in a job table keyed
+by session ID, and the page polls the table from a fragment that reruns on
+a timer until the job is done:
+- Submitting again for the same session and transcript attaches to the
+  existing job instead of launching another LLM call
+- Submitting for a different transcript (a new conversation) replaces it
+- Finished jobs are kept for job_ttl_seconds so a late duplicate click
+  still reuses the result, then pruned
+
+The worker only calls the supplied function; it never touches Streamlit.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Job statuses
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_REPORT_MAX_WORKERS = 4
+DEFAULT_JOB_TTL_SECONDS = 3600
+
+
+def compute_transcript_key(*parts: str) -> str:
+    """
+    Hash the inputs that determine a feedback result.
+
+    Args:
+        parts: Texts identifying the request (e.g. persona, transcript)
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FeedbackJob:
+    """Status and result of one background feedback generation."""
+
+    def __init__(self, session_id: str, transcript_key: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Initialize a queued job.
+
+        Args:
+            session_id: Session that owns the job
+            transcript_key: Hash of the inputs (see compute_transcript_key)
+            metadata: Caller data returned with the job (e.g. timestamp, evaluator)
+        """
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.transcript_key = transcript_key
+        self.metadata = metadata or {}
+        self.status = STATUS_QUEUED
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.attached = 0
+
+    @property
+    def is_active(self) -> bool:
+        """Whether the job is still queued or running."""
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Seconds since submission (or total duration once finished)."""
+        return (self.finished_at or time.time()) - self.submitted_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON-friendly summary of the job (without the result text)."""
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'attached': self.attached,
+            'elapsed_seconds': round(self.elapsed_seconds, 2),
+            'error': str(self.error) if self.error else None,
+        }
+
+
+class FeedbackJobManager:
+    """Bounded worker pool plus a thread-safe job table keyed by session ID."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, job_ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS):
+        """
+        Initialize the job manager.
+
+        Args:
+            max_workers: Maximum concurrent feedback generations
+            job_ttl_seconds: How long finished jobs stay in the table
+        """
+        self.max_workers = max_workers
+        self.job_ttl_seconds = job_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='feedback-job')
+        self._jobs: Dict[str, FeedbackJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, transcript_key: str, func: Callable[..., str], *args,
+               metadata: Optional[Dict[str, Any]] = None, **kwargs) -> FeedbackJob:
+        """
+        Submit a feedback job, or attach to the session's existing one.
+
+        A queued, running or finished job for the same session and transcript
+        is returned as-is; func is not called again. A failed job, or one for
+        a different transcript, is replaced.
+
+        Args:
+            session_id: Session submitting the job
+            transcript_key: Hash of the inputs (see compute_transcript_key)
+            func: Callable returning the feedback text (runs on a worker thread)
+            *args, **kwargs: Arguments for func
+            metadata: Caller data stored on the job
+
+        Returns:
+            FeedbackJob: The new or existing job
+        """
+        with self._lock:
+            self._prune_locked()
+            existing = self._jobs.get(session_id)
+            if (existing is not None and existing.transcript_key == transcript_key
+                    and existing.status != STATUS_FAILED):
+                existing.attached += 1
+                logger.info(f"Feedback request attached to job {existing.job_id[:8]} ({existing.status})")
+                return existing
+
+            job = FeedbackJob(session_id, transcript_key, metadata)
+            self._jobs[session_id] = job
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Submitted feedback job {job.job_id[:8]}")
+        return job
+
+    def _run(self, job: FeedbackJob, func: Callable[..., str], args, kwargs) -> None:
+        """Run a job on a worker thread and record its outcome."""
+        job.started_at = time.time()
+        job.status = STATUS_RUNNING
+        try:
+            job.result = func(*args, **kwargs)
+            job.status = STATUS_DONE
+        except Exception as e:
+            job.error = e
+            job.status = STATUS_FAILED
+            logger.error(f"Feedback job {job.job_id[:8]} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"Feedback job {job.job_id[:8]} {job.status} in {job.elapsed_seconds:.1f}s")
+
+    def get(self, session_id: str) -> Optional[FeedbackJob]:
+        """Get the session's current job, if any."""
+        with self._lock:
+            return self._jobs.get(session_id)
+
+    def discard(self, session_id: str) -> None:
+        """Remove the session's job from the table (a running call still completes)."""
+        with self._lock:
+            self._jobs.pop(session_id, None)
+
+    def _prune_locked(self) -> None:
+        """Drop finished jobs older than the TTL (caller holds the lock)."""
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [sid for sid, job in self._jobs.items()
+                   if not job.is_active and (job.finished_at or 0) < cutoff]
+        for session_id in expired:
+            del self._jobs[session_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job table statistics."""
+        with self._lock:
+            statuses: List[str] = [job.status for job in self._jobs.values()]
+            return {
+                'max_workers': self.max_workers,
+                'jobs': len(statuses),
+                **{status: statuses.count(status)
+                   for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED)},
+            }
+
+
+# Process-wide job managers shared by all pages and sessions
+_job_manager: Optional[FeedbackJobManager] = None
+_report_job_manager: Optional[FeedbackJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def _create_job_manager(workers_setting: str, default_workers: int) -> FeedbackJobManager:
+    """Create a job manager sized by the given feedback_jobs setting."""
+    try:
+        from config_loader import get_config_loader
+        settings = get_config_loader().get_feedback_jobs_config()
+    except Exception as e:
+        logger.warning(f"Could not read feedback job config, using defaults: {e}")
+        settings = {}
+    return FeedbackJobManager(
+        max_workers=int(settings.get(workers_setting, default_workers)),
+        job_ttl_seconds=float(settings.get('job_ttl_seconds', DEFAULT_JOB_TTL_SECONDS)),
+    )
+
+
+def get_feedback_job_manager() -> FeedbackJobManager:
+    """Get the process-wide feedback job manager (configured from config.json)."""
+    global _job_manager
+
+    if _job_manager is None:
+        with _manager_lock:
+            if _job_manager is None:
+                _job_manager = _create_job_manager('max_workers', DEFAULT_MAX_WORKERS)
+
+    return _job_manager
+
+
+def get_report_job_manager() -> FeedbackJobManager:
+    """Get the process-wide PDF report and Box backup job manager (report_max_workers threads)."""
+    global _report_job_manager
+
+    if _report_job_manager is None:
+        with _manager_lock:
+            if _report_job_manager is None:
+                _report_job_manager = _create_job_manager('report_max_workers', DEFAULT_REPORT_MAX_WORKERS)
+
+    return _report_job_manager
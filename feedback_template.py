@@ -20,7 +20,7 @@ from time_utils import convert_to_minnesota_time
 # Import new rubric system
 try:
     from services.evaluation_service import EvaluationService
-    from rubric.mi_rubric import MIRubric, RubricContext
+    from rubric.mi_rubric import CategoryAssessment, MIRubric, RubricContext
     NEW_RUBRIC_AVAILABLE = True
 except ImportError:
     NEW_RUBRIC_AVAILABLE = False
@@ -36,22 +36,45 @@ except ImportError:
 class FeedbackFormatter:
     """Handles standardized feedback formatting for MI assessments."""
     
+    # Bump whenever format_evaluation_prompt changes so cached evaluations
+    # (see evaluation_cache.py) produced by the old prompt are not reused
+    EVALUATION_PROMPT_VERSION = "40pt-granular-2"
+    # Same, for format_category_evaluation_prompt (per-category evaluation mode)
+    CATEGORY_PROMPT_VERSION = "40pt-granular-category-2"
+    
     @staticmethod
-    def format_evaluation_prompt(session_type: str, transcript: str, rag_context: str) -> str:
-        """Generate standardized evaluation prompt for both HPV and OHI assessments using updated 40-point rubric with granular scoring."""
-        # Determine context for criteria text
+    def _context_text(session_type: str) -> str:
+        """Topic substituted into the rubric criteria for a session type."""
         context_map = {
             "HPV": "HPV vaccination",
             "OHI": "oral health",
             "TOBACCO": "tobacco cessation",
             "PERIO": "periodontitis and gum health"
         }
-        
-        context_text = "the health topic"
         for key, value in context_map.items():
             if key in session_type.upper():
-                context_text = value
-                break
+                return value
+        return "the health topic"
+    
+    @staticmethod
+    def _response_times_text(response_times: str = None) -> str:
+        """Response Factor criteria line with the measured response times (empty if not measured)."""
+        if not response_times:
+            return ""
+        return f"\n        - Measured response times: {response_times}"
+    
+    @staticmethod
+    def format_evaluation_prompt(session_type: str, transcript: str, rag_context: str,
+                                 response_times: str = None) -> str:
+        """Generate standardized evaluation prompt for both HPV and OHI assessments using updated 40-point rubric with granular scoring.
+        
+        response_times is the measured timing of the student's turns (see
+        response_timing.format_response_factor_evidence), given to the
+        Response Factor criteria so it is not guessed from the transcript.
+        """
+        # Determine context for criteria text
+        context_text = FeedbackFormatter._context_text(session_type)
+        response_evidence = FeedbackFormatter._response_times_text(response_times)
         
         return f"""
         ## Motivational Interviewing Assessment - {session_type} Session
@@ -114,7 +137,7 @@ class FeedbackFormatter:
         
         **Response Factor (10 pts): [Fully Met/Partially Met/Minimally Met/Not Met] - [Specific feedback]**
         Criteria for evaluation:
-        - Fast and intuitive responses to questions probed; acceptable average time throughout conversation
+        - Fast and intuitive responses to questions probed; acceptable average time throughout conversation{response_evidence}
 
         ### Additional Requirements:
         - **MUST include direct quotes** from the student's conversation to justify each score
@@ -128,6 +151,80 @@ class FeedbackFormatter:
         Remember: Your feedback should help the student understand both what they did well and how they can improve their MI skills in future conversations. Total possible score is 40 points. **Always include conversation quotes to support your assessment.**
         """
 
+    @staticmethod
+    def format_category_evaluation_prompt(session_type: str, transcript: str, category: str,
+                                          rag_context: str, response_times: str = None) -> str:
+        """Generate the evaluation prompt for one rubric category (per-category evaluation mode).
+        
+        The answer is one "**Category (N pts): Status - feedback**" block, so
+        the answers for all categories can be merged into the format of
+        format_evaluation_prompt (see category_evaluation.merge_category_feedback).
+        response_times is only used in the Response Factor prompt.
+        """
+        context_text = FeedbackFormatter._context_text(session_type)
+        points = MIRubric.get_category_points(category)
+        criteria = "\n".join(
+            f"        - {criterion.replace('{context}', context_text)}"
+            for criterion in MIRubric.CATEGORIES[category]['criteria'][CategoryAssessment.FULLY_MET]
+        )
+        if category == 'Response Factor':
+            criteria += FeedbackFormatter._response_times_text(response_times)
+        
+        return f"""
+        ## Motivational Interviewing Assessment - {session_type} Session
+        ### Category: {category} ({points} pts)
+
+        You are evaluating ONE category of a student's Motivational Interviewing (MI) skills based on their conversation with a simulated patient. Provide constructive, educational feedback for this category only.
+
+        ### Session Transcript:
+        {transcript}
+
+        **Important Instructions:**
+        - Only evaluate the **student's responses** (lines marked 'User:', 'Student:', or similar indicators)
+        - Do not attribute change talk or motivational statements made by the patient to the student
+        - **CRITICAL**: Include specific quotes from the student's responses to justify your assessment
+
+        ### MI Knowledge Base ({category}):
+        {rag_context}
+
+        ### Criteria for {category}:
+{criteria}
+
+        **Granular Scoring Guidelines:**
+        - **Fully Met (3/3)**: Excellent competency = 100% of category points
+        - **Partially Met (2/3)**: Good competency with room for improvement = 67% of category points
+        - **Minimally Met (1/3)**: Basic competency, significant improvement needed = 33% of category points
+        - **Not Met (0/3)**: Competency not adequately demonstrated = 0 points
+
+        ### Required Format:
+        Answer with exactly this block and nothing before it:
+
+        **{category} ({points} pts): [Fully Met/Partially Met/Minimally Met/Not Met] - [Specific feedback with conversation quotes and one concrete suggestion for improvement]**
+        **Example quote(s) from conversation:** "[Direct quote from student]"
+        """
+
+    @staticmethod
+    def format_category_evaluation_prompts(session_type: str, transcript: str,
+                                           category_contexts: Dict[str, str],
+                                           response_times: str = None) -> Dict[str, str]:
+        """Generate one evaluation prompt per rubric category, in rubric order.
+        
+        Args:
+            session_type: Session label (e.g. "HPV vaccine")
+            transcript: Conversation transcript
+            category_contexts: RAG context per category (see KnowledgeBase.category_contexts)
+            response_times: Measured student response times (see format_evaluation_prompt)
+            
+        Returns:
+            Dict mapping category name to its prompt
+        """
+        return {
+            category: FeedbackFormatter.format_category_evaluation_prompt(
+                session_type, transcript, category, category_contexts.get(category, ''), response_times
+            )
+            for category in MIRubric.CATEGORIES
+        }
+
     @staticmethod
     def format_feedback_common(feedback: str, timestamp: str, evaluator: str = None) -> str:
         """Common formatting for both display and PDF."""
@@ -426,11 +523,11 @@ class FeedbackValidator:
                 - notes_present: bool (all notes non-empty)
                 - partial_report: bool (should be marked as partial)
         """
-        from config_loader import ConfigLoader
+        from config_loader import get_config_loader
         import logging
         
         logger = logging.getLogger(__name__)
-        config = ConfigLoader()
+        config = get_config_loader()
         flags = config.get_feature_flags()
         
         # Check if validation is enabled via feature flag
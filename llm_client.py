@@ -0,0 +1,186 @@
+"""
+Pooled Groq Clients for MI Chatbots
+
+Bot pages rerun on every Streamlit interaction. Constructing Groq() on each
+rerun threw away the HTTP connection pool (and its TLS sessions), and setting
+os.environ["GROQ_API_KEY"] from concurrent sessions with different keys raced
+across sessions.
+
+get_groq_client() instead returns one long-lived client per API key, shared
+by every session and rerun that uses that key:
+- Clients are keyed by a SHA-256 hash of the key (the key itself is never
+  stored as a dict key or logged) and receive it via Groq(api_key=...), so
+  the process environment is never touched
+- Each client keeps a keep-alive httpx connection pool
+- The cache is bounded (llm.client_cache_size in config.json) with LRU
+  eviction
+
+Usage:
+    from llm_client import get_groq_client
+    client = get_groq_client(st.session_state.groq_api_key)
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+from groq import DefaultHttpxClient, Groq
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLIENT_CACHE_SIZE = 64
+
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Hash an API key for use as a cache key or in logs.
+
+    Args:
+        api_key: Groq API key
+
+    Returns:
+        str: Hex SHA-256 digest of the key
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def _load_llm_config() -> Dict[str, Any]:
+    """Read the "llm" section of config.json, falling back to defaults."""
+    try:
+        from config_loader import get_config_loader
+        return get_config_loader().get_llm_config()
+    except Exception as e:
+        logger.warning(f"Could not read LLM config, using defaults: {e}")
+        return {}
+
+
+class GroqClientPool:
+    """Thread-safe LRU cache of Groq clients keyed by API-key hash."""
+
+    def __init__(self, max_clients: Optional[int] = None, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the client pool.
+
+        Args:
+            max_clients: Maximum number of cached clients (default: from config)
+            settings: LLM client settings (default: get_config_loader().get_llm_config())
+        """
+        self.settings = settings if settings is not None else _load_llm_config()
+        self.max_clients = max_clients or int(
+            self.settings.get('client_cache_size', DEFAULT_CLIENT_CACHE_SIZE)
+        )
+        self._clients: 'OrderedDict[str, Groq]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _create_client(self, api_key: str) -> Groq:
+        """Create a Groq client with a keep-alive connection pool."""
+        limits = httpx.Limits(
+            max_connections=int(self.settings.get('max_connections', 20)),
+            max_keepalive_connections=int(self.settings.get('max_keepalive_connections', 10)),
+            keepalive_expiry=float(self.settings.get('keepalive_expiry_seconds', 60)),
+        )
+        # Retries are handled by rate_limiter (429s pause the whole key), so
+        # the SDK's own retry loop is off by default
+        return Groq(
+            api_key=api_key,
+            max_retries=int(self.settings.get('sdk_max_retries', 0)),
+            http_client=DefaultHttpxClient(limits=limits),
+        )
+
+    def get(self, api_key: str) -> Groq:
+        """
+        Get the cached client for an API key, creating it on first use.
+
+        Args:
+            api_key: Groq API key
+
+        Returns:
+            Groq client
+
+        Raises:
+            ValueError: If the API key is empty
+        """
+        if not api_key:
+            raise ValueError("A Groq API key is required")
+
+        key_hash = hash_api_key(api_key)
+        with self._lock:
+            client = self._clients.get(key_hash)
+            if client is not None:
+                self._clients.move_to_end(key_hash)
+                self.hits += 1
+                return client
+
+            self.misses += 1
+            client = self._create_client(api_key)
+            self._clients[key_hash] = client
+            logger.info(f"Created Groq client for key {key_hash[:8]} ({len(self._clients)} cached)")
+
+            while len(self._clients) > self.max_clients:
+                # Evicted clients are not closed: another session may still be
+                # using one; its connections are released when it is collected.
+                evicted_hash, _ = self._clients.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"Evicted Groq client for key {evicted_hash[:8]}")
+
+            return client
+
+    def clear(self) -> None:
+        """Drop all cached clients and reset statistics."""
+        with self._lock:
+            self._clients.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get pool statistics."""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'max_clients': self.max_clients,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Process-wide pool shared by all pages and sessions
+_client_pool: Optional[GroqClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> GroqClientPool:
+    """Get the process-wide Groq client pool."""
+    global _client_pool
+
+    if _client_pool is None:
+        with _pool_lock:
+            if _client_pool is None:
+                _client_pool = GroqClientPool()
+
+    return _client_pool
+
+
+def get_groq_client(api_key: str) -> Groq:
+    """
+    Get the shared Groq client for an API key.
+
+    Args:
+        api_key: Groq API key (e.g. st.session_state.groq_api_key)
+
+    Returns:
+        Groq client with a keep-alive connection pool
+    """
+    return get_client_pool().get(api_key)
@@ -0,0 +1,286 @@
+"""
+Per-Call LLM Instrumentation for MI Chatbots
+
+Slow turns could come from the model, from prompt size or from guardrail
+regenerations, and nothing recorded which. Every Groq call in chat_utils now
+runs inside track_llm_call(), which records:
+- Wall latency and, for streamed calls, time to first token
+- Prompt/completion token counts from the reported usage
+- Model, call purpose ('turn', 'correction' or 'evaluation') and outcome
+  ('ok', 'aborted' for a stream stopped by the guardrails, or 'error')
+
+Records are kept in a bounded in-memory ring buffer for
+get_llm_metrics().get_summary() (p50/p95/p99 per purpose, shown on the
+developer page). For offline analysis they are also appended as JSON lines
+to a metrics file, only when one is set (llm_metrics.metrics_file in
+config.json, or LLM_METRICS_FILE); the file is not rotated.
+
+Usage:
+    with track_llm_call('turn', model, stream=True) as call:
+        stream = client.chat.completions.create(...)
+        ...
+        call.ttft_ms = ttft_ms
+        call.set_usage(extract_usage(chunk))
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_ENV = 'LLM_METRICS_FILE'
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_METRICS_FILE = None
+DEFAULT_RING_BUFFER_SIZE = 1000
+
+# Call purposes
+PURPOSE_TURN = 'turn'
+PURPOSE_CORRECTION = 'correction'
+PURPOSE_EVALUATION = 'evaluation'
+
+# Call outcomes
+OUTCOME_OK = 'ok'
+OUTCOME_ABORTED = 'aborted'
+OUTCOME_ERROR = 'error'
+
+PERCENTILES = (50, 95, 99)
+
+
+def extract_usage(response: Any) -> Optional[Any]:
+    """
+    Get the usage object of a completion or stream chunk.
+
+    Groq reports usage on non-streamed completions as response.usage and on
+    the final chunk of a stream as chunk.x_groq.usage.
+
+    Args:
+        response: Completion or stream chunk
+
+    Returns:
+        Usage object with prompt_tokens/completion_tokens, or None
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        usage = getattr(getattr(response, 'x_groq', None), 'usage', None)
+    return usage
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values: Sample values (any order)
+        pct: Percentile between 0 and 100
+
+    Returns:
+        float: The percentile, or None for an empty sample
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LLMCallRecord:
+    """Measurements of one LLM call."""
+
+    def __init__(self, purpose: str, model: str, stream: bool = False):
+        """
+        Initialize a record for a call that is starting now.
+
+        Args:
+            purpose: Call purpose ('turn', 'correction', 'evaluation')
+            model: Model name
+            stream: Whether the reply is streamed
+        """
+        self.purpose = purpose
+        self.model = model
+        self.stream = stream
+        self.timestamp = time.time()
+        self.latency_ms: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.outcome = OUTCOME_OK
+        self.error: Optional[str] = None
+
+    def set_usage(self, usage: Any) -> None:
+        """Copy token counts from a usage object (ignored if None)."""
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        if isinstance(prompt_tokens, int):
+            self.prompt_tokens = prompt_tokens
+        if isinstance(completion_tokens, int):
+            self.completion_tokens = completion_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON-friendly copy of the record."""
+        return {
+            'timestamp': round(self.timestamp, 3),
+            'purpose': self.purpose,
+            'model': self.model,
+            'stream': self.stream,
+            'latency_ms': None if self.latency_ms is None else round(self.latency_ms, 1),
+            'ttft_ms': None if self.ttft_ms is None else round(self.ttft_ms, 1),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'outcome': self.outcome,
+            'error': self.error,
+        }
+
+
+class LLMMetrics:
+    """Bounded ring buffer of call records plus an append-only JSON-lines file."""
+
+    def __init__(self, ring_buffer_size: int = DEFAULT_RING_BUFFER_SIZE,
+                 metrics_file: Optional[os.PathLike] = None):
+        """
+        Initialize the metrics store.
+
+        Args:
+            ring_buffer_size: Number of most recent records kept in memory
+            metrics_file: JSON-lines file records are appended to (None: memory only)
+        """
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self._records: deque = deque(maxlen=ring_buffer_size)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._file_error_logged = False
+        self.total_calls = 0
+
+    def record(self, call: LLMCallRecord) -> None:
+        """Add a finished call to the ring buffer and the metrics file."""
+        data = call.to_dict()
+        with self._lock:
+            self._records.append(data)
+            self.total_calls += 1
+        if self.metrics_file is not None:
+            self._append_to_file(data)
+
+    def _append_to_file(self, data: Dict[str, Any]) -> None:
+        """Append one JSON line; failures are logged once and otherwise ignored."""
+        try:
+            with self._file_lock:
+                self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(data) + '\n')
+        except OSError as e:
+            if not self._file_error_logged:
+                logger.warning(f"Could not write LLM metrics to {self.metrics_file}: {e}")
+                self._file_error_logged = True
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        """Get the buffered records, oldest first."""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self) -> None:
+        """Empty the ring buffer (the metrics file is left as is)."""
+        with self._lock:
+            self._records.clear()
+            self.total_calls = 0
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the buffered records per purpose.
+
+        Returns:
+            dict: total_calls, buffered, and by_purpose mapping each purpose to
+                  calls, errors, aborted, latency_ms / ttft_ms percentiles
+                  (p50, p95, p99) and mean prompt/completion tokens
+        """
+        records = self.get_records()
+        by_purpose: Dict[str, Any] = {}
+        for purpose in sorted({record['purpose'] for record in records}):
+            group = [record for record in records if record['purpose'] == purpose]
+            summary = {
+                'calls': len(group),
+                'errors': sum(1 for r in group if r['outcome'] == OUTCOME_ERROR),
+                'aborted': sum(1 for r in group if r['outcome'] == OUTCOME_ABORTED),
+            }
+            for field in ('latency_ms', 'ttft_ms'):
+                values = [r[field] for r in group if r[field] is not None]
+                summary[field] = {f'p{pct}': percentile(values, pct) for pct in PERCENTILES}
+            for field in ('prompt_tokens', 'completion_tokens'):
+                values = [r[field] for r in group if r[field] is not None]
+                summary[f'mean_{field}'] = (sum(values) / len(values)) if values else None
+            by_purpose[purpose] = summary
+        return {
+            'total_calls': self.total_calls,
+            'buffered': len(records),
+            'by_purpose': by_purpose,
+        }
+
+
+# Process-wide metrics shared by all pages and sessions
+_llm_metrics: Optional[LLMMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """Get the process-wide LLM call metrics (configured from config.json)."""
+    global _llm_metrics
+
+    if _llm_metrics is None:
+        with _metrics_lock:
+            if _llm_metrics is None:
+                try:
+                    from config_loader import get_config_loader
+                    settings = get_config_loader().get_llm_metrics_config()
+                except Exception as e:
+                    logger.warning(f"Could not read LLM metrics config, using defaults: {e}")
+                    settings = {}
+                metrics_file = os.environ.get(METRICS_FILE_ENV) or settings.get('metrics_file', DEFAULT_METRICS_FILE)
+                if metrics_file:
+                    metrics_file = Path(metrics_file)
+                    if not metrics_file.is_absolute():
+                        metrics_file = REPO_ROOT / metrics_file
+                _llm_metrics = LLMMetrics(
+                    ring_buffer_size=int(settings.get('ring_buffer_size', DEFAULT_RING_BUFFER_SIZE)),
+                    metrics_file=metrics_file or None,
+                )
+
+    return _llm_metrics
+
+
+@contextmanager
+def track_llm_call(purpose: str, model: str, stream: bool = False) -> Iterator[LLMCallRecord]:
+    """
+    Measure one LLM call and record it when the block exits.
+
+    The block sets ttft_ms, token usage and (for guardrail aborts) the
+    outcome on the yielded record; latency is measured here. An exception
+    leaving the block is recorded as an error and re-raised.
+
+    Args:
+        purpose: Call purpose ('turn', 'correction', 'evaluation')
+        model: Model name
+        stream: Whether the reply is streamed
+
+    Yields:
+        LLMCallRecord: Record to fill in
+    """
+    call = LLMCallRecord(purpose, model, stream)
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call.outcome = OUTCOME_ERROR
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.latency_ms = (time.perf_counter() - start) * 1000
+        get_llm_metrics().record(call)
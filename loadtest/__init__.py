@@ -0,0 +1,7 @@
+"""
+Offline load-testing tools for the MI chatbots.
+
+- mock_groq_server: local OpenAI/Groq-compatible chat-completions stand-in
+- harness: classroom-burst load test of the full student flow
+- stand_ins: in-memory access-code sheet and SMTP sink used by the harness
+"""
@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+"""
+Classroom-Burst Load-Test Harness
+
+A class session starts with every student entering their code within a few
+minutes and ends with every student clicking "Finish Session" at once. This
+harness simulates that burst in one process: N students run concurrently
+through the real pages (driven with Streamlit's AppTest), each doing
+- portal: load the access-code sheet and validate/mark the student's code
+- persona: open the bot page, pick a persona, start the conversation
+- turn: M chat turns through the chat_utils handlers
+- finish: "Finish Session & Get Feedback", which generates the feedback,
+  the PDF report and the Box email backup (also timed separately as
+  feedback, pdf and email_backup)
+
+External services are replaced by local stand-ins: the mock Groq server
+(loadtest.mock_groq_server), an in-memory Google Sheet and an SMTP sink
+(loadtest.stand_ins). The app reads a temporary copy of config.json
+(MI_CONFIG_PATH) pointing the email queue, caches, SMTP and its log at them;
+logger_config's log directory (git_logs by default) is redirected to the
+run directory as well.
+
+The report gives throughput, p50/p95/p99 latency per stage, peak RSS, and
+the LLM call, rate limiter and stand-in statistics.
+
+Scenarios are JSON files (see loadtest/scenarios/) describing class size,
+pacing and the stand-ins' behaviour; any key left out takes its default
+from DEFAULT_SCENARIO.
+
+Usage:
+    python3 -m loadtest.harness loadtest/scenarios/smoke.json
+    python3 -m loadtest.harness loadtest/scenarios/classroom_30.json --students 60 --json report.json
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from llm_metrics import percentile
+from loadtest.mock_groq_server import MockGroqServer, MockServerSettings, sample_latency_ms
+from loadtest.stand_ins import FakeSheetsClient, SMTPSink
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables the run sets (restored afterwards) or clears
+RUN_ENV_VARS = ('MI_CONFIG_PATH', 'GROQ_BASE_URL', 'RAG_INDEX_DIR')
+CLEARED_ENV_VARS = ('SMTP_USERNAME', 'SMTP_APP_PASSWORD', 'SMTP_SERVER', 'SMTP_PORT', 'SMTP_USE_SSL')
+
+BOT_PAGES = {
+    'HPV': 'HPV.py',
+    'OHI': 'OHI.py',
+    'TOBACCO': 'Tobacco.py',
+    'PERIO': 'Perio.py',
+}
+
+STAGES = ('portal', 'persona', 'turn', 'finish', 'feedback', 'pdf', 'email_backup')
+PERCENTILES = (50, 95, 99)
+
+# Reruns while "Finish Session" jobs run (the page's progress fragments poll on a timer)
+FINISH_POLL_INTERVAL_SECONDS = 0.05
+
+STUDENT_MESSAGES = [
+    "Hi, I'm a dental student. Would it be okay if we talked about your health today?",
+    "What do you already know about this topic?",
+    "It sounds like you have some concerns. Can you tell me more about them?",
+    "On a scale from 0 to 10, how important is making a change for you right now?",
+    "What would need to happen for that number to go up?",
+    "So on one hand you're worried about the cost, and on the other you want to stay healthy.",
+    "What are some small steps you think you could take this week?",
+    "How confident do you feel about trying that?",
+    "Let me summarize what we talked about. Did I get that right?",
+    "Is there anything else you'd like to discuss before we finish?",
+]
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    'name': 'default',
+    'students': 10,
+    'turns': 6,
+    'bots': ['HPV', 'OHI', 'TOBACCO', 'PERIO'],
+    'persona': None,
+    'ramp_up_seconds': 0.0,
+    'think_time_ms': {'distribution': 'fixed', 'value': 0},
+    'finish': True,
+    'shared_api_key': False,
+    'seed': 1,
+    'timeout_seconds': 120.0,
+    'sheet_latency_ms': 0.0,
+    'smtp_latency_ms': 0.0,
+    'mock_server': {
+        'ttft_ms': {'distribution': 'fixed', 'value': 0},
+        'token_ms': {'distribution': 'fixed', 'value': 0},
+        'error_rate_429': 0.0,
+        'error_rate_500': 0.0,
+        'retry_after_seconds': 1.0,
+        'end_after_turns': 0,
+    },
+    # Sections merged over the repo's config.json
+    'config': {
+        'retrieval': {'backend': 'bm25'},
+        'evaluation_cache': {'enabled': False},
+    },
+}
+
+
+def load_scenario(path: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Load a scenario file over DEFAULT_SCENARIO.
+
+    Args:
+        path: Scenario JSON file (None: defaults only)
+        overrides: Top-level keys to set after loading (e.g. from the CLI)
+
+    Returns:
+        dict: Complete scenario
+    """
+    scenario = copy.deepcopy(DEFAULT_SCENARIO)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            scenario = merge_settings(scenario, json.load(f))
+    if overrides:
+        scenario = merge_settings(scenario, overrides)
+    unknown = [bot for bot in scenario['bots'] if bot not in BOT_PAGES]
+    if unknown:
+        raise ValueError(f"Unknown bots in scenario: {unknown}. Valid bots: {list(BOT_PAGES)}")
+    return scenario
+
+
+def merge_settings(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively merge overrides into a copy of base (dicts merge, other values replace)."""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_settings(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def build_config(scenario: Dict[str, Any], workdir: Path, smtp_port: int) -> Dict[str, Any]:
+    """
+    Build the app configuration for a run.
+
+    Starts from the repo's config.json, redirects the files the app places
+    by config (email backup log, email queue, evaluation cache, LLM
+    metrics) into workdir, points SMTP at the sink with short retry delays,
+    and applies the scenario's config overrides last. logger_config does
+    not read this config; the harness redirects its log directory itself.
+
+    Args:
+        scenario: Loaded scenario
+        workdir: Directory for the run's files
+        smtp_port: Port of the SMTP sink on 127.0.0.1
+
+    Returns:
+        dict: Configuration to write to MI_CONFIG_PATH
+    """
+    with open(REPO_ROOT / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    smtp_dir = str(workdir / 'smtp_logs')
+    config = merge_settings(config, {
+        'email_config': {
+            'smtp_server': '127.0.0.1',
+            'smtp_port': smtp_port,
+            'smtp_use_ssl': False,
+            'smtp_username': 'loadtest@example.com',
+            'smtp_app_password': 'loadtest',
+            'connection_timeout': 10,
+            'retry_attempts': 1,
+            'retry_delay': 0,
+            'max_retries': 2,
+            'retry_delays': [0, 0],
+        },
+        'logging': {
+            'log_directory': str(workdir / 'logs'),
+            'log_file': str(workdir / 'logs' / 'chatbot.log'),
+            'smtp_log_directory': smtp_dir,
+            'smtp_log_file': str(Path(smtp_dir) / 'email_backup.log'),
+        },
+        'evaluation_cache': {'path': str(workdir / 'eval_cache.sqlite3')},
+        'llm_metrics': {'metrics_file': str(workdir / 'llm_calls.jsonl')},
+    })
+    return merge_settings(config, scenario.get('config', {}))
+
+
+class StageRecorder:
+    """Thread-safe collection of per-stage durations and errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.errors: List[Dict[str, Any]] = []
+        self.completed_students = 0
+        self.completed_turns = 0
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        with self._lock:
+            self._durations.setdefault(stage, []).append(duration_ms)
+            if stage == 'turn':
+                self.completed_turns += 1
+
+    def record_error(self, student: int, stage: str, message: str) -> None:
+        with self._lock:
+            self.errors.append({'student': student, 'stage': stage, 'error': message})
+
+    def student_done(self) -> None:
+        with self._lock:
+            self.completed_students += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count and p50/p95/p99/max (ms) per stage that has samples."""
+        with self._lock:
+            durations = {stage: list(values) for stage, values in self._durations.items()}
+        summary = {}
+        for stage, values in durations.items():
+            if not values:
+                continue
+            stats = {'count': len(values)}
+            for pct in PERCENTILES:
+                stats[f'p{pct}'] = round(percentile(values, pct), 1)
+            stats['max'] = round(max(values), 1)
+            summary[stage] = stats
+        return summary
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(recorder: StageRecorder, stage: str, func: Callable) -> Callable:
+    """Wrap func so each call's duration is recorded under stage."""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.record(stage, (time.perf_counter() - start) * 1000)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+@contextmanager
+def _concurrent_app_tests() -> Iterator[None]:
+    """
+    Make Streamlit's AppTest safe to run from several threads at once.
+
+    Each AppTest run installs a mock Runtime singleton and the
+    "global.appTest" config option, and resets both when it ends, which
+    breaks every other run still in progress (widget values go missing, a
+    page polling its feedback job fails on rerun). While active, the option
+    stays set and Runtime lookups fall back to the last installed mock
+    runtime. Page bytecode is compiled once and shared, as the real runtime
+    does; this also keeps ast.parse, which is not thread-safe in CPython
+    3.11, off concurrent threads.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    last: List[Any] = []
+    bytecode: Dict[str, Any] = {}
+    bytecode_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def shared_bytecode(self, script_path):
+        with bytecode_lock:
+            if script_path not in bytecode:
+                bytecode[script_path] = get_bytecode(self, script_path)
+            return bytecode[script_path]
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    def exists(cls):
+        return cls._instance is not None or bool(last)
+
+    with patch_config_options({'global.appTest': True}), \
+            patch.object(Runtime, 'instance', classmethod(instance)), \
+            patch.object(Runtime, 'exists', classmethod(exists)), \
+            patch.object(ScriptCache, 'get_bytecode', shared_bytecode):
+        yield
+
+
+def _portal_script():
+    """AppTest script: the portal's code validation for st.session_state.loadtest_code."""
+    import streamlit as st
+    import secret_code_portal
+
+    if secret_code_portal.load_codes_from_sheet():
+        st.session_state.loadtest_result = secret_code_portal.validate_and_mark_code(
+            st.session_state.loadtest_code
+        )
+
+
+def _app_failure(at) -> Optional[str]:
+    """First exception or error message shown by an AppTest run, if any."""
+    if len(at.exception):
+        exception = at.exception[0]
+        return exception.value or '\n'.join(exception.stack_trace)
+    if len(at.error):
+        return at.error[0].value
+    return None
+
+
+class ClassroomSimulation:
+    """One run of a scenario against the local stand-ins."""
+
+    def __init__(self, scenario: Dict[str, Any], workdir: Path):
+        """
+        Initialize the simulation.
+
+        Args:
+            scenario: Loaded scenario
+            workdir: Directory for the run's config, logs, queues and caches
+        """
+        self.scenario = scenario
+        self.workdir = workdir
+        self.recorder = StageRecorder()
+        self.codes = [
+            {
+                'name': f"Student {index + 1:03d}",
+                'bot': scenario['bots'][index % len(scenario['bots'])],
+                'secret': f"LT{index + 1:05d}",
+            }
+            for index in range(scenario['students'])
+        ]
+        self.sheets = FakeSheetsClient(self.codes, latency_ms=scenario['sheet_latency_ms'])
+        self.mock_server: Optional[MockGroqServer] = None
+        self.smtp_sink: Optional[SMTPSink] = None
+        self._saved_env: Dict[str, Optional[str]] = {}
+        self._saved_sheets_client: Optional[Callable] = None
+        self._saved_log_dir: Optional[str] = None
+        self._saved_root_handlers: List[logging.Handler] = []
+
+    def _setup(self) -> None:
+        """Start the stand-ins, write the run config and point the app at them."""
+        mock_settings = dict(self.scenario['mock_server'])
+        mock_settings.setdefault('seed', self.scenario['seed'])
+        self.mock_server = MockGroqServer(MockServerSettings(**mock_settings)).start()
+        self.smtp_sink = SMTPSink(latency_ms=self.scenario['smtp_latency_ms']).start()
+
+        config_path = self.workdir / 'config.json'
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(build_config(self.scenario, self.workdir, self.smtp_sink.port), f, indent=4)
+
+        self._saved_env = {name: os.environ.get(name) for name in RUN_ENV_VARS + CLEARED_ENV_VARS}
+        os.environ['MI_CONFIG_PATH'] = str(config_path)
+        os.environ['GROQ_BASE_URL'] = self.mock_server.base_url
+        os.environ['RAG_INDEX_DIR'] = str(self.workdir / 'rag_index')
+        for name in CLEARED_ENV_VARS:
+            os.environ.pop(name, None)
+
+        # The portal calls setup_logging() with logger_config's default
+        # directory; keep the chatbot log of the run in workdir, also when
+        # the process already logs to the default one
+        import logger_config
+        self._saved_log_dir = logger_config.DEFAULT_LOG_DIR
+        self._saved_root_handlers = list(logging.getLogger().handlers)
+        logger_config.DEFAULT_LOG_DIR = str(self.workdir / 'logs')
+        logger_config.setup_logging()
+
+        # Imported only now so module-level config reads see MI_CONFIG_PATH
+        import email_utils
+        import pdf_utils
+        import secret_code_portal
+
+        self._saved_sheets_client = secret_code_portal.get_google_sheets_client
+        secret_code_portal.get_google_sheets_client = lambda: (self.sheets, 'loadtest', 'loadtest@example.com')
+        pdf_utils.generate_pdf_report = _timed(self.recorder, 'pdf', pdf_utils.generate_pdf_report)
+        sender = email_utils.RobustEmailSender
+        sender.send_with_guaranteed_delivery = _timed(
+            self.recorder, 'email_backup', sender.send_with_guaranteed_delivery
+        )
+
+    def _teardown(self) -> None:
+        """Stop the stand-ins and undo the patches and environment changes of _setup."""
+        import email_utils
+        import logger_config
+        import pdf_utils
+        import secret_code_portal
+
+        logger_config.DEFAULT_LOG_DIR = self._saved_log_dir
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers:
+            if handler not in self._saved_root_handlers:
+                handler.close()
+        root_logger.handlers = self._saved_root_handlers
+
+        secret_code_portal.get_google_sheets_client = self._saved_sheets_client
+        pdf_utils.generate_pdf_report = pdf_utils.generate_pdf_report.__wrapped__
+        sender = email_utils.RobustEmailSender
+        sender.send_with_guaranteed_delivery = sender.send_with_guaranteed_delivery.__wrapped__
+        if self.mock_server is not None:
+            self.mock_server.stop()
+        if self.smtp_sink is not None:
+            self.smtp_sink.stop()
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def _run_stage(self, stage: str, action: Callable[[], Any]) -> None:
+        """Run and time one AppTest step; raise RuntimeError if the page showed an error."""
+        start = time.perf_counter()
+        at = action()
+        duration_ms = (time.perf_counter() - start) * 1000
+        failure = _app_failure(at)
+        if failure:
+            raise RuntimeError(failure)
+        self.recorder.record(stage, duration_ms)
+
+    @staticmethod
+    def _finish(page, button, timeout: float):
+        """
+        Click "Finish Session" and rerun the page until feedback and Box backup are done.
+
+        The page shows job progress in fragments that the browser reruns on a
+        timer; AppTest does not run them, so the page is rerun instead.
+        """
+        at = button.click().run()
+        deadline = time.monotonic() + timeout
+        while not _app_failure(at) and (
+                at.session_state['feedback'] is None
+                or at.session_state['email_backup_status'] == 'pending'):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"feedback and report not ready after {timeout:.0f}s")
+            time.sleep(FINISH_POLL_INTERVAL_SECONDS)
+            at = page.run()
+        return at
+
+    def run_student(self, index: int) -> None:
+        """Simulate one student from portal to Box backup."""
+        from streamlit.testing.v1 import AppTest
+
+        scenario = self.scenario
+        code = self.codes[index]
+        rng = random.Random(scenario['seed'] * 100003 + index)
+        timeout = scenario['timeout_seconds']
+        api_key = 'loadtest-key' if scenario['shared_api_key'] else f"loadtest-key-{index}"
+        stage = 'portal'
+
+        try:
+            # Portal: validate and mark the access code
+            portal = AppTest.from_function(_portal_script, default_timeout=timeout)
+            portal.session_state['loadtest_code'] = code['secret']
+            self._run_stage(stage, portal.run)
+            result = portal.session_state['loadtest_result']
+            if not result['success']:
+                raise RuntimeError(result['message'])
+
+            # Persona selection on the bot page the portal redirected to
+            stage = 'persona'
+            page = AppTest.from_file(str(REPO_ROOT / 'pages' / BOT_PAGES[result['bot']]), default_timeout=timeout)
+            page.session_state['authenticated'] = True
+            page.session_state['redirect_info'] = {'bot': result['bot']}
+            page.session_state['student_name'] = result['name']
+            page.session_state['groq_api_key'] = api_key
+            page.run()
+
+            def start_conversation():
+                selector = page.selectbox(key='persona_selector')
+                persona = scenario['persona'] or selector.options[index % len(selector.options)]
+                selector.select(persona)
+                next(b for b in page.button if b.label == 'Start Conversation').click()
+                return page.run()
+            self._run_stage(stage, start_conversation)
+
+            # Chat turns
+            stage = 'turn'
+            for turn in range(scenario['turns']):
+                if not len(page.chat_input):
+                    break  # The patient ended the conversation
+                time.sleep(sample_latency_ms(scenario['think_time_ms'], rng) / 1000)
+                message = STUDENT_MESSAGES[turn % len(STUDENT_MESSAGES)]
+                self._run_stage(stage, lambda: page.chat_input[0].set_value(message).run())
+
+            # Finish: feedback job, PDF report and email backup in one click
+            if scenario['finish']:
+                stage = 'finish'
+                button = next((b for b in page.button if b.label.startswith('Finish Session')), None)
+                if button is None:
+                    raise RuntimeError('Finish Session button not shown')
+                self._run_stage(stage, lambda: self._finish(page, button, timeout))
+                if page.session_state['feedback'] is None:
+                    raise RuntimeError('no feedback after Finish Session')
+
+            self.recorder.student_done()
+        except Exception as e:
+            logger.warning(f"Student {index + 1} failed at {stage}: {e}")
+            self.recorder.record_error(index + 1, stage, str(e))
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every student concurrently and build the report.
+
+        Students arrive evenly spread over ramp_up_seconds.
+
+        Returns:
+            dict: Report (see format_report)
+        """
+        self._setup()
+        try:
+            from llm_metrics import get_llm_metrics
+            from rate_limiter import get_rate_limiter
+
+            students = self.scenario['students']
+            ramp = float(self.scenario['ramp_up_seconds'])
+            rss_before = peak_rss_mb()
+            start = time.perf_counter()
+
+            def arrive(index: int) -> None:
+                delay = start + (ramp * index / students) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self.run_student(index)
+
+            with _concurrent_app_tests(), \
+                    ThreadPoolExecutor(max_workers=students, thread_name_prefix='student') as pool:
+                list(pool.map(arrive, range(students)))
+
+            elapsed = time.perf_counter() - start
+            llm_summary = get_llm_metrics().get_summary()
+            # Feedback generation runs in a background job; its latency is the evaluation call's
+            evaluation = llm_summary['by_purpose'].get('evaluation')
+            stages = self.recorder.summary()
+            if evaluation:
+                stages['feedback'] = {'count': evaluation['calls'], **evaluation['latency_ms']}
+
+            return {
+                'scenario': self.scenario['name'],
+                'students': students,
+                'turns_per_student': self.scenario['turns'],
+                'completed_students': self.recorder.completed_students,
+                'completed_turns': self.recorder.completed_turns,
+                'elapsed_seconds': round(elapsed, 2),
+                'throughput': {
+                    'sessions_per_minute': round(self.recorder.completed_students / elapsed * 60, 2),
+                    'turns_per_second': round(self.recorder.completed_turns / elapsed, 2),
+                },
+                'stages_ms': stages,
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'rss_before_mb': round(rss_before, 1),
+                'errors': self.recorder.errors,
+                'llm_calls': llm_summary['by_purpose'],
+                'rate_limiter': get_rate_limiter().get_metrics(),
+                'mock_server': self.mock_server.get_stats(),
+                'sheet': {'reads': self.sheets.worksheet.reads, 'writes': self.sheets.worksheet.writes},
+                'smtp': {'messages': self.smtp_sink.messages, 'bytes': self.smtp_sink.bytes_received},
+            }
+        finally:
+            self._teardown()
+
+
+def run_scenario(scenario: Dict[str, Any], workdir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run a scenario and return its report.
+
+    Args:
+        scenario: Loaded scenario (see load_scenario)
+        workdir: Directory to keep the run's files in (default: a temporary
+                 directory removed afterwards)
+
+    Returns:
+        dict: Report
+    """
+    if workdir:
+        Path(workdir).mkdir(parents=True, exist_ok=True)
+        return ClassroomSimulation(scenario, Path(workdir)).run()
+    tmp = tempfile.mkdtemp(prefix='mi_loadtest_')
+    try:
+        return ClassroomSimulation(scenario, Path(tmp)).run()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report as plain text."""
+    lines = [
+        f"Scenario: {report['scenario']} ({report['students']} students x {report['turns_per_student']} turns)",
+        f"Completed: {report['completed_students']}/{report['students']} students, "
+        f"{report['completed_turns']} turns in {report['elapsed_seconds']}s",
+        f"Throughput: {report['throughput']['sessions_per_minute']} sessions/min, "
+        f"{report['throughput']['turns_per_second']} turns/s",
+        f"Peak RSS: {report['peak_rss_mb']} MB (before students: {report['rss_before_mb']} MB)",
+        "",
+        f"{'Stage':<14}{'Count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for stage in STAGES:
+        stats = report['stages_ms'].get(stage)
+        if not stats:
+            continue
+        values = [stats.get(key) for key in ('p50', 'p95', 'p99', 'max')]
+        cells = ''.join(f"{'-' if v is None else f'{v:.1f}':>10}" for v in values)
+        lines.append(f"{stage:<14}{stats['count']:>7}{cells}")
+
+    limiter = report['rate_limiter']
+    lines += [
+        "",
+        f"Mock server: {report['mock_server']}",
+        f"Rate limiter: {limiter['waited']} waited (max {limiter['max_wait_seconds']:.2f}s), "
+        f"{limiter['throttled']} throttled, {limiter['retries']} retries, {limiter['timeouts']} timeouts",
+        f"Sheet: {report['sheet']['reads']} reads, {report['sheet']['writes']} writes; "
+        f"SMTP sink: {report['smtp']['messages']} messages",
+    ]
+    if report['errors']:
+        lines.append(f"Errors ({len(report['errors'])}):")
+        for error in report['errors'][:10]:
+            lines.append(f"  student {error['student']} at {error['stage']}: {error['error']}")
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Simulate a class of students hitting the MI chatbots at once")
+    parser.add_argument('scenario', nargs='?', help='Scenario JSON file (default: built-in defaults)')
+    parser.add_argument('--students', type=int, help='Override the number of students')
+    parser.add_argument('--turns', type=int, help='Override the chat turns per student')
+    parser.add_argument('--ramp-up', type=float, help='Override the arrival ramp-up in seconds')
+    parser.add_argument('--workdir', help='Keep config, logs and queues of the run in this directory')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    overrides = {}
+    if args.students is not None:
+        overrides['students'] = args.students
+    if args.turns is not None:
+        overrides['turns'] = args.turns
+    if args.ramp_up is not None:
+        overrides['ramp_up_seconds'] = args.ramp_up
+    scenario = load_scenario(args.scenario, overrides)
+
+    report = run_scenario(scenario, args.workdir)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if not report['errors'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI/Groq-Compatible Chat-Completions Stand-In
+
+Load-testing the turn loop against the real Groq API burns quota and depends
+on the network. This server answers POST /openai/v1/chat/completions (the
+Groq client's path; /v1/chat/completions also works for OpenAI clients)
+with canned but realistic replies:
+- Patient turns: persona-appropriate replies for the session's domain (HPV,
+  oral hygiene, tobacco, periodontitis); after end_after_turns student turns
+  the patient closes the conversation with the end token (<<END>>)
+- Evaluation requests (the FeedbackFormatter evaluation prompt): feedback
+  in the "**Category (N pts): Status - feedback**" format the app parses
+- Streaming (server-sent events, usage on the final chunk as x_groq.usage)
+  and non-streamed responses
+- Configurable latency distributions for time to first token and per token
+- Injected 429 (with Retry-After) and 500 responses at configurable rates
+
+Replies are chosen deterministically from the persona and turn number, and
+latency/fault sampling uses a seeded RNG, so runs are reproducible.
+
+Usage:
+    python3 -m loadtest.mock_groq_server --port 8765 --ttft-ms 300 --token-ms 15
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run secret_code_portal.py
+
+    # or in-process (tests, load-test harness)
+    server = MockGroqServer(MockServerSettings(error_rate_429=0.05)).start()
+    client = Groq(api_key='test', base_url=server.base_url)
+    ...
+    server.stop()
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_window import estimate_tokens
+from end_control_middleware import END_TOKEN
+from persona_texts import HPV_DOMAIN_NAME, OHI_DOMAIN_NAME, PERIO_DOMAIN_NAME, TOBACCO_DOMAIN_NAME
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+COMPLETION_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions', '/chat/completions')
+
+# Marker of FeedbackFormatter.format_evaluation_prompt
+EVALUATION_MARKER = 'Motivational Interviewing Assessment'
+PERSONA_NAME_PATTERN = re.compile(r'You are "([^",]+)')
+# Marker of FeedbackFormatter.format_category_evaluation_prompt
+CATEGORY_PATTERN = re.compile(r'^\s*### Category: (.+?) \(', re.MULTILINE)
+
+PATIENT_REPLIES = {
+    HPV_DOMAIN_NAME: [
+        "I've heard a little about the HPV vaccine from people at work, but I'm not sure I really need it.",
+        "I guess my biggest worry is side effects. A friend said her arm hurt for days after a shot.",
+        "That makes sense. I didn't know it could help prevent some cancers later on.",
+        "Honestly, it's mostly about finding the time. My schedule is pretty packed right now.",
+        "I think I'd be open to it if I knew more about how many doses it takes.",
+        "Okay, I feel a bit better about it now. Maybe I'll ask about it at my next appointment.",
+    ],
+    OHI_DOMAIN_NAME: [
+        "I brush in the morning most days, but I usually skip flossing because it takes too long.",
+        "My gums bleed a little sometimes when I brush. I figured that was normal.",
+        "I didn't realize plaque could build up that quickly between visits.",
+        "At night I'm just so tired that I go straight to bed without brushing.",
+        "I could probably keep floss picks by the couch and use them while watching TV.",
+        "That sounds doable. I'll try brushing twice a day this week and see how it goes.",
+    ],
+    TOBACCO_DOMAIN_NAME: [
+        "I've been smoking for about ten years. I know it's not great, but it helps me relax.",
+        "I tried quitting once before, but the cravings were really bad after a couple of days.",
+        "Mostly I smoke when I'm stressed at work or when I'm out with friends.",
+        "My kids keep asking me to stop, and that does bother me.",
+        "Maybe the patch would help with the cravings. I never tried anything like that.",
+        "I think I could set a quit date next month. That feels more realistic to me.",
+    ],
+    PERIO_DOMAIN_NAME: [
+        "The hygienist said my gums are inflamed, but they don't really hurt, so I wasn't too worried.",
+        "I didn't know gum disease could lead to losing teeth. That's a little scary.",
+        "The deep cleaning sounds uncomfortable, and I'm not sure my insurance covers it.",
+        "I do notice some bleeding when I floss, which is part of why I stopped flossing.",
+        "If it would keep my teeth healthy, I could try to be more consistent at home.",
+        "Okay, I think I'd like to schedule the cleaning and see how my gums respond.",
+    ],
+}
+GENERIC_REPLIES = [
+    "I'm not really sure what to think about all this yet.",
+    "That's a fair point. I hadn't thought about it that way.",
+    "I guess I could try. It just feels like a lot right now.",
+]
+CLOSING_REPLY = "Thank you for taking the time to talk with me. I feel like I have a plan now."
+
+EVALUATION_CATEGORIES = [
+    ('Collaboration', 9, 'Partially Met',
+     'You introduced yourself and invited the patient to share ideas, though a few turns leaned toward advice.'),
+    ('Acceptance', 6, 'Fully Met',
+     'You asked permission before sharing information and reflected the patient\'s concerns.'),
+    ('Compassion', 6, 'Fully Met',
+     'You explored the patient\'s perceptions without judgment.'),
+    ('Evocation', 6, 'Partially Met',
+     'Open-ended questions drew out some change talk; more affirmation of self-efficacy would help.'),
+    ('Summary', 3, 'Minimally Met',
+     'The session ended without a clear summary of the plan; check next steps with the patient.'),
+    ('Response Factor', 10, 'Fully Met',
+     'Responses were timely throughout the conversation.'),
+]
+
+
+class MockServerSettings:
+    """Behaviour of the mock server (latency, faults, conversation length)."""
+
+    def __init__(self, ttft_ms: Optional[Dict[str, float]] = None, token_ms: Optional[Dict[str, float]] = None,
+                 error_rate_429: float = 0.0, error_rate_500: float = 0.0, retry_after_seconds: float = 1.0,
+                 end_after_turns: int = 8, seed: int = 0, model: str = 'llama-3.1-8b-instant'):
+        """
+        Initialize mock server settings.
+
+        Latency distributions are dicts with a "distribution" of "fixed"
+        (value), "uniform" (min, max), "normal" (mean, stddev) or "lognormal"
+        (median, sigma), all in milliseconds.
+
+        Args:
+            ttft_ms: Time to first token
+            token_ms: Delay between streamed tokens (also applied per token
+                      before a non-streamed response)
+            error_rate_429: Fraction of requests answered with 429
+            error_rate_500: Fraction of requests answered with 500
+            retry_after_seconds: Retry-After header of injected 429s
+            end_after_turns: Student turns after which the patient ends with END_TOKEN
+            seed: RNG seed for latency and fault sampling
+            model: Model name reported when the request has none
+        """
+        self.ttft_ms = ttft_ms or {'distribution': 'fixed', 'value': 0}
+        self.token_ms = token_ms or {'distribution': 'fixed', 'value': 0}
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.retry_after_seconds = retry_after_seconds
+        self.end_after_turns = end_after_turns
+        self.seed = seed
+        self.model = model
+
+
+def sample_latency_ms(spec: Dict[str, float], rng: random.Random) -> float:
+    """
+    Draw one latency from a distribution spec.
+
+    Args:
+        spec: Distribution spec (see MockServerSettings)
+        rng: Random generator
+
+    Returns:
+        float: Latency in milliseconds (never negative)
+
+    Raises:
+        ValueError: If the distribution is unknown
+    """
+    distribution = spec.get('distribution', 'fixed')
+    if distribution == 'fixed':
+        value = spec.get('value', 0)
+    elif distribution == 'uniform':
+        value = rng.uniform(spec['min'], spec['max'])
+    elif distribution == 'normal':
+        value = rng.gauss(spec['mean'], spec['stddev'])
+    elif distribution == 'lognormal':
+        value = rng.lognormvariate(math.log(spec['median']), spec['sigma'])
+    else:
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    return max(0.0, float(value))
+
+
+def is_evaluation_request(messages: List[Dict[str, str]]) -> bool:
+    """Whether the request is an evaluation (FeedbackFormatter prompt) rather than a turn."""
+    return any(
+        message.get('role') == 'user' and EVALUATION_MARKER in message.get('content', '')
+        for message in messages
+    )
+
+
+def build_patient_reply(messages: List[Dict[str, str]], end_after_turns: int) -> str:
+    """
+    Pick the canned patient reply for a turn request.
+
+    Args:
+        messages: Request messages (persona system prompt first)
+        end_after_turns: Student turns after which the reply ends the session
+
+    Returns:
+        str: Patient reply, ending with END_TOKEN once the session is long enough
+    """
+    system_prompt = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+    replies = next(
+        (replies for domain, replies in PATIENT_REPLIES.items() if domain in system_prompt),
+        GENERIC_REPLIES
+    )
+    # Windowed prompts drop old turns, so the turn number comes from the summary too
+    student_turns = sum(1 for m in messages if m.get('role') == 'user')
+    student_turns += sum(
+        m.get('content', '').count('\n- Student:') for m in messages if m.get('role') == 'system'
+    )
+    if end_after_turns and student_turns >= end_after_turns:
+        return f"{CLOSING_REPLY} {END_TOKEN}"
+
+    match = PERSONA_NAME_PATTERN.search(system_prompt)
+    persona = match.group(1) if match else ''
+    offset = int(hashlib.sha256(persona.encode('utf-8')).hexdigest(), 16) % len(replies)
+    return replies[(offset + max(0, student_turns - 1)) % len(replies)]
+
+
+def build_evaluation_feedback(messages: List[Dict[str, str]]) -> str:
+    """
+    Build feedback in the FeedbackFormatter evaluation format.
+
+    Each category line quotes a student line from the transcript in the prompt.
+    A per-category prompt is answered with that category's line only.
+
+    Args:
+        messages: Evaluation request messages
+
+    Returns:
+        str: Feedback text parseable by EvaluationService.parse_llm_feedback
+    """
+    prompt = next((m.get('content', '') for m in messages if EVALUATION_MARKER in m.get('content', '')), '')
+    quotes = re.findall(r'^\s*(?:Student|User):\s*(.+)$', prompt, re.MULTILINE) or ["Tell me more about that."]
+    category_match = CATEGORY_PATTERN.search(prompt)
+    lines = []
+    for index, (category, points, status, feedback) in enumerate(EVALUATION_CATEGORIES):
+        if category_match and category_match.group(1) != category:
+            continue
+        quote = quotes[index % len(quotes)].strip()
+        lines.append(f'**{category} ({points} pts): {status} - {feedback} For example: "{quote}"**')
+        lines.append('')
+    if category_match:
+        return '\n'.join(lines).strip()
+    lines.append("**Strengths:** Warm tone and good use of open questions.")
+    lines.append("**Suggestions for improvement:** Close with a summary and confirm next steps.")
+    return '\n'.join(lines)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # A whole class connects at once; the default backlog of 5 refuses connections
+    request_queue_size = 128
+
+
+class MockGroqServer:
+    """Threaded HTTP server answering chat-completion requests with canned replies."""
+
+    def __init__(self, settings: Optional[MockServerSettings] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the server (not yet listening).
+
+        Args:
+            settings: Mock behaviour (default: no latency, no faults)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.settings = settings or MockServerSettings()
+        self._rng = random.Random(self.settings.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'streamed': 0, 'evaluations': 0, 'ended': 0,
+                      'injected_429': 0, 'injected_500': 0}
+        self._httpd = _MockHTTPServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL for Groq(base_url=...) or GROQ_BASE_URL."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockGroqServer':
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-groq-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get request counters."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _draw(self) -> Dict[str, Any]:
+        """Sample fault injection and latencies for one request."""
+        settings = self.settings
+        with self._rng_lock:
+            roll = self._rng.random()
+            return {
+                'fault': (429 if roll < settings.error_rate_429
+                          else 500 if roll < settings.error_rate_429 + settings.error_rate_500
+                          else None),
+                'ttft_ms': sample_latency_ms(settings.ttft_ms, self._rng),
+                'token_ms': sample_latency_ms(settings.token_ms, self._rng),
+            }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug("mock-groq: " + format % args)
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip('/') in ('/health', '/stats'):
+                    self._send_json(200, {'status': 'ok', **server.get_stats()})
+                else:
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+
+            def do_POST(self):
+                if self.path.split('?')[0] not in COMPLETION_PATHS:
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send_json(400, {'error': {'message': 'Invalid JSON body'}})
+                    return
+                server._handle_completion(self, request)
+
+        return Handler
+
+    def _handle_completion(self, handler: BaseHTTPRequestHandler, request: Dict[str, Any]) -> None:
+        """Answer one chat-completion request."""
+        self._count('requests')
+        draw = self._draw()
+        if draw['fault'] == 429:
+            self._count('injected_429')
+            handler._send_json(
+                429,
+                {'error': {'message': 'Rate limit reached (injected by mock server)',
+                           'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                {'retry-after': f"{self.settings.retry_after_seconds:g}"}
+            )
+            return
+        if draw['fault'] == 500:
+            self._count('injected_500')
+            handler._send_json(500, {'error': {'message': 'Internal server error (injected by mock server)'}})
+            return
+
+        messages = request.get('messages') or []
+        model = request.get('model') or self.settings.model
+        if is_evaluation_request(messages):
+            self._count('evaluations')
+            content = build_evaluation_feedback(messages)
+        else:
+            content = build_patient_reply(messages, self.settings.end_after_turns)
+            if END_TOKEN in content:
+                self._count('ended')
+
+        tokens = re.findall(r'\S+\s*', content)
+        max_tokens = request.get('max_tokens')
+        if max_tokens:
+            tokens = tokens[:int(max_tokens)]
+        usage = {
+            'prompt_tokens': sum(estimate_tokens(m.get('content', '')) for m in messages),
+            'completion_tokens': len(tokens),
+        }
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        time.sleep(draw['ttft_ms'] / 1000)
+        if not request.get('stream'):
+            time.sleep(draw['token_ms'] * len(tokens) / 1000)
+            handler._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            return
+
+        self._count('streamed')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None, **extra) -> bytes:
+            body = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(body)}\n\n".encode('utf-8')
+
+        try:
+            handler.wfile.write(chunk({'role': 'assistant', 'content': ''}))
+            for index, token in enumerate(tokens):
+                if index:
+                    time.sleep(draw['token_ms'] / 1000)
+                handler.wfile.write(chunk({'content': token}))
+                handler.wfile.flush()
+            handler.wfile.write(chunk({}, 'stop', x_groq={'id': completion_id, 'usage': usage}))
+            handler.wfile.write(b"data: [DONE]\n\n")
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (e.g. a guardrail abort)
+            logger.debug("mock-groq: client closed the stream")
+
+
+def parse_latency_arg(value: str) -> Dict[str, float]:
+    """
+    Parse a latency option: "300" (fixed), "uniform:100:500",
+    "normal:300:50" or "lognormal:300:0.5".
+    """
+    parts = value.split(':')
+    if len(parts) == 1:
+        return {'distribution': 'fixed', 'value': float(parts[0])}
+    names = {'uniform': ('min', 'max'), 'normal': ('mean', 'stddev'), 'lognormal': ('median', 'sigma')}
+    if parts[0] not in names or len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"Invalid latency spec: {value}")
+    first, second = names[parts[0]]
+    return {'distribution': parts[0], first: float(parts[1]), second: float(parts[2])}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local OpenAI/Groq-compatible chat-completions stand-in")
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--ttft-ms', type=parse_latency_arg, default='0',
+                        help='Time to first token: ms, or uniform:MIN:MAX, normal:MEAN:SD, lognormal:MEDIAN:SIGMA')
+    parser.add_argument('--token-ms', type=parse_latency_arg, default='0',
+                        help='Delay per streamed token (same forms as --ttft-ms)')
+    parser.add_argument('--error-rate-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--error-rate-500', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds of injected 429s')
+    parser.add_argument('--end-after-turns', type=int, default=8,
+                        help=f'Student turns before the patient replies with {END_TOKEN} (0: never)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latency and fault sampling')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    settings = MockServerSettings(
+        ttft_ms=args.ttft_ms,
+        token_ms=args.token_ms,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        retry_after_seconds=args.retry_after,
+        end_after_turns=args.end_after_turns,
+        seed=args.seed,
+    )
+    server = MockGroqServer(settings, args.host, args.port)
+    print(f"Mock Groq server listening on {server.base_url}")
+    print(f"Point the app at it with: GROQ_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Local Stand-Ins for External Services Used by the Load-Test Harness
+
+- FakeSheetsClient: in-memory replacement for the gspread client the portal
+  uses to validate and mark access codes (open_by_key -> worksheet ->
+  get_all_values / update_cell), with optional per-call latency
+- SMTPSink: minimal SMTP server (EHLO, AUTH PLAIN, MAIL, RCPT, DATA) that
+  accepts and counts the Box backup emails instead of delivering them
+
+Both are thread-safe so a whole simulated class can share them.
+"""
+
+import logging
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SHEET_HEADERS = ['Table No', 'Name', 'Bot', 'Secret', 'Used', 'Role']
+
+
+class FakeWorksheet:
+    """In-memory worksheet with the gspread methods the portal calls."""
+
+    def __init__(self, rows: List[List[str]], latency_ms: float = 0.0):
+        """
+        Initialize the worksheet.
+
+        Args:
+            rows: All rows including the header row
+            latency_ms: Simulated API latency per call
+        """
+        self._rows = [list(row) for row in rows]
+        self._lock = threading.Lock()
+        self.latency_ms = latency_ms
+        self.reads = 0
+        self.writes = 0
+
+    def get_all_values(self) -> List[List[str]]:
+        time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.reads += 1
+            return [list(row) for row in self._rows]
+
+    def update_cell(self, row: int, col: int, value: str) -> None:
+        """Update a cell (1-based row and column, like gspread)."""
+        time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.writes += 1
+            self._rows[row - 1][col - 1] = value
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet: FakeWorksheet):
+        self._worksheet = worksheet
+
+    def worksheet(self, name: str) -> FakeWorksheet:
+        return self._worksheet
+
+
+class FakeSheetsClient:
+    """gspread.Client stand-in serving one access-code worksheet."""
+
+    def __init__(self, codes: List[Dict[str, str]], latency_ms: float = 0.0):
+        """
+        Initialize the client with an access-code sheet.
+
+        Args:
+            codes: Rows as dicts with name, bot, secret (and optional role)
+            latency_ms: Simulated API latency per sheet call
+        """
+        rows = [SHEET_HEADERS]
+        for index, code in enumerate(codes, start=1):
+            rows.append([str(index), code['name'], code['bot'], code['secret'], 'FALSE', code.get('role', 'STUDENT')])
+        self.worksheet = FakeWorksheet(rows, latency_ms)
+
+    def open_by_key(self, sheet_id: str) -> FakeSpreadsheet:
+        return FakeSpreadsheet(self.worksheet)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session: accepts any credentials and any message."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def handle(self) -> None:
+        sink: 'SMTPSink' = self.server.sink
+        self._reply('220 localhost loadtest SMTP sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250-localhost')
+                self._reply('250-AUTH PLAIN')
+                self._reply('250 SIZE 52428800')
+            elif verb == 'AUTH':
+                self._reply('235 2.7.0 Authentication successful')
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data_line)
+                time.sleep(sink.latency_ms / 1000)
+                sink._record(size)
+                self._reply('250 OK: queued')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class SMTPSink:
+    """Local SMTP server that accepts and counts messages without delivering them."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0):
+        """
+        Initialize the sink (not yet listening).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency_ms: Simulated delay before a message is accepted
+        """
+        self.latency_ms = latency_ms
+        self._server = _ThreadingTCPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.messages = 0
+        self.bytes_received = 0
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _record(self, size: int) -> None:
+        with self._lock:
+            self.messages += 1
+            self.bytes_received += size
+
+    def start(self) -> 'SMTPSink':
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
@@ -13,8 +13,9 @@ Features:
 
 The application uses:
 - Groq LLM API for natural conversation
-- FAISS for vector similarity search in rubric retrieval
-- Sentence Transformers for embedding generation
+- A pluggable retrieval backend for rubric retrieval ("retrieval.backend" in
+  config.json or RAG_BACKEND): Sentence Transformers embeddings + FAISS, or
+  torch-free BM25
 - Streamlit for the user interface
 
 Usage:
@@ -30,14 +31,9 @@ import os
 import logging
 import streamlit as st
 from pathlib import Path
-from groq import Groq
-from sentence_transformers import SentenceTransformer
-import faiss
-import numpy as np
-from time_utils import get_formatted_utc_time
-from pdf_utils import generate_pdf_report
+from llm_client import get_groq_client
+from response_timing import format_response_factor_evidence, stamp_message
 from feedback_template import FeedbackFormatter, FeedbackValidator
-from scoring_utils import validate_student_name
 from persona_texts import (
     PERIO_PERSONAS,
     get_perio_persona,
@@ -45,6 +41,7 @@ from persona_texts import (
     PERIO_DOMAIN_KEYWORDS
 )
 from logger_config import get_logger, log_action, log_error_with_context
+from rag import get_knowledge_base, KnowledgeBaseError
 
 # Configure logging
 logger = get_logger(__name__)
@@ -108,9 +105,8 @@ working_dir = os.path.dirname(os.path.abspath(__file__))
 api_key = st.session_state.groq_api_key
 student_name = st.session_state.student_name
 
-# --- Set API key and initialize client ---
-os.environ["GROQ_API_KEY"] = api_key
-client = Groq()
+# --- Get the shared client for this API key (reused across reruns) ---
+client = get_groq_client(api_key)
 
 # --- Initialize session state ---
 from chat_utils import initialize_session_state
@@ -140,45 +136,17 @@ if rubrics_dir is None:
     logger.error(f"Failed to find perio_rubrics directory. Tried: {[str(p) for p in possible_paths]}")
     st.stop()
 
-# Load rubric files
-knowledge_texts = []
+# --- Step 2: Initialize RAG (configured retrieval backend) ---
+# The rubric index of the configured backend (embeddings + FAISS, or BM25) is built once per process
+# and shared across all sessions (rebuilt only when the rubric files change)
 try:
-    rubric_files = list(rubrics_dir.glob("*.txt"))
-    if not rubric_files:
-        st.error("⚠️ Configuration Error: No rubric files found.")
-        st.info("The Perio rubric directory exists but contains no rubric files. Please contact your administrator.")
-        logger.error(f"No .txt files found in {rubrics_dir}")
-        st.stop()
-    
-    for rubric_file in rubric_files:
-        try:
-            with open(rubric_file, "r", encoding="utf-8", errors="ignore") as f:
-                knowledge_texts.append(f.read())
-        except Exception as e:
-            logger.warning(f"Failed to read rubric file {rubric_file}: {e}")
-            continue
-    
-    if not knowledge_texts:
-        st.error("⚠️ Configuration Error: Could not load rubric content.")
-        st.info("Failed to read rubric files. Please contact your administrator.")
-        logger.error(f"Failed to load any rubric content from {rubrics_dir}")
-        st.stop()
-        
-except Exception as e:
-    st.error("⚠️ Configuration Error: Unable to access rubric files.")
-    st.info(f"An error occurred while loading rubrics. Please contact your administrator.")
-    logger.error(f"Error accessing rubrics directory {rubrics_dir}: {e}")
+    knowledge_base = get_knowledge_base(rubrics_dir)
+except KnowledgeBaseError as e:
+    st.error("⚠️ Configuration Error: Could not load rubric content.")
+    st.info("Failed to read the Perio rubric files. Please contact your administrator.")
+    logger.error(f"Failed to load knowledge base from {rubrics_dir}: {e}")
     st.stop()
 
-# Combine all documents into a single knowledge base
-knowledge_text = "\n\n".join(knowledge_texts)
-
-# --- Step 2: Initialize RAG (Embeddings + FAISS) ---
-# Use CPU device explicitly to avoid Meta tensor initialization errors
-import torch
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
-
 # --- Initialize session state for persona selection ---
 if "selected_persona" not in st.session_state:
     st.session_state.selected_persona = None
@@ -205,6 +173,7 @@ if st.session_state.selected_persona is None:
     if st.button("Start Conversation"):
         st.session_state.selected_persona = selected
         st.session_state.chat_history = []
+        st.session_state.conversation_summary = None
         st.session_state.conversation_state = "active"
         st.session_state.turn_count = 0
         
@@ -217,38 +186,15 @@ if st.session_state.selected_persona is None:
         }
         
         greeting = stage_greetings.get(selected, f"Hello! I'm {selected}, nice to meet you today.")
-        st.session_state.chat_history.append({
+        st.session_state.chat_history.append(stamp_message({
             "role": "assistant",
             "content": greeting
-        })
+        }))
         st.rerun()
     
     # Stop here if persona not selected yet
     st.stop()
       
-def split_text(text, max_length=200):
-    words = text.split()
-    chunks, current_chunk = [], []
-    for word in words:
-        if len(" ".join(current_chunk + [word])) > max_length:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = []
-        current_chunk.append(word)
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    return chunks
-
-knowledge_chunks = split_text(knowledge_text)
-dimension = 384  # for all-MiniLM-L6-v2
-faiss_index = faiss.IndexFlatL2(dimension)
-embeddings = embedding_model.encode(knowledge_chunks)
-faiss_index.add(np.array(embeddings))
-
-def retrieve_knowledge(query, top_k=2):
-    query_embedding = embedding_model.encode([query])
-    distances, indices = faiss_index.search(np.array(query_embedding), top_k)
-    return [knowledge_chunks[i] for i in indices[0]]
-
 # --- Display chat history ---
 if st.session_state.selected_persona is not None:
     for message in st.session_state.chat_history:
@@ -261,7 +207,7 @@ if "feedback" not in st.session_state:
     
 # --- Finish Session Button (Feedback with RAG) ---
 # Only enable feedback button based on conversation state
-from chat_utils import should_enable_feedback_button
+from chat_utils import should_enable_feedback_button, submit_feedback_job, poll_feedback_job
 from end_control_middleware import MIN_TURN_THRESHOLD
 
 feedback_enabled = should_enable_feedback_button()
@@ -272,167 +218,50 @@ if not feedback_enabled:
         st.info(f"💬 Continue the conversation (Turn {st.session_state.turn_count}/{MIN_TURN_THRESHOLD} minimum). The feedback button will be enabled after sufficient interaction.")
 
 if st.button(feedback_button_label, disabled=not feedback_enabled):
-    # Define current_timestamp and bot name at the beginning of this block
-    current_timestamp = get_formatted_utc_time()
+    # Bot name for the evaluator field (timestamp is taken when the job is submitted)
     evaluator = "Periodontitis Assessment Bot"
     
     transcript = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in st.session_state.chat_history])
     
-    retrieved_info = retrieve_knowledge("motivational interviewing feedback rubric")
-    rag_context = "\n".join(retrieved_info)
+    # General feedback chunks plus one section per rubric category (one batched search)
+    rag_context = knowledge_base.feedback_context()
+
+    # Measured student response times, scored for Response Factor as in the PDF report
+    response_times = format_response_factor_evidence(st.session_state.chat_history)
 
     # Use standardized evaluation prompt
     review_prompt = FeedbackFormatter.format_evaluation_prompt(
-        "periodontitis and gum health", transcript, rag_context
+        "periodontitis and gum health", transcript, rag_context, response_times
     )
 
-    try:
-        feedback_response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": PERSONAS[st.session_state.selected_persona]},
-                {"role": "user", "content": review_prompt}
-            ]
+    # One prompt per rubric category, only built when feedback_jobs.evaluation_mode is "per_category"
+    from category_evaluation import EVALUATION_MODE_PER_CATEGORY, get_evaluation_mode
+    category_prompts = None
+    if get_evaluation_mode() == EVALUATION_MODE_PER_CATEGORY:
+        category_prompts = FeedbackFormatter.format_category_evaluation_prompts(
+            "periodontitis and gum health", transcript, knowledge_base.category_contexts(), response_times
         )
-        feedback = feedback_response.choices[0].message.content
-    except Exception as e:
-        # Handle authentication errors gracefully
-        error_msg = str(e).lower()
-        if "401" in error_msg or "invalid api key" in error_msg or "authentication" in error_msg:
-            st.error("❌ Invalid API Key detected. Please check your Groq API key and try again.")
-            st.info("💡 To fix this: Enter a valid Groq API key in the field at the top of the page and restart the conversation.")
-            st.stop()
-        else:
-            # Re-raise other unexpected errors
-            raise
-    
-    # Store feedback in session state to prevent disappearing
-    st.session_state.feedback = {
-        'content': feedback,
-        'timestamp': current_timestamp,
-        'evaluator': evaluator
-    }
-
-# Show only PDF download section if feedback exists
-if st.session_state.feedback is not None:
-    feedback_data = st.session_state.feedback
-    
-    # Format feedback for PDF using standardized template
-    formatted_feedback = FeedbackFormatter.format_feedback_for_pdf(
-        feedback_data['content'], feedback_data['timestamp'], feedback_data['evaluator']
+
+    # Reuse a cached evaluation or generate in the background; repeated clicks attach to the same job
+    submit_feedback_job(
+        client, PERSONAS[st.session_state.selected_persona], review_prompt, evaluator, "PERIO", category_prompts
     )
 
-    # Show only PDF download section
-    st.markdown("### 📄 Download Feedback Report")
-    st.info("Your feedback has been generated! Click below to download the PDF report.")
-
-    # Validate student name and generate PDF
-    try:
-        validated_name = validate_student_name(student_name)
-        
-        pdf_buffer = generate_pdf_report(
-            student_name=validated_name,
-            raw_feedback=formatted_feedback,
-            chat_history=st.session_state.chat_history,
-            session_type="Periodontitis"
-        )
-        
-        # Generate standardized filename
-        download_filename = FeedbackFormatter.create_download_filename(
-            student_name, "Perio", st.session_state.selected_persona
-        )
-        
-        # Email backup with robust delivery
-        if 'email_backup_status' not in st.session_state:
-            st.session_state.email_backup_status = 'pending'
-        if 'email_backup_result' not in st.session_state:
-            st.session_state.email_backup_result = None
-        
-        # Email backup section
-        if st.session_state.email_backup_status == 'pending':
-            st.markdown("### 📧 Backing Up Report to Box")
-            
-            progress_placeholder = st.empty()
-            status_placeholder = st.empty()
-            
-            from email_utils import RobustEmailSender
-            from config_loader import ConfigLoader
-            
-            config = ConfigLoader()
-            email_config = config.config.get('email_config', {})
-            
-            # Get Perio Box email (fallback to ohi if not configured)
-            box_email = email_config.get('perio_box_email') or email_config.get('ohi_box_email')
-            
-            if box_email:
-                sender = RobustEmailSender(config.config)
-                
-                def update_progress(attempt, max_attempts, status):
-                    progress = attempt / max_attempts
-                    progress_placeholder.progress(progress)
-                    status_placeholder.text(f"Attempt {attempt}/{max_attempts}: {status}")
-                
-                result = sender.send_with_guaranteed_delivery(
-                    pdf_buffer=pdf_buffer,
-                    filename=download_filename,
-                    recipient=box_email,
-                    student_name=validated_name,
-                    session_type="Perio",
-                    progress_callback=update_progress
-                )
-                
-                st.session_state.email_backup_result = result
-                
-                if result['success']:
-                    st.session_state.email_backup_status = 'success'
-                    progress_placeholder.empty()
-                    status_placeholder.empty()
-                    st.success(f"✅ Report backed up to Box successfully! (Attempt {result['attempts']})")
-                elif result.get('queued'):
-                    st.session_state.email_backup_status = 'queued'
-                    progress_placeholder.empty()
-                    status_placeholder.empty()
-                    st.warning(f"⚠️ Email queued for later delivery. Will retry automatically.")
-                else:
-                    st.session_state.email_backup_status = 'failed'
-                    progress_placeholder.empty()
-                    status_placeholder.empty()
-            else:
-                st.session_state.email_backup_status = 'no_email'
-                st.warning("⚠️ Box email not configured. Report will be available for download only.")
-        
-        # Handle failed status
-        if st.session_state.email_backup_status == 'failed':
-            st.error("❌ Email backup failed after multiple attempts.")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🔄 Retry Backup"):
-                    st.session_state.email_backup_status = 'pending'
-                    st.session_state.email_backup_result = None
-                    st.rerun()
-            with col2:
-                if st.button("⚠️ Skip & Download Only"):
-                    st.session_state.email_backup_status = 'skipped'
-                    st.rerun()
-        
-        # Show download button only after backup is resolved
-        if st.session_state.email_backup_status in ['success', 'queued', 'skipped', 'no_email']:
-            st.markdown("### 📄 Download Report")
-            st.download_button(
-                label="📥 Download Periodontitis MI Performance Report (PDF)",
-                data=pdf_buffer.getvalue(),
-                file_name=download_filename,
-                mime="application/pdf",
-                help="Download your complete feedback report as a PDF"
-            )
-            
-    except ValueError as e:
-        st.error(f"Error generating PDF: {e}")
-        st.info("Please check your student name and try again.")
-    except Exception as e:
-        st.error(f"Unexpected error: {e}")
-        st.info("There was an issue generating the PDF. Please try again.")
+# Show progress (refreshed in a fragment) until the feedback job finishes
+poll_feedback_job()
 
+# PDF report and Box backup, built in the background once feedback exists
+if st.session_state.feedback is not None:
+    from chat_utils import handle_report_backup
+    from config_loader import get_config_loader
+    
+    email_config = get_config_loader().get_email_config()
+    
+    # Get Perio Box email (fallback to ohi if not configured)
+    box_email = email_config.get('perio_box_email') or email_config.get('ohi_box_email')
+    
+    handle_report_backup(student_name, "Periodontitis", "Perio", "Perio", box_email, "Periodontitis")
+    
 # --- Handle chat input (Using improved chat_utils with persona guards) ---
 from chat_utils import handle_chat_input
 import inspect
@@ -335,6 +335,102 @@ with col2:
 
 st.markdown("---")
 
+# --- Runtime Metrics ---
+st.header("📈 Runtime Metrics")
+
+st.markdown("""
+Process-wide metrics since this server started (shared by all sessions).
+""")
+
+from persona_guard import get_stream_abort_metrics
+
+st.subheader("Streaming guardrail early aborts")
+abort_metrics = get_stream_abort_metrics()
+col1, col2, col3 = st.columns(3)
+col1.metric("Early aborts", abort_metrics['aborts'])
+col2.metric("Tokens saved (upper bound)", abort_metrics['max_tokens_saved'],
+            help="Assumes each aborted reply would have run to the max_tokens limit")
+col3.metric("Time saved (upper bound)", f"{abort_metrics['max_ms_saved'] / 1000:.1f}s",
+            help="At the token rate observed before each abort")
+if abort_metrics['aborts_by_reason']:
+    st.write("**By reason:** " + ", ".join(
+        f"{reason}: {count}" for reason, count in sorted(abort_metrics['aborts_by_reason'].items())
+    ))
+
+from llm_metrics import get_llm_metrics
+
+st.subheader("LLM calls")
+llm_summary = get_llm_metrics().get_summary()
+
+
+def _format_ms(value):
+    return "—" if value is None else f"{value:.0f}"
+
+
+if llm_summary['by_purpose']:
+    st.caption(
+        f"Percentiles over the last {llm_summary['buffered']} calls "
+        f"({llm_summary['total_calls']} since start). Latency and TTFT in ms."
+    )
+    st.table([
+        {
+            'Purpose': purpose,
+            'Calls': stats['calls'],
+            'Errors': stats['errors'],
+            'Aborted': stats['aborted'],
+            'Latency p50': _format_ms(stats['latency_ms']['p50']),
+            'Latency p95': _format_ms(stats['latency_ms']['p95']),
+            'Latency p99': _format_ms(stats['latency_ms']['p99']),
+            'TTFT p50': _format_ms(stats['ttft_ms']['p50']),
+            'TTFT p95': _format_ms(stats['ttft_ms']['p95']),
+            'TTFT p99': _format_ms(stats['ttft_ms']['p99']),
+            'Avg prompt tokens': _format_ms(stats['mean_prompt_tokens']),
+            'Avg completion tokens': _format_ms(stats['mean_completion_tokens']),
+        }
+        for purpose, stats in llm_summary['by_purpose'].items()
+    ])
+else:
+    st.info("No LLM calls recorded yet.")
+
+from rate_limiter import get_rate_limiter
+
+st.subheader("Groq rate limiter")
+limiter_metrics = get_rate_limiter().get_metrics()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Queue depth", limiter_metrics['queue_depth'],
+            help=f"Peak: {limiter_metrics['max_queue_depth']}")
+col2.metric("Delayed requests", f"{limiter_metrics['waited']} / {limiter_metrics['requests']}")
+col3.metric("Avg / max wait", f"{limiter_metrics['avg_wait_seconds']:.1f}s / {limiter_metrics['max_wait_seconds']:.1f}s")
+col4.metric("429s / retries", f"{limiter_metrics['throttled']} / {limiter_metrics['retries']}")
+if limiter_metrics['timeouts']:
+    st.warning(f"{limiter_metrics['timeouts']} requests timed out waiting for the rate limiter.")
+
+from end_control_middleware import get_termination_metrics_snapshot
+
+st.subheader("Conversation endings")
+termination = get_termination_metrics_snapshot()
+counters = termination['counters']
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Ended with confirmation", counters['sessions_ended_with_confirmation'])
+col2.metric("Ended without confirmation", counters['sessions_ended_without_confirmation'])
+col3.metric("Parked", counters['sessions_parked'])
+col4.metric("Ambiguous replies", counters['ambiguous_responses'])
+if termination['rollups']:
+    st.caption("Decisions per minute (UTC), most recent first; minutes without decisions are skipped.")
+    st.table([
+        {
+            'Minute': rollup['minute'][11:16],
+            'Decisions': rollup['decisions'],
+            'Confirmed': rollup['sessions_ended_with_confirmation'],
+            'Unconfirmed': rollup['sessions_ended_without_confirmation'],
+            'Parked': rollup['sessions_parked'],
+            'Ambiguous': rollup['ambiguous_responses'],
+        }
+        for rollup in reversed(termination['rollups'][-10:])
+    ])
+
+st.markdown("---")
+
 # --- Session Info ---
 st.header("ℹ️ Session Information")
 
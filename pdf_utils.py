@@ -43,6 +43,7 @@ except ImportError:
         return name.strip()
 
 from feedback_template import FeedbackValidator, FeedbackFormatter
+from response_timing import format_message_time, format_response_summary, summarize_response_times
 
 
 def construct_feedback_filename(student_name: str, bot_name: str, persona_name: str = None) -> str:
@@ -256,7 +257,7 @@ def generate_pdf_report(student_name, raw_feedback, chat_history, session_type="
         ValueError: If validation fails critically
     """
     import logging
-    from config_loader import ConfigLoader
+    from config_loader import get_config_loader
     
     logger = logging.getLogger(__name__)
     
@@ -270,7 +271,7 @@ def generate_pdf_report(student_name, raw_feedback, chat_history, session_type="
     clean_feedback = FeedbackValidator.sanitize_special_characters(raw_feedback)
 
     # Comprehensive PDF payload validation with feature flag check
-    config = ConfigLoader()
+    config = get_config_loader()
     flags = config.get_feature_flags()
     
     if flags.get('pdf_score_binding_fix', True):
@@ -376,6 +377,13 @@ def generate_pdf_report(student_name, raw_feedback, chat_history, session_type="
     # --- New: Check if chat_history contains any user responses ---
     has_user_turns = any(msg.get("role", "").lower() == "user" for msg in chat_history)
 
+    # Measured student think times (None if the messages were not stamped)
+    response_summary = summarize_response_times(chat_history)
+    timing_settings = config.get_response_timing_config()
+    response_latency = None
+    if response_summary and timing_settings.get('score_response_factor', True):
+        response_latency = response_summary['think_time']['mean']
+
     # Score Summary Section
     elements.append(Paragraph("Score Summary", section_style))
 
@@ -384,7 +392,11 @@ def generate_pdf_report(student_name, raw_feedback, chat_history, session_type="
         try:
             # Try new rubric first
             if NEW_RUBRIC_AVAILABLE:
-                evaluation_result = EvaluationService.evaluate_session(clean_feedback, session_type)
+                evaluation_result = EvaluationService.evaluate_session(
+                    clean_feedback,
+                    session_type,
+                    response_latency=response_latency
+                )
                 
                 # Table construction with new rubric data
                 headers = ['MI Category', 'Assessment', 'Score', 'Max Score', 'Notes']
@@ -738,12 +750,19 @@ def generate_pdf_report(student_name, raw_feedback, chat_history, session_type="
         spaceAfter=4,
         fontName='Helvetica-Bold'
     )
+    if response_summary:
+        elements.append(Paragraph(format_response_summary(response_summary), conversation_style))
+        elements.append(Spacer(1, 8))
     for i, message in enumerate(chat_history):
         role = message.get("role", "user").title()
         content = message.get("content", "")
         clean_content = FeedbackValidator.sanitize_special_characters(content)
         bg_color = colors.lightgrey if i % 2 == 0 else colors.white
-        elements.append(Paragraph(f"<b>{role}:</b>", role_style))
+        message_time = format_message_time(message)
+        if message_time:
+            elements.append(Paragraph(f"<b>{role}:</b> <font size=8 color='grey'>({message_time})</font>", role_style))
+        else:
+            elements.append(Paragraph(f"<b>{role}:</b>", role_style))
         if len(clean_content) > 100:
             words = clean_content.split()
             chunks = []
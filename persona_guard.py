@@ -12,10 +12,12 @@ Features:
 - Domain keyword matching for off-topic detection
 - Persona consistency checking (evaluator mode during conversation)
 - Corrective system message generation
+- Streaming guard that aborts a drifting or over-long reply mid-stream
 """
 
 import re
 import logging
+import threading
 from typing import Dict, List, Optional, Tuple
 
 # Configure logging
@@ -69,6 +71,9 @@ EVALUATOR_MODE_PATTERNS = [
     r'(?i)(excellent|good|poor) use of',
 ]
 
+# Default sentence limit for patient replies (see check_response_length)
+MAX_RESPONSE_SENTENCES = 3
+
 
 def detect_prompt_injection(user_message: str) -> Tuple[bool, Optional[str]]:
     """
@@ -225,7 +230,7 @@ REGENERATE your last response as a patient, NOT as an evaluator."""
     }
 
 
-def check_response_length(assistant_message: str, max_sentences: int = 3) -> bool:
+def check_response_length(assistant_message: str, max_sentences: int = MAX_RESPONSE_SENTENCES) -> bool:
     """
     Check if assistant response is concise (within sentence limit).
     
@@ -328,6 +333,169 @@ def check_response_guardrails(
     return False, None
 
 
+# Evaluator patterns combined into one regex for incremental scanning
+_EVALUATOR_MODE_REGEX = re.compile(
+    '|'.join(f"(?:{pattern.replace('(?i)', '', 1)})" for pattern in EVALUATOR_MODE_PATTERNS),
+    re.IGNORECASE
+)
+# Characters re-scanned before new text so matches spanning two chunks are found
+_DRIFT_SCAN_OVERLAP = 64
+_SENTENCE_TERMINATORS = re.compile(r'[.!?]+')
+
+
+class StreamingGuard:
+    """
+    Incremental response guardrails for a streamed patient reply.
+    
+    feed() is called with each streamed text chunk and reports a violation
+    as soon as it is certain - i.e. the complete reply would fail
+    check_response_guardrails() whatever tokens follow:
+    - Persona drift: an EVALUATOR_MODE_PATTERNS match in the text so far
+      (a match in a prefix stays a match in the full reply)
+    - Length: more than max_sentences completed sentences (counted exactly
+      as check_response_length() does)
+    
+    Only the text added since the previous chunk is scanned, so checking a
+    whole reply is linear in its length.
+    """
+    
+    def __init__(self, domain_name: str, max_sentences: int = MAX_RESPONSE_SENTENCES):
+        """
+        Initialize streaming guard.
+        
+        Args:
+            domain_name: Name of the domain (for the correction message)
+            max_sentences: Maximum number of sentences allowed
+        """
+        self.domain_name = domain_name
+        self.max_sentences = max_sentences
+        self.text = ""
+        self.violation: Optional[str] = None
+        self._drift_scanned = 0
+        self._sentence_start = 0
+        self._sentences = 0
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Add a streamed chunk and check the reply so far.
+        
+        Args:
+            chunk: Newly streamed text
+            
+        Returns:
+            str: 'persona_drift' or 'too_long' once a violation is certain, else None
+        """
+        if self.violation:
+            return self.violation
+        self.text += chunk
+        
+        # Check for persona drift first (most critical)
+        scan_from = max(0, self._drift_scanned - _DRIFT_SCAN_OVERLAP)
+        match = _EVALUATOR_MODE_REGEX.search(self.text, scan_from)
+        self._drift_scanned = len(self.text)
+        if match:
+            logger.warning(f"Persona drift detected mid-stream: '{match.group(0)}'")
+            self.violation = 'persona_drift'
+            return self.violation
+        
+        # Count sentences completed by a terminator; the trailing fragment may still grow
+        for terminator in _SENTENCE_TERMINATORS.finditer(self.text, self._sentence_start):
+            if len(self.text[self._sentence_start:terminator.start()].strip()) > 10:
+                self._sentences += 1
+            self._sentence_start = terminator.end()
+        if self._sentences > self.max_sentences:
+            logger.info(f"Response length exceeded mid-stream: {self._sentences} sentences (max: {self.max_sentences})")
+            self.violation = 'too_long'
+        
+        return self.violation
+    
+    def finish(self) -> Optional[str]:
+        """
+        Check the complete reply once the stream has ended.
+        
+        Returns:
+            str: 'persona_drift' or 'too_long' if the full reply violates the guardrails, else None
+        """
+        if self.violation is None and check_response_length(self.text, self.max_sentences):
+            self.violation = 'too_long'
+        return self.violation
+    
+    def correction_message(self) -> Optional[Dict]:
+        """
+        Get the corrective system message for the detected violation.
+        
+        Returns:
+            dict: Correction message, or None if no violation was detected
+        """
+        if self.violation == 'persona_drift':
+            return create_persona_drift_correction_message(self.domain_name)
+        if self.violation == 'too_long':
+            return create_conciseness_correction_message()
+        return None
+
+
+# Early-abort metrics (process-wide, for monitoring)
+_stream_abort_lock = threading.Lock()
+_stream_abort_metrics = {
+    'aborts': 0,
+    'aborts_by_reason': {},
+    'tokens_received': 0,
+    'max_tokens_saved': 0,
+    'max_ms_saved': 0.0,
+}
+
+
+def record_stream_abort(reason: str, tokens_received: int, tokens_saved: int, ms_saved: float) -> None:
+    """
+    Record an early stream abort.
+    
+    Args:
+        reason: Violation that triggered the abort ('persona_drift' or 'too_long')
+        tokens_received: Tokens streamed before the abort
+        tokens_saved: Upper bound on the tokens the reply would still have
+            generated (assumes it ran to max_tokens)
+        ms_saved: Upper bound on the generation time saved, in milliseconds
+    """
+    with _stream_abort_lock:
+        _stream_abort_metrics['aborts'] += 1
+        by_reason = _stream_abort_metrics['aborts_by_reason']
+        by_reason[reason] = by_reason.get(reason, 0) + 1
+        _stream_abort_metrics['tokens_received'] += tokens_received
+        _stream_abort_metrics['max_tokens_saved'] += tokens_saved
+        _stream_abort_metrics['max_ms_saved'] += ms_saved
+    logger.info(
+        f"Aborted streamed reply ({reason}) after {tokens_received} tokens; "
+        f"saved at most {tokens_saved} tokens / {ms_saved:.0f}ms"
+    )
+
+
+def get_stream_abort_metrics() -> Dict:
+    """
+    Get early-abort metrics for dashboards/monitoring.
+    
+    Returns:
+        dict: Abort counts (total and by reason), tokens received, and upper
+        bounds on the tokens/ms saved (max_tokens_saved, max_ms_saved: each
+        aborted reply is assumed to have run to max_tokens)
+    """
+    with _stream_abort_lock:
+        metrics = dict(_stream_abort_metrics)
+        metrics['aborts_by_reason'] = dict(_stream_abort_metrics['aborts_by_reason'])
+        return metrics
+
+
+def reset_stream_abort_metrics() -> None:
+    """Reset early-abort metrics (for testing or periodic cleanup)."""
+    with _stream_abort_lock:
+        _stream_abort_metrics.update({
+            'aborts': 0,
+            'aborts_by_reason': {},
+            'tokens_received': 0,
+            'max_tokens_saved': 0,
+            'max_ms_saved': 0.0,
+        })
+
+
 # Utility function for testing/diagnostics
 def run_diagnostics(
     user_message: str,
@@ -0,0 +1,84 @@
+"""
+Retrieval-Augmented Generation (RAG) Module
+
+This module provides the shared rubric knowledge bases used by all MI chatbot
+pages for feedback retrieval.
+
+Module Structure:
+- knowledge_base.py: Process-wide registry of per-directory rubric indexes
+- backends.py: Pluggable retrieval backends (MiniLM + FAISS, pure-NumPy BM25)
+- chunking.py: Linear-time, sentence-aware chunker with overlap
+- index_store.py: Prebuilt on-disk indexes (memory-mapped at load time)
+- retrieval_cache.py: LRU cache of retrieval results, seeded at index-build time
+- lazy_imports.py: Deferred imports of faiss, torch and sentence_transformers
+- warmup.py: Optional background warm-up after the portal renders
+
+Importing this package does not import faiss, torch or sentence_transformers;
+they are loaded on first retrieval (or by the background warm-up).
+"""
+
+from .knowledge_base import (
+    KnowledgeBase,
+    KnowledgeBaseError,
+    get_knowledge_base,
+    clear_knowledge_bases,
+)
+from .backends import (
+    RetrievalBackend,
+    EmbeddingBackend,
+    BM25Backend,
+    create_backend,
+    get_backend_name,
+    get_embedding_model,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_DIMENSION,
+)
+from .chunking import chunk_text, get_chunk_settings, split_text
+from .index_store import (
+    get_index_dir,
+    read_manifest,
+    is_artifact_current,
+    INDEX_DIR_ENV,
+)
+from .retrieval_cache import (
+    RetrievalCache,
+    get_retrieval_cache,
+    FEEDBACK_QUERY,
+    CATEGORY_QUERIES,
+)
+from .lazy_imports import LazyModule
+from .warmup import (
+    warm_up,
+    start_warm_up,
+    BOT_RUBRIC_DIRS,
+)
+
+__all__ = [
+    'KnowledgeBase',
+    'KnowledgeBaseError',
+    'get_knowledge_base',
+    'get_embedding_model',
+    'clear_knowledge_bases',
+    'RetrievalBackend',
+    'EmbeddingBackend',
+    'BM25Backend',
+    'create_backend',
+    'get_backend_name',
+    'chunk_text',
+    'get_chunk_settings',
+    'split_text',
+    'EMBEDDING_MODEL_NAME',
+    'EMBEDDING_DIMENSION',
+    'get_index_dir',
+    'read_manifest',
+    'is_artifact_current',
+    'INDEX_DIR_ENV',
+    'RetrievalCache',
+    'get_retrieval_cache',
+    'FEEDBACK_QUERY',
+    'CATEGORY_QUERIES',
+    'LazyModule',
+    'warm_up',
+    'start_warm_up',
+    'BOT_RUBRIC_DIRS',
+]
@@ -0,0 +1,326 @@
+"""
+Pluggable Retrieval Backends
+
+A retrieval backend turns rubric chunks into a searchable index and answers
+batched queries with chunk ids. Two backends are provided:
+- EmbeddingBackend ("embedding"): SentenceTransformer all-MiniLM-L6-v2 + FAISS
+  IndexFlatL2 (the original retrieval path)
+- BM25Backend ("bm25"): pure-NumPy Okapi BM25 over sparse term weights
+  precomputed at build time; needs neither torch nor faiss, for small
+  CPU-only replicas
+
+The backend is selected with "retrieval": {"backend": ...} in config.json
+(or the RAG_BACKEND environment variable); see get_backend_name().
+
+Each backend persists its own files inside the knowledge base's artifact
+directory (see index_store.py) and loads them memory-mapped.
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+from .lazy_imports import faiss, sentence_transformers, torch
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Embedding model configuration
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIMENSION = 384  # for all-MiniLM-L6-v2
+
+DEFAULT_BACKEND = 'embedding'
+
+# Process-wide embedding model (shared across Streamlit sessions/threads)
+_embedding_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """
+    Get the process-wide SentenceTransformer embedding model.
+
+    The model is loaded on first use and reused by every page and session.
+
+    Returns:
+        SentenceTransformer instance
+    """
+    global _embedding_model
+
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                # Use CPU device explicitly to avoid Meta tensor initialization errors
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                logger.info(f"Loading embedding model '{EMBEDDING_MODEL_NAME}' on {device}")
+                _embedding_model = sentence_transformers.SentenceTransformer(
+                    EMBEDDING_MODEL_NAME, device=device
+                )
+
+    return _embedding_model
+
+
+class RetrievalBackend:
+    """
+    Base class for retrieval backends.
+
+    Subclasses set name (config value and artifact subdirectory) and
+    model_name (stamped into the artifact manifest; a change invalidates
+    prebuilt indexes), and implement fit/search/save/load.
+    """
+
+    name = ''
+    model_name = ''
+
+    def fit(self, chunks: List[str]) -> None:
+        """Build the index over chunk texts."""
+        raise NotImplementedError
+
+    def search(self, queries: List[str], top_k: int) -> List[List[int]]:
+        """
+        Find the nearest chunks for each query.
+
+        Args:
+            queries: Query texts
+            top_k: Maximum number of chunk ids per query
+
+        Returns:
+            List (one per query) of chunk ids, most relevant first
+        """
+        raise NotImplementedError
+
+    def save(self, directory: Path) -> None:
+        """Write backend files into an artifact directory."""
+        raise NotImplementedError
+
+    def load(self, directory: Path) -> None:
+        """Load backend files from an artifact directory (memory-mapped where possible)."""
+        raise NotImplementedError
+
+    @property
+    def size(self) -> int:
+        """Number of indexed chunks."""
+        raise NotImplementedError
+
+
+class EmbeddingBackend(RetrievalBackend):
+    """SentenceTransformer embeddings searched with a FAISS flat L2 index."""
+
+    name = 'embedding'
+    model_name = EMBEDDING_MODEL_NAME
+
+    EMBEDDINGS_FILE = 'embeddings.npy'
+    INDEX_FILE = 'index.faiss'
+
+    def __init__(self):
+        """Initialize an empty embedding backend."""
+        self.embeddings: Optional[np.ndarray] = None
+        self.index = None
+
+    def fit(self, chunks: List[str]) -> None:
+        """Encode chunks and add them to a new FAISS index."""
+        self.embeddings = np.asarray(get_embedding_model().encode(chunks), dtype='float32')
+        self.index = faiss.IndexFlatL2(EMBEDDING_DIMENSION)
+        self.index.add(self.embeddings)
+
+    def search(self, queries: List[str], top_k: int) -> List[List[int]]:
+        """Encode all queries in one batch and run one FAISS search."""
+        if not queries:
+            return []
+        query_embeddings = get_embedding_model().encode(list(queries))
+        distances, indices = self.index.search(np.asarray(query_embeddings, dtype='float32'), top_k)
+        return [[int(i) for i in row if i >= 0] for row in indices]
+
+    def save(self, directory: Path) -> None:
+        """Write embeddings (.npy) and the serialized FAISS index."""
+        np.save(directory / self.EMBEDDINGS_FILE, self.embeddings)
+        faiss.write_index(self.index, str(directory / self.INDEX_FILE))
+
+    def load(self, directory: Path) -> None:
+        """Memory-map the embeddings and FAISS index."""
+        self.embeddings = np.load(directory / self.EMBEDDINGS_FILE, mmap_mode='r')
+        self.index = faiss.read_index(
+            str(directory / self.INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        if self.index.ntotal != self.embeddings.shape[0]:
+            raise ValueError("FAISS index and embeddings disagree on chunk count")
+
+    @property
+    def size(self) -> int:
+        return 0 if self.index is None else int(self.index.ntotal)
+
+
+class BM25Backend(RetrievalBackend):
+    """
+    Okapi BM25 over precomputed sparse term weights, in pure NumPy.
+
+    At build time every (term, chunk) weight
+        idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+    is computed once and stored term-major (CSC-style: indptr, chunk ids,
+    weights), so a query only sums the weight columns of its terms.
+    """
+
+    name = 'bm25'
+    model_name = 'bm25-k1.5-b0.75'
+
+    VOCAB_FILE = 'bm25_vocab.json'
+    INDPTR_FILE = 'bm25_indptr.npy'
+    CHUNK_IDS_FILE = 'bm25_chunk_ids.npy'
+    WEIGHTS_FILE = 'bm25_weights.npy'
+
+    K1 = 1.5
+    B = 0.75
+
+    _TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+    STOPWORDS = frozenset(
+        'a an and are as at be but by for from has have i if in is it its of on or so '
+        'that the their them they this to was we were what with you your'.split()
+    )
+
+    def __init__(self):
+        """Initialize an empty BM25 backend."""
+        self.vocabulary: Dict[str, int] = {}
+        self.indptr: Optional[np.ndarray] = None
+        self.chunk_ids: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self.chunk_count = 0
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lower-case word tokens without stopwords."""
+        return [token for token in cls._TOKEN.findall(text.lower()) if token not in cls.STOPWORDS]
+
+    def fit(self, chunks: List[str]) -> None:
+        """Compute BM25 weights for every (term, chunk) pair."""
+        term_counts = [Counter(self.tokenize(chunk)) for chunk in chunks]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype='float32')
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        postings: Dict[str, List[tuple]] = {}
+        for chunk_id, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+
+        self.vocabulary = {term: i for i, term in enumerate(sorted(postings))}
+        self.chunk_count = len(chunks)
+
+        indptr = [0]
+        chunk_ids: List[int] = []
+        weights: List[float] = []
+        for term in sorted(postings):
+            entries = postings[term]
+            idf = np.log(1.0 + (self.chunk_count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for chunk_id, tf in entries:
+                norm = tf + self.K1 * (1 - self.B + self.B * lengths[chunk_id] / avg_length)
+                weights.append(idf * tf * (self.K1 + 1) / norm)
+                chunk_ids.append(chunk_id)
+            indptr.append(len(chunk_ids))
+
+        self.indptr = np.asarray(indptr, dtype='int64')
+        self.chunk_ids = np.asarray(chunk_ids, dtype='int32')
+        self.weights = np.asarray(weights, dtype='float32')
+
+    def _score(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for one query."""
+        scores = np.zeros(self.chunk_count, dtype='float32')
+        for term, query_tf in Counter(self.tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # Chunk ids are unique within a term's postings
+            scores[self.chunk_ids[start:end]] += query_tf * self.weights[start:end]
+        return scores
+
+    def search(self, queries: List[str], top_k: int) -> List[List[int]]:
+        """Rank chunks by BM25 score; chunks sharing no query term are not returned."""
+        results = []
+        for query in queries:
+            scores = self._score(query)
+            k = min(top_k, self.chunk_count)
+            if k <= 0:
+                results.append([])
+                continue
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            # Stable tie-break on chunk id, matching document order
+            ranked = sorted(candidates, key=lambda i: (-scores[i], i))
+            results.append([int(i) for i in ranked if scores[i] > 0])
+        return results
+
+    def save(self, directory: Path) -> None:
+        """Write the vocabulary and the term-major weight arrays."""
+        with open(directory / self.VOCAB_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'terms': sorted(self.vocabulary, key=self.vocabulary.get),
+                       'chunk_count': self.chunk_count}, f)
+        np.save(directory / self.INDPTR_FILE, self.indptr)
+        np.save(directory / self.CHUNK_IDS_FILE, self.chunk_ids)
+        np.save(directory / self.WEIGHTS_FILE, self.weights)
+
+    def load(self, directory: Path) -> None:
+        """Load the vocabulary and memory-map the weight arrays."""
+        with open(directory / self.VOCAB_FILE, 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        self.vocabulary = {term: i for i, term in enumerate(vocab['terms'])}
+        self.chunk_count = vocab['chunk_count']
+        self.indptr = np.load(directory / self.INDPTR_FILE, mmap_mode='r')
+        self.chunk_ids = np.load(directory / self.CHUNK_IDS_FILE, mmap_mode='r')
+        self.weights = np.load(directory / self.WEIGHTS_FILE, mmap_mode='r')
+        if len(self.indptr) != len(self.vocabulary) + 1:
+            raise ValueError("BM25 vocabulary and postings disagree")
+
+    @property
+    def size(self) -> int:
+        return self.chunk_count
+
+
+BACKENDS: Dict[str, Type[RetrievalBackend]] = {
+    EmbeddingBackend.name: EmbeddingBackend,
+    BM25Backend.name: BM25Backend,
+}
+
+
+def get_backend_name() -> str:
+    """
+    Get the configured retrieval backend name.
+
+    Returns:
+        Backend name from config.json "retrieval.backend" (or RAG_BACKEND),
+        falling back to DEFAULT_BACKEND if unset or unknown
+    """
+    try:
+        from config_loader import get_config_loader
+        name = get_config_loader().get_retrieval_config().get('backend', DEFAULT_BACKEND)
+    except Exception as e:
+        logger.warning(f"Could not read retrieval config, using '{DEFAULT_BACKEND}': {e}")
+        return DEFAULT_BACKEND
+
+    if name not in BACKENDS:
+        logger.warning(f"Unknown retrieval backend '{name}', using '{DEFAULT_BACKEND}'")
+        return DEFAULT_BACKEND
+    return name
+
+
+def create_backend(name: Optional[str] = None) -> RetrievalBackend:
+    """
+    Create a retrieval backend instance.
+
+    Args:
+        name: Backend name (default: configured backend, see get_backend_name)
+
+    Returns:
+        Unfitted RetrievalBackend
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = name or get_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
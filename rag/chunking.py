@@ -0,0 +1,208 @@
+"""
+Rubric Text Chunking
+
+This module splits rubric .txt files into retrieval chunks in a single pass:
+- Sentences are packed into chunks of at most chunk_size characters, using a
+  running length instead of re-joining the chunk for every word
+- Consecutive chunks share up to overlap characters of trailing sentences, so
+  a criterion split across chunks is still retrievable from either side
+- Numbered section headings ("1. Evocation (...)") and separator lines
+  ("_____") start a new chunk, so chunks don't straddle rubric categories
+- Lines (speaker turns, bullets, "Feedback:" labels) are sentence boundaries;
+  only a single sentence longer than chunk_size is cut at words
+
+The chunk size and overlap used for the rubric indexes come from the
+"retrieval" section of config.json (chunk_size, chunk_overlap); see
+get_chunk_settings().
+
+split_text() is the previous word-packing implementation, kept for
+comparison in benchmarks/chunking.py.
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Iterator, List, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 240
+DEFAULT_OVERLAP = 40
+
+# Sentence end followed by whitespace
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+# Lines made only of separator characters (e.g. "________")
+_SEPARATOR_LINE = re.compile(r'^[\s_\-=*]{3,}$')
+# "1. Evocation (...)", "# Heading"
+_HEADING_LINE = re.compile(r'^(\d+\.\s+[A-Z]|#+\s)')
+
+# Marker yielded between sections; never part of a chunk
+_BREAK = None
+
+
+def _iter_units(text: str) -> Iterator[str]:
+    """
+    Yield sentence units, with _BREAK markers at section boundaries.
+
+    Args:
+        text: Rubric text
+
+    Yields:
+        Sentence strings, or _BREAK where a new chunk must start
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _SEPARATOR_LINE.match(line):
+            yield _BREAK
+            continue
+        if _HEADING_LINE.match(line):
+            yield _BREAK
+        # Bullets and speaker turns are already one unit per line
+        for sentence in _SENTENCE_END.split(line.lstrip('•').strip()):
+            if sentence:
+                yield sentence
+
+
+def _split_long_unit(unit: str, chunk_size: int) -> Iterator[str]:
+    """Cut a single over-long sentence into word-aligned pieces."""
+    piece: List[str] = []
+    length = 0
+    for word in unit.split():
+        added = len(word) + (1 if piece else 0)
+        if piece and length + added > chunk_size:
+            yield ' '.join(piece)
+            piece, length = [], 0
+            added = len(word)
+        piece.append(word)
+        length += added
+    if piece:
+        yield ' '.join(piece)
+
+
+def get_chunk_settings() -> Tuple[int, int]:
+    """
+    Get the configured chunk size and overlap.
+
+    Returns:
+        (chunk_size, chunk_overlap) from config.json "retrieval.chunk_size" and
+        "retrieval.chunk_overlap", falling back to the defaults if unset or invalid
+    """
+    try:
+        from config_loader import get_config_loader
+        retrieval = get_config_loader().get_retrieval_config()
+        chunk_size = int(retrieval.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        overlap = int(retrieval.get('chunk_overlap', DEFAULT_OVERLAP))
+    except Exception as e:
+        logger.warning(f"Could not read chunk settings, using defaults: {e}")
+        return DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP
+
+    if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+        logger.warning(
+            f"Invalid chunk settings (chunk_size={chunk_size}, chunk_overlap={overlap}), using defaults"
+        )
+        return DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP
+    return chunk_size, overlap
+
+
+def chunk_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               overlap: int = DEFAULT_OVERLAP) -> List[str]:
+    """
+    Split text into sentence-aligned chunks with overlap.
+
+    Runs in time linear in the input: each sentence is appended once, lengths
+    are tracked incrementally, and the overlap carried into the next chunk is
+    bounded by overlap characters.
+
+    Args:
+        text: Text to split
+        chunk_size: Maximum chunk length in characters
+        overlap: Maximum characters of trailing sentences repeated in the next
+                 chunk (must be smaller than chunk_size; 0 disables overlap)
+
+    Returns:
+        List of text chunks
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("overlap must be between 0 and chunk_size - 1")
+
+    chunks: List[str] = []
+    current: deque = deque()
+    length = 0      # len(' '.join(current))
+    fresh = False   # whether current holds anything beyond carried-over overlap
+
+    def emit():
+        nonlocal length, fresh
+        if fresh:
+            chunks.append(' '.join(current))
+        # Carry trailing sentences (up to overlap chars) into the next chunk
+        carried: List[str] = []
+        carried_length = 0
+        for sentence in reversed(current):
+            added = len(sentence) + (1 if carried else 0)
+            if carried_length + added > overlap:
+                break
+            carried.append(sentence)
+            carried_length += added
+        current.clear()
+        current.extend(reversed(carried))
+        length = carried_length
+        fresh = False
+
+    for unit in _iter_units(text):
+        if unit is _BREAK:
+            if fresh:
+                emit()
+            current.clear()
+            length = 0
+            continue
+
+        pieces = [unit] if len(unit) <= chunk_size else _split_long_unit(unit, chunk_size)
+        for piece in pieces:
+            added = len(piece) + (1 if current else 0)
+            if current and length + added > chunk_size:
+                if fresh:
+                    emit()
+                # Drop carried sentences until the piece fits
+                while current and length + len(piece) + 1 > chunk_size:
+                    dropped = current.popleft()
+                    length -= len(dropped) + (1 if current else 0)
+                added = len(piece) + (1 if current else 0)
+            current.append(piece)
+            length += added
+            fresh = True
+
+    if fresh:
+        chunks.append(' '.join(current))
+
+    return chunks
+
+
+def split_text(text: str, max_length: int = 200) -> List[str]:
+    """
+    Split text into word-aligned chunks of at most max_length characters.
+
+    Previous implementation (quadratic in chunk size, ignores sentences);
+    kept for benchmarking against chunk_text().
+
+    Args:
+        text: Text to split
+        max_length: Maximum chunk length in characters
+
+    Returns:
+        List of text chunks
+    """
+    words = text.split()
+    chunks, current_chunk = [], []
+    for word in words:
+        if len(" ".join(current_chunk + [word])) > max_length:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = []
+        current_chunk.append(word)
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return chunks
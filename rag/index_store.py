@@ -0,0 +1,270 @@
+"""
+On-Disk Prebuilt Rubric Index Store
+
+This module persists encoded rubric knowledge bases so that bot pages can
+memory-map a prebuilt index instead of encoding the rubric corpus at startup.
+
+Each knowledge base is stored in its own directory per retrieval backend:
+    rag_index/<backend>/<name>/
+    ├── manifest.json    # Format version, backend model, corpus hash, chunk settings, per-file hashes
+    ├── chunks.json      # Chunk texts, aligned with backend chunk ids
+    ├── retrievals.json  # Precomputed results for fixed queries (see retrieval_cache.py)
+    └── ...              # Backend files (see backends.py), e.g. for "embedding":
+                         # embeddings.npy (mmap) and index.faiss (IO_FLAG_MMAP)
+
+An artifact is only used when its manifest matches the current rubric content
+hash, backend model name, chunk size and overlap, and format version; otherwise it is ignored and the
+caller rebuilds it. Artifacts are written to a temporary directory and swapped
+into place so readers never observe a partially written index.
+
+The index directory defaults to rag_index/ at the repository root and can be
+overridden with the RAG_INDEX_DIR environment variable.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .backends import DEFAULT_BACKEND, RetrievalBackend
+from .chunking import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump when chunking or the stored layout changes so old artifacts are rebuilt
+FORMAT_VERSION = 4
+INDEX_DIR_ENV = 'RAG_INDEX_DIR'
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent / 'rag_index'
+
+MANIFEST_FILE = 'manifest.json'
+CHUNKS_FILE = 'chunks.json'
+RETRIEVALS_FILE = 'retrievals.json'
+
+
+def get_index_dir(index_dir: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Resolve the directory holding prebuilt indexes.
+
+    Args:
+        index_dir: Explicit directory (optional)
+
+    Returns:
+        Path from the argument, the RAG_INDEX_DIR environment variable, or the default
+    """
+    if index_dir is not None:
+        return Path(index_dir)
+    return Path(os.environ.get(INDEX_DIR_ENV, DEFAULT_INDEX_DIR))
+
+
+def get_artifact_dir(name: str, index_dir: Optional[Union[str, Path]] = None,
+                     backend_name: str = DEFAULT_BACKEND) -> Path:
+    """Get the artifact directory for a named knowledge base and backend."""
+    return get_index_dir(index_dir) / backend_name / name
+
+
+def hash_source_files(rubric_texts: List[Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Hash each rubric file individually for the manifest.
+
+    Args:
+        rubric_texts: List of (file_name, text) tuples
+
+    Returns:
+        Dict mapping file name to hex SHA-256 digest of its content
+    """
+    return {
+        name: hashlib.sha256(text.encode('utf-8')).hexdigest()
+        for name, text in rubric_texts
+    }
+
+
+def read_manifest(name: str, index_dir: Optional[Union[str, Path]] = None,
+                  backend_name: str = DEFAULT_BACKEND) -> Optional[Dict]:
+    """
+    Read an artifact manifest.
+
+    Returns:
+        Manifest dict, or None if missing or unreadable
+    """
+    manifest_path = get_artifact_dir(name, index_dir, backend_name) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Failed to read index manifest {manifest_path}: {e}")
+        return None
+
+
+def is_artifact_current(manifest: Optional[Dict], corpus_hash: str, model_name: str,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        chunk_overlap: int = DEFAULT_OVERLAP) -> bool:
+    """
+    Check whether a manifest matches the current corpus, model and chunking.
+
+    Args:
+        manifest: Manifest dict (or None)
+        corpus_hash: Current corpus content hash
+        model_name: Current backend model name
+        chunk_size: Current chunk size in characters
+        chunk_overlap: Current chunk overlap in characters
+
+    Returns:
+        bool: True if the artifact can be used as-is
+    """
+    return bool(
+        manifest
+        and manifest.get('format_version') == FORMAT_VERSION
+        and manifest.get('corpus_hash') == corpus_hash
+        and manifest.get('model_name') == model_name
+        and manifest.get('chunk_size') == chunk_size
+        and manifest.get('chunk_overlap') == chunk_overlap
+    )
+
+
+def write_artifact(
+    name: str,
+    corpus_hash: str,
+    backend: RetrievalBackend,
+    source_files: Dict[str, str],
+    chunks: List[str],
+    index_dir: Optional[Union[str, Path]] = None,
+    retrievals: Optional[List[Dict]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_OVERLAP
+) -> Path:
+    """
+    Persist a built knowledge base to disk.
+
+    Args:
+        name: Knowledge base name (rubric directory name)
+        corpus_hash: Corpus content hash the index was built from
+        backend: Fitted retrieval backend
+        source_files: Dict mapping rubric file name to content hash
+        chunks: Chunk texts
+        index_dir: Index directory (optional)
+        retrievals: Precomputed results as dicts with query, top_k and chunk_ids (optional)
+        chunk_size: Chunk size the chunks were split with
+        chunk_overlap: Chunk overlap the chunks were split with
+
+    Returns:
+        Path to the written artifact directory
+    """
+    artifact_dir = get_artifact_dir(name, index_dir, backend.name)
+    artifact_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{name}.", dir=artifact_dir.parent))
+    try:
+        # mkdtemp creates the directory 0700; workers under another uid must read it
+        os.chmod(staging_dir, 0o755)
+        with open(staging_dir / CHUNKS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(chunks, f, ensure_ascii=False)
+        backend.save(staging_dir)
+        with open(staging_dir / RETRIEVALS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(retrievals or [], f, ensure_ascii=False)
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'name': name,
+            'backend': backend.name,
+            'model_name': backend.model_name,
+            'corpus_hash': corpus_hash,
+            'source_files': source_files,
+            'chunk_size': chunk_size,
+            'chunk_overlap': chunk_overlap,
+            'chunk_count': len(chunks),
+            'built_at': datetime.now().isoformat(),
+        }
+        with open(staging_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the new artifact into place
+        retired_dir = None
+        if artifact_dir.exists():
+            retired_dir = artifact_dir.parent / f".{name}.retired.{os.getpid()}"
+            os.replace(artifact_dir, retired_dir)
+        os.replace(staging_dir, artifact_dir)
+        if retired_dir is not None:
+            shutil.rmtree(retired_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Wrote prebuilt {backend.name} index '{name}' to {artifact_dir} ({len(chunks)} chunks)")
+    return artifact_dir
+
+
+def read_artifact(
+    name: str,
+    corpus_hash: str,
+    backend: RetrievalBackend,
+    index_dir: Optional[Union[str, Path]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_OVERLAP
+) -> Optional[List[str]]:
+    """
+    Load a prebuilt knowledge base into an (unfitted) backend.
+
+    Args:
+        name: Knowledge base name
+        corpus_hash: Current corpus content hash
+        backend: Backend to load the index files into (memory-mapped)
+        index_dir: Index directory (optional)
+        chunk_size: Current chunk size in characters
+        chunk_overlap: Current chunk overlap in characters
+
+    Returns:
+        Chunk texts, or None if the artifact is missing, stale or inconsistent
+    """
+    manifest = read_manifest(name, index_dir, backend.name)
+    if not is_artifact_current(manifest, corpus_hash, backend.model_name, chunk_size, chunk_overlap):
+        if manifest:
+            logger.info(f"Prebuilt {backend.name} index '{name}' is stale, ignoring")
+        return None
+
+    artifact_dir = get_artifact_dir(name, index_dir, backend.name)
+    try:
+        with open(artifact_dir / CHUNKS_FILE, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        backend.load(artifact_dir)
+    except Exception as e:
+        logger.warning(f"Failed to load prebuilt index '{name}' from {artifact_dir}: {e}")
+        return None
+
+    if not (len(chunks) == manifest.get('chunk_count') == backend.size):
+        logger.warning(f"Prebuilt index '{name}' is inconsistent, ignoring")
+        return None
+
+    logger.info(f"Loaded prebuilt {backend.name} index '{name}' from {artifact_dir} ({len(chunks)} chunks)")
+    return chunks
+
+
+def read_retrievals(name: str, index_dir: Optional[Union[str, Path]] = None,
+                    backend_name: str = DEFAULT_BACKEND) -> List[Dict]:
+    """
+    Read the precomputed retrieval results stored with an artifact.
+
+    Args:
+        name: Knowledge base name
+        index_dir: Index directory (optional)
+        backend_name: Retrieval backend name
+
+    Returns:
+        List of dicts with query, top_k and chunk_ids (empty if unavailable)
+    """
+    retrievals_path = get_artifact_dir(name, index_dir, backend_name) / RETRIEVALS_FILE
+    if not retrievals_path.exists():
+        return []
+    try:
+        with open(retrievals_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Failed to read precomputed retrievals {retrievals_path}: {e}")
+        return []
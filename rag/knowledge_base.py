@@ -0,0 +1,468 @@
+"""
+Shared RAG Knowledge Base Registry
+
+This module provides a process-wide registry of rubric knowledge bases so that
+every Streamlit session and every bot page shares one index per rubric
+directory (hpv_rubrics/, ohi_rubrics/, ...) and retrieval backend (see
+backends.py: MiniLM embeddings + FAISS by default, or pure-NumPy BM25).
+
+Each knowledge base is keyed by a content hash of the rubric .txt files and
+the configured chunk size and overlap, so editing or adding a rubric file (or
+changing the chunking) transparently triggers a rebuild on the next request,
+while unchanged corpora are never re-encoded.
+
+On a registry miss, a prebuilt on-disk index (see index_store.py and
+build_rubric_index.py) is memory-mapped when it matches the current corpus;
+only when none is available is the corpus encoded, and the result is then
+persisted so other worker processes can map it too.
+
+Retrieval results are cached by (corpus hash, query, top_k); the fixed
+feedback and per-category queries are answered at build time (in one batched
+encode and search) and stored with the prebuilt index, so feedback
+generation needs no query embedding or index search.
+
+Usage:
+    from rag import get_knowledge_base, FEEDBACK_QUERY
+
+    knowledge_base = get_knowledge_base(rubrics_dir)
+    chunks = knowledge_base.retrieve(FEEDBACK_QUERY)
+    rag_context = knowledge_base.feedback_context()  # general + per-category chunks
+"""
+
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .backends import RetrievalBackend, create_backend, get_backend_name
+from .chunking import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, chunk_text, get_chunk_settings
+from .index_store import hash_source_files, read_artifact, read_retrievals, write_artifact
+from .retrieval_cache import (
+    CATEGORY_CANDIDATES,
+    CATEGORY_QUERIES,
+    FEEDBACK_QUERY,
+    PRECOMPUTED_QUERIES,
+    get_retrieval_cache,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 2
+
+# Process-wide state (shared across Streamlit sessions/threads)
+_knowledge_bases: Dict[str, 'KnowledgeBase'] = {}
+_registry_lock = threading.Lock()
+_build_locks: Dict[str, threading.Lock] = {}
+
+
+class KnowledgeBaseError(Exception):
+    """Raised when a rubric knowledge base cannot be loaded."""
+    pass
+
+
+def load_rubric_texts(rubrics_dir: Union[str, Path]) -> List[Tuple[str, str]]:
+    """
+    Load all rubric .txt files from a directory.
+
+    Args:
+        rubrics_dir: Directory containing rubric .txt files
+
+    Returns:
+        List of (file_name, text) tuples, sorted by file name
+
+    Raises:
+        KnowledgeBaseError: If the directory has no readable rubric files
+    """
+    rubrics_dir = Path(rubrics_dir)
+    if not rubrics_dir.is_dir():
+        raise KnowledgeBaseError(f"Rubric directory not found: {rubrics_dir}")
+
+    rubric_files = sorted(rubrics_dir.glob("*.txt"))
+    if not rubric_files:
+        raise KnowledgeBaseError(f"No .txt files found in {rubrics_dir}")
+
+    texts = []
+    for rubric_file in rubric_files:
+        try:
+            with open(rubric_file, "r", encoding="utf-8", errors="ignore") as f:
+                texts.append((rubric_file.name, f.read()))
+        except Exception as e:
+            logger.warning(f"Failed to read rubric file {rubric_file}: {e}")
+            continue
+
+    if not texts:
+        raise KnowledgeBaseError(f"Failed to load any rubric content from {rubrics_dir}")
+
+    return texts
+
+
+def compute_corpus_hash(rubric_texts: List[Tuple[str, str]]) -> str:
+    """
+    Compute a content hash for a rubric corpus.
+
+    Args:
+        rubric_texts: List of (file_name, text) tuples
+
+    Returns:
+        Hex SHA-256 digest over file names and contents
+    """
+    digest = hashlib.sha256()
+    for name, text in rubric_texts:
+        digest.update(name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class KnowledgeBase:
+    """Rubric chunks with their retrieval index for a single rubric directory."""
+
+    def __init__(self, name: str, corpus_hash: str, chunks: List[str],
+                 backend: RetrievalBackend,
+                 source_files: Optional[Dict[str, str]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 chunk_overlap: int = DEFAULT_OVERLAP):
+        """
+        Initialize knowledge base.
+
+        Args:
+            name: Knowledge base name (rubric directory name, e.g. "hpv_rubrics")
+            corpus_hash: Content hash of the rubric files the index was built from
+            chunks: Text chunks, aligned with backend chunk ids
+            backend: Fitted (or loaded) retrieval backend
+            source_files: Dict mapping rubric file name to content hash
+            chunk_size: Chunk size the chunks were split with
+            chunk_overlap: Chunk overlap the chunks were split with
+        """
+        self.name = name
+        self.corpus_hash = corpus_hash
+        self.chunks = chunks
+        self.backend = backend
+        self.source_files = source_files or {}
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.precomputed_retrievals: List[Dict] = []
+        # Results differ per backend and chunking, so cache entries are namespaced by them
+        self.cache_key = f"{backend.name}:{corpus_hash}:{chunk_size}/{chunk_overlap}"
+
+    @classmethod
+    def build(cls, name: str, rubric_texts: List[Tuple[str, str]],
+              corpus_hash: Optional[str] = None,
+              backend: Optional[RetrievalBackend] = None,
+              chunk_settings: Optional[Tuple[int, int]] = None) -> 'KnowledgeBase':
+        """
+        Chunk and index a rubric corpus into a new knowledge base.
+
+        Args:
+            name: Knowledge base name
+            rubric_texts: List of (file_name, text) tuples
+            corpus_hash: Precomputed corpus hash (computed if omitted)
+            backend: Unfitted retrieval backend (default: configured backend)
+            chunk_settings: (chunk_size, chunk_overlap) (default: configured, see get_chunk_settings)
+
+        Returns:
+            KnowledgeBase instance
+        """
+        corpus_hash = corpus_hash or compute_corpus_hash(rubric_texts)
+        backend = backend or create_backend()
+        chunk_size, chunk_overlap = chunk_settings or get_chunk_settings()
+
+        # Combine all documents into a single knowledge text
+        knowledge_text = "\n\n".join(text for _, text in rubric_texts)
+        chunks = chunk_text(knowledge_text, chunk_size, chunk_overlap)
+        backend.fit(chunks)
+
+        logger.info(
+            f"Built {backend.name} knowledge base '{name}': {len(chunks)} chunks, hash={corpus_hash[:12]}"
+        )
+        knowledge_base = cls(name, corpus_hash, chunks, backend, hash_source_files(rubric_texts),
+                             chunk_size, chunk_overlap)
+        knowledge_base.precompute_retrievals()
+        return knowledge_base
+
+    @classmethod
+    def load(cls, name: str, rubric_texts: List[Tuple[str, str]],
+             corpus_hash: Optional[str] = None,
+             index_dir: Optional[Union[str, Path]] = None,
+             backend: Optional[RetrievalBackend] = None,
+             chunk_settings: Optional[Tuple[int, int]] = None) -> Optional['KnowledgeBase']:
+        """
+        Load a prebuilt knowledge base from disk if it matches the corpus and chunking.
+
+        Args:
+            name: Knowledge base name
+            rubric_texts: List of (file_name, text) tuples
+            corpus_hash: Precomputed corpus hash (computed if omitted)
+            index_dir: Index directory (optional, see index_store.get_index_dir)
+            backend: Unfitted retrieval backend (default: configured backend)
+            chunk_settings: (chunk_size, chunk_overlap) (default: configured, see get_chunk_settings)
+
+        Returns:
+            KnowledgeBase with a memory-mapped index, or None if unavailable
+        """
+        corpus_hash = corpus_hash or compute_corpus_hash(rubric_texts)
+        backend = backend or create_backend()
+        chunk_size, chunk_overlap = chunk_settings or get_chunk_settings()
+        chunks = read_artifact(name, corpus_hash, backend, index_dir, chunk_size, chunk_overlap)
+        if chunks is None:
+            return None
+
+        knowledge_base = cls(name, corpus_hash, chunks, backend, hash_source_files(rubric_texts),
+                             chunk_size, chunk_overlap)
+        knowledge_base.seed_retrievals(read_retrievals(name, index_dir, backend.name))
+        return knowledge_base
+
+    def save(self, index_dir: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Persist this knowledge base as a prebuilt on-disk index.
+
+        Args:
+            index_dir: Index directory (optional, see index_store.get_index_dir)
+
+        Returns:
+            Path to the written artifact directory
+        """
+        return write_artifact(
+            self.name, self.corpus_hash, self.backend, self.source_files,
+            self.chunks, index_dir, self.precomputed_retrievals,
+            self.chunk_size, self.chunk_overlap
+        )
+
+    def matches(self, corpus_hash: str, chunk_settings: Tuple[int, int]) -> bool:
+        """Check whether this knowledge base was built from a corpus with the given chunk settings."""
+        return self.corpus_hash == corpus_hash and (self.chunk_size, self.chunk_overlap) == tuple(chunk_settings)
+
+    def precompute_retrievals(self, queries: Optional[List[Tuple[str, int]]] = None) -> None:
+        """
+        Answer fixed queries now so they never need a query embedding later.
+
+        Args:
+            queries: List of (query, top_k) tuples (default: PRECOMPUTED_QUERIES)
+        """
+        queries = PRECOMPUTED_QUERIES if queries is None else queries
+        self.precomputed_retrievals = []
+        for top_k in sorted({top_k for _, top_k in queries}):
+            batch = [query for query, k in queries if k == top_k]
+            for query, chunk_ids in zip(batch, self.backend.search(batch, top_k)):
+                self.precomputed_retrievals.append(
+                    {'query': query, 'top_k': top_k, 'chunk_ids': chunk_ids}
+                )
+        self.seed_retrievals(self.precomputed_retrievals)
+
+    def seed_retrievals(self, retrievals: List[Dict]) -> None:
+        """
+        Load precomputed retrieval results into the process-wide cache.
+
+        Args:
+            retrievals: List of dicts with query, top_k and chunk_ids
+        """
+        cache = get_retrieval_cache()
+        for retrieval in retrievals:
+            chunk_ids = retrieval.get('chunk_ids', [])
+            if any(not 0 <= i < len(self.chunks) for i in chunk_ids):
+                logger.warning(f"Ignoring out-of-range precomputed retrieval for '{self.name}'")
+                continue
+            cache.put(self.cache_key, retrieval['query'], retrieval['top_k'],
+                      self._chunks_for(chunk_ids))
+        self.precomputed_retrievals = list(retrievals)
+
+    def _chunks_for(self, chunk_ids: List[int]) -> List[str]:
+        """Map chunk ids to texts, dropping repeated texts (keeps rank order)."""
+        return list(dict.fromkeys(self.chunks[i] for i in chunk_ids))
+
+    def retrieve(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[str]:
+        """
+        Retrieve the chunks most similar to a query.
+
+        Results are served from the retrieval cache when available.
+
+        Args:
+            query: Query text
+            top_k: Number of chunks to return
+
+        Returns:
+            List of chunk texts, most similar first
+        """
+        return self.retrieve_many([query], top_k)[query]
+
+    def retrieve_many(self, queries: List[str], top_k: int = DEFAULT_TOP_K) -> Dict[str, List[str]]:
+        """
+        Retrieve chunks for several queries with one batched backend search.
+
+        Cached queries are served from the retrieval cache; the rest are
+        searched together (for the embedding backend: one encode call and one
+        FAISS search).
+
+        Args:
+            queries: Query texts (duplicates are answered once)
+            top_k: Number of chunks to return per query
+
+        Returns:
+            Dict mapping each query to its de-duplicated chunk texts, most similar first
+        """
+        cache = get_retrieval_cache()
+        results: Dict[str, List[str]] = {}
+        pending: List[str] = []
+        for query in dict.fromkeys(queries):
+            chunks = cache.get(self.cache_key, query, top_k)
+            if chunks is None:
+                pending.append(query)
+            else:
+                results[query] = chunks
+
+        for query, chunk_ids in zip(pending, self.backend.search(pending, top_k) if pending else []):
+            chunks = self._chunks_for(chunk_ids)
+            cache.put(self.cache_key, query, top_k, chunks)
+            results[query] = chunks
+
+        return {query: results[query] for query in dict.fromkeys(queries)}
+
+    def retrieve_by_category(self, top_k: int = 1,
+                             exclude: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Retrieve chunks for each rubric category in MIRubric.CATEGORIES.
+
+        Each chunk is assigned to at most one category (the first, in rubric
+        order, that ranks it), so the combined context has no repeats.
+
+        Args:
+            top_k: Number of chunks per category
+            exclude: Chunk texts already in the context (optional)
+
+        Returns:
+            Dict mapping category name to its chunk texts
+        """
+        exclude = exclude or []
+        candidates = max(CATEGORY_CANDIDATES, top_k * len(CATEGORY_QUERIES) + len(exclude))
+        results = self.retrieve_many(list(CATEGORY_QUERIES.values()), candidates)
+
+        seen = set(exclude)
+        by_category = {}
+        for category, query in CATEGORY_QUERIES.items():
+            picked = [chunk for chunk in results[query] if chunk not in seen][:top_k]
+            seen.update(picked)
+            by_category[category] = picked
+        return by_category
+
+    def feedback_context(self, top_k: int = DEFAULT_TOP_K, category_top_k: int = 1) -> str:
+        """
+        Build the RAG context for the evaluation prompt.
+
+        Combines the general feedback-rubric chunks with one labelled section
+        per rubric category. All queries are answered by one batched search
+        (or from the precomputed results stored with the index).
+
+        Args:
+            top_k: Number of general feedback chunks
+            category_top_k: Number of chunks per category
+
+        Returns:
+            Context text for FeedbackFormatter.format_evaluation_prompt
+        """
+        candidates = max(CATEGORY_CANDIDATES, category_top_k * len(CATEGORY_QUERIES) + top_k)
+        # Warm the cache for all queries in a single batch
+        general = self.retrieve_many([FEEDBACK_QUERY, *CATEGORY_QUERIES.values()], candidates)
+        general_chunks = general[FEEDBACK_QUERY][:top_k]
+
+        lines = list(general_chunks)
+        for category, chunks in self.retrieve_by_category(category_top_k, general_chunks).items():
+            if chunks:
+                lines.append(f"{category}:")
+                lines.extend(chunks)
+        return "\n".join(lines)
+
+    def category_contexts(self, top_k: int = DEFAULT_TOP_K) -> Dict[str, str]:
+        """
+        Build one RAG context per rubric category for per-category evaluation.
+
+        Unlike feedback_context, each category gets its own top chunks even if
+        another category ranks them too, since every prompt is sent alone.
+
+        Args:
+            top_k: Number of chunks per category
+
+        Returns:
+            Dict mapping category name to context text for
+            FeedbackFormatter.format_category_evaluation_prompt
+        """
+        results = self.retrieve_many(list(CATEGORY_QUERIES.values()), max(CATEGORY_CANDIDATES, top_k))
+        return {
+            category: "\n".join(results[query][:top_k])
+            for category, query in CATEGORY_QUERIES.items()
+        }
+
+
+def get_knowledge_base(rubrics_dir: Union[str, Path], persist: bool = True,
+                       backend_name: Optional[str] = None) -> KnowledgeBase:
+    """
+    Get the shared knowledge base for a rubric directory, building it if needed.
+
+    The rubric files are hashed on every call; the cached index is reused as
+    long as the hash and chunk settings match, and reloaded once (per process)
+    when either changes.
+    Concurrent callers for the same directory wait for a single load.
+
+    On a miss, a matching prebuilt index is memory-mapped from disk; otherwise
+    the corpus is indexed and, when persist is True, written to disk.
+
+    Args:
+        rubrics_dir: Directory containing rubric .txt files
+        persist: Whether to write a freshly built index to disk (default: True)
+        backend_name: Retrieval backend (default: configured backend, see backends.py)
+
+    Returns:
+        KnowledgeBase instance
+
+    Raises:
+        KnowledgeBaseError: If the rubric files cannot be loaded
+    """
+    rubrics_dir = Path(rubrics_dir).resolve()
+    backend_name = backend_name or get_backend_name()
+    key = f"{backend_name}:{rubrics_dir}"
+
+    rubric_texts = load_rubric_texts(rubrics_dir)
+    corpus_hash = compute_corpus_hash(rubric_texts)
+    chunk_settings = get_chunk_settings()
+
+    with _registry_lock:
+        knowledge_base = _knowledge_bases.get(key)
+        if knowledge_base is not None and knowledge_base.matches(corpus_hash, chunk_settings):
+            return knowledge_base
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        # Another thread may have finished the build while we waited
+        knowledge_base = _knowledge_bases.get(key)
+        if knowledge_base is not None and knowledge_base.matches(corpus_hash, chunk_settings):
+            return knowledge_base
+
+        knowledge_base = KnowledgeBase.load(
+            rubrics_dir.name, rubric_texts, corpus_hash, backend=create_backend(backend_name),
+            chunk_settings=chunk_settings
+        )
+        if knowledge_base is None:
+            knowledge_base = KnowledgeBase.build(
+                rubrics_dir.name, rubric_texts, corpus_hash, backend=create_backend(backend_name),
+                chunk_settings=chunk_settings
+            )
+            if persist:
+                try:
+                    knowledge_base.save()
+                except Exception as e:
+                    # A read-only deploy still works, it just can't share the index
+                    logger.warning(f"Could not persist index '{knowledge_base.name}': {e}")
+
+        with _registry_lock:
+            _knowledge_bases[key] = knowledge_base
+
+    return knowledge_base
+
+
+def clear_knowledge_bases() -> None:
+    """Drop all cached knowledge bases and retrieval results (for testing or forced rebuilds)."""
+    with _registry_lock:
+        _knowledge_bases.clear()
+    get_retrieval_cache().clear()
@@ -0,0 +1,73 @@
+"""
+Deferred Imports for Heavy Retrieval Dependencies
+
+faiss, torch and sentence_transformers add seconds to process startup, but
+only the bot pages need them, and only once retrieval is first used. This
+module provides a module proxy that performs the real import on first
+attribute access, so importing the rag package (and anything that imports it,
+such as chat_utils) stays cheap for the portal and developer pages.
+
+Usage:
+    from .lazy_imports import faiss
+
+    index = faiss.IndexFlatL2(384)  # faiss is imported here, not at module load
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """Proxy that imports a module on first attribute access."""
+
+    def __init__(self, module_name: str):
+        """
+        Initialize lazy module proxy.
+
+        Args:
+            module_name: Fully qualified module name to import on demand
+        """
+        self._module_name = module_name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Import the module if needed and return it.
+
+        Returns:
+            The imported module
+        """
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._module_name)
+                    logger.info(
+                        f"Imported {self._module_name} in {(time.perf_counter() - start) * 1000:.0f} ms"
+                    )
+                    self._module = module
+        return self._module
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the module has been imported (by this proxy or elsewhere)."""
+        return self._module is not None or self._module_name in sys.modules
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<LazyModule '{self._module_name}' ({state})>"
+
+
+faiss = LazyModule('faiss')
+torch = LazyModule('torch')
+sentence_transformers = LazyModule('sentence_transformers')
@@ -0,0 +1,120 @@
+"""
+Retrieval Result Cache
+
+This module caches retrieval results keyed by (corpus hash, query, top_k).
+Because a result depends only on the rubric corpus, the fixed feedback query
+can be answered without computing a query embedding or searching the index.
+
+The cache is process-wide, thread-safe and bounded with LRU eviction. It is
+seeded from the precomputed results stored with each prebuilt index (see
+index_store.py) and whenever a knowledge base is built in-process.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from rubric.mi_rubric import CategoryAssessment, MIRubric
+
+# Query used by every bot page when generating session feedback
+FEEDBACK_QUERY = "motivational interviewing feedback rubric"
+
+
+def _build_category_queries() -> Dict[str, str]:
+    """One retrieval query per rubric category, from its Fully Met criteria."""
+    queries = {}
+    for category, definition in MIRubric.CATEGORIES.items():
+        criteria = definition['criteria'].get(CategoryAssessment.FULLY_MET, [])
+        criteria_text = '; '.join(criteria).replace('{context}', 'the health topic')
+        queries[category] = f"{category}: {criteria_text}"
+    return queries
+
+
+# Per-category queries used for the feedback context (see KnowledgeBase.feedback_context)
+CATEGORY_QUERIES: Dict[str, str] = _build_category_queries()
+
+# Candidates searched per query when assigning de-duplicated chunks to categories:
+# enough for one chunk per category plus the general feedback chunks
+CATEGORY_CANDIDATES = len(CATEGORY_QUERIES) + 2
+
+# Queries answered at index-build time: (query, top_k)
+PRECOMPUTED_QUERIES: List[Tuple[str, int]] = [(FEEDBACK_QUERY, 2)] + [
+    (query, CATEGORY_CANDIDATES) for query in [FEEDBACK_QUERY, *CATEGORY_QUERIES.values()]
+]
+
+DEFAULT_MAX_ENTRIES = 256
+
+CacheKey = Tuple[str, str, int]
+
+
+class RetrievalCache:
+    """Thread-safe LRU cache of retrieved chunk lists."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize retrieval cache.
+
+        Args:
+            max_entries: Maximum number of cached results before LRU eviction
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[CacheKey, List[str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, corpus_hash: str, query: str, top_k: int) -> Optional[List[str]]:
+        """
+        Look up a cached result.
+
+        Returns:
+            Copy of the cached chunk list, or None on a miss
+        """
+        key = (corpus_hash, query, top_k)
+        with self._lock:
+            chunks = self._entries.get(key)
+            if chunks is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(chunks)
+
+    def put(self, corpus_hash: str, query: str, top_k: int, chunks: List[str]) -> None:
+        """Store a result, evicting the least recently used entries if full."""
+        key = (corpus_hash, query, top_k)
+        with self._lock:
+            self._entries[key] = list(chunks)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Process-wide cache shared by all knowledge bases
+_retrieval_cache = RetrievalCache()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Get the process-wide retrieval cache."""
+    return _retrieval_cache
@@ -0,0 +1,85 @@
+"""
+Background Warm-Up of Retrieval Dependencies
+
+The portal page never needs embeddings, but the bot page a student lands on
+next does. Once the portal has rendered, start_warm_up() loads every bot's
+knowledge base in a daemon thread (for the embedding backend, after importing
+faiss, torch and sentence_transformers and loading the model), so the first
+bot page finds everything ready instead of paying for it on the request path.
+
+The warm-up runs at most once per process; later calls are no-ops.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .backends import EmbeddingBackend, get_backend_name, get_embedding_model
+from .knowledge_base import KnowledgeBaseError, get_knowledge_base
+from .lazy_imports import faiss
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BOT_RUBRIC_DIRS = ['hpv_rubrics', 'ohi_rubrics', 'perio_rubrics', 'tobacco_rubrics']
+
+_warm_up_thread: Optional[threading.Thread] = None
+_warm_up_lock = threading.Lock()
+
+
+def warm_up(rubric_dirs: Optional[List[str]] = None) -> None:
+    """
+    Import retrieval dependencies and load all bot knowledge bases.
+
+    Failures are logged and never raised; the bot pages will retry on demand.
+
+    Args:
+        rubric_dirs: Rubric directories relative to the repository root
+                     (default: BOT_RUBRIC_DIRS)
+    """
+    start = time.perf_counter()
+    backend_name = get_backend_name()
+    if backend_name == EmbeddingBackend.name:
+        try:
+            faiss.load()
+            get_embedding_model()
+        except Exception as e:
+            logger.warning(f"RAG warm-up could not load retrieval dependencies: {e}")
+            return
+
+    for rubric_dir in rubric_dirs or BOT_RUBRIC_DIRS:
+        try:
+            get_knowledge_base(REPO_ROOT / rubric_dir, backend_name=backend_name)
+        except KnowledgeBaseError as e:
+            logger.warning(f"RAG warm-up skipped {rubric_dir}: {e}")
+        except Exception as e:
+            logger.warning(f"RAG warm-up failed for {rubric_dir}: {e}")
+
+    logger.info(f"RAG warm-up finished in {time.perf_counter() - start:.1f}s")
+
+
+def start_warm_up(rubric_dirs: Optional[List[str]] = None) -> bool:
+    """
+    Start warm_up() in a background daemon thread (once per process).
+
+    Args:
+        rubric_dirs: Rubric directories relative to the repository root (optional)
+
+    Returns:
+        bool: True if a new warm-up thread was started
+    """
+    global _warm_up_thread
+
+    with _warm_up_lock:
+        if _warm_up_thread is not None:
+            return False
+        _warm_up_thread = threading.Thread(
+            target=warm_up, args=(rubric_dirs,), name='rag-warm-up', daemon=True
+        )
+        _warm_up_thread.start()
+
+    logger.info("Started background RAG warm-up")
+    return True
@@ -0,0 +1,512 @@
+"""
+Client-Side Rate Limiting for Groq Calls
+
+A lab of students sharing one API key used to send every turn and
+evaluation straight to the API; bursts exceeded the key's limits and the
+resulting 429s surfaced as raw exceptions.
+
+Every chat completion from chat_utils now goes through
+rate_limited_completion(), which:
+- Waits for a per-key token bucket that tracks both requests per minute and
+  tokens per minute (prompt estimate plus max_tokens, corrected with the
+  reported usage afterwards)
+- Queues waiting callers by priority, so in-conversation turns
+  (PRIORITY_TURN) are served before bulk evaluation jobs
+  (PRIORITY_EVALUATION)
+- Retries 429 and transient 5xx responses with jittered exponential
+  backoff; a Retry-After header is honoured, and a 429 pauses the whole key
+  so queued callers do not walk into the same limit
+- Records queue depth, wait time, throttles and retries (get_metrics())
+
+Limits are per process: replicas sharing a key each apply their own
+buckets, and the limiters of the max_keys most recently used keys are kept
+(LRU, like llm_client.GroqClientPool). Settings come from the "rate_limits"
+section of config.json and are applied again when the shared config loader
+reloads the file. The token buckets are off by default: set
+rate_limits.enabled and the key's actual limits to turn them on. The
+429/5xx retries with backoff apply either way.
+"""
+
+import email.utils
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from conversation_window import estimate_message_tokens
+from llm_client import hash_api_key
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Queue priorities (lower is served first)
+PRIORITY_TURN = 0
+PRIORITY_EVALUATION = 10
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Defaults for the "rate_limits" section of config.json
+DEFAULT_ENABLED = False
+DEFAULT_MAX_KEYS = 256
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 6000
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_BASE_SECONDS = 1.0
+DEFAULT_BACKOFF_MAX_SECONDS = 30.0
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 60.0
+# Completion tokens assumed for a request without max_tokens
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request waits in the rate limit queue longer than allowed."""
+    pass
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity."""
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            capacity: Maximum tokens (burst size)
+            refill_per_second: Tokens added per second
+            now: Current monotonic time
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens are available (0 if available now)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.refill_per_second)
+
+    def consume(self, amount: float, now: float) -> None:
+        """Take amount tokens (call after wait_time() returned 0)."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def set_rate(self, capacity: float, refill_per_second: float, now: float) -> None:
+        """Change the capacity and refill rate, keeping the current level (at most the new capacity)."""
+        self._refill(now)
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = min(self.level, capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Return (positive) or take (negative) tokens; the level may go into debt."""
+        self.level = min(self.capacity, self.level + delta)
+
+
+class KeyRateLimiter:
+    """Request and token buckets plus a priority wait queue for one API key."""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the limiter with full buckets.
+
+        Args:
+            requests_per_minute: Request limit of the key
+            tokens_per_minute: Token limit of the key
+            clock: Monotonic clock (injectable for tests)
+        """
+        self._clock = clock
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, now)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, now)
+        self._blocked_until = now
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+        # Metrics
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.throttled = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_TURN,
+                timeout: float = DEFAULT_QUEUE_TIMEOUT_SECONDS) -> float:
+        """
+        Wait until the key can take one request of the given size.
+
+        Waiters are served strictly in (priority, arrival) order.
+
+        Args:
+            tokens: Estimated tokens of the request
+            priority: PRIORITY_TURN or PRIORITY_EVALUATION
+            timeout: Maximum seconds to wait
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the request could not be admitted in time
+        """
+        with self._cond:
+            start = self._clock()
+            deadline = start + timeout
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            blocked = False
+            try:
+                while True:
+                    now = self._clock()
+                    delay = None
+                    if self._queue[0] == entry:
+                        delay = max(
+                            self._blocked_until - now,
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(tokens, now),
+                        )
+                        if delay <= 0:
+                            self.requests.consume(1, now)
+                            self.tokens.consume(tokens, now)
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise RateLimitTimeout(
+                            f"Rate limit queue wait exceeded {timeout:.0f}s"
+                        )
+                    blocked = True
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+            waited = now - start if blocked else 0.0
+            self.acquired += 1
+            if blocked:
+                self.waited += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known."""
+        with self._cond:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def set_limits(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """Apply new request and token limits (after a config reload)."""
+        with self._cond:
+            now = self._clock()
+            self.requests.set_rate(requests_per_minute, requests_per_minute / 60.0, now)
+            self.tokens.set_rate(tokens_per_minute, tokens_per_minute / 60.0, now)
+            self._cond.notify_all()
+
+    def defer(self, seconds: float) -> None:
+        """Admit no request for the given time (after a 429 from the server)."""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+            self.throttled += 1
+
+    def record_retry(self) -> None:
+        """Count a retried request."""
+        with self._cond:
+            self.retries += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue and wait metrics for this key."""
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'requests': self.acquired,
+                'waited': self.waited,
+                'total_wait_seconds': self.total_wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'timeouts': self.timeouts,
+            }
+
+
+class RateLimiter:
+    """Per-key limiters and the retry policy, configured from config.json."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            settings: rate_limits settings (default: get_config_loader().get_rate_limit_config(),
+                re-read whenever the loader reloads config.json)
+        """
+        # Limiters built from config.json follow its reloads (see refresh())
+        self._follows_config = settings is None
+        self._config_loader = None
+        if settings is None:
+            self._config_loader, settings = _load_rate_limit_config()
+        self._apply_settings(settings)
+        self._limiters: 'OrderedDict[str, KeyRateLimiter]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Metrics of evicted limiters, so totals do not drop on eviction
+        self._evicted_metrics: List[Dict[str, Any]] = []
+        self.evictions = 0
+
+    def _apply_settings(self, settings: Dict[str, Any]) -> None:
+        """Read the rate_limits settings into the limiter's attributes."""
+        self.settings = settings
+        self.enabled = bool(settings.get('enabled', DEFAULT_ENABLED))
+        self.max_keys = int(settings.get('max_keys', DEFAULT_MAX_KEYS))
+        self.requests_per_minute = float(settings.get('requests_per_minute', DEFAULT_REQUESTS_PER_MINUTE))
+        self.tokens_per_minute = float(settings.get('tokens_per_minute', DEFAULT_TOKENS_PER_MINUTE))
+        self.max_retries = int(settings.get('max_retries', DEFAULT_MAX_RETRIES))
+        self.backoff_base_seconds = float(settings.get('backoff_base_seconds', DEFAULT_BACKOFF_BASE_SECONDS))
+        self.backoff_max_seconds = float(settings.get('backoff_max_seconds', DEFAULT_BACKOFF_MAX_SECONDS))
+        self.queue_timeout_seconds = float(settings.get('queue_timeout_seconds', DEFAULT_QUEUE_TIMEOUT_SECONDS))
+
+    def refresh(self) -> None:
+        """
+        Apply the current rate_limits settings if config.json was reloaded.
+
+        Only limiters built from config.json are refreshed; ones given
+        explicit settings keep them. Existing key limiters keep their
+        queues and counters and switch to the new limits.
+        """
+        if not self._follows_config:
+            return
+        loader, settings = _load_rate_limit_config()
+        if loader is None or loader is self._config_loader:
+            return
+        with self._lock:
+            if loader is self._config_loader:
+                return
+            self._config_loader = loader
+            if settings == self.settings:
+                return
+            self._apply_settings(settings)
+            for limiter in self._limiters.values():
+                limiter.set_limits(self.requests_per_minute, self.tokens_per_minute)
+        logger.info("Applied reloaded rate limit config")
+
+    def for_key(self, api_key: Optional[str]) -> KeyRateLimiter:
+        """
+        Get the limiter of an API key (keyed by its hash), creating it on first use.
+
+        Beyond max_keys, the least recently used limiters without waiting
+        callers are dropped; a key seen again starts with full buckets.
+        """
+        key_hash = hash_api_key(api_key) if isinstance(api_key, str) and api_key else 'default'
+        with self._lock:
+            limiter = self._limiters.get(key_hash)
+            if limiter is not None:
+                self._limiters.move_to_end(key_hash)
+                return limiter
+
+            limiter = KeyRateLimiter(self.requests_per_minute, self.tokens_per_minute)
+            self._limiters[key_hash] = limiter
+            if len(self._limiters) > self.max_keys:
+                idle = [h for h, other in self._limiters.items()
+                        if other is not limiter and other.get_metrics()['queue_depth'] == 0]
+                for evicted_hash in idle[:len(self._limiters) - self.max_keys]:
+                    self._evicted_metrics.append(self._limiters.pop(evicted_hash).get_metrics())
+                    self.evictions += 1
+                    logger.info(f"Evicted rate limiter for key {evicted_hash[:8]}")
+                if len(self._evicted_metrics) > 1:
+                    self._evicted_metrics = [_sum_metrics(self._evicted_metrics)]
+            return limiter
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get metrics summed over all keys (including evicted ones)."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+            evicted = list(self._evicted_metrics)
+        per_key = [limiter.get_metrics() for limiter in limiters]
+        total = _sum_metrics(per_key + evicted)
+        total['queue_depth'] = sum(metrics['queue_depth'] for metrics in per_key)
+        total['keys'] = len(per_key)
+        total['evictions'] = self.evictions
+        total['avg_wait_seconds'] = (total['total_wait_seconds'] / total['waited']) if total['waited'] else 0.0
+        return total
+
+
+def _sum_metrics(per_key: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine KeyRateLimiter.get_metrics() dicts (sums, and maxima for the max_ fields)."""
+    total = {
+        name: sum(metrics[name] for metrics in per_key)
+        for name in ('queue_depth', 'requests', 'waited', 'total_wait_seconds',
+                     'throttled', 'retries', 'timeouts')
+    }
+    total['max_queue_depth'] = max((m['max_queue_depth'] for m in per_key), default=0)
+    total['max_wait_seconds'] = max((m['max_wait_seconds'] for m in per_key), default=0.0)
+    return total
+
+
+def _load_rate_limit_config() -> Tuple[Any, Dict[str, Any]]:
+    """
+    Read the "rate_limits" section of config.json, falling back to defaults.
+
+    Returns:
+        tuple: (the shared ConfigLoader it was read from or None, settings)
+    """
+    try:
+        from config_loader import get_config_loader
+        loader = get_config_loader()
+        return loader, loader.get_rate_limit_config()
+    except Exception as e:
+        logger.warning(f"Could not read rate limit config, using defaults: {e}")
+        return None, {}
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Get the HTTP status code of an API exception, if any."""
+    status = getattr(error, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After delay of an API exception.
+
+    Args:
+        error: Exception raised by the client (e.g. groq.RateLimitError)
+
+    Returns:
+        float: Seconds to wait, or None if the response has no usable header
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms is not None:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get('retry-after')
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+            return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_backoff(attempt: int, retry_after: Optional[float], base_seconds: float,
+                    max_seconds: float) -> float:
+    """
+    Compute the delay before a retry.
+
+    Without Retry-After the delay is drawn uniformly from the upper half of
+    base * 2**attempt (capped at max_seconds). With Retry-After the server's
+    delay is honoured and up to base_seconds of jitter is added, so callers
+    throttled together do not all retry at the same instant.
+
+    Args:
+        attempt: Retry number (0 for the first retry)
+        retry_after: Server-requested delay in seconds, or None
+        base_seconds: Backoff base
+        max_seconds: Backoff cap (not applied to Retry-After)
+
+    Returns:
+        float: Seconds to wait
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base_seconds)
+    ceiling = min(max_seconds, base_seconds * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Estimate the tokens a chat completion counts against the TPM limit."""
+    prompt_tokens = sum(estimate_message_tokens(message) for message in kwargs.get('messages', []))
+    return prompt_tokens + int(kwargs.get('max_tokens') or DEFAULT_COMPLETION_TOKENS)
+
+
+def rate_limited_completion(client, priority: int = PRIORITY_TURN, **kwargs):
+    """
+    Create a chat completion through the rate limiter.
+
+    When rate_limits.enabled is false the request is not queued, but
+    429/5xx responses are still retried with backoff.
+
+    Args:
+        client: Groq API client
+        priority: PRIORITY_TURN or PRIORITY_EVALUATION
+        **kwargs: Arguments for client.chat.completions.create (stream=True supported)
+
+    Returns:
+        The completion (or stream) returned by the client
+
+    Raises:
+        RateLimitTimeout: If the request waited too long in the queue
+        Exception: The client's error once retries are exhausted or not retryable
+    """
+    rate_limiter = get_rate_limiter()
+    limiter = rate_limiter.for_key(getattr(client, 'api_key', None))
+    estimated_tokens = estimate_request_tokens(kwargs)
+    attempt = 0
+    while True:
+        if rate_limiter.enabled:
+            waited = limiter.acquire(estimated_tokens, priority, rate_limiter.queue_timeout_seconds)
+            if waited > 0.5:
+                logger.info(f"Rate limiter delayed request by {waited:.1f}s (priority {priority})")
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            status = get_status_code(e)
+            if status not in RETRYABLE_STATUS_CODES or attempt >= rate_limiter.max_retries:
+                raise
+            delay = compute_backoff(
+                attempt, get_retry_after(e),
+                rate_limiter.backoff_base_seconds, rate_limiter.backoff_max_seconds
+            )
+            logger.warning(f"Groq returned {status}; retry {attempt + 1} in {delay:.1f}s")
+            limiter.record_retry()
+            if status == 429 and rate_limiter.enabled:
+                # Pause the whole key; the retry queues again behind the delay
+                limiter.defer(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+            continue
+
+        usage = getattr(response, 'usage', None)
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if rate_limiter.enabled and isinstance(total_tokens, int):
+            limiter.record_usage(estimated_tokens, total_tokens)
+        return response
+
+
+# Process-wide limiter shared by all pages and sessions
+_rate_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter (configured from config.json, following its reloads)."""
+    global _rate_limiter
+
+    if _rate_limiter is None:
+        with _limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+
+    _rate_limiter.refresh()
+    return _rate_limiter
@@ -0,0 +1,180 @@
+"""
+Per-Message Timestamps and Student Response Timing
+
+Every chat message is stamped when it is added to st.session_state.chat_history:
+- timestamp: wall-clock time (epoch seconds), shown in the PDF transcript
+- monotonic: time.monotonic() reading, used for durations so clock changes
+  on the server cannot produce negative or inflated timings
+
+A student message additionally records think_time: seconds between the
+previous patient message being shown and the student sending theirs.
+summarize_response_times() aggregates those per-turn values (count, mean,
+median, p90, max) together with the patient reply times; the mean think
+time is passed to EvaluationService.evaluate_session as the Response Factor
+latency and the summary is printed with the PDF transcript. The evaluation
+prompt gets the same summary and scoring rule (format_response_factor_evidence),
+so the on-screen feedback rates Response Factor as the PDF does.
+
+Only role and content are sent to the LLM (see
+conversation_window.window_chat_history), so the extra keys stay local.
+
+Usage:
+    st.session_state.chat_history.append(
+        stamp_message({"role": "user", "content": text}, st.session_state.chat_history)
+    )
+"""
+
+import math
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from time_utils import CST_TIMEZONE
+
+
+def stamp_message(message: Dict[str, Any], chat_history: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Stamp a chat message with wall-clock and monotonic times.
+
+    Student messages also get think_time, measured from the last patient
+    message in chat_history (None if that message was not stamped).
+
+    Args:
+        message: Message dict with role and content (updated in place)
+        chat_history: History the message is about to be appended to
+
+    Returns:
+        dict: The stamped message
+    """
+    message['timestamp'] = time.time()
+    message['monotonic'] = time.monotonic()
+    if message.get('role') == 'user':
+        message['think_time'] = _think_time(message['monotonic'], chat_history or [])
+    return message
+
+
+def _think_time(now: float, chat_history: List[Dict[str, Any]]) -> Optional[float]:
+    for previous in reversed(chat_history):
+        if previous.get('role') != 'assistant':
+            continue
+        shown_at = previous.get('monotonic')
+        if shown_at is None or now < shown_at:
+            # Unstamped history or a reading from another process
+            return None
+        return round(now - shown_at, 3)
+    return None
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _describe(values: List[float]) -> Dict[str, Any]:
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'mean': round(statistics.mean(ordered), 3),
+        'median': round(statistics.median(ordered), 3),
+        'p90': round(_percentile(ordered, 0.9), 3),
+        'max': round(ordered[-1], 3),
+    }
+
+
+def summarize_response_times(chat_history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Aggregate the measured timings of a conversation.
+
+    Args:
+        chat_history: Full list of chat messages
+
+    Returns:
+        dict: 'think_time' stats (count, mean, median, p90, max in seconds) of
+              the student turns and 'patient_reply' stats of the patient
+              replies (None if none measured); None if no student turn was timed
+    """
+    think_times = [m['think_time'] for m in chat_history
+                   if m.get('role') == 'user' and m.get('think_time') is not None]
+    if not think_times:
+        return None
+
+    reply_times = []
+    for previous, message in zip(chat_history, chat_history[1:]):
+        if (previous.get('role') == 'user' and message.get('role') == 'assistant'
+                and previous.get('monotonic') is not None and message.get('monotonic') is not None
+                and message['monotonic'] >= previous['monotonic']):
+            reply_times.append(message['monotonic'] - previous['monotonic'])
+
+    return {
+        'think_time': _describe(think_times),
+        'patient_reply': _describe(reply_times) if reply_times else None,
+    }
+
+
+def format_message_time(message: Dict[str, Any]) -> Optional[str]:
+    """
+    Format a message's wall-clock stamp (and think time) for the transcript.
+
+    Returns:
+        str: e.g. "02:31:05 PM CDT, after 12.4s", or None for an unstamped message
+    """
+    if message.get('timestamp') is None:
+        return None
+    shown = datetime.fromtimestamp(message['timestamp'], CST_TIMEZONE).strftime('%I:%M:%S %p %Z')
+    if message.get('think_time') is not None:
+        shown += f", after {message['think_time']:.1f}s"
+    return shown
+
+
+def format_response_summary(summary: Dict[str, Any]) -> str:
+    """
+    Format summarize_response_times() output as one line for the transcript.
+
+    Returns:
+        str: e.g. "Student response time over 8 turns: mean 14.2s, median 11.0s, ..."
+    """
+    think = summary['think_time']
+    line = (
+        f"Student response time over {think['count']} turns: mean {think['mean']:.1f}s, "
+        f"median {think['median']:.1f}s, p90 {think['p90']:.1f}s, max {think['max']:.1f}s"
+    )
+    reply = summary.get('patient_reply')
+    if reply:
+        line += f". Patient reply time: mean {reply['mean']:.1f}s, max {reply['max']:.1f}s"
+    return line
+
+
+def format_response_factor_evidence(chat_history: List[Dict[str, Any]],
+                                    settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Describe the measured response times for the evaluation prompt.
+
+    With score_response_factor on, the PDF report scores Response Factor
+    from the mean think time (Fully Met up to the threshold, otherwise Not
+    Met), so the text also states that rule and the rating it gives.
+
+    Args:
+        chat_history: Full list of chat messages
+        settings: response_timing config section (default: from get_config_loader())
+
+    Returns:
+        str: Summary line (plus the rule and rating), or None if no student turn was timed
+    """
+    summary = summarize_response_times(chat_history)
+    if summary is None:
+        return None
+    if settings is None:
+        from config_loader import get_config_loader
+        settings = get_config_loader().get_response_timing_config()
+
+    evidence = format_response_summary(summary)
+    if settings.get('score_response_factor', True):
+        threshold = float(settings['response_factor_threshold_seconds'])
+        rating = 'Fully Met' if summary['think_time']['mean'] <= threshold else 'Not Met'
+        evidence += (
+            f". Response Factor is scored from the mean student response time: Fully Met at "
+            f"{threshold:g}s or less, otherwise Not Met. Rate it {rating}"
+        )
+    return evidence
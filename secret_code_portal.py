@@ -33,7 +33,6 @@ Requirements:
     - Internet connection for Google Sheets API calls
 """
 
-import os
 import logging
 import streamlit as st
 from streamlit.errors import StreamlitAPIException
@@ -84,11 +83,11 @@ st.set_page_config(
 # --- Process failed email queue on startup ---
 # This runs once when the application starts to retry any queued emails
 try:
-    from config_loader import ConfigLoader
+    from config_loader import get_config_loader
     from email_utils import RobustEmailSender
     from email_queue import EmailQueue
     
-    config_loader = ConfigLoader()
+    config_loader = get_config_loader()
     config = config_loader.config
     
     # Check if queue processing is enabled
@@ -555,6 +554,26 @@ def validate_and_mark_code(secret_code):
     }
 
 
+def start_rag_warm_up():
+    """
+    Warm up retrieval dependencies in the background once the portal has rendered.
+
+    The portal itself never needs embeddings, so faiss/torch/sentence_transformers
+    are not imported on the login path. Controlled by the background_rag_warm_up
+    feature flag; runs at most once per process.
+    """
+    try:
+        from config_loader import get_config_loader
+        if not get_config_loader().get_feature_flags().get('background_rag_warm_up', True):
+            return
+
+        from rag import start_warm_up
+        start_warm_up()
+    except Exception as e:
+        # Warm-up is an optimization only; bot pages load on demand anyway
+        logger.warning(f"Could not start background RAG warm-up: {e}")
+
+
 def main():
     """Main application logic."""
     
@@ -717,9 +736,6 @@ def main():
                             st.session_state.groq_api_key = groq_api_key
                             st.session_state.user_role = result.get('role', ROLE_STUDENT)
                             
-                            # Set environment variable for libraries that need it
-                            os.environ["GROQ_API_KEY"] = groq_api_key
-                            
                             st.success(result['message'])
                             
                             # Handle Instructor role with access to all bots
@@ -795,6 +811,9 @@ def main():
         unsafe_allow_html=True
     )
 
+    # Portal is fully rendered; prepare retrieval for the bot pages
+    start_rag_warm_up()
+
 
 if __name__ == "__main__":
     main()
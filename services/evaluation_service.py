@@ -5,7 +5,6 @@ Provides a clean API for evaluating MI conversations using the new 40-point rubr
 Handles parsing of LLM feedback, context determination, and score calculation.
 """
 
-import os
 import re
 from typing import Dict, List, Optional, Tuple
 from rubric.mi_rubric import MIRubric, MIEvaluator, CategoryAssessment, RubricContext
@@ -16,21 +15,25 @@ class EvaluationService:
     Service for evaluating MI conversations with the new 40-point rubric.
     """
     
-    # Default Response Factor threshold (configurable via env var)
-    DEFAULT_RESPONSE_FACTOR_THRESHOLD = 2.5
+    # Default Response Factor threshold (mean student think time, seconds)
+    DEFAULT_RESPONSE_FACTOR_THRESHOLD = 60.0
     
     @classmethod
     def get_response_factor_threshold(cls) -> float:
         """
         Get Response Factor threshold from config or environment.
         
+        Reads response_timing.response_factor_threshold_seconds, which the
+        RESPONSE_FACTOR_THRESHOLD environment variable overrides.
+        
         Returns:
-            Threshold in seconds (default 2.5s)
+            Threshold in seconds (default 60s)
         """
         try:
-            threshold = float(os.environ.get('RESPONSE_FACTOR_THRESHOLD', cls.DEFAULT_RESPONSE_FACTOR_THRESHOLD))
-            return threshold
-        except (ValueError, TypeError):
+            from config_loader import get_config_loader
+            settings = get_config_loader().get_response_timing_config()
+            return float(settings['response_factor_threshold_seconds'])
+        except (ValueError, TypeError, KeyError):
             return cls.DEFAULT_RESPONSE_FACTOR_THRESHOLD
     
     @staticmethod
@@ -224,7 +227,8 @@ class EvaluationService:
         Args:
             feedback_text: Raw feedback text from LLM evaluation
             session_type: Type of session ("HPV", "OHI", etc.)
-            response_latency: Optional average bot response latency in seconds
+            response_latency: Optional average response latency in seconds
+                (the measured student think time, see response_timing)
             response_threshold: Optional Response Factor threshold (default from config)
             
         Returns:
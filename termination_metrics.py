@@ -0,0 +1,190 @@
+"""
+Bounded Conversation-Ending Metrics for MI Chatbots
+
+end_control_middleware.log_termination_metrics() used to count endings in a
+module-global dict and append every confirmation trigger to a list that
+grew for as long as the server ran, without a lock although Streamlit
+serves sessions on many threads. TerminationMetrics keeps the same
+information in constant memory:
+- Counters (sessions ended with/without confirmation, parked sessions,
+  ambiguous responses, triggers) updated under a lock
+- A fixed-size ring buffer of the most recent trigger events
+- Per-minute rollups of the counters for the last rollup_minutes minutes
+  that had decisions
+
+snapshot() returns all of it as one consistent, JSON-serializable dict
+(shown on the developer page) and export() writes that snapshot to a
+JSON file for offline analysis.
+
+Usage:
+    metrics = TerminationMetrics()
+    metrics.record(decision['metrics'])
+    metrics.snapshot()['counters']['sessions_parked']
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+DEFAULT_EVENT_BUFFER_SIZE = 500
+DEFAULT_ROLLUP_MINUTES = 60
+
+ENDED_WITH_CONFIRMATION = 'sessions_ended_with_confirmation'
+ENDED_WITHOUT_CONFIRMATION = 'sessions_ended_without_confirmation'
+PARKED = 'sessions_parked'
+AMBIGUOUS = 'ambiguous_responses'
+TRIGGERS = 'confirmation_triggers'
+
+COUNTERS = (ENDED_WITHOUT_CONFIRMATION, ENDED_WITH_CONFIRMATION, PARKED, TRIGGERS, AMBIGUOUS)
+
+CONFIRMED_RESULTS = ('confirmed_first_ask', 'confirmed_second_ask')
+
+
+def classify(metrics: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Get the counter increments for one decision's metrics.
+
+    Args:
+        metrics: Metrics dictionary from should_continue_v3/v4
+
+    Returns:
+        dict: Counter name -> 1 for every counter the decision adds to
+    """
+    counts = {}
+    if metrics.get('alert') == 'ended_without_confirmation':
+        counts[ENDED_WITHOUT_CONFIRMATION] = 1
+    elif metrics.get('confirmation_result') in CONFIRMED_RESULTS:
+        counts[ENDED_WITH_CONFIRMATION] = 1
+    if metrics.get('state') == 'PARKED':
+        counts[PARKED] = 1
+    if metrics.get('termination_trigger'):
+        counts[TRIGGERS] = 1
+    if metrics.get('confirmation_result') == 'ambiguous_first_response':
+        counts[AMBIGUOUS] = 1
+    return counts
+
+
+class TerminationMetrics:
+    """Lock-protected counters, a ring buffer of recent triggers and per-minute rollups."""
+
+    def __init__(self, event_buffer_size: int = DEFAULT_EVENT_BUFFER_SIZE,
+                 rollup_minutes: int = DEFAULT_ROLLUP_MINUTES,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize empty metrics.
+
+        Args:
+            event_buffer_size: Number of most recent trigger events kept
+            rollup_minutes: Number of most recent (active) minutes with rollups kept
+            clock: Wall-clock time source (seconds since the epoch)
+        """
+        self.event_buffer_size = event_buffer_size
+        self.rollup_minutes = rollup_minutes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._decisions = 0
+        self._events: deque = deque(maxlen=self.event_buffer_size)
+        # (minute start in epoch seconds, counts) pairs, oldest first
+        self._rollups: deque = deque(maxlen=self.rollup_minutes)
+
+    def record(self, metrics: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Count one end-control decision.
+
+        Args:
+            metrics: Metrics dictionary from should_continue_v3/v4
+
+        Returns:
+            dict: The counters after this decision
+        """
+        counts = classify(metrics)
+
+        with self._lock:
+            self._decisions += 1
+            for name, count in counts.items():
+                self._counters[name] += count
+
+            # A clock stepping back counts towards the latest minute
+            minute = int(self._clock() // 60) * 60
+            if not self._rollups or minute > self._rollups[-1][0]:
+                self._rollups.append((minute, dict.fromkeys(('decisions',) + COUNTERS, 0)))
+            bucket = self._rollups[-1][1]
+            bucket['decisions'] += 1
+            for name, count in counts.items():
+                bucket[name] += count
+
+            if TRIGGERS in counts:
+                self._events.append({
+                    'trigger': metrics.get('termination_trigger'),
+                    'timestamp': metrics.get('timestamp'),
+                    'result': metrics.get('confirmation_result'),
+                })
+            return dict(self._counters)
+
+    def counters(self) -> Dict[str, int]:
+        """Get the counters since start (or the last reset)."""
+        with self._lock:
+            return dict(self._counters)
+
+    def recent_events(self) -> List[Dict[str, Any]]:
+        """Get the buffered trigger events, oldest first."""
+        with self._lock:
+            return list(self._events)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a consistent copy of all metrics.
+
+        Returns:
+            dict: counters, decisions, recent_events (oldest first) and
+                  rollups (one dict per minute with decisions and counter
+                  increments, 'minute' as an ISO timestamp, oldest first)
+        """
+        with self._lock:
+            return {
+                'taken_at': datetime.fromtimestamp(self._clock(), timezone.utc).isoformat(),
+                'counters': dict(self._counters),
+                'decisions': self._decisions,
+                'recent_events': list(self._events),
+                'rollups': [
+                    {'minute': datetime.fromtimestamp(minute, timezone.utc).isoformat(), **counts}
+                    for minute, counts in self._rollups
+                ],
+            }
+
+    def export(self, path: os.PathLike) -> Dict[str, Any]:
+        """
+        Write a snapshot to a JSON file (replaced atomically).
+
+        Args:
+            path: Destination file
+
+        Returns:
+            dict: The snapshot written
+        """
+        snapshot = self.snapshot()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return snapshot
+
+    def reset(self) -> None:
+        """Clear all counters, events and rollups."""
+        with self._lock:
+            self._reset()
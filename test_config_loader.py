@@ -7,7 +7,11 @@ import os
 import json
 import tempfile
 import shutil
-from config_loader import ConfigLoader
+import threading
+from unittest.mock import patch
+
+import config_loader
+from config_loader import ConfigLoader, get_config_loader
 
 
 class TestConfigLoader(unittest.TestCase):
@@ -139,6 +143,114 @@ class TestConfigLoader(unittest.TestCase):
         config = loader.get_config()
         self.assertEqual(config, self.test_config)
 
+    def test_get_email_config(self):
+        """The email section is returned as a copy."""
+        loader = ConfigLoader(self.config_path, load_dotenv_file=False)
+        email_config = loader.get_email_config()
+        self.assertEqual(email_config['smtp_server'], 'smtp.test.com')
+        email_config['smtp_server'] = 'changed'
+        self.assertEqual(loader.config['email_config']['smtp_server'], 'smtp.test.com')
+
+
+class TestSharedConfigLoader(unittest.TestCase):
+    """Test cases for the process-wide loader returned by get_config_loader."""
+    
+    def setUp(self):
+        """Point MI_CONFIG_PATH at a temporary config and start with no shared loader."""
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.config_path = self._write('config.json', False)
+        
+        for patcher in (patch.dict(os.environ, {'MI_CONFIG_PATH': self.config_path}),
+                        patch.object(config_loader, '_config_loader', None),
+                        patch.object(config_loader, '_checked_at', 0.0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def _write(self, name, streaming, mtime_ns=None):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w') as f:
+            json.dump({'feature_flags': {'streaming_responses': streaming}}, f)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+    
+    def test_loaded_once_and_not_restated_within_interval(self):
+        """Repeated calls reuse one loader without touching the filesystem."""
+        loader = get_config_loader()
+        with patch.object(config_loader.os, 'stat', wraps=os.stat) as stat:
+            for _ in range(20):
+                self.assertIs(get_config_loader(), loader)
+        stat.assert_not_called()
+        self.assertFalse(loader.get_feature_flags()['streaming_responses'])
+    
+    def test_reloads_when_mtime_changes(self):
+        """A modified config file replaces the shared loader; the old one is unchanged."""
+        old = get_config_loader()
+        with patch.object(config_loader, 'CONFIG_CHECK_INTERVAL_SECONDS', 0):
+            self.assertIs(get_config_loader(), old)
+            self._write('config.json', True, mtime_ns=os.stat(self.config_path).st_mtime_ns + 10 ** 9)
+            new = get_config_loader()
+        
+        self.assertIsNot(new, old)
+        self.assertTrue(new.get_feature_flags()['streaming_responses'])
+        self.assertFalse(old.get_feature_flags()['streaming_responses'])
+    
+    def _write_env(self, text, mtime_ns=None):
+        path = os.path.join(self.test_dir, '.env')
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    @unittest.skipUnless(config_loader.DOTENV_AVAILABLE, "python-dotenv not installed")
+    def test_env_reload_updates_only_variables_it_set(self):
+        """An edited .env updates its own variables, never ones set before it was first loaded."""
+        env_path = self._write_env('MI_TEST_API_KEY=placeholder\nMI_TEST_MODEL=first\n')
+        with patch.dict(os.environ, {'MI_TEST_API_KEY': 'real-from-deploy'}), \
+                patch.object(config_loader, 'ENV_FILE_PATH', env_path), \
+                patch.object(config_loader, 'CONFIG_CHECK_INTERVAL_SECONDS', 0):
+            get_config_loader()
+            self.assertEqual(os.environ['MI_TEST_API_KEY'], 'real-from-deploy')
+            self.assertEqual(os.environ['MI_TEST_MODEL'], 'first')
+
+            self._write_env('MI_TEST_API_KEY=placeholder\nMI_TEST_MODEL=second\n',
+                            mtime_ns=os.stat(env_path).st_mtime_ns + 10 ** 9)
+            loader = get_config_loader()
+
+            self.assertEqual(os.environ['MI_TEST_API_KEY'], 'real-from-deploy')
+            self.assertEqual(os.environ['MI_TEST_MODEL'], 'second')
+            self.assertEqual(loader.dotenv_keys, {'MI_TEST_MODEL'})
+
+    def test_config_path_change_applies_immediately(self):
+        """Switching MI_CONFIG_PATH is picked up without waiting for the interval."""
+        get_config_loader()
+        other = self._write('other.json', True)
+        with patch.dict(os.environ, {'MI_CONFIG_PATH': other}):
+            loader = get_config_loader()
+        self.assertEqual(loader.config_path, other)
+        self.assertTrue(loader.get_feature_flags()['streaming_responses'])
+    
+    def test_concurrent_first_use_loads_once(self):
+        """Threads racing on first use all get the same loader."""
+        loaders = []
+        barrier = threading.Barrier(8)
+        
+        def worker():
+            barrier.wait()
+            loaders.append(get_config_loader())
+        
+        with patch.object(config_loader, 'ConfigLoader', wraps=ConfigLoader) as constructor:
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(constructor.call_count, 1)
+        self.assertEqual(len({id(loader) for loader in loaders}), 1)
+
 
 if __name__ == '__main__':
     print("🧪 Running Config Loader Tests\n")
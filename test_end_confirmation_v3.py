@@ -53,7 +53,7 @@ class TestEndConfirmationV3(unittest.TestCase):
             {"role": "assistant", "content": "No, that answers everything."},  # patient end confirmation
         ]
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_end_intent_affirmative_confirmation(self, mock_config):
         """Test: End intent -> confirmation -> affirmative -> ended."""
         # Mock feature flags enabled
@@ -89,7 +89,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertTrue(conversation_context.get('confirmation_flag'))
         self.assertEqual(decision['metrics']['confirmation_result'], 'confirmed_first_ask')
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_end_intent_ambiguous_second_confirmation(self, mock_config):
         """Test: End intent -> ambiguous -> second ask -> affirmative -> ended."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -128,7 +128,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertTrue(conversation_context.get('confirmation_flag'))
         self.assertEqual(decision['metrics']['confirmation_result'], 'confirmed_second_ask')
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_ambiguous_second_ask_parked(self, mock_config):
         """Test: End intent -> ambiguous -> second ask -> no clear response -> parked."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -152,7 +152,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertEqual(decision['state'], 'PARKED')
         self.assertEqual(decision['metrics']['confirmation_result'], 'parked_after_second_ask')
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_student_wants_to_continue(self, mock_config):
         """Test: Student indicates they want to continue after confirmation ask."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -176,7 +176,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertEqual(decision['state'], 'ACTIVE')
         self.assertEqual(decision['metrics']['confirmation_result'], 'student_wants_continue')
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_parked_session_reconnect(self, mock_config):
         """Test: Parked session can be resumed."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -196,7 +196,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertEqual(decision['state'], 'PARKED')
         self.assertIn("welcome back", decision['confirmation_prompt'].lower())
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_metrics_tracking(self, mock_config):
         """Test: Metrics are properly tracked."""
         from end_control_middleware import (
@@ -230,7 +230,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         self.assertEqual(metrics['sessions_ended_with_confirmation'], 1)
         self.assertEqual(metrics['sessions_ended_without_confirmation'], 0)
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_alert_on_no_confirmation(self, mock_config):
         """Test: Alert triggered when session ends without confirmation."""
         from end_control_middleware import (
@@ -265,7 +265,7 @@ class TestEndConfirmationV3(unittest.TestCase):
         # But the alert should be logged
         self.assertIn('alert', decision['metrics'])
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_patient_voice_maintained(self, mock_config):
         """Test: Confirmation prompts are in patient voice addressing 'doctor'."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -295,7 +295,7 @@ class TestEndConfirmationV3(unittest.TestCase):
 class TestPDFValidation(unittest.TestCase):
     """Test suite for PDF payload validation."""
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_valid_payload(self, mock_config):
         """Test validation passes for complete feedback."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -334,7 +334,7 @@ class TestPDFValidation(unittest.TestCase):
         self.assertTrue(validation['is_valid'])
         self.assertEqual(len(validation['errors']), 0)
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_missing_notes(self, mock_config):
         """Test validation catches missing notes."""
         mock_config.return_value.get_feature_flags.return_value = {
@@ -370,7 +370,7 @@ class TestPDFValidation(unittest.TestCase):
             # as long as it doesn't crash
             self.assertTrue(validation['is_valid'])
     
-    @patch('config_loader.ConfigLoader')
+    @patch('config_loader.get_config_loader')
     def test_validation_disabled_by_flag(self, mock_config):
         """Test validation can be disabled via feature flag."""
         mock_config.return_value.get_feature_flags.return_value = {
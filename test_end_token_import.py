@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 """
-Test suite to verify END_TOKEN import in chat_utils.py
+Test suite to verify END_TOKEN import in turn_pipeline.py
 
 This test ensures that END_TOKEN is properly imported and can be used
-in chat_utils.py without NameError.
+in turn_pipeline.py (which builds the per-turn instruction) without NameError.
 """
 
 import sys
@@ -14,8 +14,8 @@ import traceback
 def test_end_token_in_import_statement():
     """Test that END_TOKEN is included in the import statement."""
     try:
-        # Read the chat_utils.py file
-        with open('chat_utils.py', 'r') as f:
+        # Read the turn_pipeline.py file
+        with open('turn_pipeline.py', 'r') as f:
             content = f.read()
         
         # Parse the file as an AST
@@ -47,7 +47,7 @@ def test_end_token_import():
         # Import END_TOKEN from end_control_middleware
         from end_control_middleware import END_TOKEN
         
-        # Create a test f-string similar to the one in chat_utils.py line 346
+        # Create a test f-string similar to the one in the turn instruction (turn_pipeline.py)
         test_string = f"include the end token: {END_TOKEN}"
         
         assert END_TOKEN in test_string, "END_TOKEN should be in the formatted string"
@@ -69,10 +69,10 @@ def test_end_token_import():
 
 
 def test_end_token_usage_in_file():
-    """Test that END_TOKEN is used in an f-string in chat_utils.py."""
+    """Test that END_TOKEN is used in an f-string in the turn instruction (turn_pipeline.py)."""
     try:
-        # Read the chat_utils.py file
-        with open('chat_utils.py', 'r') as f:
+        # Read the turn_pipeline.py file
+        with open('turn_pipeline.py', 'r') as f:
             content = f.read()
         
         # Check that END_TOKEN is used in an f-string
@@ -94,7 +94,7 @@ def test_end_token_usage_in_file():
 def main():
     """Run all tests and report results."""
     print("=" * 60)
-    print("Testing END_TOKEN import in chat_utils.py")
+    print("Testing END_TOKEN import in turn_pipeline.py")
     print("=" * 60)
     
     all_passed = True
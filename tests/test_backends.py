@@ -0,0 +1,134 @@
+"""
+Test suite for rag/backends.py
+
+Tests the pluggable retrieval backends:
+- BM25 ranks chunks by shared, rare terms and needs no torch/faiss
+- Backend selection from config.json / RAG_BACKEND
+- Knowledge bases and cached results are kept separate per backend
+"""
+
+import os
+import subprocess
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from rag import backends as backends_module
+from rag.backends import BM25Backend, DEFAULT_BACKEND, create_backend, get_backend_name
+from rag.knowledge_base import clear_knowledge_bases, get_knowledge_base
+from tests.test_knowledge_base import FakeEmbeddingModel
+
+CHUNKS = [
+    'Reflections demonstrate listening to the patient.',
+    'Open-ended questions evoke change talk and motivation.',
+    'Summaries reflect the big picture and check next steps.',
+    'The patient asked about vaccine side effects.',
+]
+
+
+class TestBM25Backend(unittest.TestCase):
+    """Test cases for BM25Backend."""
+
+    def setUp(self):
+        """Fit a BM25 index over a few chunks."""
+        self.backend = BM25Backend()
+        self.backend.fit(CHUNKS)
+
+    def test_ranks_matching_chunk_first(self):
+        """The chunk sharing the query terms ranks first."""
+        results = self.backend.search(['open-ended questions', 'big picture summaries'], 2)
+
+        self.assertEqual(results[0][0], 1)
+        self.assertEqual(results[1][0], 2)
+
+    def test_rare_terms_outweigh_common_terms(self):
+        """A term in one chunk scores higher than a term in several chunks."""
+        results = self.backend.search(['patient vaccine'], 2)
+        self.assertEqual(results[0][0], 3)
+
+    def test_unmatched_query_returns_nothing(self):
+        """Chunks sharing no term with the query are not returned."""
+        self.assertEqual(self.backend.search(['zebra'], 2), [[]])
+
+    def test_top_k_larger_than_corpus(self):
+        """top_k is capped at the number of chunks."""
+        results = self.backend.search(['patient'], 10)
+        self.assertEqual(sorted(results[0]), [0, 3])
+
+    def test_bm25_does_not_import_heavy_modules(self):
+        """Fitting and searching BM25 never imports torch or faiss."""
+        code = (
+            "import sys; from rag.backends import BM25Backend; b = BM25Backend(); "
+            "b.fit(['one chunk', 'two chunk']); b.search(['chunk'], 1); "
+            "print(','.join(m for m in ('faiss', 'torch', 'sentence_transformers') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
+
+
+class TestBackendSelection(unittest.TestCase):
+    """Test cases for configuring the backend."""
+
+    def test_env_override(self):
+        """RAG_BACKEND selects the backend."""
+        with patch.dict(os.environ, {'RAG_BACKEND': 'bm25'}):
+            self.assertEqual(get_backend_name(), 'bm25')
+            self.assertIsInstance(create_backend(), BM25Backend)
+
+    def test_unknown_backend_falls_back(self):
+        """An unknown configured backend falls back to the default."""
+        with patch.dict(os.environ, {'RAG_BACKEND': 'nope'}):
+            self.assertEqual(get_backend_name(), DEFAULT_BACKEND)
+
+    def test_create_backend_rejects_unknown_name(self):
+        """Explicitly requesting an unknown backend raises ValueError."""
+        with self.assertRaises(ValueError):
+            create_backend('nope')
+
+
+class TestKnowledgeBasePerBackend(unittest.TestCase):
+    """Test cases for backend-specific knowledge bases."""
+
+    def setUp(self):
+        """Create a rubric directory and patch in the fake model."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.rubrics_dir = os.path.join(self.temp_dir, 'test_rubrics')
+        os.makedirs(self.rubrics_dir)
+        for i, chunk in enumerate(CHUNKS):
+            with open(os.path.join(self.rubrics_dir, f'{i}.txt'), 'w', encoding='utf-8') as f:
+                f.write(f'{i + 1}. {chunk}')
+
+        patcher = patch.object(backends_module, 'get_embedding_model', return_value=FakeEmbeddingModel())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env_patcher = patch.dict(os.environ, {'RAG_INDEX_DIR': os.path.join(self.temp_dir, 'index')})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        clear_knowledge_bases()
+
+    def tearDown(self):
+        """Remove temporary files and cached indexes."""
+        clear_knowledge_bases()
+        shutil.rmtree(self.temp_dir)
+
+    def test_backends_get_separate_knowledge_bases(self):
+        """Each backend has its own registry entry and cache namespace."""
+        embedding_kb = get_knowledge_base(self.rubrics_dir, backend_name='embedding')
+        bm25_kb = get_knowledge_base(self.rubrics_dir, backend_name='bm25')
+
+        self.assertIsNot(embedding_kb, bm25_kb)
+        self.assertEqual(embedding_kb.corpus_hash, bm25_kb.corpus_hash)
+        self.assertNotEqual(embedding_kb.cache_key, bm25_kb.cache_key)
+        self.assertIsInstance(bm25_kb.backend, BM25Backend)
+        self.assertIn('Summaries', bm25_kb.retrieve('big picture summaries', top_k=1)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
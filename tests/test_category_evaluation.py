@@ -0,0 +1,235 @@
+"""
+Test suite for category_evaluation.py
+
+Tests the parallel per-category evaluation mode:
+- One prompt per rubric category, each with its own RAG context
+- Answers are merged in rubric order into the standard feedback format
+- Categories are evaluated concurrently, so the wall time is about the slowest one
+- A failed or malformed category is retried; one that keeps failing is named in the error
+- The feedback job falls back to the single prompt when a category fails
+- Each category call has its own max_tokens limit
+- End to end against the mock Groq server
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from groq import Groq
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import category_evaluation
+import llm_metrics
+import rate_limiter
+from category_evaluation import CategoryEvaluationError, CategoryEvaluator, merge_category_feedback
+from feedback_template import FeedbackFormatter
+from llm_metrics import LLMMetrics
+from loadtest.mock_groq_server import MockGroqServer
+from rate_limiter import RateLimiter
+from rubric.mi_rubric import MIRubric
+from services.evaluation_service import EvaluationService
+
+
+def setUpModule():
+    """Use a rate limiter that never delays the fake calls and in-memory LLM metrics."""
+    global _saved_rate_limiter, _saved_llm_metrics
+    _saved_rate_limiter = rate_limiter._rate_limiter
+    _saved_llm_metrics = llm_metrics._llm_metrics
+    rate_limiter._rate_limiter = RateLimiter({'requests_per_minute': 100000, 'tokens_per_minute': 10 ** 9})
+    llm_metrics._llm_metrics = LLMMetrics(metrics_file=None)
+
+
+def tearDownModule():
+    rate_limiter._rate_limiter = _saved_rate_limiter
+    llm_metrics._llm_metrics = _saved_llm_metrics
+
+
+TRANSCRIPT = "Assistant: Hello!\nUser: How do you feel about flossing?\nAssistant: I forget."
+
+
+def category_line(category, status='Partially Met'):
+    points = MIRubric.get_category_points(category)
+    return f"**{category} ({points} pts): {status} - Good start. For example: \"How do you feel?\"**"
+
+
+class TestCategoryPrompts(unittest.TestCase):
+    """Test cases for FeedbackFormatter.format_category_evaluation_prompts."""
+
+    def test_one_prompt_per_category(self):
+        contexts = {category: f"{category} rubric text" for category in MIRubric.CATEGORIES}
+        prompts = FeedbackFormatter.format_category_evaluation_prompts("OHI", TRANSCRIPT, contexts)
+
+        self.assertEqual(list(prompts), list(MIRubric.CATEGORIES))
+        for category, prompt in prompts.items():
+            self.assertIn(f"### Category: {category} ({MIRubric.get_category_points(category)} pts)", prompt)
+            self.assertIn(f"{category} rubric text", prompt)
+            self.assertIn(TRANSCRIPT, prompt)
+            # Only this category's context is included
+            others = [c for c in MIRubric.CATEGORIES if c != category]
+            self.assertFalse(any(f"{other} rubric text" in prompt for other in others))
+        self.assertIn("oral health", prompts['Acceptance'])
+
+
+class TestMerge(unittest.TestCase):
+    """Test cases for merge_category_feedback."""
+
+    def test_merged_in_rubric_order_and_parseable(self):
+        responses = {category: category_line(category) for category in reversed(list(MIRubric.CATEGORIES))}
+        responses['Summary'] = "Here is my assessment:\n\n" + category_line('Summary', 'Not Met')
+
+        feedback = merge_category_feedback(responses)
+
+        assessments = EvaluationService.parse_llm_feedback(feedback)
+        self.assertEqual(list(assessments), list(MIRubric.CATEGORIES))
+        self.assertEqual(assessments['Summary'].value, 'Not Met')
+        self.assertTrue(feedback.startswith('**Collaboration (9 pts)'))
+        self.assertNotIn('Here is my assessment', feedback)
+
+    def test_missing_or_unparseable_category_rejected(self):
+        responses = {category: category_line(category) for category in MIRubric.CATEGORIES}
+        del responses['Evocation']
+        with self.assertRaises(ValueError):
+            merge_category_feedback(responses)
+
+        responses['Evocation'] = "The student asked some questions."
+        with self.assertRaises(ValueError):
+            merge_category_feedback(responses)
+
+
+class TestCategoryEvaluator(unittest.TestCase):
+    """Test cases for CategoryEvaluator.evaluate."""
+
+    def setUp(self):
+        self.evaluator = CategoryEvaluator(max_workers=6)
+        self.prompts = {category: f"### Category: {category} (" for category in MIRubric.CATEGORIES}
+
+    def test_categories_run_concurrently(self):
+        """Six 0.2s calls finish in about the time of one."""
+        active = []
+        peak = [0]
+        lock = threading.Lock()
+
+        def slow_category(client, model, system_prompt, prompt, max_tokens=None):
+            with lock:
+                active.append(prompt)
+                peak[0] = max(peak[0], len(active))
+            time.sleep(0.2)
+            with lock:
+                active.remove(prompt)
+            return category_line(prompt.split(': ', 1)[1].split(' (')[0])
+
+        start = time.perf_counter()
+        with patch.object(category_evaluation, 'evaluate_category', slow_category):
+            feedback = self.evaluator.evaluate(object(), 'persona', self.prompts, 'model')
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(EvaluationService.parse_llm_feedback(feedback)), 6)
+        self.assertGreater(peak[0], 1)
+        self.assertLess(elapsed, 0.2 * len(self.prompts) * 0.75)
+
+    def test_malformed_category_retried(self):
+        """An answer without an assessment line is asked for again."""
+        calls = []
+
+        def flaky_category(client, model, system_prompt, prompt, max_tokens=None):
+            category = prompt.split(': ', 1)[1].split(' (')[0]
+            calls.append(category)
+            if category == 'Evocation' and calls.count(category) == 1:
+                return "The student asked some questions."
+            return category_line(category)
+
+        with patch.object(category_evaluation, 'evaluate_category', flaky_category):
+            feedback = self.evaluator.evaluate(object(), 'persona', self.prompts, 'model')
+
+        self.assertEqual(len(EvaluationService.parse_llm_feedback(feedback)), 6)
+        self.assertEqual(calls.count('Evocation'), 2)
+        self.assertEqual(len(calls), 7)
+
+    def test_failed_category_named_in_error(self):
+        """A category that fails every attempt fails the evaluation with its name."""
+        def failing_category(client, model, system_prompt, prompt, max_tokens=None):
+            if 'Compassion' in prompt:
+                raise RuntimeError('Error code: 401 - invalid api key')
+            return category_line(prompt.split(': ', 1)[1].split(' (')[0])
+
+        with patch.object(category_evaluation, 'evaluate_category', failing_category):
+            with self.assertRaisesRegex(CategoryEvaluationError, 'Compassion.*invalid api key') as raised:
+                self.evaluator.evaluate(object(), 'persona', self.prompts, 'model')
+        self.assertEqual(raised.exception.categories, ['Compassion'])
+
+    def test_category_calls_limit_max_tokens(self):
+        """The rate limiter reserves the category limit, not its 1024-token default."""
+        def completion(client, priority, **kwargs):
+            category = kwargs['messages'][1]['content'].split(': ', 1)[1].split(' (')[0]
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=category_line(category)))],
+                                   usage=None)
+
+        with patch.object(category_evaluation, 'rate_limited_completion', side_effect=completion) as call:
+            CategoryEvaluator(max_workers=6, max_tokens=300).evaluate(object(), 'persona', self.prompts, 'model')
+
+        self.assertEqual(call.call_count, 6)
+        self.assertEqual({c.kwargs['max_tokens'] for c in call.call_args_list}, {300})
+
+
+class TestSingleFallback(unittest.TestCase):
+    """The feedback job's fallback to the single evaluation prompt."""
+
+    def test_failed_category_falls_back_to_single_prompt(self):
+        import chat_utils
+
+        error = CategoryEvaluationError({'Compassion': RuntimeError('timeout')})
+        messages = [{'role': 'system', 'content': 'persona'}, {'role': 'user', 'content': 'review'}]
+        with patch.object(category_evaluation, 'evaluate_categories', side_effect=error), \
+                patch.object(chat_utils, '_generate_feedback', return_value='single feedback') as single, \
+                self.assertLogs(chat_utils.logger, 'WARNING') as logs:
+            feedback = chat_utils._generate_category_feedback(
+                object(), 'persona', {'Compassion': 'prompt'}, messages,
+                'category-key', {}, 'single-key', {'prompt_version': 'single'}
+            )
+
+        self.assertEqual(feedback, 'single feedback')
+        self.assertEqual(single.call_args.args[1:], (messages, 'single-key', {'prompt_version': 'single'}))
+        self.assertIn('Compassion', logs.output[0])
+
+    def test_single_prompt_limits_max_tokens(self):
+        """The rate limiter reserves the evaluation limit, not its 1024-token default."""
+        import chat_utils
+
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='feedback'))],
+                                   usage=None)
+        with patch('rate_limiter.rate_limited_completion', return_value=response) as call:
+            feedback = chat_utils._generate_feedback(object(), [{'role': 'user', 'content': 'review'}])
+
+        self.assertEqual(feedback, 'feedback')
+        self.assertEqual(call.call_args.kwargs['max_tokens'], chat_utils.FEEDBACK_MAX_TOKENS)
+
+
+class TestAgainstMockServer(unittest.TestCase):
+    """Per-category evaluation through the rate limiter and metrics to the mock server."""
+
+    def setUp(self):
+        patcher = patch.object(llm_metrics, '_llm_metrics', LLMMetrics(metrics_file=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = MockGroqServer().start()
+        self.addCleanup(self.server.stop)
+        self.client = Groq(api_key='test-key', base_url=self.server.base_url, max_retries=0)
+
+    def test_merged_feedback_from_mock_server(self):
+        prompts = FeedbackFormatter.format_category_evaluation_prompts("OHI", TRANSCRIPT, {})
+
+        feedback = CategoryEvaluator(max_workers=6).evaluate(self.client, 'persona', prompts, 'model')
+
+        self.assertEqual(list(EvaluationService.parse_llm_feedback(feedback)), list(MIRubric.CATEGORIES))
+        self.assertEqual(self.server.get_stats()['evaluations'], 6)
+        self.assertEqual(len(llm_metrics.get_llm_metrics().get_records()), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+"""
+Test suite for streamed patient replies in chat_utils.py
+
+Tests the streaming response path:
+- Tokens are rendered into the placeholder as they arrive
+- Guardrails run on the accumulated reply and trigger a regeneration
+- A guardrail violation aborts the stream early and records the savings
+- The placeholder ends with exactly the committed text
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_utils import (
+    GENERIC_PATIENT_RESPONSE,
+    PATIENT_MAX_TOKENS,
+    STREAMING_CURSOR,
+    generate_patient_response,
+    stream_chat_completion,
+)
+from persona_guard import get_stream_abort_metrics, reset_stream_abort_metrics
+import llm_metrics
+import rate_limiter
+from llm_metrics import LLMMetrics
+from rate_limiter import RateLimiter
+
+
+def setUpModule():
+    """Use a rate limiter that never delays the fake client and in-memory LLM metrics."""
+    global _saved_rate_limiter, _saved_llm_metrics
+    _saved_rate_limiter = rate_limiter._rate_limiter
+    _saved_llm_metrics = llm_metrics._llm_metrics
+    rate_limiter._rate_limiter = RateLimiter({'requests_per_minute': 100000, 'tokens_per_minute': 10 ** 9})
+    llm_metrics._llm_metrics = LLMMetrics(metrics_file=None)
+
+
+def tearDownModule():
+    rate_limiter._rate_limiter = _saved_rate_limiter
+    llm_metrics._llm_metrics = _saved_llm_metrics
+
+
+def make_chunk(content):
+    """Build a chat-completion stream chunk."""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeStream:
+    """Iterable stream of chunks that records how far it was consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """Chat completions returning canned replies, streamed word by word when asked."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.streams = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        if kwargs.get('stream'):
+            words = reply.split(' ')
+            pieces = [word + ' ' for word in words[:-1]] + [words[-1]]
+            stream = FakeStream([make_chunk(None)] + [make_chunk(piece) for piece in pieces])
+            self.streams.append(stream)
+            return stream
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+class FakeClient:
+    def __init__(self, replies):
+        self.chat = SimpleNamespace(completions=FakeCompletions(replies))
+
+
+class FakePlaceholder:
+    """Records everything rendered into an st.empty() placeholder."""
+
+    def __init__(self):
+        self.renders = []
+
+    def markdown(self, text):
+        self.renders.append(text)
+
+    def empty(self):
+        self.renders.append('')
+
+
+MESSAGES = [{"role": "system", "content": "You are a patient."}]
+
+
+class TestStreamChatCompletion(unittest.TestCase):
+    """Test cases for stream_chat_completion."""
+
+    def test_renders_partial_buffer_and_reports_ttft(self):
+        """Each token extends the rendered buffer; timing includes TTFT."""
+        client = FakeClient(["I am not sure about that."])
+        placeholder = FakePlaceholder()
+
+        text, timing = stream_chat_completion(client, MESSAGES, placeholder)
+
+        self.assertEqual(text, "I am not sure about that.")
+        self.assertTrue(client.chat.completions.calls[0]['stream'])
+        self.assertEqual(placeholder.renders[0], "I " + STREAMING_CURSOR)
+        self.assertEqual(placeholder.renders[-1], text + STREAMING_CURSOR)
+        self.assertEqual(timing['chunks'], 6)
+        self.assertIsNotNone(timing['ttft_ms'])
+        self.assertLessEqual(timing['ttft_ms'], timing['total_ms'])
+
+
+class TestGeneratePatientResponse(unittest.TestCase):
+    """Test cases for generate_patient_response."""
+
+    def setUp(self):
+        """Reset early-abort and LLM call metrics."""
+        reset_stream_abort_metrics()
+        llm_metrics.get_llm_metrics().clear()
+
+    def test_final_render_is_committed_text(self):
+        """The placeholder ends with the reply and no cursor."""
+        placeholder = FakePlaceholder()
+        reply = generate_patient_response(FakeClient(["I brush twice a day."]), MESSAGES,
+                                          placeholder=placeholder)
+
+        self.assertEqual(reply, "I brush twice a day.")
+        self.assertEqual(placeholder.renders[-1], reply)
+
+    def test_guardrail_on_accumulated_buffer_regenerates(self):
+        """A too-long streamed reply is regenerated with the correction message."""
+        long_reply = ("I have been thinking about this a lot lately. "
+                      "My friend had a bad reaction once and it scared me. "
+                      "My mother also told me vaccines are risky for kids. "
+                      "I read about it online and I am still not convinced.")
+        client = FakeClient([long_reply, "I'm still unsure, honestly."])
+        placeholder = FakePlaceholder()
+
+        reply = generate_patient_response(client, MESSAGES, domain_name="HPV vaccination",
+                                          placeholder=placeholder)
+
+        self.assertEqual(reply, "I'm still unsure, honestly.")
+        self.assertEqual(len(client.chat.completions.calls), 2)
+        correction_messages = client.chat.completions.calls[1]['messages']
+        self.assertIn("too long", correction_messages[-1]['content'])
+        self.assertEqual(placeholder.renders[-1], reply)
+
+    def test_drift_aborts_stream_early(self):
+        """Evaluator-mode text stops the stream before the rest of the reply is read."""
+        drift_reply = ("Honestly you did well with that question. Strengths: open questions. "
+                       + " ".join(["More evaluator text follows here."] * 20))
+        client = FakeClient([drift_reply, "I guess I could try flossing more."])
+
+        reply = generate_patient_response(client, MESSAGES, domain_name="oral hygiene",
+                                          placeholder=FakePlaceholder())
+
+        first_stream = client.chat.completions.streams[0]
+        self.assertEqual(reply, "I guess I could try flossing more.")
+        self.assertTrue(first_stream.closed)
+        self.assertLess(first_stream.consumed, len(first_stream.chunks) // 2)
+        correction_messages = client.chat.completions.calls[1]['messages']
+        self.assertTrue(correction_messages[-2]['content'].endswith('you did well '))
+        self.assertIn("evaluator mode", correction_messages[-1]['content'])
+
+        metrics = get_stream_abort_metrics()
+        self.assertEqual(metrics['aborts'], 1)
+        self.assertEqual(metrics['aborts_by_reason'], {'persona_drift': 1})
+        self.assertEqual(metrics['max_tokens_saved'], PATIENT_MAX_TOKENS - metrics['tokens_received'])
+
+        calls = llm_metrics.get_llm_metrics().get_records()
+        self.assertEqual([(c['purpose'], c['outcome']) for c in calls],
+                         [('turn', 'aborted'), ('correction', 'ok')])
+        self.assertIsNotNone(calls[0]['ttft_ms'])
+
+    def test_clean_reply_is_not_aborted(self):
+        """A reply within the guardrails streams to the end without a correction."""
+        client = FakeClient(["I floss sometimes. Mostly before dentist visits, honestly."])
+
+        generate_patient_response(client, MESSAGES, domain_name="oral hygiene", placeholder=FakePlaceholder())
+
+        self.assertEqual(len(client.chat.completions.calls), 1)
+        self.assertFalse(client.chat.completions.streams[0].closed)
+        self.assertEqual(get_stream_abort_metrics()['aborts'], 0)
+
+    def test_role_break_replaced_with_generic_reply(self):
+        """A reply in evaluator voice is replaced before being committed."""
+        reply = generate_patient_response(FakeClient(["Feedback report: score: 8/10"]), MESSAGES,
+                                          placeholder=FakePlaceholder())
+        self.assertEqual(reply, GENERIC_PATIENT_RESPONSE)
+
+    def test_non_streaming_mode(self):
+        """stream=False requests one completion without rendering partial text."""
+        client = FakeClient(["Okay, that makes sense."])
+        placeholder = FakePlaceholder()
+
+        reply = generate_patient_response(client, MESSAGES, placeholder=placeholder, stream=False)
+
+        self.assertEqual(reply, "Okay, that makes sense.")
+        self.assertNotIn('stream', client.chat.completions.calls[0])
+        self.assertEqual(placeholder.renders, [reply])
+
+    def test_auth_error_returns_none(self):
+        """An invalid API key clears the placeholder and returns None."""
+        placeholder = FakePlaceholder()
+        reply = generate_patient_response(FakeClient([Exception("Error code: 401 - invalid api key")]),
+                                          MESSAGES, placeholder=placeholder)
+
+        self.assertIsNone(reply)
+        self.assertEqual(placeholder.renders, [''])
+
+    def test_other_errors_propagate(self):
+        """Unexpected API errors are re-raised."""
+        with self.assertRaises(RuntimeError):
+            generate_patient_response(FakeClient([RuntimeError("boom")]), MESSAGES)
+
+        calls = llm_metrics.get_llm_metrics().get_records()
+        self.assertEqual((calls[-1]['outcome'], calls[-1]['error']), ('error', 'RuntimeError'))
+
+
+if __name__ == '__main__':
+    unittest.main()
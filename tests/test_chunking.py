@@ -0,0 +1,122 @@
+"""
+Test suite for rag/chunking.py
+
+Tests the sentence-aware rubric chunker:
+- Chunks respect the size limit and sentence boundaries
+- Consecutive chunks overlap by whole trailing sentences
+- Rubric section headings and separators start new chunks
+- Chunk settings are read from the retrieval config
+- Legacy split_text behaviour is unchanged
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.chunking import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, chunk_text, get_chunk_settings, split_text
+
+RUBRIC_SAMPLE = """Provider: Hi, how are you today? Patient: I'm fine, just here for a cleaning.
+Provider: Is it okay if I share some information about the HPV vaccine?
+
+Motivational Interviewing (MI) Rubric & Feedback Summary
+________________________________________
+1. Evocation (Evoke self-efficacy, confidence, intrinsic motivation, and understanding)
+Rubric Criteria: Uses open-ended questions for any of the following:
+•	Patient understanding
+•	Eliciting change talk
+Feedback:
+•	Practice starting with open-ended questions from the outset.
+________________________________________
+2. Acceptance (Demonstrate respect, autonomy, and affirmations)
+Rubric Criteria:
+•	Uses reflections to demonstrate listening.
+•	Asks permission before providing information.
+"""
+
+
+class TestChunkText(unittest.TestCase):
+    """Test cases for chunk_text."""
+
+    def test_chunks_respect_size(self):
+        """No chunk exceeds chunk_size, including cut over-long sentences."""
+        text = ' '.join(['word'] * 500) + '. Short sentence.'
+        chunks = chunk_text(text, chunk_size=80, overlap=20)
+
+        self.assertTrue(chunks)
+        self.assertTrue(all(len(chunk) <= 80 for chunk in chunks))
+
+    def test_chunks_end_on_sentence_boundaries(self):
+        """Sentences are never split when they fit in a chunk."""
+        sentences = [f"Sentence number {i} is here." for i in range(30)]
+        chunks = chunk_text(' '.join(sentences), chunk_size=100, overlap=0)
+
+        for chunk in chunks:
+            self.assertTrue(chunk.endswith('here.'), chunk)
+        self.assertEqual(' '.join(chunks), ' '.join(sentences))
+
+    def test_overlap_repeats_trailing_sentences(self):
+        """The next chunk starts with the last sentence(s) of the previous one."""
+        sentences = [f"Point {i} matters." for i in range(20)]
+        chunks = chunk_text(' '.join(sentences), chunk_size=60, overlap=20)
+
+        for previous, following in zip(chunks, chunks[1:]):
+            last_sentence = previous.rsplit('. ', 1)[-1]
+            self.assertTrue(following.startswith(last_sentence), (previous, following))
+
+    def test_sections_start_new_chunks(self):
+        """Rubric category headings are not merged with the previous section."""
+        chunks = chunk_text(RUBRIC_SAMPLE, chunk_size=400, overlap=50)
+
+        self.assertTrue(any(chunk.startswith('1. Evocation') for chunk in chunks))
+        self.assertTrue(any(chunk.startswith('2. Acceptance') for chunk in chunks))
+        for chunk in chunks:
+            self.assertFalse('Evocation' in chunk and 'Acceptance (' in chunk, chunk)
+            self.assertNotIn('____', chunk)
+
+    def test_invalid_parameters_raise(self):
+        """Overlap must be smaller than the chunk size."""
+        with self.assertRaises(ValueError):
+            chunk_text('text', chunk_size=50, overlap=50)
+        with self.assertRaises(ValueError):
+            chunk_text('text', chunk_size=0)
+
+    def test_empty_text(self):
+        """Empty input yields no chunks."""
+        self.assertEqual(chunk_text(''), [])
+        self.assertEqual(chunk_text('\n\n____\n'), [])
+
+
+class TestChunkSettings(unittest.TestCase):
+    """Test cases for get_chunk_settings."""
+
+    def _settings(self, retrieval):
+        with patch('config_loader.ConfigLoader.get_retrieval_config', return_value=retrieval):
+            return get_chunk_settings()
+
+    def test_reads_retrieval_config(self):
+        self.assertEqual(self._settings({'chunk_size': 400, 'chunk_overlap': 60}), (400, 60))
+
+    def test_invalid_settings_use_defaults(self):
+        self.assertEqual(self._settings({'chunk_size': 50, 'chunk_overlap': 50}),
+                         (DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP))
+        self.assertEqual(self._settings({'chunk_size': 'large'}), (DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP))
+
+
+class TestSplitText(unittest.TestCase):
+    """Test cases for the legacy split_text."""
+
+    def test_split_text_respects_max_length(self):
+        """Chunks never exceed the maximum length."""
+        text = ' '.join(['word'] * 200)
+        chunks = split_text(text, max_length=50)
+
+        self.assertTrue(all(len(chunk) <= 50 for chunk in chunks))
+        self.assertEqual(' '.join(chunks), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Test suite for conversation_window.py
+
+Tests token-budgeted prompt windowing:
+- Short conversations are sent verbatim
+- Long conversations keep recent turns and fold older ones into a summary
+- The summary is built incrementally and stays within its budget
+- Only role and content are sent, not the per-message timestamps
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_window import (
+    SUMMARY_HEADER,
+    estimate_message_tokens,
+    estimate_tokens,
+    find_window_start,
+    summarize_message,
+    window_chat_history,
+)
+
+SETTINGS = {'history_token_budget': 200, 'min_recent_messages': 4, 'summary_token_budget': 120}
+
+
+def make_history(turns):
+    """Build a conversation of alternating student/patient messages."""
+    history = [{"role": "assistant", "content": "Hello! I'm Alex, nice to meet you today."}]
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Question {turn}. How do you feel about brushing every day?"})
+        history.append({"role": "assistant", "content": f"Answer {turn}. I try, but mornings are hectic and I forget."})
+    return history
+
+
+class TestTokenEstimates(unittest.TestCase):
+    """Test cases for token estimation."""
+
+    def test_estimate_tokens(self):
+        """Roughly four characters per token, rounded up."""
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcd'), 1)
+        self.assertEqual(estimate_tokens('abcde'), 2)
+
+    def test_message_overhead(self):
+        """Each message costs its content plus a fixed overhead."""
+        self.assertGreater(estimate_message_tokens({"role": "user", "content": ""}), 0)
+
+
+class TestWindowChatHistory(unittest.TestCase):
+    """Test cases for window_chat_history."""
+
+    def test_short_history_sent_verbatim(self):
+        """A conversation within budget is sent unchanged with no summary."""
+        history = make_history(1)
+        messages, state = window_chat_history(history, None, SETTINGS)
+
+        self.assertEqual(messages, history)
+        self.assertEqual(state['folded'], 0)
+
+    def test_long_history_is_windowed(self):
+        """Older messages move into a summary; recent ones stay verbatim."""
+        history = make_history(20)
+        messages, state = window_chat_history(history, None, SETTINGS)
+
+        self.assertEqual(messages[0]['role'], 'system')
+        self.assertTrue(messages[0]['content'].startswith(SUMMARY_HEADER))
+        self.assertEqual(messages[1:], history[state['folded']:])
+        self.assertEqual(messages[1]['role'], 'user')
+        self.assertGreaterEqual(len(messages) - 1, SETTINGS['min_recent_messages'])
+
+    def test_prompt_size_stays_bounded(self):
+        """Prompt tokens stop growing with conversation length."""
+        sizes = []
+        state = None
+        history = make_history(0)
+        for turn in range(60):
+            history.append({"role": "user", "content": f"Question {turn}. Tell me more about that?"})
+            history.append({"role": "assistant", "content": f"Answer {turn}. Well, it is complicated for me."})
+            messages, state = window_chat_history(history, state, SETTINGS)
+            sizes.append(sum(estimate_message_tokens(m) for m in messages))
+
+        budget = SETTINGS['history_token_budget'] + SETTINGS['summary_token_budget'] + 100
+        self.assertLess(max(sizes[20:]), budget)
+        self.assertGreater(state['omitted'], 0)
+
+    def test_incremental_summary_matches_full_rebuild(self):
+        """Folding turn by turn gives the same summary as folding at once."""
+        history = make_history(12)
+        state = None
+        for end in range(3, len(history) + 1):
+            _, state = window_chat_history(history[:end], state, SETTINGS)
+        _, rebuilt = window_chat_history(history, None, SETTINGS)
+
+        self.assertEqual(state['folded'], rebuilt['folded'])
+        self.assertEqual(state['lines'], rebuilt['lines'])
+
+    def test_folded_messages_never_return(self):
+        """A message folded into the summary is not sent verbatim again."""
+        history = make_history(12)
+        _, state = window_chat_history(history, None, SETTINGS)
+        folded = state['folded']
+
+        messages, state = window_chat_history(history, state, {**SETTINGS, 'history_token_budget': 10000})
+
+        self.assertEqual(state['folded'], folded)
+        self.assertEqual(messages[1:], history[folded:])
+
+    def test_reset_history_restarts_summary(self):
+        """A state from a longer, earlier conversation is discarded."""
+        _, state = window_chat_history(make_history(20), None, SETTINGS)
+        history = make_history(1)
+
+        messages, state = window_chat_history(history, state, SETTINGS)
+
+        self.assertEqual(messages, history)
+        self.assertEqual(state['lines'], [])
+
+    def test_input_history_not_modified(self):
+        """chat_history itself is never changed."""
+        history = make_history(20)
+        snapshot = [dict(m) for m in history]
+        window_chat_history(history, None, SETTINGS)
+        self.assertEqual(history, snapshot)
+
+    def test_only_role_and_content_sent(self):
+        """Timestamps stored on the messages are not sent to the API."""
+        history = [dict(m, timestamp=1700000000.0, monotonic=12.5) for m in make_history(1)]
+        messages, _ = window_chat_history(history, None, SETTINGS)
+
+        self.assertEqual(messages, make_history(1))
+        self.assertIn('timestamp', history[0])
+
+
+class TestHelpers(unittest.TestCase):
+    """Test cases for windowing helpers."""
+
+    def test_summarize_message_keeps_leading_sentence(self):
+        """Summary lines keep the role label and the first sentence."""
+        line = summarize_message({"role": "user", "content": "What worries you? Tell me more."})
+        self.assertEqual(line, "Student: What worries you? ...")
+
+    def test_window_never_starts_on_patient_message(self):
+        """The verbatim window opens with a student message."""
+        history = make_history(10)
+        start = find_window_start(history, 100, 3)
+        self.assertEqual(history[start]['role'], 'user')
+
+
+if __name__ == '__main__':
+    unittest.main()
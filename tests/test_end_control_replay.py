@@ -0,0 +1,143 @@
+"""
+Test suite for end_control_replay.py
+
+Tests the offline end-control replay:
+- A transcript is replayed turn by turn and stops once a decision ends it
+- The replayed history matches the transcript
+- Histograms of final states, end reasons and state transitions
+- Decisions files diff cleanly against themselves and report changed turns
+- The process pool gives the same results as an in-process replay
+- Streamlit is never imported
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import end_control_replay
+from end_control_replay import first_difference, format_report, replay_transcript, run_replay
+
+TRANSCRIPTS = os.path.join(REPO_ROOT, 'benchmarks', 'data', 'transcripts.jsonl')
+
+GOODBYE = {
+    'id': 'goodbye',
+    'messages': [
+        {'role': 'assistant', 'content': 'Hello, I am Alex.'},
+        {'role': 'user', 'content': 'How are you feeling about the vaccine?'},
+        {'role': 'assistant', 'content': 'A bit nervous.'},
+        {'role': 'user', 'content': "Thanks, I'm done. Bye!"},
+        {'role': 'assistant', 'content': 'Goodbye, take care!'},
+        {'role': 'user', 'content': 'One more thing...'},
+        {'role': 'assistant', 'content': 'Yes?'},
+    ],
+}
+
+
+class TestReplayTranscript(unittest.TestCase):
+    """Test cases for replay_transcript."""
+
+    def test_replays_until_ended(self):
+        result = replay_transcript(GOODBYE)
+
+        self.assertEqual(result['turns'], 2)
+        self.assertEqual([d['state'] for d in result['decisions']], ['ACTIVE', 'ENDED'])
+        self.assertEqual(result['final_state'], 'ENDED')
+        self.assertEqual(result['ended_turn'], 2)
+        self.assertIn('Mutual intent', result['end_reason'])
+
+    def test_history_matches_transcript(self):
+        """Each message is added to the history once, in transcript order."""
+        histories = []
+
+        def spy(context, assistant_reply, user_message):
+            histories.append(list(context['chat_history']))
+            return {'continue': True, 'state': 'ACTIVE', 'reason': 'spy'}
+
+        with patch.object(end_control_replay, 'should_continue_v4', side_effect=spy):
+            replay_transcript(GOODBYE)
+
+        messages = GOODBYE['messages']
+        self.assertEqual(histories, [messages[:3], messages[:5], messages[:7]])
+
+    def test_conversation_without_turns(self):
+        result = replay_transcript({'id': 'empty', 'messages': [{'role': 'assistant', 'content': 'Hi'}]})
+
+        self.assertEqual(result['turns'], 0)
+        self.assertEqual(result['final_state'], 'ACTIVE')
+        self.assertIsNone(result['end_reason'])
+
+
+class TestRunReplay(unittest.TestCase):
+    """Test cases for run_replay and the baseline diff."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.decisions = os.path.join(tmp.name, 'decisions.jsonl')
+        self.changed = os.path.join(tmp.name, 'changed.jsonl')
+
+    def test_report_and_baseline_diff(self):
+        report = run_replay(TRANSCRIPTS, output_path=self.decisions)
+
+        with open(TRANSCRIPTS) as f:
+            count = sum(1 for line in f if line.strip())
+        self.assertEqual(report['transcripts'], count)
+        self.assertEqual(sum(report['final_states'].values()), count)
+        self.assertEqual(sum(report['transitions'].values()), report['turns'])
+        self.assertIsNone(report['diff'])
+        self.assertIn('State transitions:', format_report(report))
+
+        same = run_replay(TRANSCRIPTS, baseline_path=self.decisions)
+        self.assertEqual(same['diff']['changed'], 0)
+        self.assertEqual(same['diff']['compared'], count)
+
+        with open(self.decisions) as f:
+            results = [json.loads(line) for line in f]
+        results[0]['decisions'][2]['reason'] = 'Something else'
+        with open(self.changed, 'w') as f:
+            f.writelines(json.dumps(result) + '\n' for result in results[1:] + results[:1])
+
+        diff = run_replay(TRANSCRIPTS, baseline_path=self.changed)['diff']
+        self.assertEqual(diff['changed'], 1)
+        self.assertEqual(diff['changes'][0]['id'], results[0]['id'])
+        self.assertEqual(diff['changes'][0]['first_different_turn'], 3)
+
+    def test_first_difference_on_length(self):
+        result = replay_transcript(GOODBYE)
+        shorter = dict(result, decisions=result['decisions'][:1])
+
+        self.assertIsNone(first_difference(result, result))
+        self.assertEqual(first_difference(shorter, result), 2)
+
+    def test_process_pool_matches_in_process(self):
+        streamed = []
+        run_replay(TRANSCRIPTS, workers=2, batch_size=3, on_result=streamed.append)
+        in_process = []
+        run_replay(TRANSCRIPTS, on_result=in_process.append)
+
+        self.assertEqual(streamed, in_process)
+
+
+class TestNoStreamlit(unittest.TestCase):
+    """The replay runs without importing Streamlit."""
+
+    def test_streamlit_not_imported(self):
+        code = (
+            "import sys, end_control_replay\n"
+            f"end_control_replay.run_replay({TRANSCRIPTS!r})\n"
+            "sys.exit(1 if 'streamlit' in sys.modules else 0)\n"
+        )
+        completed = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
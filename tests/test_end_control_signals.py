@@ -0,0 +1,132 @@
+"""
+Test suite for end-control signal detection
+
+Tests SignalMatcher, scan_message and MICoverageTracker in end_control_middleware.py:
+- One scan reports every signal of a message, including overlapping ones
+- Results match re.search over each pattern list on a transcript corpus
+- The matched pattern is reported for each signal
+- Cached results cannot be changed by callers
+- MI coverage is accumulated from new messages only, with hit counts and first-hit turns
+"""
+
+import json
+import os
+import re
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import end_control_middleware
+from end_control_middleware import (
+    SIGNAL_PATTERNS,
+    MICoverageTracker,
+    SignalMatcher,
+    check_mi_coverage,
+    get_mi_coverage_tracker,
+    log_conversation_trace,
+    scan_message,
+)
+
+TRANSCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'benchmarks', 'data', 'transcripts.jsonl')
+
+
+class TestSignalMatcher(unittest.TestCase):
+    """Test cases for SignalMatcher.scan and scan_message."""
+
+    def test_overlapping_signals_in_one_scan(self):
+        """'Bye' is both a user end intent and a bot acknowledgment."""
+        signals = scan_message("Thanks so much, BYE!")
+
+        self.assertIn('user_end_intent', signals)
+        self.assertIn('bot_end_ack', signals)
+        self.assertNotIn('summary', signals)
+
+    def test_matches_per_pattern_search(self):
+        """Every signal agrees with searching the patterns one by one."""
+        with open(TRANSCRIPTS) as f:
+            texts = [message['content'] for line in f for message in json.loads(line)['messages']]
+        texts += ["", "   ", "No, we're DONE", "What do you think?\nIt's up to you."]
+
+        for text in texts:
+            signals = scan_message(text)
+            for name, patterns in SIGNAL_PATTERNS.items():
+                expected = any(re.search(pattern, text.lower().strip()) for pattern in patterns)
+                self.assertEqual(name in signals, expected, f"{name}: {text!r}")
+
+    def test_reports_matched_pattern(self):
+        matcher = SignalMatcher({'greeting': [r'\bhello\b', r'\bgood (morning|evening)\b'], 'other': ['xyz']})
+
+        self.assertEqual(matcher.scan("Well, GOOD evening."), {'greeting': r'\bgood (morning|evening)\b'})
+        self.assertEqual(matcher.scan(None), {})
+
+    def test_cached_result_not_shared(self):
+        first = scan_message("It sounds like you're worried.")
+        first.clear()
+        self.assertIn('reflection', scan_message("It sounds like you're worried."))
+
+
+class TestMICoverageTracker(unittest.TestCase):
+    """Test cases for MICoverageTracker and get_mi_coverage_tracker."""
+
+    def setUp(self):
+        with open(TRANSCRIPTS) as f:
+            self.messages = json.loads(f.readline())['messages']
+
+    def test_matches_full_scan_after_every_message(self):
+        tracker = MICoverageTracker()
+        history = []
+        for message in self.messages:
+            history.append(message)
+            self.assertEqual(tracker.update(history).coverage(), check_mi_coverage(history))
+        self.assertEqual(tracker.turn, sum(1 for m in self.messages if m['role'] == 'user'))
+
+    def test_hit_counts_and_first_turn(self):
+        history = [
+            {'role': 'assistant', 'content': 'Hello! What brings you in?'},
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'It sounds like you are busy.'},
+            {'role': 'user', 'content': 'Yes'},
+            {'role': 'assistant', 'content': 'It seems hard. How do you manage?'},
+        ]
+
+        detail = MICoverageTracker().update(history).to_dict()
+
+        self.assertEqual(detail['open_ended_question'], {'hits': 2, 'first_turn': 0})
+        self.assertEqual(detail['reflection'], {'hits': 2, 'first_turn': 1})
+        self.assertEqual(detail['summary'], {'hits': 0, 'first_turn': None})
+
+    def test_only_new_messages_scanned(self):
+        context = {'chat_history': list(self.messages[:4])}
+        get_mi_coverage_tracker(context)
+
+        context['chat_history'].extend(self.messages[4:6])
+        with patch.object(end_control_middleware, 'scan_message', wraps=scan_message) as scan:
+            tracker = get_mi_coverage_tracker(context)
+
+        self.assertIs(context['mi_coverage'], tracker)
+        self.assertEqual(scan.call_count, 1)  # One new assistant message
+
+    def test_restarts_on_new_conversation(self):
+        context = {'chat_history': list(self.messages)}
+        get_mi_coverage_tracker(context)
+
+        context['chat_history'] = [{'role': 'assistant', 'content': 'Hello!'}]
+        tracker = get_mi_coverage_tracker(context)
+
+        self.assertEqual(tracker.turn, 0)
+        self.assertEqual(tracker.missing(), list(end_control_middleware.MI_COVERAGE_PATTERNS))
+
+    def test_trace_reads_tracker(self):
+        context = {'chat_history': list(self.messages), 'turn_count': 8}
+        trace = log_conversation_trace(context, {'continue': True})
+
+        self.assertEqual(trace['mi_coverage'], check_mi_coverage(self.messages))
+        self.assertEqual(trace['mi_coverage_detail'], context['mi_coverage'].to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Test suite for evaluation_cache.py
+
+Tests the on-disk evaluation result cache:
+- Store/lookup roundtrip and hit/miss statistics
+- Keys ignore formatting-only transcript differences but not real changes
+- Least recently used entries are evicted over the size limit
+- Cache errors are treated as misses
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_cache import EvaluationCache, compute_evaluation_key, normalize_transcript
+
+
+CHAT_HISTORY = [
+    {"role": "user", "content": "How do you feel about the HPV vaccine?"},
+    {"role": "assistant", "content": "I'm not sure it's needed for my son."},
+]
+
+
+class TestEvaluationKey(unittest.TestCase):
+    """Test cases for cache key computation."""
+
+    def _key(self, **overrides):
+        args = {
+            'session_type': 'HPV',
+            'persona': 'Alex',
+            'chat_history': CHAT_HISTORY,
+            'prompt_version': 'v1',
+            'model': 'llama-3.1-8b-instant',
+        }
+        args.update(overrides)
+        return compute_evaluation_key(**args)
+
+    def test_formatting_differences_share_key(self):
+        """Whitespace and role case do not change the key."""
+        reformatted = [
+            {"role": "User", "content": "  How do you feel about\nthe HPV   vaccine? "},
+            {"role": "assistant", "content": "I'm not sure it's needed for my son."},
+        ]
+        self.assertEqual(normalize_transcript(reformatted), normalize_transcript(CHAT_HISTORY))
+        self.assertEqual(self._key(chat_history=reformatted), self._key())
+
+    def test_each_field_changes_key(self):
+        """Session type, persona, transcript, prompt version, model and response times all affect the key."""
+        base = self._key()
+        changed = [
+            self._key(session_type='OHI'),
+            self._key(persona='Bob'),
+            self._key(chat_history=CHAT_HISTORY + [{"role": "user", "content": "Tell me more."}]),
+            self._key(prompt_version='v2'),
+            self._key(model='other-model'),
+            self._key(response_times='Student response time over 2 turns: mean 7.0s'),
+        ]
+        for key in changed:
+            self.assertNotEqual(key, base)
+        self.assertEqual(len(set(changed)), len(changed))
+
+
+class TestEvaluationCache(unittest.TestCase):
+    """Test cases for the SQLite evaluation cache."""
+
+    def setUp(self):
+        """Create a temporary cache directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'cache', 'evaluations.sqlite3')
+
+    def tearDown(self):
+        """Remove temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_roundtrip(self):
+        """Stored feedback is returned by a later lookup, also from a new instance."""
+        cache = EvaluationCache(self.path)
+        self.assertIsNone(cache.get('key-1'))
+
+        cache.put('key-1', 'Feedback text', session_type='HPV', persona='Alex')
+
+        self.assertEqual(cache.get('key-1'), 'Feedback text')
+        self.assertEqual(EvaluationCache(self.path).get('key-1'), 'Feedback text')
+        stats = cache.get_stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_empty_feedback_not_stored(self):
+        """Empty feedback is not cached."""
+        cache = EvaluationCache(self.path)
+        cache.put('key-1', '')
+        self.assertIsNone(cache.get('key-1'))
+
+    def test_lru_eviction_over_size_limit(self):
+        """The least recently used entry is evicted once the size limit is exceeded."""
+        feedback = 'x' * 400
+        cache = EvaluationCache(self.path, max_size_mb=1000 / (1024 * 1024))
+        cache.put('old', feedback)
+        cache.put('recent', feedback)
+        cache.get('old')  # 'recent' is now least recently used
+
+        cache.put('new', feedback)
+
+        self.assertEqual(cache.get('old'), feedback)
+        self.assertIsNone(cache.get('recent'))
+        self.assertEqual(cache.get('new'), feedback)
+        stats = cache.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['size_bytes'], stats['max_size_bytes'])
+
+    def test_clear(self):
+        """clear() removes all entries."""
+        cache = EvaluationCache(self.path)
+        cache.put('key-1', 'Feedback text')
+        cache.clear()
+        self.assertIsNone(cache.get('key-1'))
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+    def test_unusable_path_is_a_miss(self):
+        """A cache path that cannot be created is treated as a miss, not an error."""
+        blocker = os.path.join(self.temp_dir, 'file')
+        with open(blocker, 'w') as f:
+            f.write('not a directory')
+        cache = EvaluationCache(os.path.join(blocker, 'evaluations.sqlite3'))
+
+        cache.put('key-1', 'Feedback text')
+
+        self.assertIsNone(cache.get('key-1'))
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+"""
+Test suite for feedback_jobs.py
+
+Tests background feedback generation:
+- Jobs run on the worker pool and record their result or error
+- Duplicate submissions attach to the in-flight (or finished) job
+- A new transcript or a failed job starts a fresh job
+- Finished jobs are pruned after their TTL
+- The PDF report job builds the report and reports backup progress off the script thread
+- Report jobs run on their own pool, so a stalled backup cannot block feedback
+- A failed report job is only submitted again when the user clicks Retry
+- generate_and_display_feedback uses the precomputed feedback context and a feedback job
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feedback_jobs import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    FeedbackJobManager,
+    compute_transcript_key,
+)
+
+
+def wait_for(job, timeout=5.0):
+    """Wait until a job is no longer queued or running."""
+    deadline = time.time() + timeout
+    while job.is_active and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+class TestFeedbackJobManager(unittest.TestCase):
+    """Test cases for FeedbackJobManager."""
+
+    def setUp(self):
+        """Create a small job manager."""
+        self.manager = FeedbackJobManager(max_workers=2, job_ttl_seconds=60)
+        self.calls = 0
+        self.release = threading.Event()
+
+    def generate(self, text):
+        """Fake evaluation call that blocks until released."""
+        self.calls += 1
+        self.release.wait(5)
+        return f"feedback for {text}"
+
+    def test_job_runs_in_background(self):
+        """submit() returns immediately; the result appears when the worker finishes."""
+        job = self.manager.submit('s1', 'k1', self.generate, 'transcript', metadata={'evaluator': 'Bot'})
+        self.assertTrue(job.is_active)
+
+        self.release.set()
+        wait_for(job)
+
+        self.assertEqual(job.status, STATUS_DONE)
+        self.assertEqual(job.result, 'feedback for transcript')
+        self.assertEqual(job.metadata['evaluator'], 'Bot')
+
+    def test_duplicate_clicks_attach_to_in_flight_job(self):
+        """Resubmitting the same transcript while running does not call the LLM again."""
+        first = self.manager.submit('s1', 'k1', self.generate, 'transcript')
+        second = self.manager.submit('s1', 'k1', self.generate, 'transcript')
+        self.release.set()
+        wait_for(first)
+        third = self.manager.submit('s1', 'k1', self.generate, 'transcript')
+
+        self.assertIs(first, second)
+        self.assertIs(first, third)
+        self.assertEqual(first.attached, 2)
+        self.assertEqual(self.calls, 1)
+
+    def test_new_transcript_replaces_job(self):
+        """A different transcript for the session starts a new job."""
+        self.release.set()
+        first = wait_for(self.manager.submit('s1', 'k1', self.generate, 'one'))
+        second = wait_for(self.manager.submit('s1', 'k2', self.generate, 'two'))
+
+        self.assertIsNot(first, second)
+        self.assertIs(self.manager.get('s1'), second)
+        self.assertEqual(self.calls, 2)
+
+    def test_sessions_are_independent(self):
+        """Jobs are keyed by session ID."""
+        self.release.set()
+        job_a = self.manager.submit('a', 'k1', self.generate, 'x')
+        job_b = self.manager.submit('b', 'k1', self.generate, 'x')
+
+        self.assertIsNot(job_a, job_b)
+        wait_for(job_a)
+        wait_for(job_b)
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_job_is_retried(self):
+        """A failed job records its error; resubmitting starts a new attempt."""
+        def fail():
+            raise RuntimeError("Error code: 500")
+
+        failed = wait_for(self.manager.submit('s1', 'k1', fail))
+        self.assertEqual(failed.status, STATUS_FAILED)
+        self.assertIn('500', str(failed.error))
+
+        self.release.set()
+        retried = wait_for(self.manager.submit('s1', 'k1', self.generate, 'x'))
+        self.assertIsNot(failed, retried)
+        self.assertEqual(retried.status, STATUS_DONE)
+
+    def test_worker_pool_is_bounded(self):
+        """No more than max_workers jobs run at once."""
+        jobs = [self.manager.submit(f's{i}', 'k', self.generate, str(i)) for i in range(4)]
+        time.sleep(0.1)
+
+        self.assertEqual(self.manager.get_stats()['running'], 2)
+        self.assertEqual(self.manager.get_stats()['queued'], 2)
+        self.release.set()
+        for job in jobs:
+            wait_for(job)
+        self.assertEqual(self.manager.get_stats()['done'], 4)
+
+    def test_finished_jobs_pruned_after_ttl(self):
+        """Expired finished jobs are removed on the next submit."""
+        manager = FeedbackJobManager(max_workers=1, job_ttl_seconds=0)
+        wait_for(manager.submit('old', 'k', lambda: 'done'))
+        time.sleep(0.01)
+        manager.submit('new', 'k', lambda: 'done')
+
+        self.assertIsNone(manager.get('old'))
+
+    def test_transcript_key(self):
+        """The key depends on every part and on part boundaries."""
+        self.assertEqual(compute_transcript_key('a', 'b'), compute_transcript_key('a', 'b'))
+        self.assertNotEqual(compute_transcript_key('a', 'b'), compute_transcript_key('ab', ''))
+
+
+class TestReportJob(unittest.TestCase):
+    """Test cases for the PDF report job run on the worker pool (chat_utils._build_report)."""
+
+    CHAT_HISTORY = [
+        {'role': 'assistant', 'content': 'Hello!'},
+        {'role': 'user', 'content': 'How do you feel about the vaccine?'},
+    ]
+
+    def build(self, box_email, progress):
+        from chat_utils import _build_report
+        return _build_report(
+            'Jane Doe', 'Feedback text', self.CHAT_HISTORY, 'HPV Vaccine', 'HPV Vaccine',
+            'report.pdf', box_email, {}, progress
+        )
+
+    def test_reports_use_their_own_pool(self):
+        """Report and backup jobs do not take feedback workers."""
+        import feedback_jobs
+
+        with patch.object(feedback_jobs, '_job_manager', None), \
+                patch.object(feedback_jobs, '_report_job_manager', None):
+            feedback_manager = feedback_jobs.get_feedback_job_manager()
+            report_manager = feedback_jobs.get_report_job_manager()
+
+            self.assertIsNot(report_manager, feedback_manager)
+            self.assertIs(feedback_jobs.get_report_job_manager(), report_manager)
+
+    def test_report_without_box_email(self):
+        report = self.build(None, {})
+
+        self.assertTrue(report['pdf'].startswith(b'%PDF'))
+        self.assertIsNone(report['backup'])
+
+    def test_backup_progress_recorded(self):
+        def send(**kwargs):
+            kwargs['progress_callback'](1, 3, 'Sending...')
+            return {'success': True, 'attempts': 1, 'queued': False, 'error': None}
+
+        progress = {}
+        with patch('email_utils.RobustEmailSender') as sender:
+            sender.return_value.send_with_guaranteed_delivery.side_effect = send
+            report = self.build('box@example.com', progress)
+
+        self.assertTrue(report['backup']['success'])
+        self.assertEqual(progress, {'attempt': 1, 'max_attempts': 3, 'status': 'Sending...'})
+
+
+class SessionState(dict):
+    """dict with attribute access, like st.session_state."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class TestReportFailure(unittest.TestCase):
+    """A failed report job waits for the user instead of being resubmitted on rerun."""
+
+    def setUp(self):
+        import chat_utils
+
+        self.st = MagicMock()
+        self.st.button.return_value = False
+        self.st.session_state = SessionState(
+            feedback={'content': 'Feedback text', 'timestamp': '2026-01-01 10:00:00', 'evaluator': 'Jane'},
+            selected_persona='Alex',
+            chat_history=[],
+        )
+        self.manager = MagicMock()
+        self.manager.submit.return_value = SimpleNamespace(is_active=False, status=STATUS_FAILED, error='boom')
+        patcher = patch.object(chat_utils, 'st', self.st)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('feedback_jobs.get_report_job_manager', return_value=self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_page(self):
+        from chat_utils import handle_report_backup
+        handle_report_backup('Jane Doe', 'HPV Vaccine', 'HPV', 'HPV Vaccine', 'box@example.com', 'HPV')
+
+    def test_failed_report_not_resubmitted_on_rerun(self):
+        self.run_page()
+        self.run_page()
+
+        self.assertEqual(self.manager.submit.call_count, 1)
+        self.assertEqual(self.st.session_state.email_backup_status, 'report_failed')
+        self.st.error.assert_called_with('Unexpected error: boom')
+        self.st.download_button.assert_not_called()
+
+    def test_retry_click_resubmits(self):
+        self.run_page()
+        self.st.button.return_value = True
+        self.run_page()
+        self.st.button.return_value = False
+        self.run_page()
+
+        self.assertEqual(self.manager.submit.call_count, 2)
+        self.assertEqual(self.st.session_state.report_attempt, 1)
+        self.st.rerun.assert_called_once()
+
+
+class TestGenerateAndDisplayFeedback(unittest.TestCase):
+    """generate_and_display_feedback goes through the knowledge base and the feedback job."""
+
+    def test_uses_feedback_context_and_job(self):
+        import chat_utils
+
+        st = MagicMock()
+        st.session_state = SessionState(
+            selected_persona='Alex',
+            chat_history=[{'role': 'assistant', 'content': 'Hello!'}, {'role': 'user', 'content': 'Hi'}],
+        )
+        knowledge_base = MagicMock()
+        knowledge_base.feedback_context.return_value = 'precomputed rubric context'
+        with patch.object(chat_utils, 'st', st), \
+                patch.object(chat_utils, 'submit_feedback_job') as submit, \
+                patch.object(chat_utils, 'poll_feedback_job'), \
+                patch('category_evaluation.get_evaluation_mode', return_value='single'):
+            chat_utils.generate_and_display_feedback(
+                {'Alex': 'persona prompt'}, 'HPV', 'Jane Doe', knowledge_base, object(), 'HPV Bot'
+            )
+
+        knowledge_base.retrieve.assert_not_called()
+        client, system_prompt, review_prompt, evaluator, session_type, category_prompts = submit.call_args.args[:6]
+        self.assertEqual((system_prompt, evaluator, session_type), ('persona prompt', 'HPV Bot', 'HPV'))
+        self.assertIn('precomputed rubric context', review_prompt)
+        self.assertIsNone(category_prompts)
+
+
+if __name__ == '__main__':
+    unittest.main()
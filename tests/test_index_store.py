@@ -0,0 +1,187 @@
+"""
+Test suite for rag/index_store.py
+
+Tests the prebuilt on-disk rubric index:
+- Write/read roundtrip with memory-mapped embedding and BM25 indexes
+- Stale artifacts (content or model change) are ignored
+- get_knowledge_base loads a prebuilt index without encoding the corpus
+"""
+
+import json
+import os
+import sys
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag import backends as backends_module
+from rag.backends import EMBEDDING_MODEL_NAME, BM25Backend, EmbeddingBackend
+from rag.index_store import (
+    MANIFEST_FILE,
+    get_artifact_dir,
+    read_artifact,
+    read_manifest,
+)
+from rag.knowledge_base import (
+    KnowledgeBase,
+    clear_knowledge_bases,
+    compute_corpus_hash,
+    get_knowledge_base,
+    load_rubric_texts,
+)
+from tests.test_knowledge_base import FakeEmbeddingModel
+
+
+class TestIndexStore(unittest.TestCase):
+    """Test cases for prebuilt index persistence."""
+
+    def setUp(self):
+        """Create a rubric directory, an index directory and patch in the fake model."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_dir = os.path.join(self.temp_dir, 'index')
+        self.rubrics_dir = os.path.join(self.temp_dir, 'test_rubrics')
+        os.makedirs(self.rubrics_dir)
+        self._write('a.txt', 'Reflections demonstrate listening. Open questions evoke change talk.')
+        self._write('b.txt', 'Summaries reflect the big picture and check next steps.')
+
+        self.model = FakeEmbeddingModel()
+        patcher = patch.object(backends_module, 'get_embedding_model', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env_patcher = patch.dict(os.environ, {'RAG_INDEX_DIR': self.index_dir})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        clear_knowledge_bases()
+
+    def tearDown(self):
+        """Remove temporary files and cached indexes."""
+        clear_knowledge_bases()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.rubrics_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _build_and_save(self, backend=None):
+        rubric_texts = load_rubric_texts(self.rubrics_dir)
+        knowledge_base = KnowledgeBase.build('test_rubrics', rubric_texts, backend=backend or EmbeddingBackend())
+        knowledge_base.save()
+        return knowledge_base
+
+    def test_roundtrip_is_memory_mapped(self):
+        """A saved index loads back with the same chunks and mmap'd embeddings."""
+        built = self._build_and_save()
+        backend = EmbeddingBackend()
+        chunks = read_artifact('test_rubrics', built.corpus_hash, backend)
+
+        self.assertEqual(chunks, built.chunks)
+        self.assertIsInstance(backend.embeddings, np.memmap)
+        np.testing.assert_array_equal(np.asarray(backend.embeddings), built.backend.embeddings)
+        self.assertEqual(backend.index.ntotal, len(chunks))
+
+    def test_bm25_roundtrip_is_memory_mapped(self):
+        """A BM25 index is stored under its own backend directory and loads mmap'd."""
+        built = self._build_and_save(BM25Backend())
+        backend = BM25Backend()
+        chunks = read_artifact('test_rubrics', built.corpus_hash, backend)
+
+        self.assertEqual(chunks, built.chunks)
+        self.assertIsInstance(backend.weights, np.memmap)
+        query = ['summaries big picture']
+        self.assertEqual(backend.search(query, 1), built.backend.search(query, 1))
+        self.assertIsNone(read_manifest('test_rubrics'))
+
+    @unittest.skipIf(os.name != 'posix', "POSIX permissions")
+    def test_artifact_readable_by_other_users(self):
+        """The published artifact directory is not left with mkdtemp's 0700 mode."""
+        self._build_and_save(BM25Backend())
+        artifact_dir = get_artifact_dir('test_rubrics', backend_name=BM25Backend.name)
+
+        self.assertEqual(stat.S_IMODE(os.stat(artifact_dir).st_mode), 0o755)
+
+    def test_manifest_records_sources_and_model(self):
+        """The manifest stamps per-file hashes and the model name."""
+        built = self._build_and_save()
+        manifest = read_manifest('test_rubrics')
+
+        self.assertEqual(manifest['model_name'], EMBEDDING_MODEL_NAME)
+        self.assertEqual(manifest['corpus_hash'], built.corpus_hash)
+        self.assertEqual(sorted(manifest['source_files']), ['a.txt', 'b.txt'])
+        self.assertEqual(manifest['chunk_count'], len(built.chunks))
+        self.assertEqual((manifest['chunk_size'], manifest['chunk_overlap']), (built.chunk_size, built.chunk_overlap))
+
+    def test_stale_artifact_ignored(self):
+        """A different corpus hash or model name does not load the artifact."""
+        built = self._build_and_save()
+
+        class OtherModelBackend(EmbeddingBackend):
+            model_name = 'other-model'
+
+        self.assertIsNone(read_artifact('test_rubrics', 'other-hash', EmbeddingBackend()))
+        self.assertIsNone(read_artifact('test_rubrics', built.corpus_hash, OtherModelBackend()))
+        self.assertIsNone(read_artifact('test_rubrics', built.corpus_hash, EmbeddingBackend(), chunk_size=60))
+
+    def test_inconsistent_artifact_ignored(self):
+        """A manifest that disagrees with the stored chunks is rejected."""
+        built = self._build_and_save()
+        manifest_path = get_artifact_dir('test_rubrics') / MANIFEST_FILE
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        manifest['chunk_count'] += 1
+        manifest_path.write_text(json.dumps(manifest), encoding='utf-8')
+
+        self.assertIsNone(read_artifact('test_rubrics', built.corpus_hash, EmbeddingBackend()))
+
+    def test_registry_loads_prebuilt_without_encoding(self):
+        """get_knowledge_base maps a prebuilt index instead of encoding the corpus."""
+        built = self._build_and_save()
+        clear_knowledge_bases()
+        self.model.encode_calls = 0
+
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+
+        self.assertEqual(self.model.encode_calls, 0)
+        self.assertEqual(knowledge_base.chunks, built.chunks)
+        self.assertEqual(knowledge_base.retrieve('summaries big picture', top_k=1)[0], built.chunks[-1])
+
+    def test_registry_persists_fresh_build(self):
+        """A registry miss without a prebuilt index writes one for other processes."""
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+        corpus_hash = compute_corpus_hash(load_rubric_texts(self.rubrics_dir))
+
+        self.assertEqual(knowledge_base.corpus_hash, corpus_hash)
+        self.assertIsNotNone(read_artifact('test_rubrics', corpus_hash, EmbeddingBackend()))
+
+    def test_registry_rebuilds_stale_prebuilt(self):
+        """Editing a rubric file after prebuilding triggers a rebuild and rewrite."""
+        built = self._build_and_save()
+        clear_knowledge_bases()
+        self._write('c.txt', 'Autonomy support respects the patient decision.')
+
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+
+        self.assertNotEqual(knowledge_base.corpus_hash, built.corpus_hash)
+        self.assertEqual(read_manifest('test_rubrics')['corpus_hash'], knowledge_base.corpus_hash)
+
+    def test_registry_rebuilds_on_chunk_settings_change(self):
+        """Changing retrieval.chunk_size/chunk_overlap rebuilds the shared and prebuilt index."""
+        built = get_knowledge_base(self.rubrics_dir)
+
+        with patch('rag.knowledge_base.get_chunk_settings', return_value=(40, 10)):
+            knowledge_base = get_knowledge_base(self.rubrics_dir)
+
+        self.assertIsNot(knowledge_base, built)
+        self.assertEqual(knowledge_base.corpus_hash, built.corpus_hash)
+        self.assertGreater(len(knowledge_base.chunks), len(built.chunks))
+        manifest = read_manifest('test_rubrics')
+        self.assertEqual((manifest['chunk_size'], manifest['chunk_overlap']), (40, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+"""
+Test suite for rag/knowledge_base.py
+
+Tests the shared knowledge base registry:
+- Embedding model is loaded once and reused
+- One index per rubric directory, reused across calls
+- Rebuild when rubric content changes
+- Error handling for missing/empty rubric directories
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import zlib
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag import backends as backends_module
+from rag.backends import EMBEDDING_DIMENSION
+from rag.knowledge_base import (
+    KnowledgeBase,
+    KnowledgeBaseError,
+    get_knowledge_base,
+    clear_knowledge_bases,
+    compute_corpus_hash,
+)
+from rag.retrieval_cache import CATEGORY_QUERIES
+from rubric.mi_rubric import MIRubric
+
+
+class FakeEmbeddingModel:
+    """Deterministic bag-of-words encoder standing in for SentenceTransformer."""
+
+    def __init__(self):
+        self.encode_calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.encode_calls += 1
+        vectors = np.zeros((len(texts), EMBEDDING_DIMENSION), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode('utf-8')) % EMBEDDING_DIMENSION] += 1.0
+        return vectors
+
+
+class TestKnowledgeBaseRegistry(unittest.TestCase):
+    """Test cases for get_knowledge_base."""
+
+    def setUp(self):
+        """Create a temporary rubric directory and patch in the fake model."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.rubrics_dir = os.path.join(self.temp_dir, 'test_rubrics')
+        os.makedirs(self.rubrics_dir)
+        self._write('a.txt', 'Reflections demonstrate listening. Open questions evoke change talk.')
+        self._write('b.txt', 'Summaries reflect the big picture and check next steps.')
+
+        self.model = FakeEmbeddingModel()
+        patcher = patch.object(backends_module, 'get_embedding_model', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env_patcher = patch.dict(os.environ, {'RAG_INDEX_DIR': os.path.join(self.temp_dir, 'index')})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        clear_knowledge_bases()
+
+    def tearDown(self):
+        """Remove temporary files and cached indexes."""
+        clear_knowledge_bases()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, text):
+        with open(os.path.join(self.rubrics_dir, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_index_reused_across_calls(self):
+        """Repeated calls return the same knowledge base without re-encoding."""
+        first = get_knowledge_base(self.rubrics_dir)
+        encode_calls = self.model.encode_calls
+        second = get_knowledge_base(self.rubrics_dir)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.model.encode_calls, encode_calls)
+        self.assertEqual(first.name, 'test_rubrics')
+
+    def test_rebuild_on_content_change(self):
+        """Editing a rubric file produces a new index with a new hash."""
+        first = get_knowledge_base(self.rubrics_dir)
+        self._write('c.txt', 'Autonomy support respects the patient decision.')
+        second = get_knowledge_base(self.rubrics_dir)
+
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.corpus_hash, second.corpus_hash)
+        self.assertIs(get_knowledge_base(self.rubrics_dir), second)
+
+    def test_retrieve_returns_relevant_chunk(self):
+        """Retrieval returns the chunk sharing the query words."""
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+        results = knowledge_base.retrieve('reflections demonstrate listening', top_k=1)
+
+        self.assertEqual(len(results), 1)
+        self.assertIn('Reflections', results[0])
+
+    def test_missing_directory_raises(self):
+        """A missing directory raises KnowledgeBaseError."""
+        with self.assertRaises(KnowledgeBaseError):
+            get_knowledge_base(os.path.join(self.temp_dir, 'missing'))
+
+    def test_empty_directory_raises(self):
+        """A directory without .txt files raises KnowledgeBaseError."""
+        empty_dir = os.path.join(self.temp_dir, 'empty')
+        os.makedirs(empty_dir)
+        with self.assertRaises(KnowledgeBaseError):
+            get_knowledge_base(empty_dir)
+
+
+class TestBatchedRetrieval(unittest.TestCase):
+    """Test cases for retrieve_many and per-category retrieval."""
+
+    def setUp(self):
+        """Build a knowledge base over one chunk per rubric category."""
+        self.model = FakeEmbeddingModel()
+        patcher = patch.object(backends_module, 'get_embedding_model', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        clear_knowledge_bases()
+        self.addCleanup(clear_knowledge_bases)
+
+        rubric_texts = [
+            (f'{i}.txt', f'{i}. {query}')
+            for i, query in enumerate(CATEGORY_QUERIES.values(), start=1)
+        ]
+        self.knowledge_base = KnowledgeBase.build('categories', rubric_texts)
+        self.model.encode_calls = 0
+
+    def test_retrieve_many_uses_one_encode(self):
+        """Several uncached queries are embedded in a single batch."""
+        queries = ['reflections listening', 'open-ended questions', 'big picture summary']
+        results = self.knowledge_base.retrieve_many(queries, top_k=2)
+
+        self.assertEqual(self.model.encode_calls, 1)
+        self.assertEqual(list(results), queries)
+        self.assertTrue(all(len(chunks) == 2 for chunks in results.values()))
+
+    def test_retrieve_many_collapses_duplicate_queries(self):
+        """Repeated queries are answered once, and later calls hit the cache."""
+        results = self.knowledge_base.retrieve_many(['open questions', 'open questions'], top_k=1)
+        self.knowledge_base.retrieve_many(['open questions'], top_k=1)
+
+        self.assertEqual(list(results), ['open questions'])
+        self.assertEqual(self.model.encode_calls, 1)
+
+    def test_retrieve_by_category_covers_rubric_without_repeats(self):
+        """Every rubric category gets its own chunk and no chunk is reused."""
+        by_category = self.knowledge_base.retrieve_by_category(top_k=1)
+        chunks = [chunk for picked in by_category.values() for chunk in picked]
+
+        self.assertEqual(list(by_category), list(MIRubric.CATEGORIES))
+        self.assertEqual(len(chunks), len(set(chunks)))
+        for category, picked in by_category.items():
+            self.assertEqual(len(picked), 1)
+            self.assertIn(category, picked[0])
+
+    def test_feedback_context_is_precomputed(self):
+        """The feedback context needs no encoding after a build."""
+        context = self.knowledge_base.feedback_context()
+
+        self.assertEqual(self.model.encode_calls, 0)
+        for category in MIRubric.CATEGORIES:
+            self.assertIn(f"{category}:", context)
+
+    def test_category_contexts_are_precomputed(self):
+        """Each category gets its own context, with no encoding after a build."""
+        contexts = self.knowledge_base.category_contexts(top_k=1)
+
+        self.assertEqual(self.model.encode_calls, 0)
+        self.assertEqual(list(contexts), list(MIRubric.CATEGORIES))
+        for category, context in contexts.items():
+            self.assertIn(category, context)
+
+
+class TestCorpusHelpers(unittest.TestCase):
+    """Test cases for corpus hashing."""
+
+    def test_corpus_hash_depends_on_names_and_content(self):
+        """Hash changes with either the file name or the file content."""
+        base = compute_corpus_hash([('a.txt', 'hello')])
+        self.assertEqual(base, compute_corpus_hash([('a.txt', 'hello')]))
+        self.assertNotEqual(base, compute_corpus_hash([('b.txt', 'hello')]))
+        self.assertNotEqual(base, compute_corpus_hash([('a.txt', 'hello!')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Test suite for rag/lazy_imports.py and rag/warmup.py
+
+Tests deferred loading of heavy retrieval dependencies:
+- Importing rag (and chat_utils) does not import faiss/torch/sentence_transformers
+- LazyModule imports on first attribute access
+- Background warm-up starts at most once per process
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from rag import warmup as warmup_module
+from rag.lazy_imports import LazyModule
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test cases for import deferral."""
+
+    def _modules_after_import(self, module):
+        """Import a module in a fresh interpreter and report which heavy deps loaded."""
+        code = (
+            f"import sys; import {module}; "
+            "print(','.join(m for m in ('faiss', 'torch', 'sentence_transformers') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip()
+
+    def test_rag_import_defers_heavy_modules(self):
+        """Importing the rag package does not import faiss, torch or sentence_transformers."""
+        self.assertEqual(self._modules_after_import('rag'), '')
+
+    def test_lazy_module_imports_on_attribute_access(self):
+        """LazyModule loads the target module only when an attribute is used."""
+        lazy_json = LazyModule('json')
+        self.assertIsNone(lazy_json._module)
+
+        self.assertEqual(lazy_json.dumps([1]), '[1]')
+        self.assertIsNotNone(lazy_json._module)
+        self.assertTrue(lazy_json.is_loaded)
+
+    def test_lazy_module_missing_dependency_raises_on_use(self):
+        """A missing module fails at first use, not at proxy creation."""
+        lazy_missing = LazyModule('module_that_does_not_exist')
+        with self.assertRaises(ImportError):
+            lazy_missing.anything
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test cases for background warm-up."""
+
+    def setUp(self):
+        """Reset the once-per-process guard."""
+        warmup_module._warm_up_thread = None
+        self.addCleanup(setattr, warmup_module, '_warm_up_thread', None)
+
+    def test_start_warm_up_runs_once(self):
+        """Only the first call starts a warm-up thread."""
+        with patch.object(warmup_module, 'warm_up') as mock_warm_up:
+            self.assertTrue(warmup_module.start_warm_up(['hpv_rubrics']))
+            self.assertFalse(warmup_module.start_warm_up(['hpv_rubrics']))
+            warmup_module._warm_up_thread.join(timeout=5)
+
+        mock_warm_up.assert_called_once_with(['hpv_rubrics'])
+
+    def test_warm_up_never_raises(self):
+        """Dependency failures are logged, not raised."""
+        with patch.object(warmup_module, 'get_embedding_model', side_effect=ImportError('no torch')), \
+                patch.object(warmup_module.faiss, 'load'):
+            warmup_module.warm_up(['hpv_rubrics'])
+
+
+if __name__ == '__main__':
+    unittest.main()
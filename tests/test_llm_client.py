@@ -0,0 +1,100 @@
+"""
+Test suite for llm_client.py
+
+Tests the pooled Groq clients:
+- One client per API key, reused across calls
+- Bounded LRU eviction
+- The process environment is never modified
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import GroqClientPool, hash_api_key
+
+SETTINGS = {'max_connections': 4, 'max_keepalive_connections': 2, 'keepalive_expiry_seconds': 5}
+
+
+class TestGroqClientPool(unittest.TestCase):
+    """Test cases for GroqClientPool."""
+
+    def test_same_key_reuses_client(self):
+        """Repeated lookups with one key return the same client."""
+        pool = GroqClientPool(max_clients=4, settings=SETTINGS)
+
+        first = pool.get('gsk_key_a')
+        second = pool.get('gsk_key_a')
+
+        self.assertIs(first, second)
+        self.assertEqual(first.api_key, 'gsk_key_a')
+        self.assertEqual(pool.get_stats()['misses'], 1)
+        self.assertEqual(pool.get_stats()['hits'], 1)
+
+    def test_different_keys_get_different_clients(self):
+        """Each API key has its own client."""
+        pool = GroqClientPool(max_clients=4, settings=SETTINGS)
+
+        client_a = pool.get('gsk_key_a')
+        client_b = pool.get('gsk_key_b')
+
+        self.assertIsNot(client_a, client_b)
+        self.assertEqual(client_b.api_key, 'gsk_key_b')
+
+    def test_lru_eviction(self):
+        """The least recently used client is evicted when the pool is full."""
+        pool = GroqClientPool(max_clients=2, settings=SETTINGS)
+        client_a = pool.get('gsk_key_a')
+        pool.get('gsk_key_b')
+        pool.get('gsk_key_a')
+        pool.get('gsk_key_c')
+
+        self.assertEqual(len(pool), 2)
+        self.assertIs(pool.get('gsk_key_a'), client_a)
+        self.assertEqual(pool.get_stats()['evictions'], 1)
+        self.assertNotIn(hash_api_key('gsk_key_b'), pool._clients)
+
+    def test_keys_stored_hashed(self):
+        """Cache keys are hashes, never the raw API key."""
+        pool = GroqClientPool(max_clients=2, settings=SETTINGS)
+        pool.get('gsk_secret')
+
+        self.assertEqual(list(pool._clients), [hash_api_key('gsk_secret')])
+
+    def test_environment_untouched(self):
+        """Creating clients never sets GROQ_API_KEY."""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('GROQ_API_KEY', None)
+            GroqClientPool(max_clients=2, settings=SETTINGS).get('gsk_key_a')
+            self.assertNotIn('GROQ_API_KEY', os.environ)
+
+    def test_empty_key_rejected(self):
+        """An empty API key raises ValueError."""
+        with self.assertRaises(ValueError):
+            GroqClientPool(max_clients=2, settings=SETTINGS).get('')
+
+    def test_concurrent_lookups_share_one_client(self):
+        """Concurrent first lookups for a key create a single client."""
+        pool = GroqClientPool(max_clients=4, settings=SETTINGS)
+        clients = []
+
+        def lookup():
+            clients.append(pool.get('gsk_key_a'))
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertEqual(pool.get_stats()['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Test suite for llm_metrics.py
+
+Tests per-call LLM instrumentation:
+- Calls are recorded with latency, usage, purpose and outcome
+- The ring buffer is bounded and records are appended to the metrics file
+- Percentile aggregation per purpose
+"""
+
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_metrics
+from llm_metrics import (
+    LLMCallRecord,
+    LLMMetrics,
+    extract_usage,
+    percentile,
+    track_llm_call,
+)
+
+
+class TestLLMMetrics(unittest.TestCase):
+    """Test cases for the LLM call metrics store."""
+
+    def setUp(self):
+        """Create a temporary metrics file and install a fresh store."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.metrics_file = os.path.join(self.temp_dir, 'metrics', 'llm_calls.jsonl')
+        self.metrics = LLMMetrics(ring_buffer_size=3, metrics_file=self.metrics_file)
+        patcher = patch.object(llm_metrics, '_llm_metrics', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Remove temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def _record(self, purpose='turn', latency_ms=100.0, outcome='ok'):
+        call = LLMCallRecord(purpose, 'model-a')
+        call.latency_ms = latency_ms
+        call.outcome = outcome
+        self.metrics.record(call)
+
+    def test_track_records_usage_and_latency(self):
+        """A tracked call records the model, purpose, usage and a latency."""
+        response = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+        with track_llm_call('evaluation', 'model-a') as call:
+            call.set_usage(extract_usage(response))
+
+        record = self.metrics.get_records()[0]
+        self.assertEqual((record['purpose'], record['model'], record['outcome']), ('evaluation', 'model-a', 'ok'))
+        self.assertEqual((record['prompt_tokens'], record['completion_tokens']), (120, 30))
+        self.assertGreaterEqual(record['latency_ms'], 0)
+
+    def test_track_records_errors(self):
+        """An exception is recorded as an error and re-raised."""
+        with self.assertRaises(ValueError):
+            with track_llm_call('turn', 'model-a'):
+                raise ValueError('boom')
+
+        record = self.metrics.get_records()[0]
+        self.assertEqual((record['outcome'], record['error']), ('error', 'ValueError'))
+
+    def test_stream_usage_from_final_chunk(self):
+        """Usage on a stream's final chunk (x_groq.usage) is found."""
+        chunk = SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=SimpleNamespace(prompt_tokens=5)))
+        self.assertEqual(extract_usage(chunk).prompt_tokens, 5)
+        self.assertIsNone(extract_usage(SimpleNamespace(choices=[])))
+
+    def test_ring_buffer_bounded_and_file_appended(self):
+        """Only the newest records stay in memory; the file keeps every record."""
+        for latency in (1, 2, 3, 4, 5):
+            self._record(latency_ms=latency)
+
+        self.assertEqual([r['latency_ms'] for r in self.metrics.get_records()], [3, 4, 5])
+        with open(self.metrics_file, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([r['latency_ms'] for r in lines], [1, 2, 3, 4, 5])
+        self.assertEqual(self.metrics.get_summary()['total_calls'], 5)
+
+    def test_unwritable_file_does_not_fail(self):
+        """A metrics file that cannot be written only disables the file output."""
+        blocker = os.path.join(self.temp_dir, 'file')
+        with open(blocker, 'w') as f:
+            f.write('not a directory')
+        metrics = LLMMetrics(metrics_file=os.path.join(blocker, 'llm_calls.jsonl'))
+        metrics.record(LLMCallRecord('turn', 'model-a'))
+        self.assertEqual(len(metrics.get_records()), 1)
+
+    def test_process_metrics_file_off_by_default(self):
+        """The shared metrics write no file unless one is configured."""
+        from config_loader import ConfigLoader
+
+        env = {k: v for k, v in os.environ.items() if k != llm_metrics.METRICS_FILE_ENV}
+        with patch.dict(os.environ, env, clear=True), \
+                patch.object(llm_metrics, '_llm_metrics', None), \
+                patch('config_loader.get_config_loader', return_value=ConfigLoader(load_dotenv_file=False)):
+            self.assertIsNone(llm_metrics.get_llm_metrics().metrics_file)
+
+            with patch.object(llm_metrics, '_llm_metrics', None), \
+                    patch.dict(os.environ, {llm_metrics.METRICS_FILE_ENV: self.metrics_file}):
+                self.assertEqual(str(llm_metrics.get_llm_metrics().metrics_file), self.metrics_file)
+
+    def test_summary_percentiles_by_purpose(self):
+        """The summary groups records by purpose with latency percentiles."""
+        metrics = LLMMetrics(ring_buffer_size=200, metrics_file=None)
+        for latency in range(1, 101):
+            call = LLMCallRecord('turn', 'model-a')
+            call.latency_ms = float(latency)
+            metrics.record(call)
+        aborted = LLMCallRecord('correction', 'model-a')
+        aborted.latency_ms = 50.0
+        aborted.outcome = 'aborted'
+        metrics.record(aborted)
+
+        summary = metrics.get_summary()['by_purpose']
+        self.assertEqual(summary['turn']['latency_ms'], {'p50': 50.0, 'p95': 95.0, 'p99': 99.0})
+        self.assertEqual(summary['turn']['calls'], 100)
+        self.assertIsNone(summary['turn']['ttft_ms']['p50'])
+        self.assertEqual(summary['correction']['aborted'], 1)
+
+    def test_percentile(self):
+        """Nearest-rank percentiles of small samples."""
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([3, 1, 2], 99), 3)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
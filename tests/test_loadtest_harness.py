@@ -0,0 +1,182 @@
+"""
+Test suite for loadtest/harness.py and loadtest/stand_ins.py
+
+Tests the classroom-burst harness and its stand-ins:
+- Scenario loading over the defaults and config building for a run
+- The fake access-code sheet and the SMTP sink
+- A small end-to-end run: every student gets through the portal, the
+  chat turns, feedback, PDF and email backup
+"""
+
+import json
+import logging
+import os
+import smtplib
+import sys
+import tempfile
+import unittest
+from email.message import EmailMessage
+from pathlib import Path
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import evaluation_cache
+import feedback_jobs
+import llm_client
+import llm_metrics
+import logger_config
+import rate_limiter
+from loadtest.harness import (
+    DEFAULT_SCENARIO,
+    RUN_ENV_VARS,
+    StageRecorder,
+    build_config,
+    format_report,
+    load_scenario,
+    run_scenario,
+)
+from loadtest.stand_ins import FakeSheetsClient, SMTPSink
+
+SCENARIO_DIR = Path(__file__).resolve().parent.parent / 'loadtest' / 'scenarios'
+
+
+class TestScenarios(unittest.TestCase):
+    """Test cases for scenario loading and run configuration."""
+
+    def test_defaults_fill_missing_keys(self):
+        """Keys a scenario leaves out come from DEFAULT_SCENARIO; nested dicts merge."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'scenario.json')
+            with open(path, 'w') as f:
+                json.dump({'students': 3, 'mock_server': {'error_rate_429': 0.1}}, f)
+            scenario = load_scenario(path, {'turns': 2})
+
+        self.assertEqual(scenario['students'], 3)
+        self.assertEqual(scenario['turns'], 2)
+        self.assertEqual(scenario['bots'], DEFAULT_SCENARIO['bots'])
+        self.assertEqual(scenario['mock_server']['error_rate_429'], 0.1)
+        self.assertEqual(scenario['mock_server']['end_after_turns'], 0)
+
+    def test_shipped_scenarios_load(self):
+        """Every scenario in loadtest/scenarios is valid."""
+        for path in sorted(SCENARIO_DIR.glob('*.json')):
+            with self.subTest(scenario=path.name):
+                scenario = load_scenario(str(path))
+                self.assertGreater(scenario['students'], 0)
+
+    def test_unknown_bot_rejected(self):
+        with self.assertRaises(ValueError):
+            load_scenario(overrides={'bots': ['DENTAL']})
+
+    def test_build_config_redirects_to_stand_ins(self):
+        """SMTP points at the sink and every file the app writes lands in the workdir."""
+        workdir = Path('/tmp/run')
+        scenario = load_scenario(overrides={'config': {'rate_limits': {'requests_per_minute': 5}}})
+        config = build_config(scenario, workdir, 2525)
+
+        self.assertEqual(config['email_config']['smtp_server'], '127.0.0.1')
+        self.assertEqual(config['email_config']['smtp_port'], 2525)
+        self.assertFalse(config['email_config']['smtp_use_ssl'])
+        self.assertTrue(config['email_config']['hpv_box_email'])
+        self.assertEqual(config['logging']['smtp_log_directory'], str(workdir / 'smtp_logs'))
+        self.assertEqual(config['llm_metrics']['metrics_file'], str(workdir / 'llm_calls.jsonl'))
+        self.assertEqual(config['retrieval']['backend'], 'bm25')
+        self.assertEqual(config['rate_limits']['requests_per_minute'], 5)
+        self.assertIn('tokens_per_minute', config['rate_limits'])
+
+
+class TestStandIns(unittest.TestCase):
+    """Test cases for the fake sheet, the SMTP sink and the stage recorder."""
+
+    def test_fake_sheet_reads_and_writes(self):
+        client = FakeSheetsClient([{'name': 'Ann', 'bot': 'HPV', 'secret': 'S1'}])
+        worksheet = client.open_by_key('sheet').worksheet('Sheet1')
+
+        rows = worksheet.get_all_values()
+        self.assertEqual(rows[0][:5], ['Table No', 'Name', 'Bot', 'Secret', 'Used'])
+        self.assertEqual(rows[1][1:5], ['Ann', 'HPV', 'S1', 'FALSE'])
+
+        worksheet.update_cell(2, 5, 'TRUE')
+        self.assertEqual(worksheet.get_all_values()[1][4], 'TRUE')
+        self.assertEqual((worksheet.reads, worksheet.writes), (2, 1))
+
+    def test_smtp_sink_accepts_login_and_message(self):
+        sink = SMTPSink().start()
+        self.addCleanup(sink.stop)
+        message = EmailMessage()
+        message['From'] = 'a@example.com'
+        message['To'] = 'b@example.com'
+        message['Subject'] = 'Report'
+        message.set_content('body')
+
+        with smtplib.SMTP(sink.host, sink.port, timeout=5) as server:
+            server.login('user', 'password')
+            server.send_message(message)
+
+        self.assertEqual(sink.messages, 1)
+        self.assertGreater(sink.bytes_received, 0)
+
+    def test_stage_recorder_percentiles(self):
+        recorder = StageRecorder()
+        for value in range(1, 101):
+            recorder.record('turn', float(value))
+
+        summary = recorder.summary()
+        self.assertEqual(summary['turn']['count'], 100)
+        self.assertEqual(summary['turn']['p50'], 50.0)
+        self.assertEqual(summary['turn']['p95'], 95.0)
+        self.assertEqual(summary['turn']['max'], 100.0)
+        self.assertEqual(recorder.completed_turns, 100)
+        self.assertNotIn('portal', summary)
+
+
+class TestHarnessRun(unittest.TestCase):
+    """End-to-end run of a small class against the stand-ins."""
+
+    def setUp(self):
+        # The run builds its own process-wide singletons from the run config
+        for module, name in ((rate_limiter, '_rate_limiter'), (llm_metrics, '_llm_metrics'),
+                             (feedback_jobs, '_job_manager'), (feedback_jobs, '_report_job_manager'),
+                             (evaluation_cache, '_evaluation_cache'),
+                             (llm_client, '_client_pool')):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_small_class_completes(self):
+        """Two students finish every stage and the report covers each of them."""
+        scenario = load_scenario(overrides={
+            'students': 2,
+            'turns': 2,
+            'bots': ['HPV', 'OHI'],
+            'config': {'rate_limits': {'enabled': False}},
+        })
+        environ = {name: os.environ.get(name) for name in RUN_ENV_VARS}
+        repo_log = os.path.join(logger_config.DEFAULT_LOG_DIR, logger_config.DEFAULT_LOG_FILE)
+        repo_log_size = os.path.getsize(repo_log) if os.path.exists(repo_log) else 0
+        root_handlers = list(logging.getLogger().handlers)
+
+        report = run_scenario(scenario)
+
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['completed_students'], 2)
+        self.assertEqual(report['completed_turns'], 4)
+        for stage in ('portal', 'persona', 'finish', 'feedback', 'pdf', 'email_backup'):
+            self.assertEqual(report['stages_ms'][stage]['count'], 2, stage)
+        self.assertEqual(report['stages_ms']['turn']['count'], 4)
+        self.assertEqual(report['sheet']['writes'], 2)
+        self.assertEqual(report['smtp']['messages'], 2)
+        self.assertEqual(report['mock_server']['evaluations'], 2)
+        self.assertGreater(report['peak_rss_mb'], 0)
+        self.assertIn('Throughput', format_report(report))
+        # The run's environment changes are undone
+        self.assertEqual({name: os.environ.get(name) for name in RUN_ENV_VARS}, environ)
+        # The chatbot log of the run stays out of the repository's log
+        self.assertEqual(os.path.getsize(repo_log) if os.path.exists(repo_log) else 0, repo_log_size)
+        self.assertEqual(logging.getLogger().handlers, root_handlers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Test suite for loadtest/mock_groq_server.py
+
+Tests the local Groq stand-in through the real Groq client:
+- Persona replies, streamed and non-streamed, with usage
+- The patient ends the session with the end token after end_after_turns
+- Evaluation feedback parses with EvaluationService
+- Injected 429 (with Retry-After) and 500 responses
+- Latency distribution sampling
+"""
+
+import os
+import random
+import sys
+import unittest
+
+from groq import Groq, InternalServerError, RateLimitError
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from end_control_middleware import END_TOKEN
+from feedback_template import FeedbackFormatter
+from loadtest.mock_groq_server import (
+    PATIENT_REPLIES,
+    MockGroqServer,
+    MockServerSettings,
+    sample_latency_ms,
+)
+from persona_texts import OHI_DOMAIN_NAME, OHI_PERSONAS
+from services.evaluation_service import EvaluationService
+
+PERSONA_PROMPT = OHI_PERSONAS[next(iter(OHI_PERSONAS))]['system_prompt']
+
+
+class TestMockGroqServer(unittest.TestCase):
+    """Test cases for the mock chat-completions server."""
+
+    def setUp(self):
+        """Start a server on a free port and a client pointed at it."""
+        self.server = MockGroqServer(MockServerSettings(end_after_turns=3)).start()
+        self.addCleanup(self.server.stop)
+        self.client = Groq(api_key='test-key', base_url=self.server.base_url, max_retries=0)
+
+    def _messages(self, turns):
+        messages = [{"role": "system", "content": PERSONA_PROMPT}]
+        for turn in range(turns):
+            if turn:
+                messages.append({"role": "assistant", "content": "Okay."})
+            messages.append({"role": "user", "content": f"Question {turn + 1}?"})
+        return messages
+
+    def test_persona_reply_with_usage(self):
+        """A turn gets a canned reply for the persona's domain and reports usage."""
+        response = self.client.chat.completions.create(model='m', messages=self._messages(1))
+
+        self.assertIn(response.choices[0].message.content, PATIENT_REPLIES[OHI_DOMAIN_NAME])
+        self.assertGreater(response.usage.prompt_tokens, 0)
+        self.assertGreater(response.usage.completion_tokens, 0)
+
+    def test_streaming_matches_non_streaming(self):
+        """A streamed reply has the same text, with usage on the final chunk."""
+        messages = self._messages(2)
+        expected = self.client.chat.completions.create(model='m', messages=messages).choices[0].message.content
+
+        text, usage = "", None
+        for chunk in self.client.chat.completions.create(model='m', messages=messages, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                text += chunk.choices[0].delta.content
+            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or usage
+
+        self.assertEqual(text, expected)
+        self.assertIsNotNone(usage)
+        self.assertEqual(self.server.get_stats()['streamed'], 1)
+
+    def test_end_token_after_configured_turns(self):
+        """The patient ends with the end token once end_after_turns is reached."""
+        early = self.client.chat.completions.create(model='m', messages=self._messages(2))
+        final = self.client.chat.completions.create(model='m', messages=self._messages(3))
+
+        self.assertNotIn(END_TOKEN, early.choices[0].message.content)
+        self.assertTrue(final.choices[0].message.content.endswith(END_TOKEN))
+
+    def test_evaluation_feedback_is_parseable(self):
+        """Evaluation requests get feedback in the FeedbackFormatter category format."""
+        prompt = FeedbackFormatter.format_evaluation_prompt(
+            "OHI", "User: How often do you floss?\nAssistant: Not much.", "rubric"
+        )
+        response = self.client.chat.completions.create(
+            model='m', messages=[{"role": "system", "content": PERSONA_PROMPT},
+                                 {"role": "user", "content": prompt}]
+        )
+        feedback = response.choices[0].message.content
+
+        self.assertEqual(len(EvaluationService.parse_llm_feedback(feedback)), 6)
+        self.assertIn('"How often do you floss?"', feedback)
+        self.assertEqual(self.server.get_stats()['evaluations'], 1)
+
+    def test_injected_errors(self):
+        """Injected 429s carry Retry-After; injected 500s are server errors."""
+        self.server.settings.error_rate_429 = 1.0
+        self.server.settings.retry_after_seconds = 2
+        with self.assertRaises(RateLimitError) as context:
+            self.client.chat.completions.create(model='m', messages=self._messages(1))
+        self.assertEqual(context.exception.response.headers.get('retry-after'), '2')
+
+        self.server.settings.error_rate_429 = 0.0
+        self.server.settings.error_rate_500 = 1.0
+        with self.assertRaises(InternalServerError):
+            self.client.chat.completions.create(model='m', messages=self._messages(1))
+
+        stats = self.server.get_stats()
+        self.assertEqual((stats['injected_429'], stats['injected_500']), (1, 1))
+
+
+class TestLatencySampling(unittest.TestCase):
+    """Test cases for sample_latency_ms."""
+
+    def test_distributions(self):
+        """Samples respect each distribution and are never negative."""
+        rng = random.Random(1)
+        self.assertEqual(sample_latency_ms({'distribution': 'fixed', 'value': 40}, rng), 40)
+        for _ in range(100):
+            self.assertTrue(100 <= sample_latency_ms({'distribution': 'uniform', 'min': 100, 'max': 200}, rng) <= 200)
+            self.assertGreaterEqual(sample_latency_ms({'distribution': 'normal', 'mean': 5, 'stddev': 50}, rng), 0)
+            self.assertGreater(sample_latency_ms({'distribution': 'lognormal', 'median': 300, 'sigma': 0.5}, rng), 0)
+        with self.assertRaises(ValueError):
+            sample_latency_ms({'distribution': 'pareto'}, rng)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ Tests:
 - Off-topic detection (unrelated queries)
 - Persona drift detection (evaluator mode during conversation)
 - Corrective message generation
+- Streaming guard (incremental drift/length checks)
 - Persona card invariants (consistency, domain focus)
 """
 
@@ -22,6 +23,7 @@ from persona_guard import (
     detect_persona_drift,
     apply_guardrails,
     check_response_guardrails,
+    StreamingGuard,
     create_injection_guard_message,
     create_off_topic_guard_message,
     create_persona_drift_correction_message,
@@ -322,6 +324,57 @@ def test_persona_card_invariants():
     return True
 
 
+def test_streaming_guard():
+    """Test StreamingGuard incremental checks against check_response_guardrails."""
+    print("\n🔍 Testing Streaming Guard:")
+    
+    samples = [
+        "That's interesting. Can you tell me more?",
+        "Score: 8/10. You did well.",
+        "I brush every morning. Sometimes at night too. My dentist says flossing matters. I never remember it though.",
+        "Honestly I'm not sure. The strengths: of this plan are unclear to me.",
+        "I guess so... Maybe. I'll think about whether it's worth it for my kids",
+        "Well I have heard a lot of things about it and I do not know what to believe and it worries me a lot",
+    ]
+    
+    for text in samples:
+        expected, _ = check_response_guardrails(text, HPV_DOMAIN_NAME)
+        # Feed in small uneven chunks, as a token stream would arrive
+        guard = StreamingGuard(HPV_DOMAIN_NAME)
+        for i in range(0, len(text), 3):
+            if guard.feed(text[i:i + 3]):
+                break
+        violation = guard.finish()
+        
+        if bool(violation) != expected:
+            print(f"  ❌ Streaming guard disagrees with full check for: '{text[:50]}'")
+            return False
+        if violation and guard.correction_message() is None:
+            print("  ❌ Missing correction message for violation")
+            return False
+    
+    # Drift split across chunks is detected as soon as it completes
+    guard = StreamingGuard(OHI_DOMAIN_NAME)
+    if guard.feed("Okay. Areas for impro") is not None:
+        print("  ❌ Drift reported before the pattern completed")
+        return False
+    if guard.feed("vement: none") != 'persona_drift':
+        print("  ❌ Drift split across chunks not detected")
+        return False
+    
+    # Length violation is reported before the stream ends
+    guard = StreamingGuard(OHI_DOMAIN_NAME)
+    stream = ["I brush daily, mostly. ", "Flossing is harder for me. ", "Work is really busy lately. ",
+              "My kids need a lot of attention. ", "Anyway that is my life."]
+    aborted_at = next((i for i, chunk in enumerate(stream) if guard.feed(chunk)), None)
+    if aborted_at != 3 or guard.violation != 'too_long':
+        print(f"  ❌ Expected length abort at chunk 3, got {aborted_at}")
+        return False
+    
+    print("  ✅ Streaming guard matches full-response checks")
+    return True
+
+
 def test_diagnostics_function():
     """Test the run_diagnostics utility function."""
     print("\n🔍 Testing Diagnostics Function:")
@@ -372,6 +425,7 @@ def main():
         ("Guardrail Integration", test_guardrail_integration),
         ("Response Guardrails", test_response_guardrails),
         ("Persona Card Invariants", test_persona_card_invariants),
+        ("Streaming Guard", test_streaming_guard),
         ("Diagnostics Function", test_diagnostics_function),
     ]
     
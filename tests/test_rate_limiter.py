@@ -0,0 +1,312 @@
+"""
+Test suite for rate_limiter.py
+
+Tests client-side rate limiting of Groq calls:
+- Token buckets refill over time and requests wait for capacity
+- Waiting requests are served by priority (turns before evaluations)
+- Retry-After parsing and jittered exponential backoff
+- 429/5xx responses are retried and recorded in the metrics
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter
+from rate_limiter import (
+    PRIORITY_EVALUATION,
+    PRIORITY_TURN,
+    KeyRateLimiter,
+    RateLimiter,
+    RateLimitTimeout,
+    TokenBucket,
+    compute_backoff,
+    get_retry_after,
+    rate_limited_completion,
+)
+
+
+class APIError(Exception):
+    """Exception shaped like groq.APIStatusError."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class FakeCompletions:
+    """Chat completions that raise or return the queued outcomes in order."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class FakeClient:
+    def __init__(self, outcomes, api_key='test-key'):
+        self.api_key = api_key
+        self.chat = SimpleNamespace(completions=FakeCompletions(outcomes))
+
+
+def make_response(total_tokens=None):
+    usage = SimpleNamespace(total_tokens=total_tokens) if total_tokens is not None else None
+    return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content='ok'))])
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for TokenBucket."""
+
+    def test_wait_time_and_refill(self):
+        """A drained bucket reports the time until enough tokens have refilled."""
+        bucket = TokenBucket(capacity=10, refill_per_second=2, now=0.0)
+        self.assertEqual(bucket.wait_time(10, 0.0), 0.0)
+        bucket.consume(10, 0.0)
+
+        self.assertAlmostEqual(bucket.wait_time(4, 0.0), 2.0)
+        self.assertAlmostEqual(bucket.wait_time(4, 1.0), 1.0)
+        self.assertEqual(bucket.wait_time(4, 2.0), 0.0)
+
+    def test_oversized_request_is_clamped(self):
+        """A request larger than the bucket waits for a full bucket, not forever."""
+        bucket = TokenBucket(capacity=10, refill_per_second=1, now=0.0)
+        self.assertEqual(bucket.wait_time(50, 0.0), 0.0)
+        bucket.consume(50, 0.0)
+        self.assertAlmostEqual(bucket.wait_time(50, 0.0), 10.0)
+
+
+class TestKeyRateLimiter(unittest.TestCase):
+    """Test cases for KeyRateLimiter."""
+
+    def test_waits_for_token_capacity(self):
+        """Once the token bucket is drained, the next request waits for the refill."""
+        limiter = KeyRateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        self.assertEqual(limiter.acquire(600), 0.0)
+
+        waited = limiter.acquire(3)
+
+        self.assertGreaterEqual(waited, 0.2)
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['waited'], 1)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_timeout(self):
+        """A request that cannot be admitted in time raises RateLimitTimeout."""
+        limiter = KeyRateLimiter(requests_per_minute=1000, tokens_per_minute=60)
+        limiter.acquire(60)
+
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(30, timeout=0.1)
+        self.assertEqual(limiter.get_metrics()['timeouts'], 1)
+        self.assertEqual(limiter.get_metrics()['queue_depth'], 0)
+
+    def test_record_usage_returns_unused_tokens(self):
+        """Overestimated requests give their unused tokens back."""
+        limiter = KeyRateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        limiter.acquire(600)
+        limiter.record_usage(600, 100)
+        self.assertEqual(limiter.acquire(400), 0.0)
+
+    def test_turns_served_before_evaluations(self):
+        """A turn queued after an evaluation is admitted first."""
+        limiter = KeyRateLimiter(requests_per_minute=1000, tokens_per_minute=100000)
+        limiter.defer(0.3)
+        order = []
+
+        def request(name, priority):
+            limiter.acquire(10, priority)
+            order.append(name)
+
+        evaluation = threading.Thread(target=request, args=('evaluation', PRIORITY_EVALUATION))
+        evaluation.start()
+        time.sleep(0.05)
+        turn = threading.Thread(target=request, args=('turn', PRIORITY_TURN))
+        turn.start()
+        time.sleep(0.05)
+        self.assertEqual(limiter.get_metrics()['queue_depth'], 2)
+        evaluation.join()
+        turn.join()
+
+        self.assertEqual(order, ['turn', 'evaluation'])
+        self.assertEqual(limiter.get_metrics()['max_queue_depth'], 2)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the per-key limiter table."""
+
+    def test_disabled_by_default(self):
+        self.assertFalse(RateLimiter({}).enabled)
+
+    def test_follows_config_reload(self):
+        """A limiter built from config.json applies the settings of a reloaded loader."""
+        old_loader, new_loader = object(), object()
+        settings = {'enabled': False, 'requests_per_minute': 30, 'tokens_per_minute': 6000}
+        with patch.object(rate_limiter, '_load_rate_limit_config', return_value=(old_loader, settings)):
+            limiter = RateLimiter()
+            key = limiter.for_key('key-a')
+            limiter.refresh()
+        self.assertFalse(limiter.enabled)
+
+        reloaded = {'enabled': True, 'requests_per_minute': 60, 'tokens_per_minute': 12000}
+        with patch.object(rate_limiter, '_load_rate_limit_config', return_value=(new_loader, reloaded)):
+            limiter.refresh()
+
+        self.assertTrue(limiter.enabled)
+        self.assertIs(limiter.for_key('key-a'), key)
+        self.assertEqual(key.requests.capacity, 60)
+        self.assertEqual(key.tokens.refill_per_second, 200)
+
+    def test_explicit_settings_not_refreshed(self):
+        """A limiter given its settings ignores config reloads."""
+        limiter = RateLimiter({'enabled': False})
+        with patch.object(rate_limiter, '_load_rate_limit_config',
+                          return_value=(object(), {'enabled': True})) as load:
+            limiter.refresh()
+        self.assertFalse(limiter.enabled)
+        load.assert_not_called()
+
+    def test_least_recently_used_keys_evicted(self):
+        """Beyond max_keys the oldest limiter is dropped and its counts kept in the totals."""
+        limiter = RateLimiter({'enabled': True, 'max_keys': 2})
+        key_a = limiter.for_key('key-a')
+        key_a.acquire(10)
+        limiter.for_key('key-b')
+        self.assertIs(limiter.for_key('key-a'), key_a)
+
+        limiter.for_key('key-c')
+
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics['keys'], 2)
+        self.assertEqual(metrics['evictions'], 1)
+        self.assertEqual(metrics['requests'], 1)
+        self.assertIs(limiter.for_key('key-a'), key_a)
+
+    def test_keys_with_waiting_callers_kept(self):
+        """A limiter with queued callers is never evicted."""
+        limiter = RateLimiter({'enabled': True, 'max_keys': 1})
+        busy = limiter.for_key('key-a')
+        busy.defer(0.2)
+        waiter = threading.Thread(target=busy.acquire, args=(10,))
+        waiter.start()
+        time.sleep(0.05)
+
+        limiter.for_key('key-b')
+        waiter.join()
+
+        self.assertIs(limiter.for_key('key-a'), busy)
+        self.assertEqual(limiter.get_metrics()['keys'], 2)
+        self.assertEqual(limiter.get_metrics()['evictions'], 0)
+
+
+class TestBackoff(unittest.TestCase):
+    """Test cases for Retry-After parsing and backoff."""
+
+    def test_retry_after_headers(self):
+        """Seconds, milliseconds and HTTP-date forms are understood."""
+        self.assertEqual(get_retry_after(APIError(429, {'retry-after': '2'})), 2.0)
+        self.assertEqual(get_retry_after(APIError(429, {'retry-after-ms': '1500'})), 1.5)
+        http_date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 30))
+        self.assertAlmostEqual(get_retry_after(APIError(429, {'retry-after': http_date})), 30, delta=2)
+        self.assertIsNone(get_retry_after(APIError(429)))
+        self.assertIsNone(get_retry_after(ValueError('no response')))
+
+    def test_backoff_bounds(self):
+        """Backoff grows exponentially with jitter, is capped, and honours Retry-After."""
+        for _ in range(50):
+            self.assertTrue(0.5 <= compute_backoff(0, None, 1.0, 30.0) <= 1.0)
+            self.assertTrue(4.0 <= compute_backoff(3, None, 1.0, 30.0) <= 8.0)
+            self.assertTrue(15.0 <= compute_backoff(10, None, 1.0, 30.0) <= 30.0)
+            self.assertTrue(45.0 <= compute_backoff(0, 45.0, 1.0, 30.0) <= 46.0)
+
+
+class TestRateLimitedCompletion(unittest.TestCase):
+    """Test cases for rate_limited_completion."""
+
+    def setUp(self):
+        """Install a fast-retrying process-wide limiter."""
+        self.limiter = RateLimiter({
+            'enabled': True,
+            'requests_per_minute': 1000,
+            'tokens_per_minute': 10 ** 6,
+            'max_retries': 2,
+            'backoff_base_seconds': 0.01,
+            'backoff_max_seconds': 0.05,
+        })
+        patcher = patch.object(rate_limiter, '_rate_limiter', self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_rate_limit_and_server_errors(self):
+        """429 and 5xx responses are retried; a 429 pauses the key."""
+        client = FakeClient([APIError(429, {'retry-after': '0'}), APIError(503), make_response()])
+
+        response = rate_limited_completion(client, PRIORITY_TURN, model='m', messages=[])
+
+        self.assertEqual(response.choices[0].message.content, 'ok')
+        self.assertEqual(client.chat.completions.calls, 3)
+        metrics = self.limiter.get_metrics()
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['throttled'], 1)
+        self.assertEqual(metrics['requests'], 3)
+
+    def test_gives_up_after_max_retries(self):
+        """The last 429 is raised once retries are exhausted."""
+        client = FakeClient([APIError(429)] * 3)
+        with self.assertRaises(APIError):
+            rate_limited_completion(client, PRIORITY_EVALUATION, model='m', messages=[])
+        self.assertEqual(client.chat.completions.calls, 3)
+
+    def test_other_errors_not_retried(self):
+        """Client errors such as 401 are raised immediately."""
+        client = FakeClient([APIError(401)])
+        with self.assertRaises(APIError):
+            rate_limited_completion(client, model='m', messages=[])
+        self.assertEqual(client.chat.completions.calls, 1)
+
+    def test_keys_limited_separately(self):
+        """Each API key has its own limiter; usage corrects the token estimate."""
+        rate_limited_completion(FakeClient([make_response(total_tokens=50)], 'key-a'),
+                                model='m', messages=[], max_tokens=100)
+        rate_limited_completion(FakeClient([make_response()], 'key-b'), model='m', messages=[])
+
+        self.assertEqual(self.limiter.get_metrics()['keys'], 2)
+        key_a = self.limiter.for_key('key-a')
+        self.assertAlmostEqual(key_a.tokens.level, 10 ** 6 - 50, delta=5)
+
+    def test_disabled_skips_queue_but_retries(self):
+        """With rate limiting disabled the client is called without queueing; 429s are still retried."""
+        patcher = patch.object(rate_limiter, '_rate_limiter', RateLimiter({
+            'enabled': False,
+            'backoff_base_seconds': 0.01,
+            'backoff_max_seconds': 0.05,
+        }))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = FakeClient([APIError(429, {'retry-after': '0'}), make_response()])
+
+        response = rate_limited_completion(client, model='m', messages=[])
+
+        self.assertEqual(response.choices[0].message.content, 'ok')
+        self.assertEqual(client.chat.completions.calls, 2)
+        metrics = rate_limiter.get_rate_limiter().get_metrics()
+        self.assertEqual(metrics['requests'], 0)
+        self.assertEqual(metrics['retries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Test suite for response_timing.py
+
+Tests per-message timestamps and response timing:
+- Messages are stamped with wall-clock and monotonic times
+- Student messages record think time since the previous patient message
+- Unstamped or foreign-process history yields no think time
+- Aggregate stats and their transcript formatting
+- The PDF report scores the Response Factor from the measured think time
+- The evaluation prompt gets the same measured times and scoring rule
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_timing
+from response_timing import (
+    format_message_time,
+    format_response_factor_evidence,
+    format_response_summary,
+    stamp_message,
+    summarize_response_times,
+)
+
+
+def timed_history(think_times, reply_time=2.0):
+    """Build a stamped conversation with the given student think times."""
+    clock = 1000.0
+    history = [{'role': 'assistant', 'content': 'Hello!', 'timestamp': 1700000000.0, 'monotonic': clock}]
+    for think in think_times:
+        clock += think
+        history.append({'role': 'user', 'content': 'How are you?', 'timestamp': 1700000000.0 + clock,
+                        'monotonic': clock, 'think_time': think})
+        clock += reply_time
+        history.append({'role': 'assistant', 'content': 'Fine.', 'timestamp': 1700000000.0 + clock,
+                        'monotonic': clock})
+    return history
+
+
+class TestStampMessage(unittest.TestCase):
+    """Test cases for stamp_message."""
+
+    def test_stamps_wall_and_monotonic_time(self):
+        with patch.object(response_timing.time, 'time', return_value=1700000000.0), \
+                patch.object(response_timing.time, 'monotonic', return_value=50.0):
+            message = stamp_message({'role': 'assistant', 'content': 'Hello!'})
+
+        self.assertEqual(message['timestamp'], 1700000000.0)
+        self.assertEqual(message['monotonic'], 50.0)
+        self.assertNotIn('think_time', message)
+
+    def test_think_time_since_last_patient_message(self):
+        """Measured from the latest assistant message, e.g. a confirmation prompt."""
+        history = [
+            {'role': 'assistant', 'content': 'Hello!', 'monotonic': 10.0},
+            {'role': 'user', 'content': 'Hi', 'monotonic': 20.0},
+            {'role': 'assistant', 'content': 'Reply', 'monotonic': 22.0},
+            {'role': 'assistant', 'content': 'Anything else?', 'monotonic': 22.5},
+        ]
+        with patch.object(response_timing.time, 'monotonic', return_value=34.75):
+            message = stamp_message({'role': 'user', 'content': 'No'}, history)
+
+        self.assertEqual(message['think_time'], 12.25)
+
+    def test_no_think_time_without_stamped_patient_message(self):
+        self.assertIsNone(stamp_message({'role': 'user', 'content': 'Hi'}, [])['think_time'])
+        unstamped = [{'role': 'assistant', 'content': 'Hello!'}]
+        self.assertIsNone(stamp_message({'role': 'user', 'content': 'Hi'}, unstamped)['think_time'])
+        # A monotonic reading from another process can be ahead of ours
+        future = [{'role': 'assistant', 'content': 'Hello!', 'monotonic': 1e12}]
+        self.assertIsNone(stamp_message({'role': 'user', 'content': 'Hi'}, future)['think_time'])
+
+
+class TestSummary(unittest.TestCase):
+    """Test cases for summarize_response_times and formatting."""
+
+    def test_think_time_stats(self):
+        summary = summarize_response_times(timed_history([4.0, 10.0, 6.0, 20.0]))
+
+        think = summary['think_time']
+        self.assertEqual(think['count'], 4)
+        self.assertEqual(think['mean'], 10.0)
+        self.assertEqual(think['median'], 8.0)
+        self.assertEqual(think['p90'], 20.0)
+        self.assertEqual(think['max'], 20.0)
+        self.assertEqual(summary['patient_reply']['mean'], 2.0)
+
+    def test_unstamped_history_has_no_summary(self):
+        history = [{'role': 'assistant', 'content': 'Hello!'}, {'role': 'user', 'content': 'Hi'}]
+        self.assertIsNone(summarize_response_times(history))
+
+    def test_formatting(self):
+        history = timed_history([4.0, 10.0])
+        line = format_response_summary(summarize_response_times(history))
+
+        self.assertIn('over 2 turns', line)
+        self.assertIn('mean 7.0s', line)
+        self.assertIn('Patient reply time: mean 2.0s', line)
+        self.assertTrue(format_message_time(history[1]).endswith(', after 4.0s'))
+        self.assertIsNone(format_message_time({'role': 'user', 'content': 'Hi'}))
+
+
+class TestPdfResponseFactor(unittest.TestCase):
+    """The PDF report passes the measured think time to the evaluation."""
+
+    FEEDBACK = "**Collaboration (9 pts): Meets Criteria** - Good rapport."
+
+    def test_mean_think_time_scores_response_factor(self):
+        from pdf_utils import NEW_RUBRIC_AVAILABLE, generate_pdf_report
+        if not NEW_RUBRIC_AVAILABLE:
+            self.skipTest("rubric services not available")
+        from services.evaluation_service import EvaluationService
+
+        history = timed_history([30.0, 50.0])
+        with patch.object(EvaluationService, 'evaluate_session',
+                          wraps=EvaluationService.evaluate_session) as evaluate:
+            buffer = generate_pdf_report('Test Student', self.FEEDBACK, history, 'HPV')
+
+        self.assertGreater(len(buffer.getvalue()), 0)
+        kwargs = evaluate.call_args.kwargs
+        self.assertEqual(kwargs['response_latency'], 40.0)
+        self.assertNotIn('response_threshold', kwargs)
+
+    def test_threshold_has_one_source(self):
+        """RESPONSE_FACTOR_THRESHOLD overrides the config key for both the scorer and the prompt."""
+        from config_loader import ConfigLoader
+        from services.evaluation_service import EvaluationService
+
+        with patch.dict(os.environ, {'RESPONSE_FACTOR_THRESHOLD': '45'}), \
+                patch('config_loader.get_config_loader', return_value=ConfigLoader(load_dotenv_file=False)):
+            self.assertEqual(EvaluationService.get_response_factor_threshold(), 45.0)
+            evidence = format_response_factor_evidence(timed_history([50.0]))
+
+        self.assertIn('Fully Met at 45s or less', evidence)
+        self.assertTrue(evidence.endswith('Rate it Not Met'))
+
+
+class TestPromptResponseFactor(unittest.TestCase):
+    """The evaluation prompt gets the measured think time the PDF scores."""
+
+    SETTINGS = {'score_response_factor': True, 'response_factor_threshold_seconds': 60.0}
+
+    def test_rating_follows_pdf_threshold(self):
+        fast = format_response_factor_evidence(timed_history([30.0, 50.0]), self.SETTINGS)
+        slow = format_response_factor_evidence(timed_history([70.0, 90.0]), self.SETTINGS)
+
+        self.assertIn('mean 40.0s', fast)
+        self.assertTrue(fast.endswith('Rate it Fully Met'))
+        self.assertTrue(slow.endswith('Rate it Not Met'))
+
+    def test_summary_only_when_not_scored(self):
+        history = timed_history([30.0])
+        evidence = format_response_factor_evidence(history, dict(self.SETTINGS, score_response_factor=False))
+
+        self.assertEqual(evidence, format_response_summary(summarize_response_times(history)))
+        self.assertIsNone(format_response_factor_evidence([{'role': 'user', 'content': 'Hi'}], self.SETTINGS))
+
+    def test_prompts_include_evidence(self):
+        from feedback_template import FeedbackFormatter
+
+        evidence = format_response_factor_evidence(timed_history([30.0]), self.SETTINGS)
+        prompt = FeedbackFormatter.format_evaluation_prompt("HPV vaccine", "transcript", "rubric", evidence)
+        category_prompts = FeedbackFormatter.format_category_evaluation_prompts(
+            "HPV vaccine", "transcript", {}, evidence
+        )
+
+        self.assertIn(f"Measured response times: {evidence}", prompt)
+        self.assertIn(evidence, category_prompts['Response Factor'])
+        self.assertNotIn(evidence, category_prompts['Summary'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Test suite for rag/retrieval_cache.py
+
+Tests the retrieval result cache:
+- LRU eviction and key separation by (corpus hash, query, top_k)
+- The feedback query is answered at build time without a query embedding
+- Precomputed results survive a prebuilt index roundtrip
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag import backends as backends_module
+from rag.knowledge_base import clear_knowledge_bases, get_knowledge_base
+from rag.retrieval_cache import FEEDBACK_QUERY, RetrievalCache, get_retrieval_cache
+from tests.test_knowledge_base import FakeEmbeddingModel
+
+
+class TestRetrievalCache(unittest.TestCase):
+    """Test cases for RetrievalCache."""
+
+    def test_keys_include_hash_query_and_top_k(self):
+        """Entries are separated by corpus hash, query and top_k."""
+        cache = RetrievalCache()
+        cache.put('h1', 'q', 2, ['a', 'b'])
+
+        self.assertEqual(cache.get('h1', 'q', 2), ['a', 'b'])
+        self.assertIsNone(cache.get('h2', 'q', 2))
+        self.assertIsNone(cache.get('h1', 'other', 2))
+        self.assertIsNone(cache.get('h1', 'q', 3))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        cache = RetrievalCache(max_entries=2)
+        cache.put('h', 'a', 1, ['a'])
+        cache.put('h', 'b', 1, ['b'])
+        cache.get('h', 'a', 1)
+        cache.put('h', 'c', 1, ['c'])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('h', 'b', 1))
+        self.assertEqual(cache.get('h', 'a', 1), ['a'])
+
+    def test_returned_list_is_a_copy(self):
+        """Mutating a returned result does not corrupt the cache."""
+        cache = RetrievalCache()
+        cache.put('h', 'q', 1, ['a'])
+        cache.get('h', 'q', 1).append('b')
+
+        self.assertEqual(cache.get('h', 'q', 1), ['a'])
+
+
+class TestPrecomputedFeedbackQuery(unittest.TestCase):
+    """Test cases for build-time retrieval of the feedback query."""
+
+    def setUp(self):
+        """Create a rubric directory, an index directory and patch in the fake model."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.rubrics_dir = os.path.join(self.temp_dir, 'test_rubrics')
+        os.makedirs(self.rubrics_dir)
+        with open(os.path.join(self.rubrics_dir, 'a.txt'), 'w', encoding='utf-8') as f:
+            f.write('Motivational interviewing feedback rubric: collaboration and evocation. '
+                    'Unrelated scheduling notes follow here.')
+
+        self.model = FakeEmbeddingModel()
+        patcher = patch.object(backends_module, 'get_embedding_model', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env_patcher = patch.dict(os.environ, {'RAG_INDEX_DIR': os.path.join(self.temp_dir, 'index')})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        clear_knowledge_bases()
+
+    def tearDown(self):
+        """Remove temporary files and cached indexes."""
+        clear_knowledge_bases()
+        shutil.rmtree(self.temp_dir)
+
+    def test_feedback_query_needs_no_encoding(self):
+        """After a build, the feedback query is served without encoding."""
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+        encode_calls = self.model.encode_calls
+
+        results = knowledge_base.retrieve(FEEDBACK_QUERY)
+
+        self.assertEqual(self.model.encode_calls, encode_calls)
+        self.assertTrue(results)
+
+    def test_other_queries_cached_after_first_call(self):
+        """Ad-hoc queries are encoded once and then served from the cache."""
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+        knowledge_base.retrieve('scheduling notes', top_k=1)
+        encode_calls = self.model.encode_calls
+        knowledge_base.retrieve('scheduling notes', top_k=1)
+
+        self.assertEqual(self.model.encode_calls, encode_calls)
+
+    def test_precomputed_results_loaded_from_prebuilt_index(self):
+        """A prebuilt index seeds the cache so the feedback query never encodes."""
+        expected = get_knowledge_base(self.rubrics_dir).retrieve(FEEDBACK_QUERY)
+        clear_knowledge_bases()
+        self.model.encode_calls = 0
+
+        knowledge_base = get_knowledge_base(self.rubrics_dir)
+
+        self.assertEqual(knowledge_base.retrieve(FEEDBACK_QUERY), expected)
+        self.assertEqual(self.model.encode_calls, 0)
+        self.assertGreater(get_retrieval_cache().get_stats()['hits'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
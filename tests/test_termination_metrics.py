@@ -0,0 +1,142 @@
+"""
+Test suite for termination_metrics.py
+
+Tests the bounded conversation-ending metrics:
+- Decisions are classified into the same counters as before
+- Memory stays constant: recent events and minute rollups are ring buffers
+- Concurrent recording loses no counts
+- Snapshot and JSON export
+- end_control_middleware keeps its get/reset API on top of it
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import end_control_middleware
+from termination_metrics import TerminationMetrics
+
+CONFIRMED = {'state': 'ENDED', 'confirmation_result': 'confirmed_first_ask',
+             'termination_trigger': 'student', 'timestamp': '2026-01-01T10:00:00'}
+AMBIGUOUS = {'state': 'AWAITING_SECOND_CONFIRMATION', 'confirmation_result': 'ambiguous_first_response'}
+UNCONFIRMED = {'state': 'ENDED', 'alert': 'ended_without_confirmation'}
+PARKED = {'state': 'PARKED', 'confirmation_result': 'parked_after_second_ask'}
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTerminationMetrics(unittest.TestCase):
+    """Test cases for TerminationMetrics."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = TerminationMetrics(event_buffer_size=3, rollup_minutes=2, clock=self.clock)
+
+    def test_counters(self):
+        for decision in (CONFIRMED, AMBIGUOUS, UNCONFIRMED, PARKED, {'state': 'ACTIVE'}):
+            self.metrics.record(decision)
+
+        self.assertEqual(self.metrics.counters(), {
+            'sessions_ended_without_confirmation': 1,
+            'sessions_ended_with_confirmation': 1,
+            'sessions_parked': 1,
+            'confirmation_triggers': 1,
+            'ambiguous_responses': 1,
+        })
+        self.assertEqual(self.metrics.recent_events(), [
+            {'trigger': 'student', 'timestamp': '2026-01-01T10:00:00', 'result': 'confirmed_first_ask'}
+        ])
+
+    def test_buffers_are_bounded(self):
+        """Events and rollups keep only the most recent entries; counters keep totals."""
+        for minute in range(5):
+            self.clock.now = 1_700_000_000.0 + 60 * minute
+            for _ in range(2):
+                self.metrics.record(CONFIRMED)
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['counters']['confirmation_triggers'], 10)
+        self.assertEqual(snapshot['decisions'], 10)
+        self.assertEqual(len(snapshot['recent_events']), 3)
+        self.assertEqual(len(snapshot['rollups']), 2)
+        self.assertEqual([r['decisions'] for r in snapshot['rollups']], [2, 2])
+        self.assertLess(snapshot['rollups'][0]['minute'], snapshot['rollups'][1]['minute'])
+
+    def test_clock_stepping_back_uses_latest_minute(self):
+        self.metrics.record(CONFIRMED)
+        self.clock.now -= 120
+        self.metrics.record(PARKED)
+
+        rollups = self.metrics.snapshot()['rollups']
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups[0]['sessions_parked'], 1)
+
+    def test_concurrent_recording(self):
+        metrics = TerminationMetrics()
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            for _ in range(500):
+                metrics.record(CONFIRMED)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['sessions_ended_with_confirmation'], 4000)
+        self.assertEqual(sum(r['decisions'] for r in snapshot['rollups']), 4000)
+
+    def test_export(self):
+        self.metrics.record(CONFIRMED)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics', 'termination.json')
+            snapshot = self.metrics.export(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), snapshot)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['termination.json'])
+
+    def test_reset(self):
+        self.metrics.record(CONFIRMED)
+        self.metrics.reset()
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(sum(snapshot['counters'].values()), 0)
+        self.assertEqual(snapshot['rollups'], [])
+
+
+class TestMiddlewareMetrics(unittest.TestCase):
+    """end_control_middleware's metrics functions on the shared aggregator."""
+
+    def setUp(self):
+        end_control_middleware.reset_termination_metrics()
+        self.addCleanup(end_control_middleware.reset_termination_metrics)
+
+    def test_get_termination_metrics(self):
+        end_control_middleware.log_termination_metrics(CONFIRMED)
+        end_control_middleware.log_termination_metrics(AMBIGUOUS)
+
+        metrics = end_control_middleware.get_termination_metrics()
+        self.assertEqual(metrics['sessions_ended_with_confirmation'], 1)
+        self.assertEqual(metrics['ambiguous_responses'], 1)
+        self.assertEqual(metrics['triggers_total'], 1)
+        self.assertEqual(len(metrics['confirmation_triggers']), 1)
+        self.assertEqual(end_control_middleware.get_termination_metrics_snapshot()['decisions'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,391 @@
+"""
+Turn-Processing Pipeline for MI Chatbots
+
+Text and voice turns used to be handled by two copies of the same ~200
+lines in chat_utils. Both modes now run one TurnPipeline with explicit
+stages sharing a per-turn TurnContext:
+- screen: block feedback requests, note ambiguous ending phrases
+- guardrails: prompt-injection / off-topic check on the student message
+- commit_input: append the student message (stamped, with think time) and count the turn
+- build_prompt: persona, turn instruction, guard message, windowed history
+- generate: patient reply (streamed, guardrailed, role-checked)
+- end_control: should_continue_v4 decision and session-state updates
+
+What differs between modes lives in an adapter: TextTurnAdapter reads
+st.chat_input; VoiceTurnAdapter renders the STT widget and plays replies
+with TTS. Config is read once per turn into the context.
+
+Every stage is timed. Each turn's timings are logged (with the slowest
+stage) and kept in st.session_state.last_turn_timings, so a slow turn
+shows where the time went.
+
+Usage:
+    TurnPipeline(personas_dict, client, domain_name, domain_keywords).run(TextTurnAdapter())
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import streamlit as st
+
+from chat_utils import generate_patient_response, get_windowed_history
+from config_loader import get_config_loader
+from end_control_middleware import (
+    END_TOKEN,
+    log_conversation_trace,
+    log_termination_metrics,
+    prevent_ambiguous_ending,
+    should_continue_v4,
+)
+from persona_guard import apply_guardrails
+from response_timing import stamp_message
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STAGES = ('screen', 'guardrails', 'commit_input', 'build_prompt', 'generate', 'end_control')
+
+# Student requests for feedback are deferred until the session is finished
+FEEDBACK_REQUEST_PHRASES = [
+    'feedback',
+    'evaluate',
+    'how did i do',
+    'rate my performance',
+    'score',
+    'assessment',
+]
+
+# Enhanced turn instruction with conciseness, role consistency, and end token
+TURN_INSTRUCTION = {
+    "role": "system",
+    "content": f"""Follow the MI chain-of-thought steps: identify routine, ask open question, reflect, elicit change talk, summarize & plan.
+
+CRITICAL INSTRUCTIONS:
+- Keep your responses CONCISE (2-3 sentences maximum)
+- Stay in character as the PATIENT throughout the entire conversation
+- DO NOT provide feedback, evaluation, or scores during the conversation
+- DO NOT switch to evaluator role until explicitly asked at the end
+- Respond naturally as the patient would, showing emotions and reactions
+- When you are ready to naturally end the conversation after a full MI session, include the end token: {END_TOKEN}
+- Only use the end token when the conversation has covered all MI components and feels complete"""
+}
+
+
+class TurnContext:
+    """State of one turn, shared by all pipeline stages."""
+
+    def __init__(self, user_prompt: str, flags: Dict[str, Any], window_settings: Dict[str, Any]):
+        """
+        Initialize the context for a submitted student message.
+
+        Args:
+            user_prompt: The student's message
+            flags: feature_flags section of the config
+            window_settings: conversation_window section of the config
+        """
+        self.user_prompt = user_prompt
+        self.flags = flags
+        self.window_settings = window_settings
+        self.guard_message: Optional[Dict[str, str]] = None
+        self.messages: List[Dict[str, str]] = []
+        self.assistant_response: Optional[str] = None
+        self.decision: Optional[Dict[str, Any]] = None
+        self.stopped = False
+        self.timings: Dict[str, float] = {}
+
+    def stop(self) -> None:
+        """End the turn after the current stage (e.g. blocked input, failed generation)."""
+        self.stopped = True
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.timings.values())
+
+
+class TextTurnAdapter:
+    """Typed input through st.chat_input; replies rendered as text."""
+
+    def read_input(self) -> Optional[str]:
+        """Render the input widget and return the submitted message, if any."""
+        return st.chat_input("Your response...")
+
+    def show_user_message(self, text: str) -> None:
+        st.chat_message("user").markdown(text)
+
+    @contextmanager
+    def assistant_message(self) -> Iterator[None]:
+        """Container the patient reply is streamed into."""
+        with st.chat_message("assistant"):
+            yield
+
+    def after_reply(self, text: str) -> None:
+        """Called inside assistant_message once the reply is final."""
+
+    def show_confirmation(self, text: str) -> None:
+        with st.chat_message("assistant"):
+            st.markdown(text)
+
+    def finish_turn(self) -> None:
+        """Called after a completed turn."""
+
+
+class VoiceTurnAdapter(TextTurnAdapter):
+    """Spoken input through the browser STT widget; replies also played with TTS."""
+
+    def __init__(self):
+        """
+        Load the speech components.
+
+        Raises:
+            ImportError: If the speech module is not available
+        """
+        import streamlit.components.v1 as components
+        from speech_text.stt_handler import STTHandler
+        from speech_text.tts_handler import TTSHandler
+
+        self._components = components
+        self._stt_handler = STTHandler()
+        self._tts_handler = TTSHandler()
+        self.turn_key: Optional[str] = None
+
+    def read_input(self) -> Optional[str]:
+        """Render the STT widget and editable transcript; return it when Send is clicked."""
+        st.markdown("### 🎤 Your Turn")
+        st.markdown("Click **Start Recording**, speak your response, then click **Stop Recording**.")
+
+        # Create unique key for this turn - ensure turn_count is initialized
+        turn_key = f"voice_input_turn_{st.session_state.get('turn_count', 0)}"
+        self.turn_key = turn_key
+
+        # Initialize transcript state
+        if f"{turn_key}_transcript" not in st.session_state:
+            st.session_state[f"{turn_key}_transcript"] = ""
+        if f"{turn_key}_confirmed" not in st.session_state:
+            st.session_state[f"{turn_key}_confirmed"] = False
+
+        # Render STT interface
+        stt_html = self._stt_handler.generate_browser_stt_html(session_key=turn_key)
+        self._components.html(stt_html, height=250)
+
+        # Manual input area for transcript (user can also type)
+        user_prompt = st.text_area(
+            "Your transcript (edit if needed):",
+            value=st.session_state.get(f"{turn_key}_transcript", ""),
+            key=f"{turn_key}_text_area",
+            help="You can edit the transcribed text or type directly here."
+        )
+        if user_prompt:
+            st.session_state[f"{turn_key}_transcript"] = user_prompt
+
+        if not st.button("✅ Send Response", key=f"{turn_key}_send", type="primary"):
+            return None
+        if not user_prompt or not user_prompt.strip():
+            st.warning("Please provide a response before sending.")
+            return None
+
+        st.session_state[f"{turn_key}_confirmed"] = True
+        return user_prompt
+
+    def _speak(self, text: str) -> None:
+        tts_html = self._tts_handler.generate_browser_tts_html(text, auto_play=True)
+        self._components.html(tts_html, height=0)
+
+    def after_reply(self, text: str) -> None:
+        """Play the reply and offer a repeat button."""
+        self._speak(text)
+        if st.button("🔊 Repeat", key=f"repeat_turn_{st.session_state.turn_count}"):
+            self._speak(text)
+
+    def show_confirmation(self, text: str) -> None:
+        with st.chat_message("assistant"):
+            st.markdown(text)
+            self._speak(text)
+
+    def finish_turn(self) -> None:
+        """Clear the transcript for the next turn and rerun to show the updated chat."""
+        st.session_state[f"{self.turn_key}_transcript"] = ""
+        st.session_state[f"{self.turn_key}_confirmed"] = False
+        st.rerun()
+
+
+class TurnPipeline:
+    """Runs one student turn through the stages in STAGES."""
+
+    def __init__(self, personas_dict: Dict[str, str], client: Any,
+                 domain_name: Optional[str] = None, domain_keywords: Optional[List[str]] = None):
+        """
+        Initialize the pipeline for a bot page.
+
+        Args:
+            personas_dict: Dictionary of persona definitions
+            client: Groq API client
+            domain_name: Name of the domain (e.g., "HPV vaccination", "oral hygiene")
+            domain_keywords: List of domain-relevant keywords for off-topic detection
+        """
+        self.personas_dict = personas_dict
+        self.client = client
+        self.domain_name = domain_name
+        self.domain_keywords = domain_keywords
+
+    def run(self, adapter: TextTurnAdapter) -> Optional[TurnContext]:
+        """
+        Read the student's input through the adapter and process the turn.
+
+        Args:
+            adapter: Input/output adapter for the current mode
+
+        Returns:
+            TurnContext: The processed turn, or None if no message was submitted
+        """
+        if st.session_state.selected_persona is None:
+            return None
+        if st.session_state.conversation_state == "ended":
+            st.info("💬 This conversation has ended. Please click 'Finish Session & Get Feedback' to receive your evaluation, or start a new conversation.")
+            return None
+
+        user_prompt = adapter.read_input()
+        if not user_prompt:
+            return None
+
+        config = get_config_loader()
+        ctx = TurnContext(user_prompt, config.get_feature_flags(), config.get_conversation_window_config())
+
+        for stage in STAGES:
+            start = time.perf_counter()
+            getattr(self, f'_{stage}')(ctx, adapter)
+            ctx.timings[stage] = (time.perf_counter() - start) * 1000
+            if ctx.stopped:
+                break
+
+        self._report_timings(ctx)
+        if not ctx.stopped:
+            adapter.finish_turn()
+        return ctx
+
+    def _report_timings(self, ctx: TurnContext) -> None:
+        """Log the stage timings of a turn and keep them in session state."""
+        st.session_state.last_turn_timings = dict(ctx.timings)
+        slowest = max(ctx.timings, key=ctx.timings.get)
+        logger.info(
+            f"Turn {st.session_state.turn_count} took {ctx.total_ms:.0f}ms (slowest: {slowest}): "
+            + ", ".join(f"{stage} {ms:.1f}ms" for stage, ms in ctx.timings.items())
+        )
+
+    def _screen(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        # Block feedback requests during conversation
+        if any(phrase in ctx.user_prompt.lower() for phrase in FEEDBACK_REQUEST_PHRASES):
+            st.warning("⏸️ Feedback will be provided after the conversation ends. Please continue the conversation naturally.")
+            ctx.stop()
+            return
+
+        # Prevent premature ending from ambiguous phrases
+        if prevent_ambiguous_ending(ctx.user_prompt):
+            logger.info(f"Ambiguous phrase detected from user: '{ctx.user_prompt}' - continuing conversation")
+
+    def _guardrails(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        # Apply persona guardrails if domain metadata is provided
+        if not (self.domain_name and self.domain_keywords):
+            return
+        needs_intervention, ctx.guard_message = apply_guardrails(
+            ctx.user_prompt, self.domain_name, self.domain_keywords
+        )
+        if needs_intervention:
+            logger.warning(f"Guardrail intervention triggered for user message: '{ctx.user_prompt[:50]}'")
+
+    def _commit_input(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        st.session_state.chat_history.append(
+            stamp_message({"role": "user", "content": ctx.user_prompt}, st.session_state.chat_history)
+        )
+        adapter.show_user_message(ctx.user_prompt)
+        st.session_state.turn_count += 1
+
+    def _build_prompt(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        ctx.messages = [
+            {"role": "system", "content": self.personas_dict[st.session_state.selected_persona]},
+            TURN_INSTRUCTION,
+        ]
+        # Add guard message before chat history if intervention needed
+        if ctx.guard_message:
+            ctx.messages.append(ctx.guard_message)
+        # Recent turns verbatim, older turns as a rolling summary
+        ctx.messages.extend(get_windowed_history(ctx.window_settings))
+
+    def _generate(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        # Stream the reply into the assistant bubble; guardrails run on the full text
+        with adapter.assistant_message():
+            ctx.assistant_response = generate_patient_response(
+                self.client,
+                ctx.messages,
+                domain_name=self.domain_name,
+                placeholder=st.empty(),
+                stream=ctx.flags.get('streaming_responses', True)
+            )
+            if ctx.assistant_response is None:
+                ctx.stop()
+                return
+            adapter.after_reply(ctx.assistant_response)
+
+        st.session_state.chat_history.append(stamp_message({"role": "assistant", "content": ctx.assistant_response}))
+
+    def _end_control(self, ctx: TurnContext, adapter: TextTurnAdapter) -> None:
+        # Use end-control middleware v4 for semantic-based ending
+        conversation_context = {
+            'chat_history': st.session_state.chat_history,
+            'turn_count': st.session_state.turn_count,
+            'end_control_state': st.session_state.get('end_control_state', 'ACTIVE'),
+            'confirmation_flag': st.session_state.get('confirmation_flag', False),
+            'termination_trigger': st.session_state.get('termination_trigger', 'unknown'),
+            'user_end_intent': st.session_state.get('user_end_intent', False),
+            'bot_end_ack': st.session_state.get('bot_end_ack', False),
+            'mi_coverage': st.session_state.get('mi_coverage')
+        }
+        ctx.decision = decision = should_continue_v4(
+            conversation_context,
+            ctx.assistant_response,
+            ctx.user_prompt
+        )
+        require_confirmation = ctx.flags.get('require_end_confirmation', True)
+
+        if require_confirmation:
+            # Log metrics for monitoring
+            log_termination_metrics(decision.get('metrics', {}))
+        else:
+            # Log the decision for diagnostics
+            log_conversation_trace(conversation_context, decision, {
+                'last_user_message': ctx.user_prompt,
+                'last_assistant_message': ctx.assistant_response,
+            })
+
+        # Update session state with new conversation state and flags
+        st.session_state.end_control_state = decision['state']
+        st.session_state.confirmation_flag = conversation_context.get('confirmation_flag', False)
+        st.session_state.user_end_intent = conversation_context.get('user_end_intent', False)
+        st.session_state.bot_end_ack = conversation_context.get('bot_end_ack', False)
+        st.session_state.mi_coverage = conversation_context.get('mi_coverage')
+
+        if not require_confirmation:
+            # Semantic-based v4 decides alone when confirmation is disabled
+            if not decision['continue']:
+                st.session_state.conversation_state = "ended"
+                st.info("💬 The conversation has concluded. Click 'Finish Session & Get Feedback' to receive your evaluation.")
+                logger.info(f"Conversation ended: {decision['reason']}")
+            return
+
+        # Handle confirmation prompt if needed
+        if decision.get('requires_confirmation') and decision.get('confirmation_prompt'):
+            # Add confirmation prompt as an assistant message (patient voice)
+            confirmation_msg = decision['confirmation_prompt']
+            st.session_state.chat_history.append(stamp_message({"role": "assistant", "content": confirmation_msg}))
+            adapter.show_confirmation(confirmation_msg)
+            logger.info(f"Showing confirmation prompt: {confirmation_msg}")
+
+        # Only end if decision says so
+        if not decision['continue']:
+            st.session_state.conversation_state = "ended"
+            st.info("💬 The conversation has concluded with mutual confirmation. Click 'Finish Session & Get Feedback' to receive your evaluation.")
+            logger.info(f"Conversation ended: {decision['reason']}")
+        elif decision['state'] == 'PARKED':
+            st.warning("💬 Session paused. Reconnect to continue the conversation.")
+            logger.info(f"Session parked: {decision['reason']}")